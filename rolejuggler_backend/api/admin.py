@@ -1,3 +1,28 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import IngestionRun
+
+
+@admin.register(IngestionRun)
+class IngestionRunAdmin(admin.ModelAdmin):
+    """Read-only: runs are written by api.tracing"""
+    list_display = ('started_at', 'user', 'source', 'status', 'duration_ms', 'messages', 'updates', 'llm_calls',
+                    'cache_hits', 'errors', 'slowest_stage')
+    list_filter = ('status', 'source')
+    search_fields = ('user__username', 'user__email', 'error')
+    date_hierarchy = 'started_at'
+    ordering = ('-started_at',)
+    list_select_related = ('user',)
+
+    @admin.display(description='Slowest stage')
+    def slowest_stage(self, run):
+        if not run.spans:
+            return '-'
+        span = max(run.spans, key=lambda s: s['ms'])
+        return f"{span['stage']} ({span['ms']:.0f} ms)"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
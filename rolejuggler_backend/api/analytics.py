@@ -0,0 +1,272 @@
+"""
+Productivity analytics over a user's WorkSession and Task history.
+
+Each table is read with one raw query straight into column lists (no
+model instances, no per-row field conversion) and turned into NumPy
+arrays. Every series is then computed with array operations:
+
+  * heatmap: focus minutes per hour of the week (Monday 00:00 first),
+    each session split across the hours it spans
+  * focus: daily focus minutes per job with rolling 7- and 28-day sums
+  * session lengths: histogram and percentiles, overall and per job
+  * deadlines: tasks finished on time, late, or still open past due
+
+Times are bucketed in the requested timezone, DST included. Reports are
+cached under the user's data version (api.dashboard.version), so saving
+any of their tasks refreshes them.
+"""
+import datetime
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, models
+from django.db.models import Q, TextField
+from django.db.models.functions import Cast
+
+from . import dashboard
+from .models import Job, Task, WorkSession
+from .purge import LIVE_JOB
+
+ROLLING_WINDOWS = (7, 28)
+LENGTH_BINS_MINUTES = (0, 5, 15, 30, 60, 90, 120, 180, 240)  # the last bin is open-ended
+PERCENTILES = (25, 50, 75, 90)
+NO_JOB = -1
+DAY = 86400
+HOUR = 3600
+EPOCH = datetime.date(1970, 1, 1)
+EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday (Monday = 0)
+MAX_SPLIT_HOURS = 24  # sessions left running longer are counted in their first 24 hours only
+
+
+def max_days():
+    return getattr(settings, 'ANALYTICS_MAX_DAYS', 730)
+
+
+def _is_temporal(queryset, field):
+    return isinstance(queryset.query.chain().resolve_ref(field).output_field, models.DateField)
+
+
+def _columns(queryset, *fields):
+    """One list per field of `queryset`'s rows, fetched raw (DB-native values, no model field conversion)"""
+    if connections[queryset.db].vendor == 'sqlite':
+        # Wrapped in a CAST a column loses its declared type, so sqlite3 hands back the stored
+        # text instead of building a datetime per value; NumPy parses the ISO strings far faster
+        casts = {f'raw_{i}': Cast(field, TextField()) for i, field in enumerate(fields) if _is_temporal(queryset, field)}
+        queryset = queryset.annotate(**casts)
+        fields = tuple(f'raw_{i}' if f'raw_{i}' in casts else field for i, field in enumerate(fields))
+    sql, params = queryset.values_list(*fields).query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    if not rows:
+        return [[] for _ in fields]
+    return [list(column) for column in zip(*rows)]
+
+
+def _utc(values):
+    """datetime64[s] UTC from raw datetime values: naive UTC strings (SQLite) or aware datetimes; None is NaT"""
+    if not any(isinstance(value, datetime.datetime) for value in values[:1]):
+        return np.array(values, dtype='datetime64[us]').astype('datetime64[s]')
+    seconds = np.array([value and value.timestamp() for value in values], dtype=np.float64)
+    result = np.full(len(seconds), np.datetime64('NaT'), dtype='datetime64[s]')
+    known = ~np.isnan(seconds)
+    result[known] = seconds[known].astype(np.int64).astype('datetime64[s]')
+    return result
+
+
+def _job_index(values):
+    """int64 job ids, NO_JOB for None"""
+    return np.nan_to_num(np.array(values, dtype=np.float64), nan=NO_JOB).astype(np.int64)
+
+
+def local_seconds(utc, tz):
+    """
+    Wall-clock seconds since the epoch in `tz` for datetime64[s] UTC
+    times (NaT excluded by the caller). The UTC offset is looked up once
+    per distinct UTC hour, so DST changes land in the right place.
+    """
+    seconds = utc.astype(np.int64)
+    hours, inverse = np.unique(seconds // HOUR, return_inverse=True)
+    offsets = np.array([
+        datetime.datetime.fromtimestamp(int(hour) * HOUR, tz).utcoffset().total_seconds() for hour in hours
+    ], dtype=np.int64)
+    return seconds + offsets[inverse]
+
+
+def heatmap(start, minutes):
+    """7x24 focus minutes by local weekday and hour for sessions starting at `start` (local seconds)"""
+    end = start + np.round(minutes * 60).astype(np.int64)
+    first = start // HOUR
+    spans = np.clip((end - 1) // HOUR - first + 1, 1, MAX_SPLIT_HOURS)
+    # One element per (session, hour it touches)
+    session = np.repeat(np.arange(len(start)), spans)
+    hour = first[session] + np.arange(len(session)) - np.repeat(np.cumsum(spans) - spans, spans)
+    overlap = np.minimum(end[session], (hour + 1) * HOUR) - np.maximum(start[session], hour * HOUR)
+    slot = ((hour // 24 + EPOCH_WEEKDAY) % 7) * 24 + hour % 24
+    return np.bincount(slot, weights=overlap / 60, minlength=7 * 24).reshape(7, 24)
+
+
+def rolling_focus(day, minutes, job, first_day, days):
+    """
+    (job ids, daily minutes, {window: rolling sums}) for the `days` days
+    from `first_day` (days since the epoch). `day` may reach back before
+    `first_day` so the first rolling sums are complete.
+    """
+    lead = max(ROLLING_WINDOWS) - 1
+    width = lead + days
+    column = day - (first_day - lead)
+    keep = (column >= 0) & (column < width)
+    column, minutes, job = column[keep], minutes[keep], job[keep]
+
+    job_ids = np.unique(job)
+    row = np.searchsorted(job_ids, job)
+    daily = np.bincount(row * width + column, weights=minutes, minlength=len(job_ids) * width)
+    daily = daily.reshape(len(job_ids), width)
+    cumulative = np.concatenate([np.zeros((len(job_ids), 1)), np.cumsum(daily, axis=1)], axis=1)
+    rolling = {
+        window: cumulative[:, lead + 1:] - cumulative[:, lead + 1 - window:width + 1 - window]
+        for window in ROLLING_WINDOWS
+    }
+    return job_ids, daily[:, lead:], rolling
+
+
+def _length_stats(minutes):
+    if not len(minutes):
+        return {'sessions': 0, 'mean': None, **{f'p{p}': None for p in PERCENTILES}}
+    return {
+        'sessions': int(len(minutes)),
+        'mean': round(float(minutes.mean()), 1),
+        **{f'p{p}': round(float(value), 1) for p, value in zip(PERCENTILES, np.percentile(minutes, PERCENTILES))},
+    }
+
+
+def session_lengths(minutes, job):
+    """Histogram over LENGTH_BINS_MINUTES and percentiles, overall and {job id: percentiles}"""
+    counts, _ = np.histogram(minutes, bins=[*LENGTH_BINS_MINUTES, np.inf])
+    order = np.argsort(job, kind='stable')
+    job_sorted, minutes_sorted = job[order], minutes[order]
+    boundaries = np.flatnonzero(np.diff(job_sorted)) + 1
+    per_job = {
+        int(group_jobs[0]): _length_stats(group)
+        for group_jobs, group in zip(np.split(job_sorted, boundaries), np.split(minutes_sorted, boundaries))
+        if len(group)
+    }
+    return counts, _length_stats(minutes), per_job
+
+
+def deadline_hits(deadline, completed, done, job, first_day, today):
+    """
+    Per job (and overall, under None) counts of tasks due from
+    `first_day` to `today`: finished on time, finished late, and still
+    open past the deadline. `deadline` and `completed` are local days
+    since the epoch; done tasks with no completion time are left out.
+    """
+    due = (deadline >= first_day) & (deadline <= today)
+    known = ~(done & (completed < 0))
+    on_time = due & known & done & (completed <= deadline)
+    late = due & known & done & (completed > deadline)
+    overdue = due & ~done & (deadline < today)
+
+    job_ids = np.unique(job[due]) if due.any() else np.array([], dtype=np.int64)
+    row = np.searchsorted(job_ids, job)
+    counts = {
+        name: np.bincount(row[mask], minlength=len(job_ids))
+        for name, mask in (('on_time', on_time), ('late', late), ('overdue', overdue))
+    }
+
+    def summary(on_time, late, overdue):
+        total = on_time + late + overdue
+        return {'on_time': int(on_time), 'late': int(late), 'overdue': int(overdue),
+                'hit_rate': round(on_time / total, 3) if total else None}
+
+    result = {int(job_id): summary(*(counts[name][i] for name in counts)) for i, job_id in enumerate(job_ids)}
+    result[None] = summary(on_time.sum(), late.sum(), overdue.sum())
+    return result
+
+
+def load_sessions(user, since):
+    """(start UTC datetime64[s], minutes, job id) of `user`'s finished sessions starting from `since`"""
+    queryset = WorkSession.objects.filter(task__user=user, duration__gt=0, start_time__gte=since).filter(
+        Q(task__job__isnull=True) | Q(task__job__deleted_at__isnull=True)
+    )
+    start, duration, job = _columns(queryset, 'start_time', 'duration', 'task__job_id')
+    return _utc(start), np.array(duration, dtype=np.float64) / 60000, _job_index(job)
+
+
+def load_tasks(user):
+    """(deadline datetime64[D], completed UTC datetime64[s], done, job id) of `user`'s tasks with a deadline"""
+    queryset = Task.objects.filter(LIVE_JOB, user=user, deadline__isnull=False)
+    deadline, completed, status, job = _columns(queryset, 'deadline', 'completed_at', 'status', 'job_id')
+    return (
+        np.array(deadline, dtype='datetime64[D]'), _utc(completed), np.array(status, dtype=object) == 'done',
+        _job_index(job),
+    )
+
+
+def build(user, days, tz, today):
+    """The report for the `days` days up to `today` in timezone `tz`"""
+    today_n = (today - EPOCH).days
+    first_day = today_n - days + 1
+    lead = max(ROLLING_WINDOWS) - 1
+    since = datetime.datetime.combine(today - datetime.timedelta(days=days + lead), datetime.time.min, tz)
+
+    start, minutes, job = load_sessions(user, since - datetime.timedelta(days=1))
+    start = local_seconds(start, tz)
+    day = start // DAY
+    job_ids, daily, rolling = rolling_focus(day, minutes, job, first_day, days)
+    in_window = (day >= first_day) & (day <= today_n)
+    grid = heatmap(start[in_window], minutes[in_window])
+    counts, lengths, lengths_by_job = session_lengths(minutes[in_window], job[in_window])
+
+    deadline, completed, done, task_job = load_tasks(user)
+    completed_day = np.full(len(completed), -1, dtype=np.int64)
+    finished = ~np.isnat(completed)
+    completed_day[finished] = local_seconds(completed[finished], tz) // DAY
+    hits = deadline_hits(deadline.astype(np.int64), completed_day, done, task_job, first_day, today_n)
+
+    jobs = {row['id']: row for row in Job.objects.filter(user=user).values('id', 'name', 'company', 'color')}
+    job_rows = []
+    for i, job_id in enumerate(job_ids.tolist()):
+        info = jobs.get(job_id, {})
+        job_rows.append({
+            'job_id': None if job_id == NO_JOB else job_id,
+            'name': info.get('name', 'No job'),
+            'color': info.get('color'),
+            'total_minutes': round(float(daily[i].sum()), 1),
+            'daily': np.round(daily[i], 1).tolist(),
+            **{f'rolling_{window}': np.round(rolling[window][i], 1).tolist() for window in ROLLING_WINDOWS},
+            'session_lengths': lengths_by_job.get(job_id, _length_stats(np.array([]))),
+            'deadlines': hits.get(job_id),
+        })
+    for job_id, summary in hits.items():
+        if job_id is not None and job_id not in set(job_ids.tolist()):
+            info = jobs.get(job_id, {})
+            job_rows.append({'job_id': None if job_id == NO_JOB else job_id, 'name': info.get('name', 'No job'),
+                             'color': info.get('color'), 'total_minutes': 0.0, 'deadlines': summary})
+
+    return {
+        'timezone': str(tz),
+        'start': EPOCH + datetime.timedelta(days=first_day),
+        'end': today,
+        'heatmap': np.round(grid, 1).tolist(),
+        'session_lengths': {
+            'bins': list(LENGTH_BINS_MINUTES),
+            'counts': counts.tolist(),
+            **lengths,
+        },
+        'deadlines': hits[None],
+        'jobs': job_rows,
+    }
+
+
+def snapshot(user, days, tz, today=None):
+    """(report, served from cache?) for `user`"""
+    today = today or datetime.datetime.now(tz).date()
+    key = f"analytics:{user.id}:{dashboard.version(user.id)}:{days}:{tz}:{today.isoformat()}"
+    cached = cache.get(key)
+    if cached is not None:
+        return cached, True
+    data = build(user, days, tz, today)
+    cache.set(key, data, getattr(settings, 'ANALYTICS_CACHE_SECONDS', 3600))
+    return data, False
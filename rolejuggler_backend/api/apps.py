@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Connects the resolver's and dashboard's cache invalidation signals
+        from . import company_resolver, dashboard  # noqa: F401
@@ -0,0 +1,172 @@
+"""
+Minimal IMAP4rev1 client on asyncio streams.
+
+Only what ingestion needs: LOGIN, SELECT, SEARCH and FETCH (by message
+number or UID, with literals) and LOGOUT. Every command is tagged and its untagged responses are
+collected until the tagged completion, so many mailboxes can be polled
+concurrently from one thread.
+"""
+import asyncio
+import re
+import ssl as ssl_module
+
+_LITERAL_RE = re.compile(rb'\{(\d+)\}\r\n$')
+_FETCH_RE = re.compile(rb'^(\d+) FETCH ', re.IGNORECASE)
+_UID_RE = re.compile(rb'\bUID (\d+)', re.IGNORECASE)
+_UIDVALIDITY_RE = re.compile(rb'\[UIDVALIDITY (\d+)\]', re.IGNORECASE)
+
+
+class IMAPError(Exception):
+    """The server answered NO/BAD or the connection broke"""
+
+
+class AuthenticationError(IMAPError):
+    pass
+
+
+def quote(value):
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class AsyncIMAPClient:
+    def __init__(self, host, port=993, use_ssl=True, timeout=30.0):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.reader = self.writer = None
+        self.uidvalidity = None
+        self._tag = 0
+
+    async def connect(self):
+        context = ssl_module.create_default_context() if self.use_ssl else None
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=context), self.timeout
+        )
+        greeting = await self._readline()
+        if not greeting.startswith(b'* OK'):
+            raise IMAPError(f"unexpected greeting: {greeting[:80]!r}")
+        return self
+
+    async def _readline(self):
+        line = await asyncio.wait_for(self.reader.readline(), self.timeout)
+        if not line:
+            raise IMAPError("connection closed by server")
+        return line
+
+    async def _read_response(self):
+        """One response line with its literals: (text with literals elided, [literal bytes])"""
+        line = await self._readline()
+        text, literals = line, []
+        while True:
+            match = _LITERAL_RE.search(line)
+            if not match:
+                break
+            literals.append(await asyncio.wait_for(self.reader.readexactly(int(match.group(1))), self.timeout))
+            line = await self._readline()
+            text += line
+        return text, literals
+
+    async def command(self, *args):
+        """Send a command; returns its untagged responses, raises IMAPError unless OK"""
+        self._tag += 1
+        tag = f'A{self._tag:04d}'.encode()
+        self.writer.write(tag + b' ' + ' '.join(args).encode() + b'\r\n')
+        await self.writer.drain()
+
+        untagged = []
+        while True:
+            text, literals = await self._read_response()
+            if text.startswith(tag + b' '):
+                status = text[len(tag) + 1:].split(b' ', 1)[0].upper()
+                if status != b'OK':
+                    message = text.decode(errors='replace').strip()
+                    if args[0] == 'LOGIN':
+                        raise AuthenticationError(message)
+                    raise IMAPError(message)
+                return untagged
+            untagged.append((text, literals))
+
+    async def login(self, user, password):
+        await self.command('LOGIN', quote(user), quote(password))
+
+    async def select(self, mailbox='INBOX'):
+        """Number of messages in the mailbox; also records its UIDVALIDITY"""
+        exists = 0
+        for text, _ in await self.command('SELECT', quote(mailbox)):
+            parts = text.split()
+            if len(parts) >= 3 and parts[2].upper() == b'EXISTS':
+                exists = int(parts[1])
+            match = _UIDVALIDITY_RE.search(text)
+            if match:
+                self.uidvalidity = int(match.group(1))
+        return exists
+
+    async def search(self, *criteria):
+        numbers = []
+        for text, _ in await self.command('SEARCH', *criteria):
+            if text.upper().startswith(b'* SEARCH'):
+                numbers.extend(int(n) for n in text.split()[2:])
+        return numbers
+
+    async def fetch(self, numbers, items):
+        """{message number: [literals]} for `items` (e.g. "(RFC822.HEADER)") of all `numbers` in one command"""
+        if not numbers:
+            return {}
+        results = {}
+        for text, literals in await self.command('FETCH', sequence_set(numbers), items):
+            match = _FETCH_RE.match(text[2:])
+            if match:
+                results[int(match.group(1))] = literals
+        return results
+
+    async def uid_search(self, *criteria):
+        numbers = []
+        for text, _ in await self.command('UID SEARCH', *criteria):
+            if text.upper().startswith(b'* SEARCH'):
+                numbers.extend(int(n) for n in text.split()[2:])
+        return numbers
+
+    async def uid_fetch(self, uids, items):
+        """{uid: (response text, [literals])} for `items` of all `uids` in one command"""
+        if not uids:
+            return {}
+        results = {}
+        for text, literals in await self.command('UID FETCH', sequence_set(uids), items):
+            match = _UID_RE.search(text)
+            if _FETCH_RE.match(text[2:]) and match:
+                results[int(match.group(1))] = (text, literals)
+        return results
+
+    async def logout(self):
+        try:
+            await self.command('LOGOUT')
+        except (IMAPError, OSError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        await self.logout()
+
+
+def sequence_set(numbers):
+    """Compact IMAP sequence set: [1, 2, 3, 7] -> "1:3,7\""""
+    numbers = sorted(set(numbers))
+    ranges = []
+    start = prev = numbers[0]
+    for n in numbers[1:]:
+        if n != prev + 1:
+            ranges.append(f'{start}:{prev}' if start != prev else str(start))
+            start = n
+        prev = n
+    ranges.append(f'{start}:{prev}' if start != prev else str(start))
+    return ','.join(ranges)
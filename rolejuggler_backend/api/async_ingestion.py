@@ -0,0 +1,247 @@
+"""
+Concurrent IMAP ingestion for many users on one event loop.
+
+Each user's INBOX is polled over an asyncio stream (login, search today's
+messages, one FETCH for all their headers and body structures, then the
+first few KB of each text part - see api.mail_body), with a global cap on users in
+flight and a per-host cap on open connections so a provider isn't hit
+with hundreds of simultaneous logins. The headers then go through the
+same classification and persistence as the "fetch today" button
+(api.ingestion): classification on worker threads since it may call the
+LLM, several messages at once, database writes through sync_to_async.
+
+    results = run_ingestion(User.objects.exclude(app_password=""), use_llm=False)
+"""
+import asyncio
+import contextlib
+import datetime
+import email
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+
+from . import mail_body, tracing
+from .async_imap import AsyncIMAPClient, AuthenticationError
+from .classifier import load_for_user as load_email_classifier
+from .ingestion import classify_message, decode_subject, is_relevant, save_classified_batch
+
+
+def imap_settings():
+    """(host, port, use_ssl) of the mail server from settings"""
+    return (
+        getattr(settings, 'IMAP_HOST', 'imap.gmail.com'),
+        getattr(settings, 'IMAP_PORT', 993),
+        getattr(settings, 'IMAP_SSL', True),
+    )
+
+
+class HostLimits:
+    """One connection semaphore per (host, port)"""
+
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self.semaphores = {}
+
+    def __call__(self, host, port):
+        key = (host, port)
+        if key not in self.semaphores:
+            self.semaphores[key] = asyncio.Semaphore(self.per_host)
+        return self.semaphores[key]
+
+
+def _classify(uid, raw, snippet, uidvalidity, classifier, use_llm):
+    try:
+        item = classify_message(email.message_from_bytes(raw), use_llm=use_llm, classifier=classifier, snippet=snippet)
+    except Exception as e:
+        print(f"Error classifying message: {e}")
+        tracing.error(e)
+        return None
+    if item is not None:
+        item.update(imap_uid=uid, imap_uidvalidity=uidvalidity)
+    return item
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _classify_executor():
+    """
+    Threads for classification, sized to the LLM concurrency cap: they
+    mostly wait on the API, so the CPU-sized default executor would
+    needlessly serialize them
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'LLM_MAX_CONCURRENCY', 4), thread_name_prefix='classify'
+                )
+    return _executor
+
+
+async def classify_all(messages, uidvalidity, classifier, use_llm):
+    """
+    Classified items for (uid, raw header, snippet) messages, in order.
+    Messages are classified concurrently on worker threads, at most
+    LLM_MAX_CONCURRENCY at a time so waiting LLM calls never queue past
+    the client's deadline.
+    """
+    gate = asyncio.Semaphore(getattr(settings, 'LLM_MAX_CONCURRENCY', 4))
+    classify = sync_to_async(_classify, thread_sensitive=False, executor=_classify_executor())
+
+    async def one(uid, raw, snippet):
+        async with gate:
+            return await classify(uid, raw, snippet, uidvalidity, classifier, use_llm)
+
+    items = await asyncio.gather(*(one(*message) for message in messages))
+    return [item for item in items if item is not None]
+
+
+async def fetch_snippets(client, structures):
+    """
+    {uid: snippet text} for messages with a text part, given their parsed
+    BODYSTRUCTUREs. Only the first EMAIL_SNIPPET_BYTES of that part are
+    fetched, with one command per distinct part number.
+    """
+    by_section = {}
+    for uid, structure in structures.items():
+        part = mail_body.choose_text_part(structure)
+        if part:
+            by_section.setdefault(part[0], []).append((uid, part))
+
+    snippets = {}
+    size = mail_body.snippet_bytes()
+    for section, entries in by_section.items():
+        fetched = await client.uid_fetch([uid for uid, _ in entries], f'(BODY.PEEK[{section}]<0.{size}>)')
+        for uid, part in entries:
+            if fetched.get(uid) and fetched[uid][1]:
+                snippets[uid] = mail_body.snippet(fetched[uid][1][0], part)
+    return snippets
+
+
+async def fetch_headers(client, user, password, since, cursor=None, snippets=True):
+    """
+    New INBOX messages, newest first, as (uid, raw header, body snippet),
+    and the cursor to resume from next time. With a `cursor`
+    ({'uidvalidity', 'last_uid'}) only messages above its UID are fetched;
+    otherwise those since `since`.
+    """
+    with tracing.span('login'):
+        await client.login(user, password)
+    with tracing.span('select'):
+        await client.select('INBOX')
+    last_uid = (cursor or {}).get('last_uid') or 0
+    if last_uid and (cursor or {}).get('uidvalidity') == client.uidvalidity:
+        # "UID n:*" always returns the newest message, even if already seen
+        with tracing.span('search'):
+            uids = [uid for uid in await client.uid_search('UID', f'{last_uid + 1}:*') if uid > last_uid]
+    else:
+        last_uid = 0
+        with tracing.span('search'):
+            uids = await client.uid_search('SINCE', since.strftime('%d-%b-%Y'))
+
+    with tracing.span('fetch_headers'):
+        fetched = await client.uid_fetch(uids, '(RFC822.HEADER BODYSTRUCTURE)' if snippets else '(RFC822.HEADER)')
+    bodies = {}
+    if snippets:
+        structures = {}
+        for uid, (text, literals) in fetched.items():
+            # Irrelevant messages are dropped by classification anyway; don't fetch their bodies
+            if not literals or not is_relevant(decode_subject(email.message_from_bytes(literals[0]))):
+                continue
+            try:
+                structures[uid] = mail_body.bodystructure_from_response(text)
+            except ValueError:
+                pass
+        with tracing.span('fetch_bodies'):
+            bodies = await fetch_snippets(client, structures)
+
+    messages = [
+        (uid, fetched[uid][1][0], bodies.get(uid, ''))
+        for uid in sorted(uids, reverse=True) if fetched.get(uid) and fetched[uid][1]
+    ]
+    return messages, {'uidvalidity': client.uidvalidity, 'last_uid': max(uids, default=last_uid)}
+
+
+async def ingest_mailbox(user, limits=None, server=None, use_llm=True, since=None, timeout=None, cursor=None):
+    """
+    Fetch, classify and save one user's new messages. Returns (messages
+    fetched, cursor for the next poll, saved Updates, saved Meetings);
+    IMAP and network errors are raised.
+    """
+    host, port, use_ssl = server or imap_settings()
+    timeout = timeout or getattr(settings, 'IMAP_TIMEOUT_SECONDS', 30.0)
+    with tracing.span('load_classifier'):
+        classifier = await sync_to_async(load_email_classifier)(user)
+    # The host slot is only held while talking to the server
+    async with limits(host, port) if limits else contextlib.nullcontext():
+        client = AsyncIMAPClient(host, port, use_ssl, timeout)
+        with tracing.span('connect'):
+            await client.connect()
+        try:
+            messages, cursor = await fetch_headers(
+                client, user.email, user.app_password or '', since or datetime.date.today(), cursor
+            )
+        finally:
+            with tracing.span('logout'):
+                await client.logout()
+
+    with tracing.span('classify'):
+        items = await classify_all(messages, cursor['uidvalidity'], classifier, use_llm)
+    updates, meetings = [], []
+    if items:
+        with tracing.span('save'):
+            updates, meetings = await sync_to_async(save_classified_batch)(user, items)
+    return len(messages), cursor, updates, meetings
+
+
+async def ingest_user(user, limits, server=None, use_llm=True, since=None, timeout=None, cursor=None):
+    """
+    Poll one user's mailbox; returns a result dict (errors are reported,
+    not raised) including the cursor for the next incremental poll.
+    """
+    result = {
+        'user': user.username, 'messages': 0, 'updates': 0, 'meetings': 0,
+        'error': None, 'auth_failed': False, 'cursor': cursor,
+    }
+    started = time.monotonic()
+    try:
+        result['messages'], result['cursor'], updates, meetings = await ingest_mailbox(
+            user, limits, server, use_llm, since, timeout, cursor
+        )
+        result['updates'], result['meetings'] = len(updates), len(meetings)
+    except AuthenticationError as e:
+        result['error'] = f"authentication failed: {e}"
+        result['auth_failed'] = True
+    except Exception as e:
+        # IMAP and network errors, but also anything else (a database error while
+        # saving, say): one user's failure must not lose every other user's results
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.monotonic() - started, 3)
+    return result
+
+
+async def ingest_users(users, concurrency=None, per_host=None, **options):
+    """Poll all `users` concurrently; results in input order"""
+    concurrency = concurrency or getattr(settings, 'IMAP_MAX_CONCURRENT_USERS', 100)
+    limits = HostLimits(per_host or getattr(settings, 'IMAP_CONNECTIONS_PER_HOST', 10))
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(user):
+        async with gate:
+            return await ingest_user(user, limits, **options)
+
+    return await asyncio.gather(*(one(user) for user in users))
+
+
+def run_ingestion(users, **options):
+    """
+    Synchronous entry point. Database work is routed back to the calling
+    thread by async_to_sync, so this is safe inside transactions and tests.
+    """
+    return async_to_sync(ingest_users)(list(users), **options)
@@ -0,0 +1,127 @@
+"""
+Native async versions of the I/O-bound endpoints, used when the project
+runs under ASGI with settings.ASYNC_VIEWS on (see api.urls).
+
+DRF views are synchronous, so these are plain Django coroutine views
+answering the same JSON as their DRF counterparts in api.views. DRF's
+authentication and the token-bucket throttles run on a worker thread. The
+IMAP conversation, the LLM calls and single-flight waiting are awaited,
+so a request held up on the mail server doesn't tie up a thread. ORM work
+goes through sync_to_async on Django's shared thread.
+"""
+import datetime
+import json
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import dashboard, throttling, tracing
+from .async_imap import AuthenticationError
+from .async_ingestion import ingest_mailbox
+from .serializers import UpdateSerializer
+
+
+def json_response(data, status_code=status.HTTP_200_OK, headers=None):
+    """JSON encoded like DRF's JSONRenderer, so both view flavours answer the same bytes"""
+    body = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    body = body.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+    return HttpResponse(body.encode(), status=status_code, headers=headers, content_type='application/json')
+
+
+def _authenticate(request):
+    """The authenticated user, or the error response DRF's IsAuthenticated would give"""
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    drf_request = Request(request, authenticators=authenticators)
+    try:
+        user = drf_request.user
+        if not user or not user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        return user, None
+    except exceptions.APIException as e:
+        # 401 when the first authenticator can challenge, else 403 (as APIView.handle_exception)
+        header = authenticators[0].authenticate_header(drf_request) if authenticators else None
+        if header:
+            return None, json_response({'detail': e.detail}, status.HTTP_401_UNAUTHORIZED, {'WWW-Authenticate': header})
+        return None, json_response({'detail': e.detail}, status.HTTP_403_FORBIDDEN)
+
+
+def _throttled(scope, user):
+    """429 response if `user`'s `scope` bucket is empty, else None"""
+    wait = throttling.take(scope, user.pk)
+    if not wait:
+        return None
+    headers = {}
+    if not math.isinf(wait):
+        headers['Retry-After'] = str(math.ceil(wait))
+    detail = exceptions.Throttled(None if math.isinf(wait) else wait).detail
+    return json_response({'detail': detail}, status.HTTP_429_TOO_MANY_REQUESTS, headers)
+
+
+def _serialize_updates(updates):
+    return list(UpdateSerializer(updates, many=True).data)
+
+
+async def _fetch_today_emails(user):
+    """(response data, status) of one "fetch today" run for `user`, traced as an IngestionRun"""
+    async with tracing.arun(user, 'fetch_today_async') as tracer:
+        try:
+            messages, _, updates, meetings = await ingest_mailbox(user)
+        except AuthenticationError as e:
+            tracer.fail(e)
+            return {"detail": "IMAP login failed."}, status.HTTP_400_BAD_REQUEST
+        except Exception as e:
+            tracer.fail(e)
+            print(f"Error fetching emails: {e}")
+            return {"detail": "Error fetching emails."}, status.HTTP_500_INTERNAL_SERVER_ERROR
+        tracer.result.update(messages=messages, updates=len(updates), meetings=len(meetings))
+        return await sync_to_async(_serialize_updates)(updates), status.HTTP_200_OK
+
+
+@csrf_exempt  # SessionAuthentication enforces CSRF itself, as in DRF views
+@require_http_methods(["POST"])
+async def fetch_today_emails(request):
+    user, error = await sync_to_async(_authenticate)(request)
+    if error:
+        return error
+    throttled = await sync_to_async(_throttled)('ingestion', user)
+    if throttled:
+        return throttled
+    if not user.email or not user.app_password:
+        return json_response({"detail": "Gmail credentials not configured."}, status.HTTP_400_BAD_REQUEST)
+
+    # Shares runs (and results) with the sync view, whichever flavour a worker serves
+    try:
+        data, status_code = await throttling.asingle_flight(
+            f"fetch-today:{user.pk}", lambda: _fetch_today_emails(user),
+            lock_seconds=getattr(settings, 'INGESTION_LOCK_SECONDS', 120.0),
+            wait_seconds=getattr(settings, 'INGESTION_COALESCE_WAIT_SECONDS', 60.0),
+        )
+    except throttling.Busy as e:
+        return json_response(
+            {"detail": "Already fetching emails, try again later."},
+            status.HTTP_429_TOO_MANY_REQUESTS, {"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    return json_response(data, status_code)
+
+
+@require_http_methods(["GET"])
+async def dashboard_view(request):
+    """Today's tasks, upcoming meetings, recent updates, notes and counts in one response"""
+    user, error = await sync_to_async(_authenticate)(request)
+    if error:
+        return error
+    try:
+        today = datetime.date.fromisoformat(request.GET["date"]) if request.GET.get("date") else timezone.now().date()
+    except ValueError:
+        return json_response({"detail": "date must be YYYY-MM-DD."}, status.HTTP_400_BAD_REQUEST)
+    data, cached = await sync_to_async(dashboard.snapshot)(user, today)
+    return json_response(data, headers={"X-Dashboard-Cache": "hit" if cached else "miss"})
@@ -0,0 +1,263 @@
+"""
+Streaming export and batched import of a user's full dataset.
+
+Export walks every resource with `.iterator()` so memory stays flat no
+matter how many rows a user has. Import reads NDJSON line by line,
+validates each record against the model fields and `bulk_create`s in
+batches, remapping job/task ids to the newly created rows.
+"""
+import csv
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Q
+
+from . import dashboard, fingerprint
+from .models import Job, Task, WorkSession, Meeting, StickyNote, Update
+from .purge import LIVE_JOB
+from .recurrence import last_occurrence
+
+CHUNK_SIZE = 2000
+BATCH_SIZE = 1000
+
+# Export/import order matters: parents come before the rows pointing at them.
+# (name, model, owner lookup, {fk attname: resource whose ids it references})
+RESOURCES = [
+    ("jobs", Job, "user", {}),
+    ("tasks", Task, "user", {"job_id": "jobs"}),
+    ("work_sessions", WorkSession, "task__user", {"task_id": "tasks"}),
+    ("meetings", Meeting, "user", {"job_id": "jobs"}),
+    ("sticky_notes", StickyNote, "user", {}),
+    ("updates", Update, "user", {}),
+]
+RESOURCE_NAMES = [name for name, *_ in RESOURCES]
+
+# A soft-deleted job and its rows are hidden until purged, so they aren't exported
+LIVE_ROWS = {
+    "jobs": Q(deleted_at__isnull=True),
+    "tasks": LIVE_JOB,
+    "work_sessions": Q(task__job__isnull=True) | Q(task__job__deleted_at__isnull=True),
+    "meetings": LIVE_JOB,
+}
+
+
+class DatasetImportError(ValueError):
+    """Raised for an invalid import record; carries the line number"""
+
+    def __init__(self, line_no, message):
+        super().__init__(f"line {line_no}: {message}")
+        self.line_no = line_no
+
+
+def export_fields(model):
+    """Concrete fields written to the export (owner and pk excluded)"""
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key and field.name != "user"
+    ]
+
+
+def import_fields(model):
+    """
+    Fields accepted on import; auto timestamps are set by the database, and
+    deleted_at is dropped since an imported job has no Purge to remove it.
+    """
+    return [
+        field for field in export_fields(model)
+        if field.editable and not getattr(field, "auto_now", False) and not getattr(field, "auto_now_add", False)
+        and field.name != "deleted_at"
+    ]
+
+
+def _encode(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _rows(user, resource):
+    name, model, owner, _ = resource
+    fields = export_fields(model)
+    columns = ["id"] + [field.attname for field in fields]
+    queryset = model.objects.filter(LIVE_ROWS.get(name, Q()), **{owner: user}).order_by("pk").values_list(*columns)
+    return columns, queryset.iterator(chunk_size=CHUNK_SIZE)
+
+
+def export_ndjson(user, resources=None):
+    """Yield NDJSON lines: one {"resource": ..., "id": ..., <fields>} object per row"""
+    for resource in RESOURCES:
+        name = resource[0]
+        if resources and name not in resources:
+            continue
+        columns, rows = _rows(user, resource)
+        prefix = '{"resource": "%s", ' % name
+        buffer = []
+        for row in rows:
+            buffer.append(prefix + json.dumps(dict(zip(columns, row)), default=_encode)[1:] + "\n")
+            if len(buffer) >= CHUNK_SIZE:
+                yield "".join(buffer)
+                buffer = []
+        if buffer:
+            yield "".join(buffer)
+
+
+class _Echo:
+    """File-like object whose write() just returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(user, resource_name):
+    """Yield CSV lines for a single resource"""
+    resource = next(r for r in RESOURCES if r[0] == resource_name)
+    columns, rows = _rows(user, resource)
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    buffer = []
+    for row in rows:
+        buffer.append(writer.writerow([
+            json.dumps(value) if isinstance(value, (list, dict)) else value for value in row
+        ]))
+        if len(buffer) >= CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+def _clean(field, value):
+    """Convert and validate one raw value for `field`"""
+    if value is None or value == "":
+        if isinstance(field, models.JSONField):
+            return field.get_default()
+        if field.null:
+            return None
+        if field.has_default():
+            return field.get_default()
+        if value is None:
+            raise ValidationError("This field cannot be null.")
+
+    if isinstance(field, models.JSONField):
+        return value
+    value = field.to_python(value)
+    if field.choices and value not in {choice for choice, _ in field.flatchoices}:
+        raise ValidationError(f"{value!r} is not a valid choice.")
+    if getattr(field, "max_length", None) and isinstance(value, str) and len(value) > field.max_length:
+        raise ValidationError(f"Ensure this value has at most {field.max_length} characters.")
+    return value
+
+
+class _Importer:
+    def __init__(self, user, batch_size):
+        self.user = user
+        self.batch_size = batch_size
+        self.resources = {name: (model, fks) for name, model, _, fks in RESOURCES}
+        self.fields = {name: import_fields(model) for name, model, _, _ in RESOURCES}
+        self.id_maps = {name: {} for name in RESOURCE_NAMES}
+        self.counts = {name: 0 for name in RESOURCE_NAMES}
+        self.current = None
+        self.pending = []  # (old id, instance)
+
+    def add(self, line_no, record):
+        name = record.get("resource")
+        if name not in self.resources:
+            raise DatasetImportError(line_no, f"unknown resource {name!r}")
+        if self.current is not None and RESOURCE_NAMES.index(name) < RESOURCE_NAMES.index(self.current):
+            raise DatasetImportError(line_no, f"{name} must come before {self.current}")
+        if name != self.current:
+            self.flush()
+            self.current = name
+
+        model, fks = self.resources[name]
+        values = {}
+        for field in self.fields[name]:
+            raw = record.get(field.attname)
+            if field.attname in fks:
+                if raw is None:
+                    if not field.null:
+                        raise DatasetImportError(line_no, f"{field.attname} is required")
+                    values[field.attname] = None
+                    continue
+                try:
+                    values[field.attname] = self.id_maps[fks[field.attname]][raw]
+                except KeyError:
+                    raise DatasetImportError(line_no, f"{field.attname}={raw} does not match an imported row")
+                continue
+            try:
+                values[field.attname] = _clean(field, raw)
+            except ValidationError as e:
+                raise DatasetImportError(line_no, f"{field.attname}: {' '.join(e.messages)}")
+
+        if model is not WorkSession:
+            values["user"] = self.user
+        if model is Meeting and values.get("recurrence_rule"):
+            try:
+                values["recurrence_end"] = last_occurrence(values["recurrence_rule"], values["meeting_date"])
+            except ValueError as e:
+                raise DatasetImportError(line_no, f"recurrence_rule: {e}")
+        if model is Meeting:
+            values["fingerprint"] = fingerprint.for_meeting(values.get("title", ""), values.get("organizer_domain", ""))
+
+        self.pending.append((record.get("id"), model(**values)))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def _skip_saved_messages(self):
+        """
+        Drop pending Updates for mailbox messages the user already has (a
+        restore into the same account); they'd break the unique constraint.
+        """
+        uids = {obj.imap_uid for _, obj in self.pending if obj.imap_uid is not None}
+        seen = set(
+            Update.objects.filter(user=self.user, imap_uid__in=uids).values_list("imap_uidvalidity", "imap_uid")
+        ) if uids else set()
+        pending = []
+        for old_id, obj in self.pending:
+            if obj.imap_uid is not None:
+                key = (obj.imap_uidvalidity, obj.imap_uid)
+                if key in seen:
+                    continue
+                seen.add(key)
+            pending.append((old_id, obj))
+        self.pending = pending
+
+    def flush(self):
+        if self.pending and self.resources[self.current][0] is Update:
+            self._skip_saved_messages()
+        if not self.pending:
+            return
+        model, _ = self.resources[self.current]
+        created = model.objects.bulk_create([obj for _, obj in self.pending])
+        id_map = self.id_maps[self.current]
+        for (old_id, _), obj in zip(self.pending, created):
+            if old_id is not None:
+                id_map[old_id] = obj.pk
+        self.counts[self.current] += len(created)
+        self.pending = []
+
+
+def import_ndjson(user, lines, batch_size=BATCH_SIZE):
+    """
+    Import NDJSON `lines` (bytes or str) produced by `export_ndjson` for
+    `user`. Runs in one transaction; raises DatasetImportError on the first bad
+    record. Returns the number of rows created per resource.
+    """
+    importer = _Importer(user, batch_size)
+    with transaction.atomic():
+        for line_no, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise DatasetImportError(line_no, "invalid JSON")
+            if not isinstance(record, dict):
+                raise DatasetImportError(line_no, "expected a JSON object")
+            importer.add(line_no, record)
+        importer.flush()
+        dashboard.invalidate(user.id)  # bulk_create sends no signals
+    return importer.counts
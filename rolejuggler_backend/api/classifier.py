@@ -0,0 +1,180 @@
+"""
+On-box email type classifier.
+
+Multinomial naive Bayes over hashed subject/sender features. It is trained
+incrementally from each user's own Update.type labels and classifies in a
+few microseconds; the ingestion pipeline only escalates to the LLM when
+its confidence is below EMAIL_CLASSIFIER_CONFIDENCE.
+
+It learns from the raw Subject (Update.subject, what it is later asked
+about) and only from labels the LLM or the user gave: learning from its
+own or the keyword rules' guesses would just reinforce their mistakes.
+"""
+import math
+import re
+import zlib
+
+from django.conf import settings
+
+from .models import ClassifierState, Update
+
+LABELS = ('email', 'meeting', 'task')
+# Update.classified_by values worth learning from
+TRUSTED_SOURCES = ('llm', 'user')
+N_FEATURES = 2 ** 18
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def confidence_threshold():
+    return getattr(settings, 'EMAIL_CLASSIFIER_CONFIDENCE', 0.9)
+
+
+def _bucket(feature):
+    # crc32 rather than hash(): must be stable across processes and restarts
+    return zlib.crc32(feature.encode('utf-8')) % N_FEATURES
+
+
+def features(subject, sender):
+    """Hashed feature buckets for a subject/sender pair"""
+    words = TOKEN_RE.findall((subject or "").lower())
+    feats = [f"w:{w}" for w in words]
+    feats += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+
+    address = (sender or "").lower()
+    if '<' in address:
+        address = address[address.rfind('<') + 1:].rstrip('>')
+    if '@' in address:
+        local, _, domain = address.rpartition('@')
+        feats.append(f"d:{domain.strip()}")
+        feats.append(f"s:{local.strip()}@{domain.strip()}")
+    return [_bucket(f) for f in feats]
+
+
+class NaiveBayesClassifier:
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+        self.doc_counts = {label: 0 for label in LABELS}
+        self.token_totals = {label: 0 for label in LABELS}
+        self.counts = {label: {} for label in LABELS}  # label -> bucket -> count
+        self.vocabulary = set()
+
+    @property
+    def trained(self):
+        return sum(self.doc_counts.values())
+
+    def learn(self, subject, sender, label):
+        if label not in self.doc_counts:
+            return
+        self.doc_counts[label] += 1
+        table = self.counts[label]
+        buckets = features(subject, sender)
+        for bucket in buckets:
+            table[bucket] = table.get(bucket, 0) + 1
+        self.vocabulary.update(buckets)
+        self.token_totals[label] += len(buckets)
+
+    def unlearn(self, subject, sender, label):
+        """Take back one learn() of the same message"""
+        if label not in self.doc_counts or not self.doc_counts[label]:
+            return
+        self.doc_counts[label] -= 1
+        table = self.counts[label]
+        buckets = features(subject, sender)
+        for bucket in buckets:
+            if table.get(bucket, 0) > 1:
+                table[bucket] -= 1
+            else:
+                table.pop(bucket, None)
+        self.token_totals[label] = max(0, self.token_totals[label] - len(buckets))
+
+    def predict_proba(self, subject, sender):
+        """Posterior probability for each label"""
+        total_docs = self.trained
+        if not total_docs:
+            return {label: 1 / len(LABELS) for label in LABELS}
+
+        buckets = features(subject, sender)
+        vocabulary_size = len(self.vocabulary) + 1
+        log_scores = {}
+        for label in LABELS:
+            # Laplace smoothing on both the prior and the likelihoods
+            score = math.log((self.doc_counts[label] + 1) / (total_docs + len(LABELS)))
+            table = self.counts[label]
+            denom = math.log(self.token_totals[label] + self.alpha * vocabulary_size)
+            for bucket in buckets:
+                score += math.log(table.get(bucket, 0) + self.alpha) - denom
+            log_scores[label] = score
+
+        top = max(log_scores.values())
+        exp_scores = {label: math.exp(score - top) for label, score in log_scores.items()}
+        norm = sum(exp_scores.values())
+        return {label: value / norm for label, value in exp_scores.items()}
+
+    def predict(self, subject, sender):
+        """(label, confidence) for a subject/sender pair"""
+        proba = self.predict_proba(subject, sender)
+        label = max(proba, key=proba.get)
+        return label, proba[label]
+
+    def to_dict(self):
+        return {
+            'doc_counts': self.doc_counts,
+            'token_totals': self.token_totals,
+            # JSON object keys must be strings
+            'counts': {label: {str(k): v for k, v in table.items()} for label, table in self.counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        clf = cls()
+        if data:
+            clf.doc_counts.update(data.get('doc_counts', {}))
+            clf.token_totals.update(data.get('token_totals', {}))
+            for label, table in data.get('counts', {}).items():
+                if label in clf.counts:
+                    clf.counts[label] = {int(k): v for k, v in table.items()}
+                    clf.vocabulary.update(clf.counts[label])
+        return clf
+
+
+def load_for_user(user):
+    """
+    The user's classifier, first caught up on any Updates labelled since
+    it was last saved.
+    """
+    state, _ = ClassifierState.objects.get_or_create(user=user)
+    clf = NaiveBayesClassifier.from_dict(state.model)
+
+    new_labels = (
+        Update.objects.filter(
+            user=user, id__gt=state.trained_through, type__in=LABELS, classified_by__in=TRUSTED_SOURCES
+        )
+        .order_by('id')
+        .values_list('id', 'subject', 'sender', 'type')
+    )
+    last_id = None
+    for last_id, subject, sender, label in new_labels.iterator(chunk_size=2000):
+        clf.learn(subject, sender, label)
+
+    if last_id is not None:
+        state.model = clf.to_dict()
+        state.trained_through = last_id
+        state.save(update_fields=['model', 'trained_through', 'updated_at'])
+    return clf
+
+
+def relabel(update, old_type, old_classified_by):
+    """
+    Correct the user's saved classifier for an Update the user just
+    relabelled. Updates it hasn't caught up on yet are learned the normal
+    way by load_for_user.
+    """
+    state = ClassifierState.objects.select_for_update().filter(user_id=update.user_id).first()
+    if state is None or update.id > state.trained_through:
+        return
+    clf = NaiveBayesClassifier.from_dict(state.model)
+    if old_classified_by in TRUSTED_SOURCES:
+        clf.unlearn(update.subject, update.sender, old_type)
+    clf.learn(update.subject, update.sender, update.type)
+    state.model = clf.to_dict()
+    state.save(update_fields=['model', 'updated_at'])
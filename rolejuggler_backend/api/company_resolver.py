@@ -0,0 +1,198 @@
+"""
+Sender → company → Job resolution.
+
+Sender addresses are parsed properly (display names, angle brackets) and
+reduced to their registrable domain with public-suffix rules, so
+"Alice <alice@mail.google.com>" and "bob@acme.co.uk" become google.com
+and acme.co.uk. Each user has a SenderDomain table mapping domains to a
+company and Job (which the user can override); an in-process LRU sits in
+front of it so repeat senders cost no queries.
+"""
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parseaddr
+
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import tracing
+from .models import Job, SenderDomain
+
+UNKNOWN = "Unknown"
+
+# Multi-label public suffixes seen in practice. Anything not listed is
+# treated as a single-label TLD (".com", ".io", ".de").
+MULTI_LABEL_SUFFIXES = {
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'ltd.uk', 'plc.uk', 'me.uk', 'net.uk', 'sch.uk',
+    'com.au', 'net.au', 'org.au', 'edu.au', 'gov.au', 'co.nz', 'org.nz', 'net.nz', 'ac.nz',
+    'co.in', 'net.in', 'org.in', 'firm.in', 'gen.in', 'ind.in', 'ac.in', 'edu.in', 'gov.in',
+    'co.jp', 'ne.jp', 'or.jp', 'ac.jp', 'go.jp', 'co.kr', 'or.kr', 'ac.kr',
+    'com.br', 'net.br', 'org.br', 'com.mx', 'org.mx', 'com.ar', 'com.co', 'com.pe', 'com.cl',
+    'com.cn', 'net.cn', 'org.cn', 'edu.cn', 'gov.cn', 'com.hk', 'org.hk', 'com.tw', 'org.tw',
+    'com.sg', 'edu.sg', 'org.sg', 'com.my', 'com.ph', 'co.id', 'or.id', 'co.th', 'in.th', 'com.vn',
+    'co.za', 'org.za', 'com.ng', 'co.ke', 'com.eg', 'com.tr', 'org.tr', 'co.il', 'org.il', 'ac.il',
+    'com.pk', 'com.bd', 'com.np', 'com.lk', 'com.sa', 'com.pl', 'com.ua', 'co.at', 'or.at',
+    'com.es', 'com.pt', 'com.gr', 'co.it',
+}
+
+# Personal mailbox providers say nothing about the sender's company
+FREEMAIL_DOMAINS = {
+    'gmail.com', 'googlemail.com', 'outlook.com', 'hotmail.com', 'live.com', 'msn.com',
+    'yahoo.com', 'ymail.com', 'icloud.com', 'me.com', 'mac.com', 'aol.com', 'proton.me',
+    'protonmail.com', 'gmx.com', 'gmx.de', 'mail.com', 'zoho.com', 'yandex.com', 'yandex.ru',
+    'hey.com', 'fastmail.com', 'rediffmail.com', 'qq.com', '163.com',
+}
+
+
+def sender_domain(from_header):
+    """Lower-cased domain of the address in a From header, or None"""
+    _, address = parseaddr(from_header or "")
+    if '@' not in address:
+        return None
+    domain = address.rpartition('@')[2].strip().strip('.').lower()
+    return domain or None
+
+
+def registrable_domain(domain):
+    """The domain one label below its public suffix: mail.google.com -> google.com"""
+    labels = domain.split('.')
+    if len(labels) >= 3 and '.'.join(labels[-2:]) in MULTI_LABEL_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def company_name(domain):
+    """Display company name for a registrable domain"""
+    if not domain or domain in FREEMAIL_DOMAINS:
+        return UNKNOWN
+    return domain.split('.')[0].replace('-', ' ').replace('_', ' ').title()
+
+
+def company_from_sender(from_header):
+    """Company name from a From header, without touching the database"""
+    domain = sender_domain(from_header)
+    return company_name(registrable_domain(domain)) if domain else UNKNOWN
+
+
+class LRUCache:
+    """Small thread-safe LRU with a TTL so other processes' overrides are picked up eventually"""
+
+    def __init__(self, maxsize=4096, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.data.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self.misses += 1
+                return None
+            self.data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self.data[key] = (value, time.monotonic() + self.ttl)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.data.clear()
+
+
+# (user id, registrable domain) -> (company, job id or None)
+cache = LRUCache()
+
+
+@receiver(post_save, sender=SenderDomain)
+@receiver(post_delete, sender=SenderDomain)
+def _forget_mapping(sender, instance, **kwargs):
+    cache.discard((instance.user_id, instance.domain))
+
+
+def forget_job(job_id):
+    """Drop cached mappings to `job_id`; their rows were nulled by an update() or SET_NULL, without signals"""
+    with cache._lock:
+        stale = [key for key, (value, _) in cache.data.items() if value[1] == job_id]
+        for key in stale:
+            del cache.data[key]
+
+
+@receiver(post_delete, sender=Job)
+def _forget_job(sender, instance, **kwargs):
+    forget_job(instance.id)
+
+
+def _mapping(user, domain):
+    key = (user.id, domain)
+    cached = cache.get(key)
+    if cached is not None:
+        tracing.count('cache_hits')
+        return cached
+    tracing.count('cache_misses')
+
+    row = SenderDomain.objects.filter(user=user, domain=domain).values_list('company', 'job_id').first()
+    if row is None:
+        try:
+            # A savepoint, so losing the race doesn't break the caller's transaction
+            with transaction.atomic():
+                SenderDomain.objects.create(user=user, domain=domain, company=company_name(domain))
+        except IntegrityError:
+            pass  # created concurrently
+        row = SenderDomain.objects.filter(user=user, domain=domain).values_list('company', 'job_id').first()
+    # Only remembered once committed, so a rolled-back Job is never cached
+    transaction.on_commit(lambda: cache.set(key, row))
+    return row
+
+
+def resolve_company(user, from_header):
+    """Company for a sender, honouring the user's overrides"""
+    domain = sender_domain(from_header)
+    if not domain:
+        return UNKNOWN
+    domain = registrable_domain(domain)
+    if domain in FREEMAIL_DOMAINS:
+        return UNKNOWN
+    return _mapping(user, domain)[0]
+
+
+def resolve_job(user, from_header):
+    """
+    (company, job) for a sender. The Job is looked up (or created) by
+    company the first time and remembered on the domain mapping.
+    """
+    domain = sender_domain(from_header)
+    if not domain:
+        return UNKNOWN, None
+    domain = registrable_domain(domain)
+    if domain in FREEMAIL_DOMAINS:
+        return UNKNOWN, None
+
+    company, job_id = _mapping(user, domain)
+    if job_id is None and company != UNKNOWN:
+        job, created = Job.objects.get_or_create(
+            user=user,
+            company=company,
+            deleted_at__isnull=True,
+            defaults={
+                'name': f"{company} Work",
+                'color': '#3B82F6'
+            }
+        )
+        job_id = job.id
+        SenderDomain.objects.filter(user=user, domain=domain, job__isnull=True).update(job=job)
+        key, value = (user.id, domain), (company, job_id)
+        transaction.on_commit(lambda: cache.set(key, value))
+    return company, job_id
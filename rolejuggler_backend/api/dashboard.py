@@ -0,0 +1,163 @@
+"""
+Dashboard snapshot: everything the overview page shows on mount, in one
+response built from a handful of targeted queries.
+
+Snapshots are cached per user and day in the shared cache under a
+per-user version token. Any save or delete of the user's tasks, jobs,
+meetings, updates, notes or work sessions replaces the token once the transaction
+commits, so the next request rebuilds; bulk writes that bypass signals
+(ingestion, imports) call invalidate() themselves.
+"""
+import datetime
+import secrets
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, Q, Value, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import recurrence
+from .planner import PRIORITY_RANK
+from .models import Job, Meeting, StickyNote, Task, Update, WorkSession
+from .purge import LIVE_JOB
+
+UPCOMING_DAYS = 7
+UPCOMING_MEETINGS = 20
+RECENT_UPDATES = 10
+NOTES = 50
+
+TASK_FIELDS = ('id', 'title', 'status', 'priority', 'deadline', 'total_time_spent', 'job_id',
+               'job__name', 'job__company', 'job__color')
+MEETING_FIELDS = ('id', 'title', 'company', 'meeting_date', 'meeting_time', 'duration', 'location',
+                  'job_id', 'recurrence_rule', 'recurrence_exceptions')
+UPDATE_FIELDS = ('id', 'title', 'type', 'company', 'sender', 'snippet', 'received_at', 'deadline', 'linked_task')
+NOTE_FIELDS = ('id', 'content', 'color', 'revision', 'updated_at')
+
+
+def _version_key(user_id):
+    return f"dashboard-version:{user_id}"
+
+
+def version(user_id):
+    """
+    Token that changes whenever `user_id`'s data does; also keys the
+    productivity analytics cache (api.analytics)
+    """
+    # A random token, not a counter: an evicted version can't resurrect old snapshots
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = secrets.token_hex(4)
+        cache.add(_version_key(user_id), version, None)
+        version = cache.get(_version_key(user_id), version)
+    return version
+
+
+def invalidate(user_id):
+    """Drop `user_id`'s cached snapshots once the current transaction commits"""
+    transaction.on_commit(lambda: cache.delete(_version_key(user_id)))
+
+
+# High before medium before low; the stored strings sort alphabetically
+PRIORITY_ORDER = Case(
+    *(When(priority=priority, then=Value(rank)) for priority, rank in PRIORITY_RANK.items()),
+    default=Value(PRIORITY_RANK['medium']),
+)
+
+
+def _tasks(user, today):
+    rows = Task.objects.filter(LIVE_JOB, user=user, deadline=today).order_by('status', PRIORITY_ORDER, 'id')
+    rows = rows.values(*TASK_FIELDS)
+    return [
+        {
+            **{k: v for k, v in row.items() if not k.startswith('job__')},
+            'job_name': row['job__name'], 'job_company': row['job__company'], 'job_color': row['job__color'],
+        }
+        for row in rows
+    ]
+
+
+def _meetings(user, today):
+    """Meetings (and occurrences of recurring series) from today through the next UPCOMING_DAYS"""
+    end = today + datetime.timedelta(days=UPCOMING_DAYS)
+    series_running = Q(recurrence_rule__gt='') & (Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=today))
+    rows = Meeting.objects.filter(LIVE_JOB, user=user).filter(
+        Q(meeting_date__gte=today, meeting_date__lte=end) | (series_running & Q(meeting_date__lte=end))
+    ).values(*MEETING_FIELDS)
+
+    results = []
+    for row in rows:
+        for day in recurrence.occurrences(row, today, end):
+            occurrence = {k: v for k, v in row.items() if k != 'recurrence_exceptions'}
+            occurrence['meeting_date'] = day
+            if row['recurrence_rule']:
+                occurrence['occurrence_of'] = row['id']
+            results.append(occurrence)
+    results.sort(key=lambda m: (m['meeting_date'], m['meeting_time']))
+    return results[:UPCOMING_MEETINGS]
+
+
+def _counts(user, today):
+    tasks = Task.objects.filter(LIVE_JOB, user=user).aggregate(
+        open=Count('id', filter=~Q(status='done')),
+        due_today=Count('id', filter=Q(deadline=today)),
+        overdue=Count('id', filter=Q(deadline__lt=today) & ~Q(status='done')),
+    )
+    return {
+        'tasks_open': tasks['open'],
+        'tasks_due_today': tasks['due_today'],
+        'tasks_overdue': tasks['overdue'],
+        'updates_today': Update.objects.filter(user=user, received_at__date=today).count(),
+    }
+
+
+def build(user, today):
+    """The snapshot for `user` as of `today`, straight from the database"""
+    meetings = _meetings(user, today)
+    counts = _counts(user, today)
+    counts['meetings_today'] = sum(1 for m in meetings if m['meeting_date'] == today)
+    return {
+        'date': today,
+        'counts': counts,
+        'tasks_today': _tasks(user, today),
+        'upcoming_meetings': meetings,
+        'recent_updates': list(
+            Update.objects.filter(user=user).order_by('-received_at', '-id').values(*UPDATE_FIELDS)[:RECENT_UPDATES]
+        ),
+        'sticky_notes': list(StickyNote.objects.filter(user=user).order_by('-updated_at').values(*NOTE_FIELDS)[:NOTES]),
+    }
+
+
+def snapshot(user, today):
+    """(snapshot, served from cache?) for `user` as of `today`"""
+    key = f"dashboard:{user.id}:{version(user.id)}:{today.isoformat()}"
+    cached = cache.get(key)
+    if cached is not None:
+        return cached, True
+    data = build(user, today)
+    cache.set(key, data, getattr(settings, 'DASHBOARD_CACHE_SECONDS', 300))
+    return data, False
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=Job)
+@receiver(post_delete, sender=Job)
+@receiver(post_save, sender=Meeting)
+@receiver(post_delete, sender=Meeting)
+@receiver(post_save, sender=Update)
+@receiver(post_delete, sender=Update)
+@receiver(post_save, sender=StickyNote)
+@receiver(post_delete, sender=StickyNote)
+def _changed(sender, instance, **kwargs):
+    invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=WorkSession)
+@receiver(post_delete, sender=WorkSession)
+def _session_changed(sender, instance, **kwargs):
+    # Not on the dashboard, but the analytics cached under the same version read them
+    user_id = Task.objects.filter(pk=instance.task_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        invalidate(user_id)
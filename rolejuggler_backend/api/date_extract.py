@@ -0,0 +1,244 @@
+"""
+Natural-language meeting date/time extraction.
+
+A single regex pass splits the subject into tokens (numbers, clock times,
+numeric dates, words, UTC offsets); one linear walk over those tokens then
+recognizes absolute dates ("10/21/2025", "2025-10-21", "Oct 21", "21st
+October 2025"), relative dates ("today", "tomorrow", "day after tomorrow",
+"in 3 days", "Tue", "next Friday"), 12h/24h times ("3pm", "10:30",
+"14:00", "noon") and timezone abbreviations/offsets ("IST", "UTC+5:30").
+
+Relative dates are anchored on the email's Date header.
+"""
+import datetime
+import re
+
+_TOKEN_RE = re.compile(r"""
+      (?P<iso>\d{4}-\d{1,2}-\d{1,2})(?!\d)
+    | (?P<numdate>\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?)(?![\d:])
+    | (?<![\d:])(?P<offset>[+-]\d{1,2}(?::?\d{2})?)(?![\d:])
+    | (?P<clock>\d{1,2}[:.]\d{2})(?!\d)
+    | (?P<num>\d{1,4})(?:st|nd|rd|th)?(?![\d])
+    | (?P<word>[a-z]+)
+""", re.VERBOSE)
+
+MONTHS = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9, 'oct': 10, 'october': 10,
+    'nov': 11, 'november': 11, 'dec': 12, 'december': 12,
+}
+WEEKDAYS = {
+    'mon': 0, 'monday': 0, 'tue': 1, 'tues': 1, 'tuesday': 1, 'wed': 2, 'weds': 2, 'wednesday': 2,
+    'thu': 3, 'thur': 3, 'thurs': 3, 'thursday': 3, 'fri': 4, 'friday': 4,
+    'sat': 5, 'saturday': 5, 'sun': 6, 'sunday': 6,
+}
+# Weekday abbreviations that are also everyday words need more context
+AMBIGUOUS_WEEKDAYS = {'sat', 'sun', 'wed'}
+# Offsets in minutes east of UTC
+TIMEZONES = {
+    'utc': 0, 'gmt': 0, 'wet': 0, 'bst': 60, 'cet': 60, 'cest': 120, 'eet': 120, 'eest': 180,
+    'msk': 180, 'gst': 240, 'pkt': 300, 'ist': 330, 'npt': 345, 'ict': 420, 'wib': 420,
+    'sgt': 480, 'hkt': 480, 'awst': 480, 'jst': 540, 'kst': 540, 'acst': 570, 'aest': 600,
+    'aedt': 660, 'nzst': 720, 'nzdt': 780, 'est': -300, 'edt': -240, 'cst': -360, 'cdt': -300,
+    'mst': -420, 'mdt': -360, 'pst': -480, 'pdt': -420, 'akst': -540, 'hst': -600,
+}
+RELATIVE_DAYS = {'today': 0, 'tonight': 0, 'tomorrow': 1, 'tmrw': 1, 'tmr': 1, 'yesterday': -1}
+UNIT_DAYS = {'day': 1, 'days': 1, 'week': 7, 'weeks': 7}
+
+# A date without a year this far in the past is taken to mean next year
+PAST_DATE_GRACE = datetime.timedelta(days=60)
+
+
+def tokenize(text):
+    """(kind, value) tokens of `text`, in order"""
+    return [(m.lastgroup, m.group(m.lastgroup)) for m in _TOKEN_RE.finditer(text.lower())]
+
+
+def _safe_date(year, month, day):
+    try:
+        return datetime.date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _expand_year(year):
+    return year + 2000 if year < 100 else year
+
+
+def _infer_year(month, day, anchor):
+    candidate = _safe_date(anchor.year, month, day)
+    if candidate and candidate < anchor - PAST_DATE_GRACE:
+        candidate = _safe_date(anchor.year + 1, month, day)
+    return candidate
+
+
+def _hour_12(hour, meridiem):
+    if not 1 <= hour <= 12:
+        return None
+    if meridiem == 'am':
+        return 0 if hour == 12 else hour
+    return hour if hour == 12 else hour + 12
+
+
+def _meridiem(tokens, i):
+    """'am'/'pm' if tokens[i] is one (also 'a m' from 'a.m.'), with the number of tokens used"""
+    if i >= len(tokens) or tokens[i][0] != 'word':
+        return None, 0
+    word = tokens[i][1]
+    if word in ('am', 'pm'):
+        return word, 1
+    if word in ('a', 'p') and i + 1 < len(tokens) and tokens[i + 1] == ('word', 'm'):
+        return word + 'm', 2
+    return None, 0
+
+
+def _parse_offset(value):
+    sign = -1 if value[0] == '-' else 1
+    digits = value[1:].replace(':', '')
+    hours, minutes = (int(digits[:-2]), int(digits[-2:])) if len(digits) > 2 else (int(digits), 0)
+    if hours > 14 or minutes > 59:
+        return None
+    return sign * (hours * 60 + minutes)
+
+
+def parse(text, anchor=None):
+    """
+    Extract (date, time, utc_offset_minutes) from `text`. Any part that is
+    not found is None. `anchor` (a date or datetime, normally the email's
+    Date header) is "today" for relative dates and year inference.
+    """
+    if anchor is None:
+        anchor = datetime.date.today()
+    elif isinstance(anchor, datetime.datetime):
+        anchor = anchor.date()
+
+    tokens = tokenize(text)
+    date = time = offset = None
+    n = len(tokens)
+    i = 0
+    while i < n:
+        kind, value = tokens[i]
+        prev = tokens[i - 1][1] if i else None
+
+        if kind == 'iso' and date is None:
+            y, m, d = map(int, value.split('-'))
+            date = _safe_date(y, m, d)
+
+        elif kind == 'numdate' and date is None:
+            parts = [int(p) for p in re.split(r'[/-]', value)]
+            first, second = parts[0], parts[1]
+            # US order (MM/DD) like the rest of the app, unless that can't be a month
+            month, day = (second, first) if first > 12 else (first, second)
+            meridiem, used = _meridiem(tokens, i + 1)
+            if meridiem and len(parts) == 2 and '-' in value:
+                # Not a date but an hour range: "10-11am"
+                if time is None and _hour_12(first, meridiem) is not None:
+                    time = datetime.time(_hour_12(first, meridiem), 0)
+                i += used + 1
+                continue
+            if len(parts) == 3:
+                date = _safe_date(_expand_year(parts[2]), month, day)
+            else:
+                date = _infer_year(month, day, anchor)
+
+        elif kind == 'clock' and time is None:
+            hour, minute = int(value[:-3]), int(value[-2:])
+            meridiem, used = _meridiem(tokens, i + 1)
+            if meridiem:
+                hour = _hour_12(hour, meridiem)
+                i += used
+            # "14.30" is only a time with am/pm; otherwise it's likely a version number
+            if hour is not None and hour <= 23 and minute <= 59 and (meridiem or ':' in value):
+                time = datetime.time(hour, minute)
+
+        elif kind == 'num':
+            number = int(value)
+            meridiem, used = _meridiem(tokens, i + 1)
+            following = tokens[i + 1] if i + 1 < n else (None, None)
+
+            if meridiem and time is None:
+                hour = _hour_12(number, meridiem)
+                if hour is not None:
+                    time = datetime.time(hour, 0)
+                i += used
+            elif following[0] == 'word' and following[1] in MONTHS and date is None:
+                # "21 Oct", "21st October 2025"
+                month = MONTHS[following[1]]
+                year_token = tokens[i + 2] if i + 2 < n else (None, None)
+                if year_token[0] == 'num' and len(year_token[1]) == 4:
+                    date = _safe_date(int(year_token[1]), month, number)
+                    i += 1
+                else:
+                    date = _infer_year(month, number, anchor)
+                i += 1
+            elif prev == 'in' and following[0] == 'word' and following[1] in UNIT_DAYS and date is None:
+                date = anchor + datetime.timedelta(days=number * UNIT_DAYS[following[1]])
+                i += 1
+            elif prev == 'at' and time is None and number <= 23:
+                # "at 10" - bare hours before 8 are almost always afternoon meetings
+                time = datetime.time(number + 12 if 1 <= number < 8 else number, 0)
+
+        elif kind == 'offset':
+            meridiem, used = _meridiem(tokens, i + 1)
+            if meridiem:
+                # The end of a time range ("2pm-3pm", "9am -10:30am"), not a UTC offset
+                i += used
+            elif offset is None and (time is not None or prev in ('utc', 'gmt')):
+                offset = _parse_offset(value)
+
+        elif kind == 'word':
+            following = tokens[i + 1] if i + 1 < n else (None, None)
+
+            if value in MONTHS and following[0] == 'num' and date is None:
+                # "Oct 21", "October 21st, 2025"
+                day = int(following[1])
+                year_token = tokens[i + 2] if i + 2 < n else (None, None)
+                if year_token[0] == 'num' and len(year_token[1]) == 4 and day <= 31:
+                    date = _safe_date(int(year_token[1]), MONTHS[value], day)
+                    i += 2
+                elif day <= 31:
+                    date = _infer_year(MONTHS[value], day, anchor)
+                    i += 1
+
+            elif value == 'day' and following == ('word', 'after') and date is None:
+                if i + 2 < n and tokens[i + 2][1] == 'tomorrow':
+                    date = anchor + datetime.timedelta(days=2)
+                    i += 2
+
+            elif value in RELATIVE_DAYS and date is None:
+                date = anchor + datetime.timedelta(days=RELATIVE_DAYS[value])
+
+            elif value in WEEKDAYS and date is None:
+                contextual = prev in ('on', 'next', 'this', 'every') or following[0] in ('num', 'clock')
+                if value not in AMBIGUOUS_WEEKDAYS or contextual:
+                    ahead = (WEEKDAYS[value] - anchor.weekday()) % 7
+                    if prev == 'next' and ahead == 0:
+                        ahead = 7
+                    date = anchor + datetime.timedelta(days=ahead)
+
+            elif value == 'noon' and time is None:
+                time = datetime.time(12, 0)
+            elif value == 'midnight' and time is None:
+                time = datetime.time(0, 0)
+
+            elif value in TIMEZONES and offset is None and (time is not None or following[0] == 'offset'):
+                offset = TIMEZONES[value]
+                if following[0] == 'offset' and value in ('utc', 'gmt'):
+                    extra = _parse_offset(following[1])
+                    if extra is not None:
+                        offset = extra
+                        i += 1
+
+        i += 1
+
+    return date, time, offset
+
+
+def to_local(date, time, offset, tz):
+    """Convert a date/time written in UTC`offset` into wall-clock date/time in `tz`"""
+    if date is None or time is None or offset is None:
+        return date, time
+    source = datetime.timezone(datetime.timedelta(minutes=offset))
+    local = datetime.datetime.combine(date, time, tzinfo=source).astimezone(tz)
+    return local.date(), local.time().replace(tzinfo=None)
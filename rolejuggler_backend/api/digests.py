@@ -0,0 +1,140 @@
+"""
+Daily digests of what's due, built server-side for every user at once.
+
+For each active user, open tasks that are overdue or due within
+DIGEST_DUE_SOON_DAYS, and meetings (recurring ones expanded) in that
+window, are saved as one Digest for the day and announced with a
+Notification in the user's feed (/api/notifications/). Users with nothing
+due get neither.
+
+Users are walked in id order, DIGEST_USER_CHUNK at a time (keyset, not
+OFFSET), and each chunk costs the same few queries whatever its size: a
+range scan of open tasks on the partial (user, deadline) index, which
+leaves finished tasks out entirely, one of meetings on (user,
+meeting_date), and bulk inserts. A user's cost therefore follows what
+they have due, not how many tasks exist overall. Each chunk commits on
+its own; re-running for a day skips users who already have its digest.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import recurrence
+from .models import Digest, Meeting, Notification, Task, User
+from .purge import LIVE_JOB
+
+TASK_FIELDS = ('id', 'user_id', 'title', 'priority', 'deadline', 'job_id', 'job__name')
+MEETING_FIELDS = ('id', 'user_id', 'title', 'company', 'meeting_date', 'meeting_time', 'job_id',
+                  'recurrence_rule', 'recurrence_exceptions')
+
+
+def due_soon_days():
+    return getattr(settings, 'DIGEST_DUE_SOON_DAYS', 2)
+
+
+def chunk_size():
+    return getattr(settings, 'DIGEST_USER_CHUNK', 500)
+
+
+def max_items():
+    return getattr(settings, 'DIGEST_MAX_ITEMS', 20)
+
+
+def _tasks(user_ids, today, horizon):
+    """{user id: {'overdue': [...], 'due_soon': [...]}} of open tasks due by `horizon`, earliest first"""
+    rows = Task.objects.filter(LIVE_JOB, user_id__in=user_ids, deadline__lte=horizon).exclude(status='done')
+    found = {}
+    for row in rows.order_by('deadline', 'id').values(*TASK_FIELDS):
+        section = 'overdue' if row['deadline'] < today else 'due_soon'
+        found.setdefault(row.pop('user_id'), {'overdue': [], 'due_soon': []})[section].append({
+            'id': row['id'], 'title': row['title'], 'priority': row['priority'],
+            'deadline': row['deadline'].isoformat(), 'job_id': row['job_id'], 'job_name': row['job__name'],
+        })
+    return found
+
+
+def _meetings(user_ids, today, horizon):
+    """{user id: [...]} of meetings and occurrences of recurring series from `today` to `horizon`"""
+    series_running = Q(recurrence_rule__gt='') & (Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=today))
+    rows = Meeting.objects.filter(LIVE_JOB, user_id__in=user_ids, meeting_date__lte=horizon).filter(
+        Q(meeting_date__gte=today) | series_running
+    ).values(*MEETING_FIELDS)
+    found = {}
+    for row in rows:
+        for day in recurrence.occurrences(row, today, horizon):
+            found.setdefault(row['user_id'], []).append({
+                'id': row['id'], 'title': row['title'], 'company': row['company'], 'job_id': row['job_id'],
+                'meeting_date': day.isoformat(), 'meeting_time': row['meeting_time'].isoformat(),
+            })
+    for meetings in found.values():
+        meetings.sort(key=lambda m: (m['meeting_date'], m['meeting_time']))
+    return found
+
+
+def title(digest):
+    parts = []
+    if digest.overdue_tasks:
+        parts.append(f"{digest.overdue_tasks} overdue")
+    if digest.due_soon_tasks:
+        parts.append(f"{digest.due_soon_tasks} due soon")
+    if digest.upcoming_meetings:
+        parts.append(f"{digest.upcoming_meetings} meeting{'s' if digest.upcoming_meetings != 1 else ''}")
+    return ", ".join(parts)
+
+
+def build_chunk(user_ids, today):
+    """Write `today`'s digests and their notifications for `user_ids`; returns how many were written"""
+    horizon = today + datetime.timedelta(days=due_soon_days())
+    limit = max_items()
+    with transaction.atomic():
+        done = set(Digest.objects.filter(user_id__in=user_ids, date=today).values_list('user_id', flat=True))
+        pending = [user_id for user_id in user_ids if user_id not in done]
+        if not pending:
+            return 0
+        tasks = _tasks(pending, today, horizon)
+        meetings = _meetings(pending, today, horizon)
+
+        digests = []
+        for user_id in pending:
+            due = tasks.get(user_id, {'overdue': [], 'due_soon': []})
+            upcoming = meetings.get(user_id, [])
+            if not (due['overdue'] or due['due_soon'] or upcoming):
+                continue
+            digests.append(Digest(
+                user_id=user_id, date=today,
+                overdue_tasks=len(due['overdue']), due_soon_tasks=len(due['due_soon']),
+                upcoming_meetings=len(upcoming),
+                items={'overdue': due['overdue'][:limit], 'due_soon': due['due_soon'][:limit],
+                       'meetings': upcoming[:limit]},
+            ))
+        # Primary keys come back on SQLite and PostgreSQL, so notifications can point at them
+        Digest.objects.bulk_create(digests)
+        Notification.objects.bulk_create([
+            Notification(user_id=digest.user_id, kind='digest', title=title(digest), digest=digest)
+            for digest in digests
+        ])
+    return len(digests)
+
+
+def run(today=None, size=None):
+    """
+    Write `today`'s digests for every active user, one chunk of users at
+    a time. Yields (users seen, digests written) running totals after
+    each chunk.
+    """
+    today = today or timezone.localdate()
+    size = size or chunk_size()
+    last_id, users, written = 0, 0, 0
+    while True:
+        user_ids = list(
+            User.objects.filter(is_active=True, id__gt=last_id).order_by('id').values_list('id', flat=True)[:size]
+        )
+        if not user_ids:
+            return
+        written += build_chunk(user_ids, today)
+        users += len(user_ids)
+        last_id = user_ids[-1]
+        yield users, written
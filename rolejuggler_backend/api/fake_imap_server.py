@@ -0,0 +1,357 @@
+"""
+Local IMAP server with generated mailboxes, for tests and benchmarks.
+
+Speaks just enough IMAP4rev1 for ingestion (LOGIN, SELECT, SEARCH, FETCH
+of headers, BODYSTRUCTURE and partial BODY sections, NOOP, LOGOUT) over
+plain TCP, with an injectable per-command latency so
+hundreds of simulated mailboxes on a slow server can be polled from one
+machine:
+
+    python -m api.fake_imap_server --port 1143 --users 200 --messages 20 --latency 0.02
+
+Every user's password is `password`; SEARCH only understands UID ranges
+and otherwise returns the whole mailbox.
+"""
+import argparse
+import asyncio
+import datetime
+import re
+import threading
+from email import message_from_bytes
+from email.message import EmailMessage
+from email.policy import SMTP
+from email.utils import format_datetime
+
+SUBJECTS = [
+    "Project sync meeting tomorrow at 10am",
+    "Action items from the design review",
+    "Lunch on Friday?",
+    "Zoom call with Acme on Oct 21 3pm",
+    "Todo: update the proposal",
+    "Weekly newsletter",
+    "Agenda for the planning call",
+    "Your invoice is ready",
+]
+SENDERS = ["Ann <ann@acme.com>", "bob@mail.globex.co.uk", "news@letters.example.com", "carol@initech.io"]
+
+_COMMAND_RE = re.compile(rb'^(\S+) (\S+)(?: (.*))?$')
+_ATOM_RE = re.compile(rb'"((?:[^"\\]|\\.)*)"|(\S+)')
+_SECTION_RE = re.compile(r'^BODY(?:\.PEEK)?\[([^\]]*)\](?:<(\d+)\.(\d+)>)?$')
+
+
+# Body text for each subject; the vague subjects only say what they are in the body
+BODIES = [
+    "Hi, the sync is in room 4B. Agenda: roadmap, hiring.",
+    "Please pick up the follow up tasks assigned to you by Friday.",
+    "Want to grab lunch on Friday at noon?",
+    "Join the Zoom call: https://zoom.us/j/123. Dial-in details below.",
+    "Can you update the proposal with the new pricing before the review?",
+    "This week's news, links and upcoming events.",
+    "Agenda attached for Thursday's planning call at 2pm.",
+    "Your invoice for October is attached.",
+]
+ATTACHMENT = bytes(range(256)) * 256  # 64 KB "PDF"
+
+
+def make_message(user, index, when=None):
+    """
+    A message for `user`'s mailbox. Bodies rotate between plain text,
+    multipart/alternative (plain + HTML) and HTML with a 64 KB attachment.
+    """
+    when = when or datetime.datetime.now(datetime.timezone.utc)
+    choice = (index + len(user)) % len(SUBJECTS)
+    subject, body = SUBJECTS[choice], BODIES[choice]
+    msg = EmailMessage()
+    msg["From"] = SENDERS[index % len(SENDERS)]
+    msg["To"] = user
+    msg["Subject"] = f"{subject} #{index}"
+    msg["Date"] = format_datetime(when)
+    msg["Message-ID"] = f"<{index}.{user}@fake-imap>"
+    if index % 3 == 0:
+        msg.set_content(f"{body}\n\nThanks")
+    elif index % 3 == 1:
+        msg.set_content(f"{body}\n\nThanks")
+        msg.add_alternative(f"<html><body><p>{body}</p><p>Thanks</p></body></html>", subtype="html")
+    else:
+        msg.set_content(f"<html><head><style>p {{color: red}}</style></head><body><p>{body}</p></body></html>", subtype="html")
+        msg.add_attachment(ATTACHMENT, maintype="application", subtype="pdf", filename="document.pdf")
+    return msg.as_bytes(policy=SMTP)
+
+
+def _imap_string(value):
+    return 'NIL' if value is None else '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _imap_params(params):
+    if not params:
+        return 'NIL'
+    return '(' + ' '.join(f'{_imap_string(k.upper())} {_imap_string(v)}' for k, v in params) + ')'
+
+
+def bodystructure(part):
+    """IMAP BODYSTRUCTURE of a parsed message part"""
+    if part.is_multipart():
+        children = ''.join(bodystructure(child) for child in part.get_payload())
+        boundary = _imap_params([('boundary', part.get_boundary())])
+        return f'({children} {_imap_string(part.get_content_subtype().upper())} {boundary} NIL NIL)'
+
+    payload = part.get_payload().encode('utf-8', 'surrogateescape')
+    params = [(k, v) for k, v in part.get_params()[1:]] if part.get_params() else []
+    encoding = (part.get('Content-Transfer-Encoding') or '7bit').upper()
+    filename = part.get_filename()
+    disposition = f'("ATTACHMENT" {_imap_params([("filename", filename)])})' if filename else 'NIL'
+    fields = (
+        f'{_imap_string(part.get_content_maintype().upper())} {_imap_string(part.get_content_subtype().upper())} '
+        f'{_imap_params(params)} NIL NIL {_imap_string(encoding)} {len(payload)}'
+    )
+    if part.get_content_maintype() == 'text':
+        lines = payload.count(b'\n')
+        return f'({fields} {lines} NIL {disposition} NIL NIL)'
+    return f'({fields} NIL {disposition} NIL NIL)'
+
+
+def body_section(raw, spec):
+    """Raw (still transfer-encoded) bytes of section `spec` ("1", "2.1", "" for all)"""
+    if not spec:
+        return raw
+    if spec == 'HEADER':
+        return header_bytes(raw)
+    part = message_from_bytes(raw)
+    for index in spec.split('.'):
+        if part.is_multipart():
+            part = part.get_payload()[int(index) - 1]
+    return part.get_payload().encode('utf-8', 'surrogateescape')
+
+
+def parse_arguments(data):
+    """Split an IMAP argument string into atoms/quoted strings (no literals)"""
+    return [
+        m.group(1).replace(b'\\"', b'"').replace(b'\\\\', b'\\') if m.group(1) is not None else m.group(2)
+        for m in _ATOM_RE.finditer(data or b'')
+    ]
+
+
+def parse_sequence_set(value, count):
+    """Message numbers (1-based) named by an IMAP sequence set like 1:5,7,9:*"""
+    numbers = []
+    for part in value.decode().split(','):
+        start, _, end = part.partition(':')
+        start = count if start == '*' else int(start)
+        end = start if not end else (count if end == '*' else int(end))
+        low, high = sorted((start, end))
+        numbers.extend(range(max(low, 1), min(high, count) + 1))
+    return numbers
+
+
+def header_bytes(raw):
+    end = raw.find(b'\r\n\r\n')
+    return raw if end < 0 else raw[:end + 4]
+
+
+class FakeIMAPServer:
+    """asyncio IMAP server on a background thread; use as a context manager"""
+
+    password = b'password'
+    uidvalidity = 1
+
+    def __init__(self, mailboxes=None, port=0, latency=0.0):
+        self.mailboxes = mailboxes if mailboxes is not None else {}
+        self.port = port
+        self.latency = latency
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+        self.commands = 0
+        self.bytes_sent = 0  # message data (literals) sent by FETCH
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self._started = threading.Event()
+
+    def populate(self, users, messages):
+        """Fill `users` mailboxes with `messages` generated messages each"""
+        for user in users:
+            self.mailboxes[user] = [make_message(user, i) for i in range(messages)]
+        return self
+
+    def deliver(self, user, count=1):
+        """Append `count` new messages to `user`'s mailbox"""
+        box = self.mailboxes.setdefault(user, [])
+        box.extend([make_message(user, len(box) + i) for i in range(count)])
+
+    @property
+    def address(self):
+        return '127.0.0.1', self.port
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        session = {'user': None, 'mailbox': None, 'uid': False}
+        try:
+            writer.write(b'* OK [CAPABILITY IMAP4rev1] Fake IMAP ready\r\n')
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                match = _COMMAND_RE.match(line.rstrip(b'\r\n'))
+                if not match:
+                    writer.write(b'* BAD Malformed command\r\n')
+                    await writer.drain()
+                    continue
+                tag, command, rest = match.groups()
+                self.commands += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                try:
+                    if not await self.dispatch(writer, session, tag, command.upper(), rest):
+                        break
+                except (ValueError, IndexError):
+                    writer.write(tag + b' BAD Invalid arguments\r\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.active -= 1
+            writer.close()
+
+    async def dispatch(self, writer, session, tag, command, rest):
+        """Answer one command; False ends the connection"""
+        args = parse_arguments(rest)
+        if command == b'UID':
+            # Messages are never expunged here, so UIDs are the message numbers
+            session['uid'] = True
+            try:
+                return await self.dispatch(writer, session, tag, args[0].upper(), rest.split(b' ', 1)[1])
+            finally:
+                session['uid'] = False
+
+        if command == b'CAPABILITY':
+            writer.write(b'* CAPABILITY IMAP4rev1\r\n' + tag + b' OK CAPABILITY completed\r\n')
+        elif command == b'NOOP':
+            writer.write(tag + b' OK NOOP completed\r\n')
+        elif command == b'LOGOUT':
+            writer.write(b'* BYE Logging out\r\n' + tag + b' OK LOGOUT completed\r\n')
+            await writer.drain()
+            return False
+        elif command == b'LOGIN':
+            user = args[0].decode() if args else ''
+            if len(args) == 2 and user in self.mailboxes and args[1] == self.password:
+                session['user'] = user
+                writer.write(tag + b' OK LOGIN completed\r\n')
+            else:
+                writer.write(tag + b' NO [AUTHENTICATIONFAILED] Invalid credentials\r\n')
+        elif session['user'] is None:
+            writer.write(tag + b' BAD Log in first\r\n')
+        elif command in (b'SELECT', b'EXAMINE'):
+            session['mailbox'] = self.mailboxes[session['user']]
+            count = len(session['mailbox'])
+            writer.write(
+                f'* {count} EXISTS\r\n* 0 RECENT\r\n* OK [UIDVALIDITY {self.uidvalidity}] UIDs valid\r\n'.encode()
+                + tag + b' OK [READ-WRITE] SELECT completed\r\n'
+            )
+        elif session['mailbox'] is None:
+            writer.write(tag + b' BAD Select a mailbox first\r\n')
+        elif command == b'SEARCH':
+            count = len(session['mailbox'])
+            upper = [a.upper() for a in args]
+            if b'UID' in upper:
+                # "UID n:*" always matches at least the last message, as on real servers
+                matched = parse_sequence_set(args[upper.index(b'UID') + 1], count) or [count]
+            else:
+                matched = range(1, count + 1)
+            numbers = ' '.join(str(i) for i in matched if i)
+            writer.write(f'* SEARCH {numbers}\r\n'.encode() + tag + b' OK SEARCH completed\r\n')
+        elif command == b'FETCH':
+            self.fetch(writer, session['mailbox'], tag, args, session['uid'])
+        else:
+            writer.write(tag + b' BAD Unsupported command\r\n')
+        return True
+
+    def fetch(self, writer, messages, tag, args, uid=False):
+        items = b' '.join(args[1:]).decode().strip('()').upper().split()
+        for number in parse_sequence_set(args[0], len(messages)):
+            raw = messages[number - 1]
+            pieces = [b'UID %d' % number] if uid else []
+            for item in items:
+                section = _SECTION_RE.match(item)
+                if item == 'BODYSTRUCTURE':
+                    pieces.append(b'BODYSTRUCTURE ' + bodystructure(message_from_bytes(raw)).encode())
+                    continue
+                if item == 'RFC822.HEADER':
+                    name, data = b'RFC822.HEADER', header_bytes(raw)
+                elif section:
+                    spec, offset, length = section.groups()
+                    data = body_section(raw, spec)
+                    name = f'BODY[{spec}]'.encode()
+                    if offset is not None:
+                        data = data[int(offset):int(offset) + int(length)]
+                        name += f'<{offset}>'.encode()
+                elif item == 'RFC822':
+                    name, data = b'RFC822', raw
+                else:
+                    continue
+                self.bytes_sent += len(data)
+                pieces.append(b'%s {%d}\r\n' % (name, len(data)) + data)
+            writer.write(b'* %d FETCH (' % number + b' '.join(pieces) + b')\r\n')
+        writer.write(tag + b' OK FETCH completed\r\n')
+
+    async def _serve(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self._started.set()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            try:
+                self.loop.run_until_complete(self._serve())
+            except asyncio.CancelledError:
+                pass
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        self._started.wait()
+        return self
+
+    def stop(self):
+        def shutdown():
+            for task in asyncio.all_tasks(self.loop):
+                task.cancel()
+
+        self.loop.call_soon_threadsafe(shutdown)
+        self.thread.join(timeout=5)
+        self.loop.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=1143)
+    parser.add_argument("--users", type=int, default=100, help="Mailboxes user0..userN-1")
+    parser.add_argument("--messages", type=int, default=20, help="Messages per mailbox")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each reply")
+    args = parser.parse_args()
+
+    server = FakeIMAPServer(port=args.port, latency=args.latency)
+    server.populate([f"user{i}@example.com" for i in range(args.users)], args.messages)
+    server.start()
+    print(f"Fake IMAP listening on 127.0.0.1:{server.port} ({args.users} mailboxes, password 'password')")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
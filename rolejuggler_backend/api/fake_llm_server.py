@@ -0,0 +1,108 @@
+"""
+Local stand-in for the Gemini generateContent REST endpoint.
+
+Answers every request with a canned classification after an injectable
+delay (or with an HTTP error), so timeouts, concurrency limits and the
+circuit breaker can be exercised without network access:
+
+    python -m api.fake_llm_server --port 8765 --delay 2.5
+    GEMINI_API_BASE=http://127.0.0.1:8765 python manage.py runserver
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = {
+    "detailed_task_title": "Project sync",
+    "company_name": "Acme",
+    "type": "meeting",
+    "deadline": None,
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        fake = self.server.fake
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with fake.lock:
+            fake.requests += 1
+            fake.in_flight += 1
+            fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+        try:
+            if fake.delay:
+                time.sleep(fake.delay)
+            if fake.status != 200:
+                self.send_error(fake.status)
+                return
+            text = "```json\n" + json.dumps(fake.reply) + "\n```"
+            body = json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up at its deadline
+        finally:
+            with fake.lock:
+                fake.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeGeminiServer:
+    """Threaded fake server; use as a context manager, tweak delay/status/reply on the fly"""
+
+    def __init__(self, port=0, delay=0.0, status=200, reply=None):
+        self.delay = delay
+        self.status = status
+        self.reply = reply or dict(DEFAULT_REPLY)
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--status", type=int, default=200, help="HTTP status to answer with")
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(args.port, args.delay, args.status)
+    print(f"Fake Gemini listening on {server.base_url} (delay {args.delay}s, status {args.status})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Sparse fieldsets for list and detail endpoints.
+
+    GET /api/tasks/?fields=id,title,status
+    GET /api/meetings/?exclude=description,location
+
+The requested fields narrow both the serialized output and the columns
+loaded from the database (QuerySet.only()), so long text columns the
+client didn't ask for are never read. Only reads are narrowed; writes
+always validate and return the full object.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+
+def _names(value):
+    return [name.strip() for name in value.split(',') if name.strip()] if value else []
+
+
+def requested(request):
+    """(fields, exclude) name lists from the query string of a read, else (None, None)"""
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None, None
+    params = request.query_params
+    return _names(params.get('fields')) or None, _names(params.get('exclude')) or None
+
+
+class SparseFieldsMixin:
+    """Serializer mixin: drop fields not selected by ?fields= / ?exclude="""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields, exclude = requested(self.context.get('request'))
+        if fields is None and exclude is None:
+            return
+        unknown = sorted(set(fields or []).union(exclude or []) - set(self.fields))
+        if unknown:
+            raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}"})
+        for name in list(self.fields):
+            if (fields is not None and name not in fields) or (exclude and name in exclude):
+                self.fields.pop(name)
+
+
+def columns(serializer, required=()):
+    """
+    (only() field paths, select_related() names) that the serializer's
+    current fields read, or (None, None) when a field reads something other
+    than model columns (a property, a method, the whole object) and
+    nothing can be deferred.
+    """
+    model = serializer.Meta.model
+    only, related = {model._meta.pk.name, *required}, set()
+    for field in serializer.fields.values():
+        if field.source == '*':
+            return None, None
+        parts = field.source.split('.')
+        try:
+            model_field = model._meta.get_field(parts[0])
+        except FieldDoesNotExist:
+            return None, None
+        if model_field.many_to_many or model_field.one_to_many:
+            continue
+        only.add(model_field.name)
+        if len(parts) > 1:
+            if not model_field.many_to_one and not model_field.one_to_one:
+                return None, None
+            related.add(model_field.name)
+            only.add('__'.join(parts[:2]))
+    return sorted(only), sorted(related)
+
+
+def narrow(queryset, serializer, required=()):
+    """Restrict `queryset` to the columns `serializer` will read (plus `required` ones)"""
+    only, related = columns(serializer, required)
+    if only is None:
+        return queryset
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*only)
+
+
+class SparseFieldsViewMixin:
+    """
+    Generic view mixin: load only the columns the (sparse) serializer
+    needs. `required_fields` are columns the view itself reads.
+    """
+    required_fields = ()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method in ('GET', 'HEAD'):
+            queryset = narrow(queryset, self.get_serializer(), self.required_fields)
+        return queryset
@@ -0,0 +1,57 @@
+"""
+Meeting fingerprints for duplicate detection.
+
+A fingerprint hashes the canonical title (lower-cased word tokens without
+"Re:"/"Fwd:" prefixes, punctuation, times, dates or filler words, sorted)
+and the organizer's domain. Numbers that aren't dates or times are kept,
+so "Interview round 1" and "round 2" stay apart. Meetings store theirs in
+an indexed column together with the date; a candidate is a duplicate when
+a meeting with the same fingerprint is dated within a few days of it
+(ingestion.DUPLICATE_WINDOW), which one indexed IN lookup answers for a
+whole batch of emails.
+"""
+import hashlib
+import re
+
+_PREFIX_RE = re.compile(r'^\s*(?:(?:re|fwd?|aw|wg|tr)\s*(?:\[\d+\])?\s*:\s*)+', re.IGNORECASE)
+_MONTH = (r'(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+          r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)')
+# When the meeting is, which the date comparison covers and rewordings often drop
+_WHEN_RE = re.compile(rf"""
+      \b\d{{1,2}}(?::\d{{2}})?\s*(?:am|pm)\b
+    | \b\d{{1,2}}:\d{{2}}\b
+    | \b\d{{1,4}}[/-]\d{{1,2}}(?:[/-]\d{{2,4}})?\b
+    | \b\d{{1,2}}(?:st|nd|rd|th)?\s+{_MONTH}\b
+    | \b{_MONTH}\s+\d{{1,2}}(?:st|nd|rd|th)?\b
+    | \b\d{{1,2}}(?:st|nd|rd|th)\b
+""", re.IGNORECASE | re.VERBOSE)
+_WORD_RE = re.compile(r'[^\W_]+')
+FILLER_WORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'for', 'to', 'on', 'at', 'in', 'with', 'by',
+    'am', 'pm', 'invitation', 'invite', 'updated', 'reminder',
+}
+
+
+def canonical_title(title):
+    """Order-, case- and punctuation-insensitive form of a meeting title"""
+    title = _WHEN_RE.sub(' ', _PREFIX_RE.sub('', title or ''))
+    tokens = {token for token in _WORD_RE.findall(title.lower()) if token not in FILLER_WORDS}
+    return ' '.join(sorted(tokens))
+
+
+def make(title, domain):
+    key = f"{canonical_title(title)}|{(domain or '').lower()}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def for_meeting(title, domain):
+    """The fingerprint stored on a meeting"""
+    return make(title, domain)
+
+
+def candidates(title, domain):
+    """
+    Fingerprints a duplicate of this meeting could have: for the
+    organizer's domain and for meetings entered by hand (no domain).
+    """
+    return {make(title, d) for d in {domain or '', ''}}
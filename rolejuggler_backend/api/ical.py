@@ -0,0 +1,121 @@
+"""
+iCalendar (RFC 5545) serialization for the subscription feed.
+
+Everything here is a generator so the feed can be streamed straight from
+chunked querysets without building the whole calendar in memory.
+"""
+import datetime
+
+PRODID = "-//RoleJuggler//Calendar Feed//EN"
+CHUNK_SIZE = 500
+
+
+def escape_text(value):
+    """Escape a TEXT property value"""
+    return (
+        (value or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line):
+    """Fold a content line at 75 octets and terminate it with CRLF"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte UTF-8 character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+        limit = 74  # continuation lines start with a space
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _date(value):
+    return value.strftime("%Y%m%d")
+
+
+def _datetime(value):
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def _stamp(value):
+    return value.astimezone(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def meeting_event(meeting, host):
+    """VEVENT lines for a Meeting values() row"""
+    start = datetime.datetime.combine(meeting["meeting_date"], meeting["meeting_time"])
+    end = start + datetime.timedelta(minutes=meeting["duration"] or 0)
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:meeting-{meeting['id']}@{host}",
+        f"DTSTAMP:{_stamp(meeting['updated_at'])}",
+        f"DTSTART:{_datetime(start)}",
+        f"DTEND:{_datetime(end)}",
+        f"SUMMARY:{escape_text(meeting['title'])}",
+    ]
+    if meeting.get("recurrence_rule"):
+        lines.append(f"RRULE:{meeting['recurrence_rule']}")
+        for day in meeting.get("recurrence_exceptions") or ():
+            exdate = datetime.datetime.combine(datetime.date.fromisoformat(day), meeting["meeting_time"])
+            lines.append(f"EXDATE:{_datetime(exdate)}")
+    if meeting.get("description"):
+        lines.append(f"DESCRIPTION:{escape_text(meeting['description'])}")
+    if meeting.get("location"):
+        lines.append(f"LOCATION:{escape_text(meeting['location'])}")
+    lines.append("END:VEVENT")
+    return "".join(fold(line) for line in lines)
+
+
+def task_deadline_event(task, host):
+    """All-day VEVENT for a task deadline"""
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:task-{task['id']}@{host}",
+        f"DTSTAMP:{_stamp(task['updated_at'])}",
+        f"DTSTART;VALUE=DATE:{_date(task['deadline'])}",
+        f"DTEND;VALUE=DATE:{_date(task['deadline'] + datetime.timedelta(days=1))}",
+        f"SUMMARY:{escape_text('Due: ' + task['title'])}",
+        f"CATEGORIES:{escape_text(task['priority'])}",
+        "TRANSP:TRANSPARENT",
+        "END:VEVENT",
+    ]
+    return "".join(fold(line) for line in lines)
+
+
+def calendar_stream(meetings, tasks, host, name="RoleJuggler"):
+    """
+    Yield the calendar in pieces. `meetings` and `tasks` should be
+    values() querysets; they are consumed with .iterator() in chunks.
+    """
+    yield "".join(fold(line) for line in [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{escape_text(name)}",
+    ])
+    buffer = []
+    for meeting in meetings.iterator(chunk_size=CHUNK_SIZE):
+        buffer.append(meeting_event(meeting, host))
+        if len(buffer) >= CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+    for task in tasks.iterator(chunk_size=CHUNK_SIZE):
+        buffer.append(task_deadline_event(task, host))
+        if len(buffer) >= CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+    buffer.append(fold("END:VCALENDAR"))
+    yield "".join(buffer)
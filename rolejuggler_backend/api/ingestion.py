@@ -0,0 +1,407 @@
+"""
+Email ingestion pipeline shared by the live IMAP fetch and offline imports.
+
+A message goes through: subject/sender/date decoding, the keyword
+relevance filter, classification (the user's local classifier, escalating
+to Gemini when unsure, with a keyword heuristic as the last fallback) and
+finally persistence as an Update (plus a Meeting for meeting emails).
+"""
+import datetime
+import email
+import json
+from email.header import decode_header
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import company_resolver, dashboard, date_extract, fingerprint, llm, recurrence, tracing
+from .classifier import confidence_threshold
+from .company_resolver import company_from_sender
+from .models import Job, Meeting, Update
+
+RELEVANT_KEYWORDS = ["project", "meeting", "call", "proposal", "agenda", "update", "task", "action", "todo"]
+MEETING_KEYWORDS = ['meeting', 'call', 'zoom', 'schedule', 'calendar']
+TASK_KEYWORDS = ['task', 'action', 'todo', 'follow up']
+
+# Meetings this close to a meeting (or an occurrence of a recurring series) with the same title are duplicates
+DUPLICATE_WINDOW = datetime.timedelta(days=3)
+
+
+def extract_meeting_datetime(subject, anchor=None):
+    """
+    Extract meeting date and time from the subject. Relative dates ("Tue",
+    "tomorrow") are resolved against `anchor`, normally the Date header.
+    """
+    try:
+        meeting_date, meeting_time, offset = date_extract.parse(subject or "", anchor)
+        if offset is not None:
+            # Times with an explicit zone ("14:00 IST") are converted to the server timezone
+            return date_extract.to_local(meeting_date, meeting_time, offset, timezone.get_current_timezone())
+        return meeting_date, meeting_time
+    except Exception as e:
+        print(f"Error extracting meeting datetime: {e}")
+        return None, None
+
+
+def keyword_type(subject):
+    """Classify a subject as meeting/task/email from keywords"""
+    lower_subj = subject.lower() if subject else ""
+    if any(word in lower_subj for word in MEETING_KEYWORDS):
+        return 'meeting'
+    if any(word in lower_subj for word in TASK_KEYWORDS):
+        return 'task'
+    return 'email'
+
+
+def meeting_datetime(subject, snippet="", anchor=None):
+    """Meeting date/time from the subject, with parts it lacks taken from the body snippet"""
+    meeting_date, meeting_time = extract_meeting_datetime(subject, anchor)
+    if snippet and (meeting_date is None or meeting_time is None):
+        body_date, body_time = extract_meeting_datetime(snippet, anchor)
+        meeting_date = meeting_date or body_date
+        meeting_time = meeting_time or body_time
+    return meeting_date, meeting_time
+
+
+def resolve_deadline(parsed_data, subject, anchor=None, snippet=""):
+    """Meetings use the date in the subject (or body) when there is one, everything else 3 days out"""
+    if parsed_data['type'] == 'meeting':
+        # For meetings, try to extract date from subject
+        meeting_date, meeting_time = meeting_datetime(subject, snippet, anchor)
+        if meeting_date:
+            # Set deadline to meeting date at 5 PM
+            deadline = timezone.make_aware(
+                datetime.datetime.combine(meeting_date, meeting_time or datetime.time(17, 0))
+            )
+        else:
+            # Default to 3 days from now for meetings without clear date
+            deadline = timezone.now() + datetime.timedelta(days=3)
+    else:
+        # For tasks/emails, always 3 days from now
+        deadline = timezone.now() + datetime.timedelta(days=3)
+
+    return deadline.replace(hour=17, minute=0, second=0, microsecond=0)
+
+
+def heuristic_parse(subject, from_header, email_type=None, anchor=None, snippet=""):
+    """
+    Classification without the LLM: keywords in the subject, then the body
+    snippet (or the local classifier's `email_type`) for the type, sender
+    domain for the company
+    """
+    email_type = email_type or keyword_type(subject)
+    if email_type == 'email' and snippet:
+        email_type = keyword_type(snippet)
+    parsed_data = {
+        'detailed_task_title': subject[:255] if subject else "Untitled",
+        'company_name': company_from_sender(from_header),
+        'type': email_type,
+    }
+    parsed_data['deadline'] = resolve_deadline(parsed_data, subject, anchor, snippet)
+    return parsed_data
+
+
+def parse_email_with_gemini(subject, from_header, anchor=None, snippet=""):
+    """Parse email content with Gemini API"""
+    try:
+        prompt = f"""
+        Based ONLY on the email subject, sender and the start of its body, extract this information as JSON:
+        - detailed_task_title: Create a meaningful title from the subject (max 8 words)
+        - company_name: Extract company name from sender email domain
+        - type: Classify as "email", "meeting", or "task" based on subject keywords
+        - deadline: For tasks, use 3 days from today. For meetings, try to extract date from subject.
+
+        Subject: {subject}
+        Sender: {from_header}
+        Body (start): {snippet[:500] or "(not available)"}
+
+        Return ONLY JSON with keys: detailed_task_title, company_name, type, deadline
+        """
+
+        # Deadline, concurrency cap and circuit breaker live in the client
+        tracing.count('llm_calls')
+        response_text = llm.get_client().generate(prompt).strip()
+        if response_text.startswith('```json'):
+            response_text = response_text[7:]
+        if response_text.endswith('```'):
+            response_text = response_text[:-3]
+
+        parsed_data = json.loads(response_text)
+
+        # Validate and set defaults
+        if not parsed_data.get('detailed_task_title'):
+            parsed_data['detailed_task_title'] = subject[:255] if subject else "Untitled"
+
+        if not parsed_data.get('company_name'):
+            parsed_data['company_name'] = company_from_sender(from_header)
+
+        # Type validation
+        valid_types = ['email', 'meeting', 'task']
+        if parsed_data.get('type') not in valid_types:
+            parsed_data['type'] = keyword_type(subject)
+
+        # Deadline handling
+        parsed_data['deadline'] = resolve_deadline(parsed_data, subject, anchor, snippet)
+
+        return parsed_data
+
+    except Exception as e:
+        print(f"Gemini parsing failed: {e}")
+        tracing.error(e)
+        parsed_data = heuristic_parse(subject, from_header, anchor=anchor, snippet=snippet)
+        parsed_data['fallback'] = True  # not an LLM label; classify_message pops it
+        return parsed_data
+
+
+def decode_subject(msg):
+    """Decoded Subject header of a parsed message"""
+    subj, encoding = decode_header(msg.get("Subject") or "")[0]
+    if isinstance(subj, bytes):
+        return subj.decode(encoding or "utf-8", errors="ignore")
+    return subj or ""
+
+
+def parse_received_at(msg):
+    """Aware datetime from the Date header, or now if it is missing/broken"""
+    date_header = msg.get("Date")
+    try:
+        parsed_date = email.utils.parsedate_to_datetime(date_header) if date_header else timezone.now()
+        if parsed_date.tzinfo is None:
+            parsed_date = timezone.make_aware(parsed_date)
+    except Exception:
+        parsed_date = timezone.now()
+    return parsed_date
+
+
+def is_relevant(subject):
+    """Basic relevance check on the subject"""
+    lower_subj = subject.lower() if subject else ""
+    return any(k in lower_subj for k in RELEVANT_KEYWORDS)
+
+
+def classify_message(msg, use_llm=True, classifier=None, snippet=""):
+    """
+    Run one parsed email.message.Message through the relevance filter and
+    classification. With a local `classifier`, the LLM is only called when
+    its confidence is below the threshold. `snippet` is the start of the
+    body when it was fetched. Returns a plain (picklable) dict, or None
+    when the message is not relevant.
+    """
+    subject = decode_subject(msg)
+    if not is_relevant(subject):
+        return None
+
+    from_header = msg.get("From") or ""
+    received_at = parse_received_at(msg)
+    label, confidence = classifier.predict(subject, from_header) if classifier else (None, 0.0)
+    if label and confidence >= confidence_threshold():
+        parsed_data = heuristic_parse(subject, from_header, email_type=label, anchor=received_at, snippet=snippet)
+        classified_by = 'local'
+    elif use_llm:
+        parsed_data = parse_email_with_gemini(subject, from_header, anchor=received_at, snippet=snippet)
+        classified_by = 'heuristic' if parsed_data.pop('fallback', False) else 'llm'
+    else:
+        parsed_data = heuristic_parse(subject, from_header, anchor=received_at, snippet=snippet)
+        classified_by = 'heuristic'
+
+    # Extract meeting date/time if it's a meeting
+    meeting_date = None
+    meeting_time = None
+    if parsed_data['type'] == 'meeting':
+        meeting_date, meeting_time = meeting_datetime(subject, snippet, received_at)
+
+    return {
+        'subject': subject,
+        'from_header': from_header,
+        'received_at': received_at,
+        'parsed_data': parsed_data,
+        'meeting_date': meeting_date,
+        'meeting_time': meeting_time,
+        'classified_by': classified_by,
+        'snippet': snippet,
+    }
+
+
+def sender_company(user, item):
+    """The user's company mapping for the sender, else whatever classification found"""
+    company = company_resolver.resolve_company(user, item['from_header'])
+    if company == company_resolver.UNKNOWN:
+        company = item['parsed_data']['company_name']
+    return company
+
+
+def build_update(user, item):
+    """Unsaved Update for a classified message"""
+    parsed_data = item['parsed_data']
+    return Update(
+        user=user,
+        title=parsed_data['detailed_task_title'][:255],
+        subject=(item['subject'] or "")[:255],
+        message=f"From: {item['from_header']}",
+        source="email",
+        sender=item['from_header'],
+        received_at=item['received_at'],
+        type=parsed_data['type'],
+        classified_by=item.get('classified_by') or "",
+        linked_task=False,
+        deadline=parsed_data['deadline'],
+        company=sender_company(user, item)[:255],
+        meeting_date=item['meeting_date'],
+        meeting_time=item['meeting_time'],
+        snippet=item.get('snippet') or "",
+        imap_uid=item.get('imap_uid'),
+        imap_uidvalidity=item.get('imap_uidvalidity'),
+    )
+
+
+def meeting_slot(item):
+    """(date, time) a meeting email is scheduled for, defaulting to tomorrow 10 AM"""
+    return (
+        item['meeting_date'] or (timezone.now() + datetime.timedelta(days=1)).date(),
+        item['meeting_time'] or datetime.time(10, 0),
+    )
+
+
+class MeetingDeduper:
+    """
+    Duplicate check for the meeting emails of one ingestion run: existing
+    fingerprints are fetched with a single indexed lookup and recurring
+    series once, then every candidate is checked in memory.
+    """
+
+    def __init__(self, user, items):
+        self.user = user
+        keys = set()
+        dates = []
+        for item in items:
+            keys |= fingerprint.candidates(item['parsed_data']['detailed_task_title'][:255], organizer_domain(item))
+            dates.append(meeting_slot(item)[0])
+        self.seen = {}  # fingerprint -> meeting dates
+        if keys:
+            for key, meeting_date in Meeting.objects.filter(
+                user=user, fingerprint__in=keys,
+                meeting_date__range=(min(dates) - DUPLICATE_WINDOW, max(dates) + DUPLICATE_WINDOW),
+            ).values_list('fingerprint', 'meeting_date'):
+                self.seen.setdefault(key, []).append(meeting_date)
+
+        # A recurring series (standup, weekly sync) covers its occurrences too
+        self.series = {}
+        if dates:
+            window_start = min(dates) - DUPLICATE_WINDOW
+            window_end = max(dates) + DUPLICATE_WINDOW
+            for meeting in Meeting.objects.filter(
+                user=user, recurrence_rule__gt="", meeting_date__lte=window_end,
+            ).filter(Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=window_start)):
+                self.series.setdefault(fingerprint.canonical_title(meeting.title), []).append(meeting)
+
+    def is_duplicate(self, item):
+        title = item['parsed_data']['detailed_task_title'][:255]
+        meeting_date = meeting_slot(item)[0]
+        if any(
+            abs(seen_date - meeting_date) <= DUPLICATE_WINDOW
+            for key in fingerprint.candidates(title, organizer_domain(item))
+            for seen_date in self.seen.get(key, ())
+        ):
+            return True
+        return any(
+            recurrence.occurrences(m, meeting_date - DUPLICATE_WINDOW, meeting_date + DUPLICATE_WINDOW)
+            for m in self.series.get(fingerprint.canonical_title(title), ())
+        )
+
+    def add(self, meeting):
+        self.seen.setdefault(meeting.fingerprint, []).append(meeting.meeting_date)
+
+
+def organizer_domain(item):
+    domain = company_resolver.sender_domain(item['from_header'])
+    return company_resolver.registrable_domain(domain) if domain else ''
+
+
+def save_meeting(user, item, deduper=None):
+    """Create a Meeting for a classified meeting email unless one already exists"""
+    parsed_data = item['parsed_data']
+    subject = item['subject']
+    deduper = deduper or MeetingDeduper(user, [item])
+    if deduper.is_duplicate(item):
+        return None
+    meeting_date_value, meeting_time_value = meeting_slot(item)
+
+    # Job from the sender's domain mapping; senders without one (personal
+    # mailboxes) fall back to the classified company name
+    company_name, job_id = company_resolver.resolve_job(user, item['from_header'])
+    if company_name == company_resolver.UNKNOWN:
+        company_name = parsed_data['company_name']
+        if company_name != company_resolver.UNKNOWN:
+            job_id = Job.objects.get_or_create(
+                user=user,
+                company=company_name,
+                deleted_at__isnull=True,
+                defaults={
+                    'name': f"{company_name} Work",
+                    'color': '#3B82F6'
+                }
+            )[0].id
+
+    meeting = Meeting.objects.create(
+        user=user,
+        job_id=job_id,
+        title=parsed_data['detailed_task_title'][:255],
+        company=company_name,
+        meeting_date=meeting_date_value,
+        meeting_time=meeting_time_value,
+        duration=60,  # Default 1 hour
+        description=f"Automatically created from email: {subject}",
+        organizer_domain=organizer_domain(item),
+    )
+    deduper.add(meeting)
+    return meeting
+
+
+def save_classified(user, item):
+    """Persist one classified message; returns (update, meeting or None)"""
+    with transaction.atomic():
+        upd = build_update(user, item)
+        upd.save()
+        meeting = save_meeting(user, item) if item['parsed_data']['type'] == 'meeting' else None
+    return upd, meeting
+
+
+def unsaved_messages(user, items):
+    """
+    `items` minus the mailbox messages that already have an Update: the
+    fetch-today button and the polling daemon can both see the same mail.
+    One query; a save racing this check is caught by the unique constraint
+    on (user, UIDVALIDITY, UID), see save_classified_batch.
+    """
+    uids = {item['imap_uid'] for item in items if item.get('imap_uid') is not None}
+    seen = set(
+        Update.objects.filter(user=user, imap_uid__in=uids).values_list('imap_uidvalidity', 'imap_uid')
+    ) if uids else set()
+    fresh = []
+    for item in items:
+        if item.get('imap_uid') is not None:
+            key = (item.get('imap_uidvalidity'), item['imap_uid'])
+            if key in seen:
+                continue
+            seen.add(key)
+        fresh.append(item)
+    return fresh
+
+
+def save_classified_batch(user, items):
+    """Persist many classified messages with one bulk insert for the Updates"""
+    with transaction.atomic():
+        items = unsaved_messages(user, items)
+        try:
+            with transaction.atomic():
+                updates = Update.objects.bulk_create([build_update(user, item) for item in items])
+        except IntegrityError:
+            # Another fetch saved some of these messages since the check; it has committed by now
+            items = unsaved_messages(user, items)
+            updates = Update.objects.bulk_create([build_update(user, item) for item in items])
+        meeting_items = [item for item in items if item['parsed_data']['type'] == 'meeting']
+        deduper = MeetingDeduper(user, meeting_items)
+        meetings = [save_meeting(user, item, deduper) for item in meeting_items]
+        dashboard.invalidate(user.id)  # bulk_create sends no signals
+    return updates, [m for m in meetings if m is not None]
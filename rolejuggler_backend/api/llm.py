@@ -0,0 +1,234 @@
+"""
+Resilient wrapper around the Gemini client.
+
+Every call gets a hard deadline, a process-wide semaphore caps concurrent
+calls, and a circuit breaker stops calling the API after consecutive
+failures so ingestion drops straight to the heuristic fallback instead of
+hanging. Latency histograms and breaker state are kept for /api/llm/status/.
+
+Backends are plain callables `backend(prompt, timeout) -> text`, so the
+client can be pointed at the SDK, the REST API or a local fake server.
+"""
+import json
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from django.conf import settings
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LLMUnavailable(Exception):
+    """The call was not made or did not finish: breaker open, saturated or timed out"""
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        """Whether a call may go through; in half-open state only one trial call is let in"""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_skipped(self):
+        """An allowed call was never made (no free slot): neither a success nor a failure"""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                # A failed half-open trial re-opens the breaker for another full period
+                self.opened_at = self.clock()
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms):
+        index = next((i for i, bound in enumerate(self.buckets) if ms <= bound), len(self.buckets))
+        with self._lock:
+            self.counts[index] += 1
+            self.total_ms += ms
+
+    def snapshot(self):
+        labels = [f"<={bound}ms" for bound in self.buckets] + [f">{self.buckets[-1]}ms"]
+        count = sum(self.counts)
+        return {
+            'count': count,
+            'mean_ms': round(self.total_ms / count, 1) if count else None,
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class LLMClient:
+    def __init__(self, backend, timeout=10.0, max_concurrency=4, breaker=None):
+        self.backend = backend
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        # Calls run on these threads so the caller can give up at the deadline
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='llm')
+        self.latency = LatencyHistogram()
+        self.counters = {'success': 0, 'error': 0, 'timeout': 0, 'rejected': 0, 'short_circuited': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.counters[key] += 1
+
+    def _run(self, prompt, timeout):
+        try:
+            return self.backend(prompt, timeout)
+        finally:
+            # Released only when the backend call really returns, so a hung
+            # request keeps holding its slot
+            self.semaphore.release()
+
+    def generate(self, prompt, timeout=None):
+        """Response text for `prompt`, or LLMUnavailable/backend error within the deadline"""
+        timeout = timeout or self.timeout
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise LLMUnavailable("circuit breaker is open")
+
+        deadline = time.monotonic() + timeout
+        if not self.semaphore.acquire(timeout=timeout):
+            # Our own backlog, not an API failure: counted apart so it can't open the breaker
+            self._count('rejected')
+            self.breaker.record_skipped()
+            raise LLMUnavailable("too many concurrent LLM calls")
+
+        started = time.monotonic()
+        future = self.executor.submit(self._run, prompt, max(deadline - started, 0.001))
+        try:
+            text = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeout:
+            self._count('timeout')
+            self.breaker.record_failure()
+            raise LLMUnavailable(f"LLM call exceeded {timeout}s")
+        except Exception:
+            self._count('error')
+            self.breaker.record_failure()
+            raise
+        finally:
+            self.latency.observe((time.monotonic() - started) * 1000)
+
+        self._count('success')
+        self.breaker.record_success()
+        return text
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            'breaker': {'state': self.breaker.state, 'consecutive_failures': self.breaker.failures},
+            'calls': counters,
+            'latency': self.latency.snapshot(),
+        }
+
+
+def gemini_sdk_backend(api_key, model_name='models/gemini-2.0-flash-lite'):
+    """
+    Backend using the google.generativeai SDK. The SDK takes a noticeable
+    share of startup time, so it is imported and configured on the first
+    call rather than when the backend (or this module) is loaded.
+    """
+    model = None
+    lock = threading.Lock()
+
+    def call(prompt, timeout):
+        nonlocal model
+        if model is None:
+            with lock:
+                if model is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=api_key)
+                    model = genai.GenerativeModel(model_name)
+        return model.generate_content(prompt, request_options={'timeout': timeout}).text
+
+    return call
+
+
+def gemini_rest_backend(base_url, api_key, model_name='models/gemini-2.0-flash-lite'):
+    """Backend calling the generateContent REST endpoint directly (also used with the fake server)"""
+    url = f"{base_url.rstrip('/')}/v1beta/{model_name}:generateContent?key={api_key}"
+
+    def call(prompt, timeout):
+        body = json.dumps({'contents': [{'parts': [{'text': prompt}]}]}).encode()
+        request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = json.load(response)
+        return payload['candidates'][0]['content']['parts'][0]['text']
+
+    return call
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Process-wide LLM client, created on first use from settings (falling
+    back to the GEMINI_API_KEY environment variable)
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                base_url = getattr(settings, 'GEMINI_API_BASE', None)
+                api_key = getattr(settings, 'GEMINI_API_KEY', '') or os.environ.get('GEMINI_API_KEY', '')
+                if base_url:
+                    backend = gemini_rest_backend(base_url, api_key)
+                else:
+                    backend = gemini_sdk_backend(api_key)
+                _client = LLMClient(
+                    backend,
+                    timeout=getattr(settings, 'LLM_TIMEOUT_SECONDS', 10.0),
+                    max_concurrency=getattr(settings, 'LLM_MAX_CONCURRENCY', 4),
+                    breaker=CircuitBreaker(
+                        failure_threshold=getattr(settings, 'LLM_BREAKER_FAILURES', 5),
+                        reset_timeout=getattr(settings, 'LLM_BREAKER_RESET_SECONDS', 60.0),
+                    ),
+                )
+    return _client
@@ -0,0 +1,207 @@
+"""
+Body snippets without downloading whole messages.
+
+The IMAP BODYSTRUCTURE of a message is parsed to find its first inline
+text/plain part (text/html if there is none), so only the first few KB of
+that one part are fetched with BODY.PEEK[<part>]<0.N>; attachments are
+never transferred. The partial bytes are then decoded (base64 /
+quoted-printable cut mid-sequence, charsets, HTML) into plain text.
+"""
+import base64
+import binascii
+import html
+import quopri
+import re
+
+from django.conf import settings
+
+SNIPPET_CHARS = 1000
+
+_TOKEN_RE = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|\{(\d+)\}\r\n|([^\s()"]+))')
+_BLOCK_RE = re.compile(r'<(script|style|head)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_BREAK_RE = re.compile(r'<\s*(br|/p|/div|/tr|/li|/h\d)\b[^>]*>', re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]*>')
+_SPACE_RE = re.compile(r'[ \t\r\f\v]+')
+_BLANK_LINES_RE = re.compile(r'\n\s*\n+')
+
+
+def snippet_bytes():
+    """How much of the text part to fetch"""
+    return getattr(settings, 'EMAIL_SNIPPET_BYTES', 2048)
+
+
+def parse_sexp(data, pos=0):
+    """
+    Parse one parenthesized IMAP list starting at `data[pos]` into nested
+    Python lists of str/int/None. Returns (value, next position).
+    """
+    stack = [[]]
+    while pos < len(data):
+        match = _TOKEN_RE.match(data, pos)
+        if not match:
+            break
+        pos = match.end()
+        opening, closing, quoted, literal, atom = match.groups()
+        if opening:
+            stack.append([])
+        elif closing:
+            finished = stack.pop()
+            stack[-1].append(finished)
+            if len(stack) == 1:
+                return finished, pos
+        elif quoted is not None:
+            stack[-1].append(quoted.replace(b'\\"', b'"').replace(b'\\\\', b'\\').decode(errors='replace'))
+        elif literal is not None:
+            size = int(literal)
+            stack[-1].append(data[pos:pos + size].decode(errors='replace'))
+            pos += size
+        else:
+            value = atom.decode(errors='replace')
+            stack[-1].append(None if value.upper() == 'NIL' else int(value) if value.isdigit() else value)
+    raise ValueError("unterminated IMAP list")
+
+
+def bodystructure_from_response(text):
+    """The parsed BODYSTRUCTURE in a FETCH response line, or None"""
+    index = text.upper().find(b'BODYSTRUCTURE (')
+    if index < 0:
+        return None
+    return parse_sexp(text, index + len(b'BODYSTRUCTURE '))[0]
+
+
+def _params(value):
+    """Body parameter list ("CHARSET" "utf-8" ...) as a lower-cased dict"""
+    if not isinstance(value, list):
+        return {}
+    return {str(k).lower(): v for k, v in zip(value[::2], value[1::2])}
+
+
+def _is_attachment(part):
+    # Extension data of a text part: md5 at 8, disposition at 9
+    disposition = part[9] if len(part) > 9 else None
+    return isinstance(disposition, list) and str(disposition[0]).lower() == 'attachment'
+
+
+def text_parts(structure, prefix=''):
+    """Yield (part spec, subtype, encoding, charset) of the inline text parts, in order"""
+    if structure and isinstance(structure[0], list):
+        # multipart: the children come first, then the subtype and its parameters
+        for index, child in enumerate(structure, start=1):
+            if not isinstance(child, list):
+                break
+            yield from text_parts(child, f"{prefix}{index}.")
+        return
+    if len(structure) < 7 or str(structure[0]).lower() != 'text' or _is_attachment(structure):
+        return
+    charset = _params(structure[2]).get('charset') or 'utf-8'
+    encoding = str(structure[5] or '7bit').lower()
+    # A non-multipart message's only part is "1"
+    yield (prefix.rstrip('.') or '1'), str(structure[1]).lower(), encoding, charset
+
+
+def choose_text_part(structure):
+    """The part to take a snippet from: first text/plain, else first text/html"""
+    parts = list(text_parts(structure)) if structure else []
+    for wanted in ('plain', 'html'):
+        for part in parts:
+            if part[1] == wanted:
+                return part
+    return None
+
+
+def _decode_transfer(data, encoding, partial):
+    if encoding == 'base64':
+        data = re.sub(rb'[^A-Za-z0-9+/=]', b'', data)
+        if partial:
+            data = data[:len(data) - len(data) % 4]
+        try:
+            return base64.b64decode(data)
+        except (binascii.Error, ValueError):
+            return b''
+    if encoding == 'quoted-printable':
+        if partial:
+            # Drop an escape or soft line break cut off at the end
+            data = re.sub(rb'=[0-9A-Fa-f]?$', b'', data)
+        return quopri.decodestring(data)
+    return data
+
+
+def html_to_text(markup):
+    markup = _BLOCK_RE.sub(' ', markup)
+    markup = re.sub(r'<(script|style|head)\b.*$|<[^>]*$', ' ', markup, flags=re.IGNORECASE | re.DOTALL)  # cut off mid-way
+    markup = _BREAK_RE.sub('\n', markup)
+    return html.unescape(_TAG_RE.sub(' ', markup))
+
+
+def normalize(text):
+    text = _SPACE_RE.sub(' ', text.replace('\xa0', ' '))
+    return _BLANK_LINES_RE.sub('\n\n', '\n'.join(line.strip() for line in text.split('\n'))).strip()
+
+
+def decode_part(data, subtype, encoding, charset, partial=True):
+    """Plain text from (possibly truncated) raw bytes of a text part"""
+    raw = _decode_transfer(data, encoding, partial)
+    try:
+        text = raw.decode(charset, errors='replace')
+    except LookupError:
+        text = raw.decode('utf-8', errors='replace')
+    if partial:
+        text = text.rstrip('\ufffd')  # a multi-byte character cut in half
+    if subtype == 'html':
+        text = html_to_text(text)
+    return normalize(text)
+
+
+def snippet(data, part, limit=SNIPPET_CHARS):
+    """Snippet text from the first bytes of `part` (as returned by choose_text_part)"""
+    _, subtype, encoding, charset = part
+    return decode_part(data, subtype, encoding, charset)[:limit]
+
+
+def text_from_message(msg):
+    """Full text of a parsed email.message.Message: text/plain, else text/html, never attachments"""
+    fallback = None
+    for part in msg.walk():
+        if part.get_content_maintype() != 'text' or part.get_content_disposition() == 'attachment':
+            continue
+        payload = part.get_payload(decode=True) or b''
+        charset = part.get_content_charset() or 'utf-8'
+        subtype = part.get_content_subtype()
+        if subtype == 'plain':
+            return decode_part(payload, 'plain', '8bit', charset, partial=False)
+        if subtype == 'html' and fallback is None:
+            fallback = decode_part(payload, 'html', '8bit', charset, partial=False)
+    return fallback or ''
+
+
+def imaplib_response(data):
+    """(response text, [literals]) from the data list of an imaplib FETCH of one message"""
+    text, literals = b'', []
+    for piece in data:
+        if isinstance(piece, tuple):
+            text += piece[0] + b'\r\n'
+            literals.append(piece[1])
+        elif piece:
+            text += piece
+    return text, literals
+
+
+def fetch_text_imaplib(imap, uid, limit=None):
+    """
+    Text of message `uid` on a selected imaplib connection: the first
+    `limit` bytes of its text part (all of it when None), decoded; None if
+    the message is gone, '' if it has no text part.
+    """
+    typ, data = imap.uid('FETCH', str(uid), '(BODYSTRUCTURE)')
+    if typ != 'OK' or not data or data[0] is None:
+        return None
+    part = choose_text_part(bodystructure_from_response(imaplib_response(data)[0]))
+    if part is None:
+        return ''
+    section = f'BODY.PEEK[{part[0]}]' + (f'<0.{limit}>' if limit else '')
+    typ, data = imap.uid('FETCH', str(uid), f'({section})')
+    literals = imaplib_response(data)[1] if typ == 'OK' and data and data[0] is not None else []
+    if not literals:
+        return None
+    _, subtype, encoding, charset = part
+    return decode_part(literals[0], subtype, encoding, charset, partial=bool(limit))
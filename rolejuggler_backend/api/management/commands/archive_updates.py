@@ -0,0 +1,38 @@
+"""
+Move old updates out of the hot table into the archive (see api.retention).
+Meant to run daily from cron; safe to interrupt and re-run.
+
+    python manage.py archive_updates                 # older than settings.UPDATES_RETENTION_DAYS
+    python manage.py archive_updates --days 30 --batch-size 5000
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import retention
+from api.models import Update
+
+
+class Command(BaseCommand):
+    help = "Archive updates older than the retention window, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Retention in days (default: settings.UPDATES_RETENTION_DAYS)")
+        parser.add_argument("--batch-size", type=int, help="Rows per transaction (default: settings.UPDATES_ARCHIVE_BATCH_SIZE)")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be archived")
+
+    def handle(self, *args, **options):
+        before = retention.cutoff(options["days"])
+        if options["dry_run"]:
+            count = Update.objects.filter(received_at__lt=before).count()
+            self.stdout.write(f"{count} updates received before {before:%Y-%m-%d %H:%M} would be archived")
+            return
+
+        started = time.monotonic()
+        total = 0
+        for total in retention.archive_updates(options["days"], options["batch_size"]):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {total} archived ({time.monotonic() - started:.1f}s)")
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {total} updates received before {before:%Y-%m-%d %H:%M} in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,66 @@
+"""
+Poll many users' IMAP inboxes concurrently and ingest today's messages.
+
+    python manage.py ingest_imap                      # every user with an app password
+    python manage.py ingest_imap alice bob --no-llm
+    python manage.py ingest_imap --host 127.0.0.1 --port 1143 --no-ssl   # python -m api.fake_imap_server
+"""
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.async_ingestion import imap_settings, run_ingestion
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = "Ingest today's email for many users concurrently over IMAP"
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*", help="Defaults to every user with an app password")
+        parser.add_argument("--host", help="IMAP host (default: settings.IMAP_HOST)")
+        parser.add_argument("--port", type=int, help="IMAP port (default: settings.IMAP_PORT)")
+        parser.add_argument("--no-ssl", action="store_true", help="Plain TCP, e.g. for the fake server")
+        parser.add_argument("--concurrency", type=int, help="Users polled at once")
+        parser.add_argument("--per-host", type=int, help="Open connections per IMAP host")
+        parser.add_argument("--since", type=datetime.date.fromisoformat, help="YYYY-MM-DD (default: today)")
+        parser.add_argument("--no-llm", action="store_true", help="Never call the LLM; fall back to keywords")
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(app_password__isnull=True).exclude(app_password="")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        users = list(users)
+        if not users:
+            raise CommandError("No users with IMAP credentials to poll")
+
+        host, port, use_ssl = imap_settings()
+        server = (options["host"] or host, options["port"] or port, use_ssl and not options["no_ssl"])
+
+        started = time.perf_counter()
+        results = run_ingestion(
+            users,
+            server=server,
+            concurrency=options["concurrency"],
+            per_host=options["per_host"],
+            use_llm=not options["no_llm"],
+            since=options["since"],
+        )
+        elapsed = time.perf_counter() - started
+
+        for result in results:
+            if result["error"]:
+                self.stderr.write(f"{result['user']}: {result['error']}")
+            elif options["verbosity"] > 1:
+                self.stdout.write(
+                    f"{result['user']}: {result['messages']} messages, {result['updates']} updates, "
+                    f"{result['meetings']} meetings ({result['seconds']}s)"
+                )
+        failed = sum(1 for r in results if r["error"])
+        messages = sum(r["messages"] for r in results)
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {len(results) - failed}/{len(results)} mailboxes, {messages} messages, "
+            f"{sum(r['updates'] for r in results)} updates, {sum(r['meetings'] for r in results)} meetings "
+            f"in {elapsed:.1f}s"
+        ))
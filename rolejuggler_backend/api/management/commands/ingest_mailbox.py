@@ -0,0 +1,163 @@
+"""
+Offline email ingestion: run local mbox files or .eml directories through
+the same relevance filter / classification / persistence pipeline as the
+live IMAP fetch. Parsing and classification run in a process pool; the
+results are written back in batches from the main process.
+
+    python manage.py ingest_mailbox alice ~/mail/archive.mbox ~/mail/eml/ --workers 8
+"""
+import email
+import mailbox
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from email import policy
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from api.classifier import load_for_user as load_email_classifier
+from api.ingestion import classify_message, save_classified_batch
+from api.models import User
+
+
+def iter_raw_messages(paths):
+    """Yield raw message bytes from mbox files and (recursively) .eml directories"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(".eml"):
+                        with open(os.path.join(root, name), "rb") as f:
+                            yield f.read()
+        elif path.lower().endswith(".eml"):
+            with open(path, "rb") as f:
+                yield f.read()
+        else:
+            box = mailbox.mbox(path, create=False)
+            try:
+                for key in box.iterkeys():
+                    yield box.get_bytes(key)
+            finally:
+                box.close()
+
+
+# Set once per worker process so the model isn't pickled with every chunk
+_worker_classifier = None
+
+
+def _init_worker(classifier_state):
+    # Spawned (non-forked) workers need their own Django setup
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+    global _worker_classifier
+    if classifier_state is not None:
+        from api.classifier import NaiveBayesClassifier
+        _worker_classifier = NaiveBayesClassifier.from_dict(classifier_state)
+
+
+def _classify_chunk(raws, use_llm):
+    results = []
+    for raw in raws:
+        try:
+            msg = email.message_from_bytes(raw, policy=policy.compat32)
+            results.append(classify_message(msg, use_llm=use_llm, classifier=_worker_classifier))
+        except Exception as e:
+            results.append({"error": str(e)})
+    return results
+
+
+def classify_in_pool(pool, raw_messages, use_llm, chunk_size, max_in_flight):
+    """
+    Classify messages in `pool`, yielding results in input order. Only
+    `max_in_flight` chunks are queued at once so huge mailboxes are never
+    read into memory up front (unlike Executor.map).
+    """
+    pending = deque()
+    chunk = []
+    for raw in raw_messages:
+        chunk.append(raw)
+        if len(chunk) >= chunk_size:
+            pending.append(pool.submit(_classify_chunk, chunk, use_llm))
+            chunk = []
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+    if chunk:
+        pending.append(pool.submit(_classify_chunk, chunk, use_llm))
+    while pending:
+        yield from pending.popleft().result()
+
+
+class Command(BaseCommand):
+    help = "Ingest local mbox files or directories of .eml files for a user"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("paths", nargs="+", help="mbox files, .eml files or directories of .eml files")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows per bulk DB write")
+        parser.add_argument("--chunk-size", type=int, default=64, help="Messages sent to a worker at a time")
+        parser.add_argument("--no-llm", action="store_true", help="Never call the LLM; fall back to keywords")
+        parser.add_argument("--no-local-model", action="store_true", help="Skip the user's learned classifier")
+        parser.add_argument("--dry-run", action="store_true", help="Classify but don't write to the database")
+        parser.add_argument("--progress-every", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}")
+        for path in options["paths"]:
+            if not os.path.exists(path):
+                raise CommandError(f"{path} does not exist")
+
+        use_llm = not options["no_llm"]
+        classifier_state = None if options["no_local_model"] else load_email_classifier(user).to_dict()
+        batch_size = options["batch_size"]
+        stats = {"messages": 0, "relevant": 0, "errors": 0, "updates": 0, "meetings": 0, "llm": 0}
+        batch = []
+        started = time.perf_counter()
+
+        def flush():
+            if batch and not options["dry_run"]:
+                updates, meetings = save_classified_batch(user, batch)
+                stats["updates"] += len(updates)
+                stats["meetings"] += len(meetings)
+            batch.clear()
+
+        workers = max(1, options["workers"])
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(classifier_state,)) as pool:
+            results = classify_in_pool(
+                pool, iter_raw_messages(options["paths"]), use_llm, options["chunk_size"], workers * 4
+            )
+            for item in results:
+                stats["messages"] += 1
+                if item is not None and "error" in item:
+                    stats["errors"] += 1
+                elif item is not None:
+                    stats["relevant"] += 1
+                    stats["llm"] += item["classified_by"] == "llm"
+                    batch.append(item)
+                    if len(batch) >= batch_size:
+                        flush()
+
+                if stats["messages"] % options["progress_every"] == 0:
+                    self._report(stats, started)
+        flush()
+
+        self._report(stats, started)
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {stats['updates']} updates, {stats['meetings']} meetings "
+            f"from {stats['messages']} messages ({stats['errors']} unreadable)"
+        ))
+
+    def _report(self, stats, started):
+        elapsed = time.perf_counter() - started
+        rate = stats["messages"] / elapsed if elapsed else 0
+        self.stdout.write(
+            f"{stats['messages']} messages, {stats['relevant']} relevant, "
+            f"{stats['llm']} sent to LLM, {stats['updates']} saved - {elapsed:.1f}s ({rate:,.0f} msg/s)"
+        )
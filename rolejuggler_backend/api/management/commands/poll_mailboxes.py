@@ -0,0 +1,190 @@
+"""
+Background mailbox polling daemon.
+
+Every user with an app password is polled on their own timer: first polls
+are staggered over the interval, and each user's interval then adapts to
+their inbox (see api.polling). A global cap bounds users polled at once,
+on top of the per-host connection cap. Each poll only fetches messages
+above the last ingested UID. Per-user lag (how late a poll started
+against its schedule) is reported periodically and kept on
+MailboxPollState for /api/ingestion/polling/.
+
+    python manage.py poll_mailboxes --concurrency 50 --report-every 60
+    python manage.py poll_mailboxes --once --stagger 0   # one pass over everyone, then exit
+"""
+import asyncio
+import datetime
+import heapq
+import json
+import signal
+import threading
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api import polling
+from api.async_ingestion import HostLimits, imap_settings, ingest_user
+from api.models import MailboxPollState, User
+
+
+class Command(BaseCommand):
+    help = "Poll users' IMAP inboxes on staggered, adaptive schedules"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=50, help="Users polled at once")
+        parser.add_argument("--per-host", type=int, help="Open connections per IMAP host")
+        parser.add_argument("--min-interval", type=float, help="Seconds (default: settings.POLL_MIN_INTERVAL_SECONDS)")
+        parser.add_argument("--max-interval", type=float, help="Seconds (default: settings.POLL_MAX_INTERVAL_SECONDS)")
+        parser.add_argument("--stagger", type=float, help="Spread first polls over this many seconds (default: min interval)")
+        parser.add_argument("--refresh-every", type=float, default=300, help="Seconds between reloading the user list")
+        parser.add_argument("--report-every", type=float, default=60, help="Seconds between lag reports")
+        parser.add_argument("--metrics-file", help="Also write each lag report as JSON here")
+        parser.add_argument("--once", action="store_true", help="Poll every user once, then exit")
+        parser.add_argument("--host", help="IMAP host (default: settings.IMAP_HOST)")
+        parser.add_argument("--port", type=int, help="IMAP port (default: settings.IMAP_PORT)")
+        parser.add_argument("--no-ssl", action="store_true", help="Plain TCP, e.g. for the fake server")
+        parser.add_argument("--no-llm", action="store_true", help="Never call the LLM; fall back to keywords")
+
+    def handle(self, *args, **options):
+        min_interval, max_interval, max_auth_interval = polling.limits()
+        self.min_interval = options["min_interval"] or min_interval
+        self.max_interval = max(options["max_interval"] or max_interval, self.min_interval)
+        self.max_auth_interval = max(max_auth_interval, self.max_interval)
+        self.stagger = self.min_interval if options["stagger"] is None else options["stagger"]
+        host, port, use_ssl = imap_settings()
+        self.server = (options["host"] or host, options["port"] or port, use_ssl and not options["no_ssl"])
+        self.options = options
+        self.stats = polling.LagStats()
+        self.stopping = threading.Event()
+
+        previous = {}
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                previous[sig] = signal.signal(sig, lambda *_: self.stopping.set())
+        try:
+            # Database work is run back on this thread by sync_to_async
+            async_to_sync(self.run)()
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+        self.report()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.limits = HostLimits(self.options["per_host"] or getattr(settings, 'IMAP_CONNECTIONS_PER_HOST', 10))
+        self.gate = asyncio.Semaphore(self.options["concurrency"])
+        self.users, self.states = {}, {}
+        self.schedule = []  # heap of (due loop time, user id)
+        tasks = set()
+        next_refresh = next_report = loop.time()
+
+        while not self.stopping.is_set():
+            now = loop.time()
+            if now >= next_refresh and not (self.options["once"] and self.users):
+                await self.refresh_users(now)
+                next_refresh = now + self.options["refresh_every"]
+            if now >= next_report:
+                self.report()
+                next_report = now + self.options["report_every"]
+
+            while self.schedule and self.schedule[0][0] <= now:
+                due, user_id = heapq.heappop(self.schedule)
+                if user_id in self.users:
+                    task = asyncio.create_task(self.poll(self.users[user_id], due))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+            if self.options["once"] and not self.schedule and not tasks:
+                break
+            # Wake for the next due poll, refresh or report; at least once a second to notice signals
+            wake = min(next_refresh, next_report, now + 1.0, self.schedule[0][0] if self.schedule else now + 1.0)
+            await asyncio.sleep(max(0.0, wake - loop.time()))
+
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def refresh_users(self, now):
+        users = await sync_to_async(self.load_users)()
+        for user in users:
+            if user.id not in self.users:
+                state = self.states[user.id]
+                offset = polling.stagger_offset(user.id, self.stagger) if self.stagger else 0.0
+                if state.next_poll_at and not self.options["once"]:
+                    # Resume the previous schedule, but never later than one interval from now
+                    remaining = (state.next_poll_at - timezone.now()).total_seconds()
+                    offset = min(max(remaining, 0.0), state.interval_seconds or self.min_interval)
+                heapq.heappush(self.schedule, (now + offset, user.id))
+        self.users = {user.id: user for user in users}
+
+    def load_users(self):
+        users = list(User.objects.exclude(app_password__isnull=True).exclude(app_password=""))
+        # Known users keep their in-memory state; polls in flight still update it
+        new_users = [user for user in users if user.id not in self.states]
+        states = {s.user_id: s for s in MailboxPollState.objects.filter(user__in=new_users)}
+        missing = [MailboxPollState(user=user) for user in new_users if user.id not in states]
+        for state in MailboxPollState.objects.bulk_create(missing):
+            states[state.user_id] = state
+        self.states.update(states)
+        return users
+
+    async def poll(self, user, due):
+        loop = asyncio.get_running_loop()
+        async with self.gate:
+            # Lag includes time spent queued behind the concurrency cap
+            lag_ms = int(max(0.0, loop.time() - due) * 1000)
+            self.stats.observe(user.username, lag_ms)
+            state = self.states[user.id]
+            try:
+                result = await ingest_user(
+                    user, self.limits, server=self.server, use_llm=not self.options["no_llm"],
+                    cursor={'uidvalidity': state.uidvalidity, 'last_uid': state.last_uid},
+                )
+            except Exception as e:
+                result = {'messages': 0, 'error': f"{type(e).__name__}: {e}", 'auth_failed': False}
+
+        interval = polling.next_interval(
+            state.interval_seconds, result, self.min_interval, self.max_interval, self.max_auth_interval
+        )
+        if result['error']:
+            state.consecutive_failures += 1
+            state.last_error = result['error'][:255]
+            if self.options["verbosity"] > 0:
+                self.stderr.write(f"{user.username}: {result['error']} (next poll in {interval:.0f}s)")
+        else:
+            state.consecutive_failures = 0
+            state.last_error = ''
+            state.uidvalidity = result['cursor']['uidvalidity']
+            state.last_uid = result['cursor']['last_uid']
+            if self.options["verbosity"] > 1:
+                self.stdout.write(
+                    f"{user.username}: {result['messages']} new, {result['updates']} updates "
+                    f"(lag {lag_ms}ms, next poll in {interval:.0f}s)"
+                )
+        state.interval_seconds = interval
+        state.polls += 1
+        state.last_lag_ms = lag_ms
+        state.last_polled_at = timezone.now()
+        state.next_poll_at = state.last_polled_at + datetime.timedelta(seconds=interval)
+        await sync_to_async(state.save)()
+
+        if not self.options["once"]:
+            heapq.heappush(self.schedule, (loop.time() + interval, user.id))
+
+    def report(self):
+        snapshot = self.stats.snapshot()
+        if not snapshot['polls']:
+            return
+        backing_off = sum(1 for s in self.states.values() if s.consecutive_failures)
+        laggiest = ", ".join(f"{name} {ms}ms" for name, ms in snapshot['laggiest_users'])
+        self.stdout.write(
+            f"{snapshot['polls']} polls, lag p50 {snapshot['p50_ms']}ms p95 {snapshot['p95_ms']}ms "
+            f"max {snapshot['max_ms']}ms, {backing_off} users backing off; laggiest: {laggiest}"
+        )
+        if self.options["metrics_file"]:
+            snapshot['users_backing_off'] = backing_off
+            snapshot['at'] = timezone.now().isoformat()
+            with open(self.options["metrics_file"], "w") as f:
+                json.dump(snapshot, f)
+        self.stats.reset_window()
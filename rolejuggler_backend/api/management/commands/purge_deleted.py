@@ -0,0 +1,36 @@
+"""
+Remove the rows of deleted jobs and accounts in small batches (see api.purge).
+
+    python manage.py purge_deleted                     # run pending purges, then exit (cron)
+    python manage.py purge_deleted --watch 30          # keep running, checking every 30s
+    python manage.py purge_deleted --batch-size 200 --pause 0.05
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import purge
+
+
+class Command(BaseCommand):
+    help = "Purge soft-deleted jobs and accounts in bounded batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Rows per transaction (default: settings.PURGE_BATCH_SIZE)")
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+        parser.add_argument("--watch", type=float, help="Keep running, looking for new purges every this many seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            for pending in purge.pending():
+                started = time.monotonic()
+                try:
+                    purge.run(pending, options["batch_size"], options["pause"])
+                except Exception as e:
+                    self.stderr.write(f"{pending}: {type(e).__name__}: {e}")
+                    continue
+                removed = ", ".join(f"{count} {label}" for label, count in pending.deleted.items()) or "nothing"
+                self.stdout.write(f"{pending}: removed {removed} in {time.monotonic() - started:.1f}s")
+            if not options["watch"]:
+                return
+            time.sleep(options["watch"])
@@ -0,0 +1,42 @@
+"""
+Respace Kanban card and sticky-note positions whose keys have grown long
+(see api.ordering). Only lists containing a long or blank key are
+rewritten, each in its own transaction. Meant for a nightly cron.
+
+    python manage.py rebalance_positions
+    python manage.py rebalance_positions --length 8
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Length
+
+from api import ordering
+from api.models import StickyNote, Task
+
+LISTS = [
+    ('cards', Task, ('user_id', 'status')),
+    ('notes', StickyNote, ('user_id',)),
+]
+
+
+class Command(BaseCommand):
+    help = "Rewrite long fractional-index positions with short, evenly spaced keys"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--length", type=int, help="Rebalance lists with keys longer than this "
+                                                       "(default: settings.POSITION_REBALANCE_LENGTH)")
+
+    def handle(self, *args, **options):
+        limit = options["length"] or ordering.max_length()
+        for label, model, scope in LISTS:
+            lists = (
+                model.objects.annotate(key_length=Length('position'))
+                .filter(Q(key_length__gt=limit) | Q(position=''))
+                .values(*scope).distinct()
+            )
+            rewritten = 0
+            for list_filter in lists:
+                with transaction.atomic():
+                    rewritten += ordering.rebalance(model.objects.filter(**list_filter))
+            self.stdout.write(f"{label}: rebalanced {len(lists)} lists, {rewritten} rows rewritten")
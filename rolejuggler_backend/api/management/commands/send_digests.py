@@ -0,0 +1,36 @@
+"""
+Write the day's due-soon and overdue digests for every user (see api.digests).
+Meant to run every morning from cron; safe to interrupt and re-run.
+
+    python manage.py send_digests
+    python manage.py send_digests --date 2025-03-10 --chunk-size 1000
+"""
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import digests
+
+
+class Command(BaseCommand):
+    help = "Build due-soon/overdue digests and notifications for all users, in user chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Day to build for, YYYY-MM-DD (default: today)")
+        parser.add_argument("--chunk-size", type=int, help="Users per chunk (default: settings.DIGEST_USER_CHUNK)")
+
+    def handle(self, *args, **options):
+        try:
+            today = datetime.date.fromisoformat(options["date"]) if options["date"] else None
+        except ValueError:
+            raise CommandError("--date must be YYYY-MM-DD")
+
+        started = time.monotonic()
+        users = written = 0
+        for users, written in digests.run(today, options["chunk_size"]):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {users} users, {written} digests ({time.monotonic() - started:.1f}s)")
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} digests for {users} users in {time.monotonic() - started:.1f}s"
+        ))
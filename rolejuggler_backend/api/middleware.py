@@ -0,0 +1,86 @@
+"""
+Response compression: brotli when the client accepts it and the optional
+`brotli` package is installed, gzip otherwise.
+
+Only responses of at least RESPONSE_COMPRESSION_MIN_BYTES are compressed,
+and only when that makes them smaller. Streaming responses (the calendar
+feed, data exports) are left alone so they keep streaming.
+"""
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+_ACCEPTS_BR_RE = re.compile(r'\bbr\b')
+_ACCEPTS_GZIP_RE = re.compile(r'\bgzip\b')
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+
+def choose_encoding(accept_encoding):
+    if brotli is not None and _ACCEPTS_BR_RE.search(accept_encoding):
+        return 'br'
+    if _ACCEPTS_GZIP_RE.search(accept_encoding):
+        return 'gzip'
+    return None
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        # Quality 11 costs ~10x the CPU of 5 for a few % smaller JSON
+        return brotli.compress(content, quality=getattr(settings, 'RESPONSE_BROTLI_QUALITY', 5))
+    return compress_string(content)
+
+
+class CompressionMiddleware:
+    # Runs in whichever mode the handler is in, so async views under ASGI
+    # aren't adapted onto a thread just to pass through here
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES)
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < getattr(settings, 'RESPONSE_COMPRESSION_MIN_BYTES', 1024):
+            return response
+
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The compressed body is a different representation of the same resource
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_user_calendar_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassifierState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.JSONField(blank=True, default=dict)),
+                ('trained_through', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='classifier_state', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_classifierstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SenderDomain',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=255)),
+                ('company', models.CharField(max_length=100)),
+                ('is_override', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sender_domains', to='api.job')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sender_domains', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['domain'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'domain'), name='unique_sender_domain_per_user')],
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:22
+
+import hashlib
+import re
+
+from django.db import migrations, models
+
+# The fingerprint as it was when this migration shipped, frozen here so that
+# later changes to api.fingerprint don't change what this migration writes
+_PREFIX_RE = re.compile(r'^\s*(?:(?:re|fwd?|aw|wg|tr)\s*(?:\[\d+\])?\s*:\s*)+', re.IGNORECASE)
+_WORD_RE = re.compile(r'[^\W_]+')
+_FILLER_WORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'for', 'to', 'on', 'at', 'in', 'with', 'by',
+    'am', 'pm', 'invitation', 'invite', 'updated', 'reminder',
+}
+
+
+def _fingerprint(title, domain, date):
+    """Canonical title, domain and one-week date bucket, hashed"""
+    title = _PREFIX_RE.sub('', title or '')
+    tokens = {
+        token for token in _WORD_RE.findall(title.lower())
+        if token not in _FILLER_WORDS and not token.isdigit()
+    }
+    key = f"{' '.join(sorted(tokens))}|{(domain or '').lower()}|{date.toordinal() // 7}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def backfill_fingerprints(apps, schema_editor):
+    Meeting = apps.get_model('api', 'Meeting')
+    batch = []
+    for meeting in Meeting.objects.only('id', 'title', 'meeting_date').iterator(chunk_size=2000):
+        meeting.fingerprint = _fingerprint(meeting.title, '', meeting.meeting_date)
+        batch.append(meeting)
+        if len(batch) >= 2000:
+            Meeting.objects.bulk_update(batch, ['fingerprint'])
+            batch = []
+    Meeting.objects.bulk_update(batch, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_sender_domain'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='organizer_domain',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['user', 'fingerprint'], name='api_meeting_user_id_6bd582_idx'),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
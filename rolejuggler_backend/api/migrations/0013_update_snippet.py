@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_mailbox_poll_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='update',
+            name='imap_uid',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='update',
+            name='imap_uidvalidity',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='update',
+            name='snippet',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.CreateModel(
+            name='UpdateBody',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField(blank=True)),
+                ('fetched_at', models.DateTimeField(auto_now_add=True)),
+                ('update', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='body', to='api.update')),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_update_snippet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedUpdate',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField(blank=True, null=True)),
+                ('source', models.CharField(default='email', max_length=100)),
+                ('sender', models.CharField(blank=True, max_length=255, null=True)),
+                ('received_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField()),
+                ('type', models.CharField(choices=[('task', 'Task'), ('meeting', 'Meeting'), ('email', 'Email'), ('other', 'Other')], default='email', max_length=20)),
+                ('linked_task', models.BooleanField(default=False)),
+                ('deadline', models.DateTimeField(blank=True, null=True)),
+                ('company', models.CharField(blank=True, max_length=255, null=True)),
+                ('meeting_date', models.DateField(blank=True, null=True)),
+                ('meeting_time', models.TimeField(blank=True, null=True)),
+                ('snippet', models.TextField(blank=True, default='')),
+                ('imap_uid', models.BigIntegerField(blank=True, null=True)),
+                ('imap_uidvalidity', models.BigIntegerField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_updates', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-received_at'],
+                'indexes': [models.Index(fields=['user', 'received_at'], name='api_archive_user_id_627ebc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:50
+
+import itertools
+
+from django.db import migrations, models
+
+from api.ordering import spread
+
+
+def backfill_positions(apps, schema_editor):
+    """Existing cards and notes keep their creation order"""
+    for model_name, scope in (('Task', ('user_id', 'status')), ('StickyNote', ('user_id',))):
+        model = apps.get_model('api', model_name)
+        rows = model.objects.order_by(*scope, 'created_at', 'id').only('id', *scope)
+        batch = []
+        same_list = lambda row: [getattr(row, field) for field in scope]  # noqa: E731
+        for _, items in itertools.groupby(rows.iterator(chunk_size=2000), key=same_list):
+            items = list(items)
+            for item, key in zip(items, spread(len(items))):
+                item.position = key
+                batch.append(item)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['position'])
+                batch = []
+        model.objects.bulk_update(batch, ['position'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_soft_delete_purge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stickynote',
+            name='position',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='position',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='stickynote',
+            index=models.Index(fields=['user', 'position'], name='api_stickyn_user_id_080f72_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'status', 'position'], name='api_task_user_id_d6629a_idx'),
+        ),
+        migrations.RunPython(backfill_positions, migrations.RunPython.noop),
+    ]
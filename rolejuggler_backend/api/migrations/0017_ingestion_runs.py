@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_positions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('fetch_today', 'Fetch today'), ('fetch_today_async', 'Fetch today (async view)')], max_length=20)),
+                ('status', models.CharField(choices=[('ok', 'OK'), ('failed', 'Failed')], max_length=10)),
+                ('started_at', models.DateTimeField()),
+                ('duration_ms', models.IntegerField()),
+                ('messages', models.IntegerField(default=0)),
+                ('updates', models.IntegerField(default=0)),
+                ('meetings', models.IntegerField(default=0)),
+                ('llm_calls', models.IntegerField(default=0)),
+                ('cache_hits', models.IntegerField(default=0)),
+                ('errors', models.IntegerField(default=0)),
+                ('error', models.CharField(blank=True, default='', max_length=255)),
+                ('spans', models.JSONField(blank=True, default=list)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingestion_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-started_at'], name='api_ingesti_user_id_03f807_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:05
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_completed_at(apps, schema_editor):
+    """Done tasks were last touched when they were completed, as far as we can tell"""
+    Task = apps.get_model('api', 'Task')
+    Task.objects.filter(status='done').update(completed_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_ingestion_runs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='worksession',
+            index=models.Index(fields=['task', 'start_time', 'duration'], name='api_workses_task_id_3d4ba3_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_digests'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stickynote',
+            name='revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:35
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def drop_duplicate_messages(apps, schema_editor):
+    """Keep the first Update of each mailbox message saved by both the fetch button and the poller"""
+    Update = apps.get_model('api', 'Update')
+    duplicated = (
+        Update.objects.filter(imap_uid__isnull=False, imap_uidvalidity__isnull=False)
+        .values('user', 'imap_uidvalidity', 'imap_uid')
+        .annotate(first=Min('id'), copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    for row in duplicated:
+        Update.objects.filter(
+            user=row['user'], imap_uidvalidity=row['imap_uidvalidity'], imap_uid=row['imap_uid'], id__gt=row['first']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_sticky_note_revision'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_messages, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='update',
+            constraint=models.UniqueConstraint(fields=('user', 'imap_uidvalidity', 'imap_uid'), name='unique_update_imap_message'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:47
+
+from django.db import migrations, models
+
+
+def reset_classifiers(apps, schema_editor):
+    """
+    Saved models learned from rewritten titles and their own predictions;
+    older Updates don't say who labelled them, so start over from new LLM
+    and user labels.
+    """
+    ClassifierState = apps.get_model('api', 'ClassifierState')
+    Update = apps.get_model('api', 'Update')
+    last = Update.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    ClassifierState.objects.update(model={}, trained_through=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_update_imap_message_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedupdate',
+            name='classified_by',
+            field=models.CharField(blank=True, choices=[('llm', 'LLM'), ('local', 'Local classifier'), ('heuristic', 'Keyword rules'), ('user', 'User')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='archivedupdate',
+            name='subject',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='update',
+            name='classified_by',
+            field=models.CharField(blank=True, choices=[('llm', 'LLM'), ('local', 'Local classifier'), ('heuristic', 'Keyword rules'), ('user', 'User')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='update',
+            name='subject',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(reset_classifiers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:53
+
+import hashlib
+import re
+
+from django.db import migrations, models
+
+# api.fingerprint as of this migration, frozen so later changes to it don't change what this writes
+_PREFIX_RE = re.compile(r'^\s*(?:(?:re|fwd?|aw|wg|tr)\s*(?:\[\d+\])?\s*:\s*)+', re.IGNORECASE)
+_MONTH = (r'(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+          r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)')
+_WHEN_RE = re.compile(rf"""
+      \b\d{{1,2}}(?::\d{{2}})?\s*(?:am|pm)\b
+    | \b\d{{1,2}}:\d{{2}}\b
+    | \b\d{{1,4}}[/-]\d{{1,2}}(?:[/-]\d{{2,4}})?\b
+    | \b\d{{1,2}}(?:st|nd|rd|th)?\s+{_MONTH}\b
+    | \b{_MONTH}\s+\d{{1,2}}(?:st|nd|rd|th)?\b
+    | \b\d{{1,2}}(?:st|nd|rd|th)\b
+""", re.IGNORECASE | re.VERBOSE)
+_WORD_RE = re.compile(r'[^\W_]+')
+_FILLER_WORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'for', 'to', 'on', 'at', 'in', 'with', 'by',
+    'am', 'pm', 'invitation', 'invite', 'updated', 'reminder',
+}
+
+
+def _fingerprint(title, domain):
+    """Canonical title (times and dates stripped, numbers kept) and domain, hashed"""
+    title = _WHEN_RE.sub(' ', _PREFIX_RE.sub('', title or ''))
+    tokens = {token for token in _WORD_RE.findall(title.lower()) if token not in _FILLER_WORDS}
+    key = f"{' '.join(sorted(tokens))}|{(domain or '').lower()}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def recompute_fingerprints(apps, schema_editor):
+    """Fingerprints no longer include a week bucket, and keep numbers from the title"""
+    Meeting = apps.get_model('api', 'Meeting')
+    batch = []
+    for meeting in Meeting.objects.only('id', 'title', 'organizer_domain').iterator(chunk_size=2000):
+        meeting.fingerprint = _fingerprint(meeting.title, meeting.organizer_domain)
+        batch.append(meeting)
+        if len(batch) >= 2000:
+            Meeting.objects.bulk_update(batch, ['fingerprint'])
+            batch = []
+    Meeting.objects.bulk_update(batch, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_update_subject_classified_by'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='meeting',
+            name='api_meeting_user_id_6bd582_idx',
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['user', 'fingerprint', 'meeting_date'], name='api_meeting_user_id_312285_idx'),
+        ),
+        migrations.RunPython(recompute_fingerprints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:20
+
+from django.db import migrations, models
+
+
+def blank_null_rules(apps, schema_editor):
+    """Non-recurring meetings had NULL or ''; keep only ''"""
+    Meeting = apps.get_model('api', 'Meeting')
+    Meeting.objects.filter(recurrence_rule__isnull=True).update(recurrence_rule='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_meeting_fingerprint_without_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(blank_null_rules, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='meeting',
+            name='recurrence_rule',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
+from . import fingerprint, ordering
+from .recurrence import last_occurrence
 
 class User(AbstractUser):
     email = models.EmailField(_('email address'), unique=True)
@@ -15,6 +17,9 @@ class User(AbstractUser):
     gmail_app_password = models.CharField(max_length=255, blank=True, null=True)
     app_password = models.CharField(max_length=128, blank=True, null=True)
 
+    # Secret for the read-only .ics subscription feed
+    calendar_token = models.CharField(max_length=64, unique=True, blank=True, null=True)
+
     def __str__(self):
         return self.email
 
@@ -25,6 +30,8 @@ class Job(models.Model):
     color = models.CharField(max_length=7, default='#3B82F6')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set when deleted; the job is hidden at once and purged in the background (api.purge)
+    deleted_at = models.DateTimeField(blank=True, null=True, db_index=True)
     
     def __str__(self):
         return f"{self.name} - {self.company}"
@@ -51,12 +58,36 @@ class Task(models.Model):
     deadline = models.DateField(null=True, blank=True)
     total_time_spent = models.IntegerField(default=0)  # in milliseconds
     last_worked_on = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)  # when it was last moved to done
+    # Order within the user's column for this status (api.ordering)
+    position = models.CharField(max_length=255, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'status', 'position']),
+            # Open tasks by deadline, for the daily digests (api.digests); finished ones stay out of it
+            models.Index(fields=['user', 'deadline'], condition=~models.Q(status='done'), name='task_open_deadline_idx'),
+        ]
     
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if not self.position:
+            # New cards go to the bottom of their column
+            column = Task.objects.filter(user_id=self.user_id, status=self.status).exclude(pk=self.pk)
+            self.position = ordering.append_key(column)
+        completed_at = self.completed_at
+        if self.status == 'done':
+            self.completed_at = self.completed_at or timezone.now()
+        else:
+            self.completed_at = None
+        if self.completed_at != completed_at and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = [*kwargs['update_fields'], 'completed_at']
+        super().save(*args, **kwargs)
+
 class Meeting(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='meetings')
     job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='meetings', null=True, blank=True)
@@ -67,15 +98,35 @@ class Meeting(models.Model):
     duration = models.IntegerField(default=60)  # Duration in minutes
     description = models.TextField(blank=True, null=True)
     location = models.CharField(max_length=255, blank=True, null=True)
+
+    # Recurrence (RRULE subset, e.g. "FREQ=WEEKLY;BYDAY=MO,WE"); meeting_date is the first occurrence
+    recurrence_rule = models.CharField(max_length=255, blank=True, default='')
+    recurrence_exceptions = models.JSONField(default=list, blank=True)  # ISO dates to skip
+    recurrence_end = models.DateField(blank=True, null=True, editable=False)  # derived from UNTIL/COUNT
+
+    # Registrable domain of the email a meeting was created from; part of the dedup fingerprint
+    organizer_domain = models.CharField(max_length=255, blank=True, default='')
+    fingerprint = models.CharField(max_length=40, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['meeting_date', 'meeting_time']
+        indexes = [
+            models.Index(fields=['user', 'fingerprint', 'meeting_date']),
+            models.Index(fields=['user', 'meeting_date']),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.meeting_date} {self.meeting_time}"
 
+    def save(self, *args, **kwargs):
+        self.recurrence_end = (
+            last_occurrence(self.recurrence_rule, self.meeting_date) if self.recurrence_rule else None
+        )
+        self.fingerprint = fingerprint.for_meeting(self.title, self.organizer_domain)
+        super().save(*args, **kwargs)
+
 class WorkSession(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='work_sessions')
     start_time = models.DateTimeField()
@@ -83,6 +134,12 @@ class WorkSession(models.Model):
     duration = models.IntegerField(default=0)  # in milliseconds
     notes = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Covers the productivity analytics scan (api.analytics) without touching the table
+            models.Index(fields=['task', 'start_time', 'duration']),
+        ]
     
     def __str__(self):
         return f"{self.task.title} - {self.start_time}"
@@ -91,12 +148,26 @@ class StickyNote(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sticky_notes')
     content = models.TextField()
     color = models.CharField(max_length=7, default='#FEF3C7')
+    position = models.CharField(max_length=255, blank=True, default='')  # api.ordering
+    # Bumped on every content change; delta edits name the revision they were made against (api.note_edits)
+    revision = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'position']),
+        ]
     
     def __str__(self):
         return self.content[:50] + "..." if len(self.content) > 50 else self.content
 
+    def save(self, *args, **kwargs):
+        if not self.position:
+            notes = StickyNote.objects.filter(user_id=self.user_id).exclude(pk=self.pk)
+            self.position = ordering.append_key(notes)
+        super().save(*args, **kwargs)
+
 class Update(models.Model):
     TYPE_CHOICES = [
         ("task", "Task"),
@@ -105,14 +176,25 @@ class Update(models.Model):
         ("other", "Other"),
     ]
 
+    # Who decided `type`; the local classifier only learns from "llm" and "user" labels
+    CLASSIFIED_BY_CHOICES = [
+        ("llm", "LLM"),
+        ("local", "Local classifier"),
+        ("heuristic", "Keyword rules"),
+        ("user", "User"),
+    ]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="updates")
     title = models.CharField(max_length=255)
+    # The email's Subject as received; `title` is the classifier's rewrite of it
+    subject = models.CharField(max_length=255, blank=True, default="")
     message = models.TextField(blank=True, null=True)
     source = models.CharField(max_length=100, default="email")
     sender = models.CharField(max_length=255, blank=True, null=True)
     received_at = models.DateTimeField(default=timezone.now)
     created_at = models.DateTimeField(auto_now_add=True)
     type = models.CharField(max_length=20, choices=TYPE_CHOICES, default="email")
+    classified_by = models.CharField(max_length=20, choices=CLASSIFIED_BY_CHOICES, blank=True, default="")
     linked_task = models.BooleanField(default=False)
 
     # ✅ new fields
@@ -123,11 +205,224 @@ class Update(models.Model):
     meeting_date = models.DateField(blank=True, null=True)
     meeting_time = models.TimeField(blank=True, null=True)
 
+    # Start of the body's text part, and where to fetch the rest from
+    snippet = models.TextField(blank=True, default="")
+    imap_uid = models.BigIntegerField(blank=True, null=True)
+    imap_uidvalidity = models.BigIntegerField(blank=True, null=True)
+
     class Meta:
         ordering = ["-received_at"]
         indexes = [
             models.Index(fields=["user", "received_at"]),
         ]
+        constraints = [
+            # One Update per mailbox message, however many fetches see it
+            models.UniqueConstraint(
+                fields=["user", "imap_uidvalidity", "imap_uid"], name="unique_update_imap_message"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.user})"
+
+
+class ArchivedUpdate(models.Model):
+    """
+    An Update moved out of the hot table by the retention job
+    (manage.py archive_updates). Keeps the original id and fields; only
+    read by the archive search.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_updates")
+    title = models.CharField(max_length=255)
+    subject = models.CharField(max_length=255, blank=True, default="")
+    message = models.TextField(blank=True, null=True)
+    source = models.CharField(max_length=100, default="email")
+    sender = models.CharField(max_length=255, blank=True, null=True)
+    received_at = models.DateTimeField()
+    created_at = models.DateTimeField()
+    type = models.CharField(max_length=20, choices=Update.TYPE_CHOICES, default="email")
+    classified_by = models.CharField(max_length=20, choices=Update.CLASSIFIED_BY_CHOICES, blank=True, default="")
+    linked_task = models.BooleanField(default=False)
+    deadline = models.DateTimeField(blank=True, null=True)
+    company = models.CharField(max_length=255, blank=True, null=True)
+    meeting_date = models.DateField(blank=True, null=True)
+    meeting_time = models.TimeField(blank=True, null=True)
+    snippet = models.TextField(blank=True, default="")
+    imap_uid = models.BigIntegerField(blank=True, null=True)
+    imap_uidvalidity = models.BigIntegerField(blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-received_at"]
+        indexes = [
+            models.Index(fields=["user", "received_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.user}, archived)"
+
+
+class ClassifierState(models.Model):
+    """Per-user naive Bayes email classifier, trained from the user's Update labels"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='classifier_state')
+    model = models.JSONField(default=dict, blank=True)
+    trained_through = models.BigIntegerField(default=0)  # last Update id looked at
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Classifier for {self.user}"
+
+
+class SenderDomain(models.Model):
+    """Per-user mapping of a sender's registrable domain to a company and Job"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sender_domains')
+    domain = models.CharField(max_length=255)
+    company = models.CharField(max_length=100)
+    job = models.ForeignKey(Job, on_delete=models.SET_NULL, null=True, blank=True, related_name='sender_domains')
+    is_override = models.BooleanField(default=False)  # set by the user rather than derived
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['domain']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'domain'], name='unique_sender_domain_per_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.domain} -> {self.company}"
+
+
+class MailboxPollState(models.Model):
+    """Where background polling of a user's INBOX left off, and how it is scheduled"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='mailbox_poll_state')
+    uidvalidity = models.BigIntegerField(blank=True, null=True)
+    last_uid = models.BigIntegerField(default=0)  # highest UID already ingested
+    interval_seconds = models.FloatField(default=0)
+    consecutive_failures = models.IntegerField(default=0)
+    last_error = models.CharField(max_length=255, blank=True, default='')
+    polls = models.IntegerField(default=0)
+    last_polled_at = models.DateTimeField(blank=True, null=True)
+    next_poll_at = models.DateTimeField(blank=True, null=True)
+    last_lag_ms = models.IntegerField(blank=True, null=True)  # how late the last poll started
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Polling {self.user}"
+
+
+class UpdateBody(models.Model):
+    """Full text body of an email Update, fetched from IMAP on first request"""
+    update = models.OneToOneField(Update, on_delete=models.CASCADE, related_name='body')
+    text = models.TextField(blank=True)
+    fetched_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Body of {self.update_id}"
+
+
+class Purge(models.Model):
+    """A soft-deleted job or account whose rows are being removed in batches (api.purge)"""
+    KIND_CHOICES = [
+        ('job', 'Job'),
+        ('user', 'User'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    target_id = models.BigIntegerField()
+    # Null once an account purge has removed the user itself
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='purges')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True)
+    deleted = models.JSONField(default=dict, blank=True)  # rows removed so far, per model
+    error = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Purge {self.kind} {self.target_id} ({self.status})"
+
+
+class IngestionRun(models.Model):
+    """Timing and counters of one "fetch today" run, stage by stage (api.tracing)"""
+    SOURCE_CHOICES = [
+        ('fetch_today', 'Fetch today'),
+        ('fetch_today_async', 'Fetch today (async view)'),
+    ]
+    STATUS_CHOICES = [
+        ('ok', 'OK'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ingestion_runs')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    started_at = models.DateTimeField()
+    duration_ms = models.IntegerField()
+    messages = models.IntegerField(default=0)  # fetched from the server
+    updates = models.IntegerField(default=0)
+    meetings = models.IntegerField(default=0)
+    llm_calls = models.IntegerField(default=0)
+    cache_hits = models.IntegerField(default=0)
+    errors = models.IntegerField(default=0)  # handled and fatal, across all stages
+    error = models.CharField(max_length=255, blank=True, default='')  # what failed the run
+    # [{'stage', 'offset_ms', 'ms', 'calls', and any counters/'error'}] in start order
+    spans = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-started_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.source} for {self.user} at {self.started_at:%Y-%m-%d %H:%M} ({self.duration_ms} ms)"
+
+
+class Digest(models.Model):
+    """A user's overdue and due-soon tasks and upcoming meetings as of one morning (api.digests)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='digests')
+    date = models.DateField()
+    overdue_tasks = models.IntegerField(default=0)
+    due_soon_tasks = models.IntegerField(default=0)
+    upcoming_meetings = models.IntegerField(default=0)
+    # {'overdue': [...], 'due_soon': [...], 'meetings': [...]}, each capped at DIGEST_MAX_ITEMS
+    items = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_digest_per_user_day'),
+        ]
+
+    def __str__(self):
+        return f"Digest for {self.user} on {self.date}"
+
+
+class Notification(models.Model):
+    """An entry in the user's notification feed"""
+    KIND_CHOICES = [
+        ('digest', 'Digest'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    title = models.CharField(max_length=255)
+    digest = models.ForeignKey(Digest, on_delete=models.CASCADE, null=True, blank=True, related_name='notifications')
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
 
     def __str__(self):
-        return f"{self.title} ({self.user})"
\ No newline at end of file
+        return f"{self.kind} for {self.user}: {self.title}"
@@ -0,0 +1,89 @@
+"""
+Sticky-note edits sent as text deltas instead of the whole content.
+
+An edit is a list of splices [start, delete, insert] made against a known
+revision of the note, applied in order. Offsets count UTF-16 code units,
+as JavaScript string indices do, so the client can diff its textarea
+directly. Saving is a compare-and-set on StickyNote.revision that writes
+only content, revision and updated_at: an edit against a revision that
+has since moved on is refused with the current text (Conflict), and the
+client rebases and retries. Clients coalesce keystrokes and send one
+compacted splice per autosave (src/services/noteAutosave.js).
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import dashboard
+from .models import StickyNote
+
+MAX_OPS = 100
+
+
+class InvalidEdit(ValueError):
+    pass
+
+
+class Conflict(Exception):
+    """The note is no longer at the edit's base revision"""
+
+    def __init__(self, revision, content):
+        super().__init__(f"note is at revision {revision}")
+        self.revision = revision
+        self.content = content
+
+
+def parse(ops):
+    """[(start, delete, insert)] from request data, or InvalidEdit"""
+    if not isinstance(ops, list) or not 0 < len(ops) <= MAX_OPS:
+        raise InvalidEdit(f"ops must be a list of 1 to {MAX_OPS} [start, delete, insert] splices.")
+    parsed = []
+    for op in ops:
+        if not (isinstance(op, list) and len(op) == 3
+                and all(isinstance(n, int) and not isinstance(n, bool) and n >= 0 for n in op[:2])
+                and isinstance(op[2], str)):
+            raise InvalidEdit("Each op must be [start, delete, insert] with non-negative integers and a string.")
+        parsed.append(tuple(op))
+    return parsed
+
+
+def utf16_length(text):
+    return len(text.encode('utf-16-le', 'surrogatepass')) // 2
+
+
+def apply(content, ops):
+    """`content` with the splices `ops` applied in order"""
+    units = bytearray(content.encode('utf-16-le', 'surrogatepass'))
+    for start, delete, insert in ops:
+        if (start + delete) * 2 > len(units):
+            raise InvalidEdit(f"Splice [{start}, {delete}] is past the end of the text.")
+        units[start * 2:(start + delete) * 2] = insert.encode('utf-16-le', 'surrogatepass')
+    try:
+        return units.decode('utf-16-le')
+    except UnicodeDecodeError:
+        raise InvalidEdit("The edits leave half of a surrogate pair.")
+
+
+def save(note, revision, ops):
+    """
+    Apply `ops` to `note` if it is still at `revision`. Returns (new
+    revision, new content, updated_at); an edit that changes nothing
+    writes nothing and keeps the revision.
+    """
+    with transaction.atomic():
+        current = StickyNote.objects.select_for_update().filter(pk=note.pk).values('content', 'revision', 'updated_at')
+        current = current.get()
+        if current['revision'] != revision:
+            raise Conflict(current['revision'], current['content'])
+        content = apply(current['content'], ops)
+        if content == current['content']:
+            return revision, content, current['updated_at']
+        now = timezone.now()
+        # The revision check makes this a compare-and-set on backends where select_for_update is a no-op
+        if not StickyNote.objects.filter(pk=note.pk, revision=revision).update(
+            content=content, revision=revision + 1, updated_at=now
+        ):
+            latest = StickyNote.objects.values('content', 'revision').get(pk=note.pk)
+            raise Conflict(latest['revision'], latest['content'])
+        # update() sends no post_save
+        dashboard.invalidate(note.user_id)
+    return revision + 1, content, now
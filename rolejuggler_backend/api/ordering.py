@@ -0,0 +1,164 @@
+"""
+Fractional-index positions for user-ordered lists (Kanban cards, sticky notes).
+
+A position is a base-62 string compared lexicographically. Between any
+two keys there is always another one, so moving an item only rewrites
+that item's row. Keys never end in the lowest digit, which keeps room to
+insert before any key. Adding at either end of a list steps the key by
+one digit (so appends grow a key by one character per ~60 items);
+repeated inserts between the same two items make keys longer by about
+one character each. rebalance() rewrites a list with evenly spaced,
+short keys, and append_key()/move() do that inline for a list whose new
+key would pass max_length().
+"""
+import math
+
+from django.conf import settings
+from django.db.models import Max
+
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'  # ASCII order
+BASE = len(DIGITS)
+_INDEX = {digit: i for i, digit in enumerate(DIGITS)}
+
+
+def max_length():
+    """Keys longer than this are due for rebalancing"""
+    return getattr(settings, 'POSITION_REBALANCE_LENGTH', 12)
+
+
+def _midpoint(a, b):
+    """A key strictly between digit strings `a` and `b` (None: no upper bound)"""
+    if b is not None:
+        # Copy the common prefix ('' pads `a` with the lowest digit)
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else DIGITS[0]) == b[n]:
+            n += 1
+        if n:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    low = _INDEX[a[0]] if a else 0
+    high = _INDEX[b[0]] if b is not None else BASE
+    if high - low > 1:
+        return DIGITS[(low + high) // 2]
+    # Adjacent first digits
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[low] + _midpoint(a[1:], None)
+
+
+def _after(key):
+    """A short key after `key`: the first digit that can go up, incremented"""
+    if not key:
+        return DIGITS[BASE // 2]
+    i = 0
+    while i < len(key) and key[i] == DIGITS[-1]:
+        i += 1
+    if i == len(key):
+        return key + DIGITS[1]
+    return key[:i] + DIGITS[_INDEX[key[i]] + 1]
+
+
+def _before(key):
+    """A short key before `key`: its first significant digit decremented"""
+    i = 0
+    while key[i] == DIGITS[0]:
+        i += 1
+    digit = _INDEX[key[i]]
+    if digit > 1:
+        return key[:i] + DIGITS[digit - 1]
+    if i + 1 < len(key):
+        return key[:i + 1]
+    # "1" -> "0z": lowering the digit would end the key in the lowest digit
+    return key[:i] + DIGITS[0] + DIGITS[-1]
+
+
+def key_between(before=None, after=None):
+    """
+    A position sorting after `before` and before `after`; either may be
+    None (or '') for the start/end of the list.
+    """
+    before = before or ''
+    after = after or None
+    if after is not None and before >= after:
+        raise ValueError(f"{before!r} is not before {after!r}")
+    if after is not None and after.endswith(DIGITS[0]) or before.endswith(DIGITS[0]):
+        raise ValueError("positions never end in the lowest digit")
+    # The ends of a list step by one digit rather than halving the gap to the
+    # first/last digit, which would grow the key every few inserts
+    if after is None:
+        return _after(before)
+    if not before:
+        return _before(after)
+    return _midpoint(before, after)
+
+
+def append_key(scope):
+    """Position after the last item of `scope` (a list's queryset), respacing the list if it would be too long"""
+    key = key_between(scope.aggregate(Max('position'))['position__max'])
+    if len(key) > max_length():
+        rebalance(scope)
+        key = key_between(scope.aggregate(Max('position'))['position__max'])
+    return key
+
+
+def spread(count):
+    """`count` evenly spaced keys of the shortest length that fits them, in order"""
+    if count <= 0:
+        return []
+    width = max(1, math.ceil(math.log(count + 1, BASE)))
+    keys = []
+    for i in range(1, count + 1):
+        value = i * BASE ** width // (count + 1)
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        keys.append(''.join(reversed(digits)).rstrip(DIGITS[0]))
+    return keys
+
+
+def rebalance(queryset):
+    """
+    Rewrite the positions of one ordered list (e.g. a user's cards in one
+    column) with short, evenly spaced keys, keeping the current order.
+    Returns the number of rows written.
+    """
+    items = list(queryset.order_by('position', 'id').only('id', 'position'))
+    changed = []
+    for item, key in zip(items, spread(len(items))):
+        if item.position != key:
+            item.position = key
+            changed.append(item)
+    queryset.model.objects.bulk_update(changed, ['position'], batch_size=500)
+    return len(changed)
+
+
+def move(item, scope, after=None, before=None, update_fields=()):
+    """
+    Put `item` between `after` and `before` (neighbours from `scope`, the
+    queryset of its list; either may be None) and save only its position.
+    With one neighbour given, the other is the item next to it in the
+    list; with none, `item` goes to the end.
+    """
+    scope = scope.exclude(pk=item.pk)
+    for attempt in range(2):
+        if after is not None and before is None:
+            before = scope.filter(position__gt=after.position).order_by('position', 'id').first()
+        elif before is not None and after is None:
+            after = scope.filter(position__lt=before.position).order_by('-position', '-id').first()
+        elif after is None and before is None:
+            after = scope.order_by('-position', '-id').first()
+        try:
+            item.position = key_between(after and after.position, before and before.position)
+        except ValueError:
+            if attempt:
+                raise
+            # Equal or blank neighbour keys (concurrent moves, old rows): respace the list and retry
+        else:
+            if attempt or len(item.position) <= max_length():
+                break
+            # Too long a key: respace now rather than wait for rebalance_positions
+        rebalance(scope)
+        after = after and scope.get(pk=after.pk)
+        before = before and scope.get(pk=before.pk)
+    item.save(update_fields=['position', *update_fields])
+    return item
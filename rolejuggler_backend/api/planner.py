@@ -0,0 +1,154 @@
+"""
+Deadline-aware auto-planner.
+
+Packs open tasks into the free time between meetings using an
+earliest-deadline-first heap, with priority as the tie breaker.
+The engine works on plain dicts so it can be driven from querysets
+(`.values()`) or from synthetic data in benchmarks.
+"""
+import datetime
+import heapq
+from statistics import median
+
+# Working hours used to build free slots
+WORKDAY_START = datetime.time(9, 0)
+WORKDAY_END = datetime.time(18, 0)
+
+# Planning granularity and fallbacks (minutes)
+BLOCK_MINUTES = 15
+DEFAULT_ESTIMATE_MINUTES = {'high': 120, 'medium': 60, 'low': 30}
+
+PRIORITY_RANK = {'high': 0, 'medium': 1, 'low': 2}
+
+# Tasks without a deadline sort after every dated task
+NO_DEADLINE = datetime.date.max.toordinal()
+
+MS_PER_MINUTE = 60 * 1000
+
+
+def _round_up(minutes):
+    """Round minutes up to the planning granularity"""
+    return -(-int(minutes) // BLOCK_MINUTES) * BLOCK_MINUTES
+
+
+def estimate_history(done_tasks):
+    """Median minutes spent on finished tasks, per priority"""
+    samples = {}
+    for task in done_tasks:
+        spent = task.get('total_time_spent') or 0
+        if spent > 0:
+            samples.setdefault(task.get('priority'), []).append(spent / MS_PER_MINUTE)
+
+    history = dict(DEFAULT_ESTIMATE_MINUTES)
+    for priority, values in samples.items():
+        if priority in history:
+            history[priority] = median(values)
+    return history
+
+
+def estimate_remaining_minutes(task, history):
+    """Remaining effort for an open task based on its tracked time so far"""
+    estimate = history.get(task.get('priority'), DEFAULT_ESTIMATE_MINUTES['medium'])
+    spent = (task.get('total_time_spent') or 0) / MS_PER_MINUTE
+    remaining = estimate - spent
+    if remaining < BLOCK_MINUTES:
+        # Already over the estimate - plan one more block to wrap it up
+        remaining = BLOCK_MINUTES
+    return _round_up(remaining)
+
+
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def free_slots(start_date, days, meetings, day_start=WORKDAY_START, day_end=WORKDAY_END, now=None):
+    """
+    Return the free (date, start_minute, end_minute) gaps between meetings,
+    in chronological order, for `days` days starting at `start_date`.
+    On the date of `now` (a datetime) the gaps start at its next block
+    boundary, so nothing gets planned in the past.
+    """
+    busy = {}
+    for meeting in meetings:
+        begin = _minutes(meeting['meeting_time'])
+        busy.setdefault(meeting['meeting_date'], []).append(
+            (begin, begin + (meeting.get('duration') or 0))
+        )
+
+    open_at, close_at = _minutes(day_start), _minutes(day_end)
+    slots = []
+    for offset in range(days):
+        day = start_date + datetime.timedelta(days=offset)
+        if day.weekday() >= 5:
+            continue
+
+        cursor = open_at
+        if now is not None and day == now.date():
+            elapsed = _minutes(now) + bool(now.second or now.microsecond)
+            cursor = max(cursor, _round_up(elapsed))
+        for begin, end in sorted(busy.get(day, ())):
+            if begin > cursor:
+                slots.append((day, cursor, min(begin, close_at)))
+            cursor = max(cursor, end)
+            if cursor >= close_at:
+                break
+        if cursor < close_at:
+            slots.append((day, cursor, close_at))
+
+    return [slot for slot in slots if slot[2] - slot[1] >= BLOCK_MINUTES]
+
+
+def build_plan(tasks, meetings, start_date, days=7, history=None, now=None):
+    """
+    Schedule `tasks` into the free time around `meetings`.
+
+    Tasks are taken earliest deadline first (then highest priority, then
+    oldest id) from a heap and poured into the free slots in order; a task
+    that does not fit in the current slot continues in the next one.
+    Planning on the day of `now` starts from the current time.
+    Returns a dict with the scheduled blocks and any tasks left over.
+    """
+    history = history or DEFAULT_ESTIMATE_MINUTES
+
+    heap = []
+    remaining = {}
+    for task in tasks:
+        deadline = task.get('deadline')
+        key = (
+            deadline.toordinal() if deadline else NO_DEADLINE,
+            PRIORITY_RANK.get(task.get('priority'), 1),
+            task['id'],
+        )
+        remaining[task['id']] = estimate_remaining_minutes(task, history)
+        heap.append((key, task))
+    heapq.heapify(heap)
+
+    blocks = []
+    for day, begin, end in free_slots(start_date, days, meetings, now=now):
+        cursor = begin
+        while heap and end - cursor >= BLOCK_MINUTES:
+            key, task = heap[0]
+            available = (end - cursor) // BLOCK_MINUTES * BLOCK_MINUTES
+            chunk = min(remaining[task['id']], available)
+            deadline = task.get('deadline')
+            blocks.append({
+                'task_id': task['id'],
+                'title': task.get('title'),
+                'date': day,
+                'start': datetime.time(cursor // 60, cursor % 60),
+                'end': datetime.time((cursor + chunk) // 60, (cursor + chunk) % 60),
+                'minutes': chunk,
+                'late': bool(deadline and day > deadline),
+            })
+            cursor += chunk
+            remaining[task['id']] -= chunk
+            if remaining[task['id']] <= 0:
+                heapq.heappop(heap)
+        if not heap:
+            break
+
+    unscheduled = [
+        {'task_id': task['id'], 'title': task.get('title'), 'minutes': remaining[task['id']]}
+        for _, task in sorted(heap, key=lambda item: item[0])
+    ]
+    return {'blocks': blocks, 'unscheduled': unscheduled}
@@ -0,0 +1,79 @@
+"""
+Scheduling policy for background mailbox polling.
+
+Users are spread over the base interval by a stable hash of their id so a
+restart doesn't poll everyone at once. After each poll the interval
+adapts: back to the minimum when new mail arrived, stretched gradually
+for quiet inboxes, doubled on errors and quadrupled on authentication
+failures (a wrong app password won't fix itself in a minute), with a
+little jitter so users that drifted together spread out again.
+"""
+import random
+import zlib
+
+from django.conf import settings
+
+QUIET_FACTOR = 1.5
+ERROR_FACTOR = 2.0
+AUTH_FACTOR = 4.0
+JITTER = 0.1
+
+
+def limits():
+    """(min, max, max after auth failures) polling intervals in seconds, from settings"""
+    return (
+        getattr(settings, 'POLL_MIN_INTERVAL_SECONDS', 60.0),
+        getattr(settings, 'POLL_MAX_INTERVAL_SECONDS', 1800.0),
+        getattr(settings, 'POLL_MAX_AUTH_BACKOFF_SECONDS', 6 * 3600.0),
+    )
+
+
+def stagger_offset(user_id, interval):
+    """Stable offset in [0, interval) for a user's first poll"""
+    return (zlib.crc32(str(user_id).encode()) % 10000) / 10000 * interval
+
+
+def next_interval(previous, result, min_interval, max_interval, max_auth_interval, rng=random):
+    """Seconds until the next poll after a poll with `result` (see async_ingestion.ingest_user)"""
+    previous = previous or min_interval
+    if result['auth_failed']:
+        interval = min(max(previous, min_interval) * AUTH_FACTOR, max_auth_interval)
+    elif result['error']:
+        interval = min(previous * ERROR_FACTOR, max_interval)
+    elif result['messages']:
+        interval = min_interval
+    else:
+        interval = min(previous * QUIET_FACTOR, max_interval)
+    return interval * rng.uniform(1 - JITTER, 1 + JITTER)
+
+
+class LagStats:
+    """How late polls start compared to their schedule, overall and per user"""
+
+    def __init__(self):
+        self.samples = []
+        self.last = {}  # username -> ms
+        self.worst = {}  # username -> ms
+
+    def observe(self, username, lag_ms):
+        self.samples.append(lag_ms)
+        self.last[username] = lag_ms
+        self.worst[username] = max(lag_ms, self.worst.get(username, 0))
+
+    def percentile(self, p):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def snapshot(self, top=5):
+        return {
+            'polls': len(self.samples),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'max_ms': max(self.samples) if self.samples else None,
+            'laggiest_users': sorted(self.worst.items(), key=lambda kv: kv[1], reverse=True)[:top],
+        }
+
+    def reset_window(self):
+        self.samples = []
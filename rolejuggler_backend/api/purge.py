@@ -0,0 +1,126 @@
+"""
+Soft deletion with a background, batched purge.
+
+Deleting a job or an account only marks it (Job.deleted_at, or an
+inactive user with their tokens revoked) and records a Purge; the request
+returns at once. `manage.py purge_deleted` then removes the dependent
+rows leaf tables first, PURGE_BATCH_SIZE rows per short transaction, so
+the database write lock is never held for long, and records progress on
+the Purge as it goes. Purges are idempotent and resume where they stopped.
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from . import company_resolver
+from .models import (
+    ArchivedUpdate, ClassifierState, Digest, IngestionRun, Job, MailboxPollState, Meeting, Notification, Purge,
+    SenderDomain, StickyNote, Task, Update, UpdateBody, User, WorkSession,
+)
+
+# Rows whose job is soft-deleted: hidden until purged
+LIVE_JOB = Q(job__isnull=True) | Q(job__deleted_at__isnull=True)
+
+
+def _job_steps(job_id):
+    return [
+        ('work_sessions', WorkSession.objects.filter(task__job_id=job_id)),
+        ('tasks', Task.objects.filter(job_id=job_id)),
+        ('meetings', Meeting.objects.filter(job_id=job_id)),
+        ('jobs', Job.objects.filter(id=job_id)),
+    ]
+
+
+def _user_steps(user_id):
+    return [
+        ('work_sessions', WorkSession.objects.filter(task__user_id=user_id)),
+        ('update_bodies', UpdateBody.objects.filter(update__user_id=user_id)),
+        ('updates', Update.objects.filter(user_id=user_id)),
+        ('archived_updates', ArchivedUpdate.objects.filter(user_id=user_id)),
+        ('meetings', Meeting.objects.filter(user_id=user_id)),
+        ('tasks', Task.objects.filter(user_id=user_id)),
+        ('sticky_notes', StickyNote.objects.filter(user_id=user_id)),
+        ('sender_domains', SenderDomain.objects.filter(user_id=user_id)),
+        ('jobs', Job.objects.filter(user_id=user_id)),
+        ('classifier_state', ClassifierState.objects.filter(user_id=user_id)),
+        ('mailbox_poll_state', MailboxPollState.objects.filter(user_id=user_id)),
+        ('ingestion_runs', IngestionRun.objects.filter(user_id=user_id)),
+        ('notifications', Notification.objects.filter(user_id=user_id)),
+        ('digests', Digest.objects.filter(user_id=user_id)),
+        ('users', User.objects.filter(id=user_id)),
+    ]
+
+
+STEPS = {'job': _job_steps, 'user': _user_steps}
+
+
+def batch_size():
+    return getattr(settings, 'PURGE_BATCH_SIZE', 500)
+
+
+def soft_delete_job(job):
+    """Hide `job` and its tasks and meetings now; returns the Purge that removes them"""
+    with transaction.atomic():
+        job.deleted_at = timezone.now()
+        job.save(update_fields=['deleted_at', 'updated_at'])
+        # New mail from the job's domains shouldn't be filed under it any more
+        SenderDomain.objects.filter(job=job).update(job=None)
+        transaction.on_commit(lambda: company_resolver.forget_job(job.id))
+        return Purge.objects.create(kind='job', target_id=job.id, requested_by=job.user)
+
+
+def soft_delete_user(user):
+    """Deactivate `user` and revoke their tokens now; returns the Purge that removes their data"""
+    with transaction.atomic():
+        user.is_active = False
+        user.app_password = None
+        user.save(update_fields=['is_active', 'app_password'])
+        Token.objects.filter(user=user).delete()
+        return Purge.objects.create(kind='user', target_id=user.id, requested_by=user)
+
+
+def _delete_batch(queryset, size):
+    with transaction.atomic():
+        ids = list(queryset.order_by().values_list('pk', flat=True)[:size])
+        if ids:
+            queryset.model.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def run(purge, size=None, pause=0.0):
+    """
+    Remove everything `purge` covers, batch by batch, saving progress after
+    each batch. `pause` seconds between batches give other writers a turn.
+    """
+    size = size or batch_size()
+    purge.status = 'running'
+    purge.started_at = purge.started_at or timezone.now()
+    purge.save(update_fields=['status', 'started_at'])
+    try:
+        for label, queryset in STEPS[purge.kind](purge.target_id):
+            while True:
+                removed = _delete_batch(queryset, size)
+                if not removed:
+                    break
+                purge.deleted[label] = purge.deleted.get(label, 0) + removed
+                purge.save(update_fields=['deleted'])
+                if pause:
+                    time.sleep(pause)
+    except Exception as e:
+        purge.status = 'failed'
+        purge.error = f"{type(e).__name__}: {e}"[:255]
+        purge.save(update_fields=['status', 'error'])
+        raise
+    purge.status = 'done'
+    purge.finished_at = timezone.now()
+    purge.save(update_fields=['status', 'finished_at'])
+    return purge
+
+
+def pending():
+    """Purges still to run (including interrupted ones), oldest first"""
+    return Purge.objects.filter(status__in=['pending', 'running', 'failed']).order_by('created_at')
@@ -0,0 +1,166 @@
+"""
+RRULE-style recurrence for meetings.
+
+Supports the subset of RFC 5545 recurrence rules the app needs:
+FREQ=DAILY|WEEKLY|MONTHLY with INTERVAL, BYDAY (weekly), COUNT and UNTIL,
+e.g. "FREQ=WEEKLY;BYDAY=MO,WE,FR" or "FREQ=DAILY;INTERVAL=2;COUNT=10".
+
+Occurrences are generated lazily and only for the requested window;
+`expand` is memoized so the same series/window is never recomputed.
+"""
+import datetime
+from functools import lru_cache
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+WEEKDAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+
+# Hard cap so a bad rule or huge window can't spin forever
+MAX_OCCURRENCES = 1000
+
+
+@lru_cache(maxsize=256)
+def parse_rule(rule):
+    """Parse an RRULE string into a dict, raising ValueError if invalid"""
+    if rule.upper().startswith('RRULE:'):
+        rule = rule[6:]
+
+    parts = {}
+    for part in filter(None, rule.strip().split(';')):
+        key, sep, value = part.partition('=')
+        if not sep:
+            raise ValueError(f"Invalid recurrence part: {part}")
+        parts[key.strip().upper()] = value.strip().upper()
+
+    freq = parts.get('FREQ')
+    if freq not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+
+    try:
+        interval = int(parts.get('INTERVAL', 1))
+        count = int(parts['COUNT']) if 'COUNT' in parts else None
+    except ValueError:
+        raise ValueError("INTERVAL and COUNT must be integers")
+    if interval < 1 or (count is not None and count < 1):
+        raise ValueError("INTERVAL and COUNT must be positive")
+
+    until = None
+    if 'UNTIL' in parts:
+        try:
+            until = datetime.datetime.strptime(parts['UNTIL'][:8], '%Y%m%d').date()
+        except ValueError:
+            raise ValueError("UNTIL must be a date like 20251231")
+
+    byday = ()
+    if 'BYDAY' in parts:
+        try:
+            byday = tuple(sorted({WEEKDAYS[day] for day in parts['BYDAY'].split(',')}))
+        except KeyError:
+            raise ValueError("BYDAY must be a list of MO,TU,WE,TH,FR,SA,SU")
+
+    return {'freq': freq, 'interval': interval, 'count': count, 'until': until, 'byday': byday}
+
+
+def _add_months(day, months):
+    """Same day-of-month `months` later, or None if that month is too short"""
+    month_index = day.month - 1 + months
+    try:
+        return day.replace(year=day.year + month_index // 12, month=month_index % 12 + 1)
+    except ValueError:
+        return None
+
+
+def _iter_dates(rule, dtstart, from_date):
+    """
+    Yield occurrence dates of `rule` in order. When the rule has no COUNT,
+    whole periods before `from_date` are skipped arithmetically instead of
+    being generated one by one.
+    """
+    freq, interval = rule['freq'], rule['interval']
+    skip_ahead = rule['count'] is None and from_date > dtstart
+
+    if freq == 'DAILY':
+        periods = (from_date - dtstart).days // interval if skip_ahead else 0
+        day = dtstart + datetime.timedelta(days=periods * interval)
+        step = datetime.timedelta(days=interval)
+        while True:
+            yield day
+            day += step
+
+    elif freq == 'WEEKLY':
+        byday = rule['byday'] or (dtstart.weekday(),)
+        week = dtstart - datetime.timedelta(days=dtstart.weekday())
+        if skip_ahead:
+            week += datetime.timedelta(weeks=(from_date - week).days // 7 // interval * interval)
+        step = datetime.timedelta(weeks=interval)
+        while True:
+            for weekday in byday:
+                day = week + datetime.timedelta(days=weekday)
+                if day >= dtstart:
+                    yield day
+            week += step
+
+    else:  # MONTHLY
+        months = 0
+        if skip_ahead:
+            elapsed = (from_date.year - dtstart.year) * 12 + from_date.month - dtstart.month
+            months = max(elapsed, 0) // interval * interval
+        while True:
+            day = _add_months(dtstart, months)
+            if day is not None:
+                yield day
+            months += interval
+
+
+@lru_cache(maxsize=4096)
+def expand(rule, dtstart, window_start, window_end, exdates=frozenset()):
+    """Occurrence dates of a series that fall inside [window_start, window_end]"""
+    parsed = parse_rule(rule)
+    count, until = parsed['count'], parsed['until']
+    if until is not None:
+        window_end = min(window_end, until)
+
+    occurrences = []
+    for n, day in enumerate(_iter_dates(parsed, dtstart, window_start)):
+        if day > window_end or (count is not None and n >= count) or len(occurrences) >= MAX_OCCURRENCES:
+            break
+        if day >= window_start and day not in exdates:
+            occurrences.append(day)
+    return tuple(occurrences)
+
+
+def last_occurrence(rule, dtstart):
+    """Last date a series can occur on, or None if it is unbounded"""
+    parsed = parse_rule(rule)
+    last = parsed['until']
+    if parsed['count'] is not None:
+        counted = None
+        for n, day in enumerate(_iter_dates(parsed, dtstart, dtstart)):
+            if n >= parsed['count'] or (last is not None and day > last):
+                break
+            counted = day
+        last = counted
+    return last
+
+
+def exception_dates(values):
+    """Normalize a list of ISO date strings into a frozenset of dates"""
+    dates = set()
+    for value in values or ():
+        if isinstance(value, datetime.date):
+            dates.add(value)
+        else:
+            dates.add(datetime.date.fromisoformat(str(value)[:10]))
+    return frozenset(dates)
+
+
+def occurrences(meeting, window_start, window_end):
+    """Dates on which `meeting` (a Meeting or a values() dict) occurs in the window"""
+    get = meeting.get if isinstance(meeting, dict) else lambda name: getattr(meeting, name)
+    meeting_date = get('meeting_date')
+    rule = get('recurrence_rule')
+    if not rule:
+        return (meeting_date,) if window_start <= meeting_date <= window_end else ()
+    return expand(
+        rule, meeting_date, window_start, window_end,
+        exception_dates(get('recurrence_exceptions')),
+    )
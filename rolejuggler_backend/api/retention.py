@@ -0,0 +1,68 @@
+"""
+Retention for ingested updates.
+
+Updates older than UPDATES_RETENTION_DAYS are moved to ArchivedUpdate in
+batches, oldest first, each batch in its own short transaction (copy,
+then delete), so the hot `Update` table and its (user, received_at) index
+only hold recent mail. Re-running after an interruption is safe: rows
+already copied are skipped by their kept primary key.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedUpdate, Update
+
+# Copied as-is; `archived_at` is set on insert
+ARCHIVED_FIELDS = [
+    f.attname for f in ArchivedUpdate._meta.concrete_fields if f.name != 'archived_at'
+]
+
+
+def cutoff(days=None, now=None):
+    """Updates received before this are archived"""
+    days = getattr(settings, 'UPDATES_RETENTION_DAYS', 90) if days is None else days
+    return (now or timezone.now()) - datetime.timedelta(days=days)
+
+
+def archive_batch(before, batch_size):
+    """Move up to `batch_size` of the oldest updates received before `before`; returns how many"""
+    with transaction.atomic():
+        rows = list(
+            Update.objects.filter(received_at__lt=before)
+            .order_by('received_at', 'id')
+            .values(*ARCHIVED_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        ArchivedUpdate.objects.bulk_create([ArchivedUpdate(**row) for row in rows], ignore_conflicts=True)
+        Update.objects.filter(id__in=[row['id'] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_updates(days=None, batch_size=None, now=None):
+    """
+    Archive every update older than the retention window, one batch at a
+    time. Yields the running total after each batch.
+    """
+    before = cutoff(days, now)
+    batch_size = batch_size or getattr(settings, 'UPDATES_ARCHIVE_BATCH_SIZE', 1000)
+    total = 0
+    while True:
+        moved = archive_batch(before, batch_size)
+        if not moved:
+            return
+        total += moved
+        yield total
+
+
+def matching(queryset, query):
+    """Rows of an Update or ArchivedUpdate queryset whose title, sender, company or snippet contain every word of `query`"""
+    for term in query.split():
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(sender__icontains=term) | Q(company__icontains=term) | Q(snippet__icontains=term)
+        )
+    return queryset
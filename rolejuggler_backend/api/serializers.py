@@ -1,7 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
-from .models import User, Job, Task, WorkSession, StickyNote,Update,Meeting
+from django.db.models import F
+from django.utils import timezone
+from .models import User, Job, Task, WorkSession, StickyNote,Update,Meeting, SenderDomain, ArchivedUpdate, Purge, IngestionRun, Digest, Notification
+from . import company_resolver, purge, recurrence
+from .fieldsets import SparseFieldsMixin
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -46,13 +50,36 @@ class LoginSerializer(serializers.Serializer):
             return user
         raise serializers.ValidationError("Invalid credentials")
 
-class JobSerializer(serializers.ModelSerializer):
+class JobSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Job
         fields = '__all__'
-        read_only_fields = ('user', 'created_at', 'updated_at')
+        read_only_fields = ('user', 'created_at', 'updated_at', 'deleted_at')
 
-class TaskSerializer(serializers.ModelSerializer):
+class SenderDomainSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SenderDomain
+        fields = ('id', 'domain', 'company', 'job', 'is_override', 'created_at', 'updated_at')
+        read_only_fields = ('is_override', 'created_at', 'updated_at')
+        extra_kwargs = {'company': {'required': False}}
+
+    def validate_domain(self, value):
+        domain = company_resolver.sender_domain(value if '@' in value else f"x@{value}")
+        if not domain or '.' not in domain:
+            raise serializers.ValidationError("Enter a domain such as acme.com")
+        domain = company_resolver.registrable_domain(domain)
+        if self.instance is not None and domain != self.instance.domain and SenderDomain.objects.filter(
+            user=self.instance.user, domain=domain
+        ).exists():
+            raise serializers.ValidationError("This domain already has a mapping")
+        return domain
+
+    def validate_job(self, value):
+        if value is not None and value.user_id != self.context['request'].user.id:
+            raise serializers.ValidationError("Unknown job")
+        return value
+
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     job_name = serializers.CharField(source='job.name', read_only=True)
     job_company = serializers.CharField(source='job.company', read_only=True)
     job_color = serializers.CharField(source='job.color', read_only=True)
@@ -60,18 +87,34 @@ class TaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
         fields = '__all__'
-        read_only_fields = ('user', 'created_at', 'updated_at')
+        read_only_fields = ('user', 'position', 'completed_at', 'created_at', 'updated_at')
 
 class WorkSessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = WorkSession
         fields = '__all__'
 
-class StickyNoteSerializer(serializers.ModelSerializer):
+class StickyNoteSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = StickyNote
         fields = '__all__'
-        read_only_fields = ('user', 'created_at', 'updated_at')
+        read_only_fields = ('user', 'position', 'revision', 'created_at', 'updated_at')
+
+    def update(self, instance, validated_data):
+        # Only the fields sent are written, so a PATCH can't put back content or a revision
+        # that a delta edit (api.note_edits) changed since the note was loaded
+        content_changed = 'content' in validated_data and validated_data['content'] != instance.content
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        fields = [*validated_data, 'updated_at'] + ([] if instance.position else ['position'])
+        if content_changed:
+            # A whole-content PATCH moves the revision on too, so delta edits made before it conflict
+            instance.revision = F('revision') + 1
+            fields.append('revision')
+        instance.save(update_fields=fields)
+        if content_changed:
+            instance.refresh_from_db(fields=['revision'])
+        return instance
 
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -104,16 +147,81 @@ class ProfileSerializer(serializers.ModelSerializer):
         return rep
 
 
-class UpdateSerializer(serializers.ModelSerializer):
+class UpdateSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Update
         fields = "__all__"
-        read_only_fields = ("user", "created_at")
+        read_only_fields = ("user", "subject", "classified_by", "created_at")
+
+
+class ArchivedUpdateSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedUpdate
+        exclude = ("user",)
 
 
 
-class MeetingSerializer(serializers.ModelSerializer):
+class MeetingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Meeting
         fields = '__all__'
-        read_only_fields = ('user', 'created_at', 'updated_at')
\ No newline at end of file
+        read_only_fields = ('user', 'created_at', 'updated_at')
+        # Older clients clear the rule with null
+        extra_kwargs = {'recurrence_rule': {'allow_null': True}}
+
+    def validate_recurrence_rule(self, value):
+        if not value:
+            return ''
+        try:
+            recurrence.parse_rule(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value.upper()
+
+    def validate_recurrence_exceptions(self, value):
+        try:
+            return sorted(d.isoformat() for d in recurrence.exception_dates(value))
+        except (TypeError, ValueError):
+            raise serializers.ValidationError("Exceptions must be a list of YYYY-MM-DD dates.")
+
+class PurgeSerializer(serializers.ModelSerializer):
+    remaining = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Purge
+        fields = ('id', 'kind', 'target_id', 'status', 'deleted', 'remaining', 'error',
+                  'created_at', 'started_at', 'finished_at')
+
+    def get_remaining(self, obj):
+        """Rows still to delete, per model (counted on request, so only while unfinished)"""
+        if obj.status == 'done':
+            return {}
+        counts = {label: queryset.count() for label, queryset in purge.STEPS[obj.kind](obj.target_id)}
+        return {label: count for label, count in counts.items() if count}
+
+
+class IngestionRunSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = IngestionRun
+        exclude = ('user',)
+
+class DigestSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Digest
+        exclude = ('user',)
+
+class NotificationSerializer(serializers.ModelSerializer):
+    digest = DigestSerializer(read_only=True)
+    read = serializers.BooleanField(write_only=True, required=False)
+
+    class Meta:
+        model = Notification
+        fields = ('id', 'kind', 'title', 'digest', 'created_at', 'read_at', 'read')
+        read_only_fields = ('kind', 'title', 'created_at', 'read_at')
+
+    def update(self, instance, validated_data):
+        # {"read": true} stamps read_at once; {"read": false} marks it unread again
+        if 'read' in validated_data:
+            instance.read_at = (instance.read_at or timezone.now()) if validated_data['read'] else None
+            instance.save(update_fields=['read_at'])
+        return instance
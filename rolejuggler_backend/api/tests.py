@@ -1,7 +1,42 @@
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
+import datetime
+import gzip
+import json
+import mailbox
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zoneinfo
+from email.message import EmailMessage
+from io import StringIO
+from unittest import mock
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from . import (
+    analytics, async_ingestion, async_views, classifier, company_resolver, dashboard, digests, fingerprint, ical, ingestion, llm, mail_body, middleware, ordering, planner, polling,
+    recurrence,
+    purge, retention, throttling, tracing,
+)
+from .async_imap import sequence_set
+from .fake_imap_server import FakeIMAPServer
+from .fake_llm_server import FakeGeminiServer
+from .serializers import StickyNoteSerializer, UpdateSerializer
+from .models import ArchivedUpdate, ClassifierState, Digest, IngestionRun, Notification, Purge, Job, MailboxPollState, SenderDomain, Task, WorkSession, Meeting, StickyNote, Update
 User = get_user_model()
 
 class TestAuthAPI(APITestCase):
@@ -174,3 +209,1728 @@ class TestAuthAPI(APITestCase):
         final_response = self.client.post(login_url, good_data, format="json")
         self.assertEqual(final_response.status_code, status.HTTP_200_OK)
         self.assertIn("token", final_response.data)
+
+
+class TestPlannerAPI(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="planner", email="planner@example.com", password="TestPass123!"
+        )
+        self.client.force_authenticate(self.user)
+        # Monday, so the planning window starts on a working day
+        self.monday = datetime.date(2025, 1, 6)
+
+    def test_build_plan_orders_by_deadline_then_priority(self):
+        """✅ Earliest deadline first, priority breaks ties"""
+        tasks = [
+            {"id": 1, "title": "later", "priority": "high", "deadline": self.monday + datetime.timedelta(days=3), "total_time_spent": 0},
+            {"id": 2, "title": "soon low", "priority": "low", "deadline": self.monday, "total_time_spent": 0},
+            {"id": 3, "title": "soon high", "priority": "high", "deadline": self.monday, "total_time_spent": 0},
+        ]
+        plan = planner.build_plan(tasks, [], self.monday, days=1)
+        order = [block["task_id"] for block in plan["blocks"]]
+        self.assertEqual(order, [3, 2, 1])
+        self.assertEqual(plan["unscheduled"], [])
+
+    def test_build_plan_skips_meetings(self):
+        """✅ Planned blocks never overlap meetings"""
+        tasks = [{"id": 1, "title": "big", "priority": "high", "deadline": None, "total_time_spent": 0}]
+        meetings = [{"meeting_date": self.monday, "meeting_time": datetime.time(10, 0), "duration": 60}]
+        plan = planner.build_plan(tasks, meetings, self.monday, days=1)
+        spans = [(b["start"], b["end"]) for b in plan["blocks"]]
+        self.assertEqual(spans, [(datetime.time(9, 0), datetime.time(10, 0)), (datetime.time(11, 0), datetime.time(12, 0))])
+
+    def test_plan_for_today_starts_now(self):
+        """✅ Today's plan starts at the next block after the current time, later days at the workday start"""
+        tasks = [{"id": 1, "title": "big", "priority": "high", "deadline": None, "total_time_spent": 0}]
+        now = datetime.datetime.combine(self.monday, datetime.time(16, 50, 20))
+        plan = planner.build_plan(tasks, [], self.monday, days=2, now=now)
+        spans = [(b["date"], b["start"], b["end"]) for b in plan["blocks"]]
+        self.assertEqual(spans, [
+            (self.monday, datetime.time(17, 0), datetime.time(18, 0)),
+            (self.monday + datetime.timedelta(days=1), datetime.time(9, 0), datetime.time(10, 0)),
+        ])
+        evening = planner.free_slots(self.monday, 1, [], now=now.replace(hour=19))
+        self.assertEqual(evening, [])
+
+    def test_remaining_effort_uses_tracked_time(self):
+        """✅ Time already spent reduces the remaining estimate"""
+        history = planner.estimate_history([{"priority": "medium", "total_time_spent": 90 * planner.MS_PER_MINUTE}])
+        task = {"priority": "medium", "total_time_spent": 30 * planner.MS_PER_MINUTE}
+        self.assertEqual(planner.estimate_remaining_minutes(task, history), 60)
+
+    def test_planner_endpoint(self):
+        """✅ Planner endpoint returns blocks for open tasks only"""
+        Task.objects.create(user=self.user, title="open", priority="high")
+        Task.objects.create(user=self.user, title="finished", status="done")
+        response = self.client.get(reverse("planner"), {"start": self.monday.isoformat(), "days": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({b["title"] for b in response.data["blocks"]}, {"open"})
+
+
+class TestDashboardSnapshot(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="overview", email="overview@example.com", password="TestPass123!"
+        )
+        self.client.force_authenticate(self.user)
+        self.today = datetime.date(2025, 3, 10)
+        job = Job.objects.create(user=self.user, name="Engineer", company="Acme", color="#111111")
+        Task.objects.create(user=self.user, job=job, title="Ship", deadline=self.today, priority="high")
+        Task.objects.create(user=self.user, title="Late", deadline=self.today - datetime.timedelta(days=2))
+        Task.objects.create(user=self.user, title="Later", deadline=self.today + datetime.timedelta(days=3))
+        Meeting.objects.create(user=self.user, title="Standup", meeting_date=self.today - datetime.timedelta(days=7),
+                               meeting_time=datetime.time(9), recurrence_rule="FREQ=WEEKLY")
+        Meeting.objects.create(user=self.user, title="Interview", meeting_date=self.today, meeting_time=datetime.time(8))
+        Update.objects.create(user=self.user, title="Offer", type="email")
+        StickyNote.objects.create(user=self.user, content="remember")
+
+    def get(self):
+        return self.client.get(f"/api/dashboard/?date={self.today.isoformat()}")
+
+    def test_snapshot_contents(self):
+        """✅ One response with today's tasks, upcoming meetings, updates, notes and counts"""
+        with self.assertNumQueries(6):
+            response = self.get()
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual([t["title"] for t in data["tasks_today"]], ["Ship"])
+        self.assertEqual(data["tasks_today"][0]["job_color"], "#111111")
+        self.assertEqual(
+            [(m["title"], m["meeting_date"]) for m in data["upcoming_meetings"]],
+            [("Interview", self.today), ("Standup", self.today), ("Standup", self.today + datetime.timedelta(days=7))],
+        )
+        self.assertEqual(data["counts"]["tasks_open"], 3)
+        self.assertEqual(data["counts"]["tasks_overdue"], 1)
+        self.assertEqual(data["counts"]["meetings_today"], 2)
+        self.assertEqual(len(data["recent_updates"]), 1)
+        self.assertEqual(data["sticky_notes"][0]["content"], "remember")
+
+    def test_tasks_sorted_by_priority(self):
+        """✅ Today's tasks run high, medium, low, not alphabetically"""
+        for title, priority in (("Tidy", "low"), ("Review", "medium"), ("Pitch", "high")):
+            Task.objects.create(user=self.user, title=title, deadline=self.today, priority=priority)
+        titles = [t["title"] for t in self.get().data["tasks_today"]]
+        self.assertEqual(titles, ["Ship", "Pitch", "Review", "Tidy"])
+
+    def test_cached_until_a_write(self):
+        """✅ Repeat loads hit the cache; a committed write rebuilds the snapshot"""
+        self.assertEqual(self.get()["X-Dashboard-Cache"], "miss")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get()["X-Dashboard-Cache"], "hit")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/tasks/", {"title": "New", "deadline": self.today.isoformat()}, format="json")
+        response = self.get()
+        self.assertEqual(response["X-Dashboard-Cache"], "miss")
+        self.assertEqual(len(response.data["tasks_today"]), 2)
+
+    def test_snapshots_are_per_user(self):
+        """✅ Another user's write leaves this user's snapshot cached"""
+        self.get()
+        other = User.objects.create_user(username="someone", email="someone@example.com", password="TestPass123!")
+        with self.captureOnCommitCallbacks(execute=True):
+            StickyNote.objects.create(user=other, content="mine")
+        self.assertEqual(self.get()["X-Dashboard-Cache"], "hit")
+        dashboard.invalidate(self.user.id)
+        self.assertEqual(self.get()["X-Dashboard-Cache"], "hit")  # not committed yet
+
+    def test_rejects_bad_date(self):
+        """❌ Malformed date"""
+        self.assertEqual(self.client.get("/api/dashboard/?date=tomorrow").status_code, 400)
+
+
+class TestProductivityAnalytics(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="analyst", email="analyst@example.com", password="TestPass123!"
+        )
+        self.client.force_authenticate(self.user)
+        self.today = datetime.date(2025, 3, 10)  # a Monday
+        self.job = Job.objects.create(user=self.user, name="Engineer", company="Acme", color="#111111")
+        self.task = Task.objects.create(user=self.user, job=self.job, title="Build")
+        loose = Task.objects.create(user=self.user, title="Admin")
+        self.session(self.task, datetime.datetime(2025, 3, 10, 9, 30), 60)  # spans two hours
+        self.session(self.task, datetime.datetime(2025, 3, 4, 14, 0), 30)
+        self.session(loose, datetime.datetime(2025, 2, 20, 10, 0), 20)  # before the window, inside the 28-day lead
+
+    def session(self, task, start, minutes):
+        start = start.replace(tzinfo=datetime.timezone.utc)
+        return WorkSession.objects.create(task=task, start_time=start, end_time=start + datetime.timedelta(minutes=minutes),
+                                          duration=minutes * 60000)
+
+    def due(self, day, status="todo", completed=None):
+        task = Task.objects.create(user=self.user, job=self.job, title="Due", deadline=self.today.replace(day=day),
+                                   status=status)
+        if completed:
+            Task.objects.filter(pk=task.pk).update(completed_at=completed.replace(tzinfo=datetime.timezone.utc))
+        return task
+
+    def test_heatmap_and_rolling_focus(self):
+        """✅ Sessions split across the hours they span; rolling sums reach back before the window"""
+        report = analytics.build(self.user, 7, zoneinfo.ZoneInfo("UTC"), self.today)
+        self.assertEqual(report["start"], datetime.date(2025, 3, 4))
+        self.assertEqual(report["heatmap"][0][9], 30.0)
+        self.assertEqual(report["heatmap"][0][10], 30.0)
+        self.assertEqual(report["heatmap"][1][14], 30.0)
+        self.assertEqual(sum(map(sum, report["heatmap"])), 90.0)
+
+        jobs = {row["job_id"]: row for row in report["jobs"]}
+        self.assertEqual(jobs[self.job.id]["daily"], [30.0, 0, 0, 0, 0, 0, 60.0])
+        self.assertEqual(jobs[self.job.id]["rolling_7"][-1], 90.0)
+        self.assertEqual(jobs[None]["name"], "No job")
+        self.assertEqual(jobs[None]["total_minutes"], 0.0)
+        self.assertEqual(jobs[None]["rolling_28"], [20.0] * 7)
+        self.assertEqual(report["session_lengths"]["sessions"], 2)
+        self.assertEqual(report["session_lengths"]["counts"][3:5], [1, 1])  # 30-60 and 60-90 minutes
+
+    def test_local_time_buckets(self):
+        """✅ Hours and days are bucketed in the requested timezone, across DST"""
+        self.session(self.task, datetime.datetime(2025, 3, 10, 3, 30), 15)  # 23:30 Sunday in New York (EDT)
+        report = analytics.build(self.user, 7, zoneinfo.ZoneInfo("America/New_York"), self.today)
+        self.assertEqual(report["heatmap"][6][23], 15.0)
+        self.assertEqual(report["heatmap"][0][5], 30.0)  # 09:30 UTC is 05:30 EDT
+
+    def test_deadline_hit_rates(self):
+        """✅ Finished on or before the deadline day, finished late, or still open past it"""
+        self.due(5, "done", datetime.datetime(2025, 3, 5, 18, 0))
+        self.due(5, "done", datetime.datetime(2025, 3, 7, 9, 0))
+        self.due(6)
+        self.due(10)  # due today: not overdue yet
+        self.due(1)  # before the window
+        report = analytics.build(self.user, 7, zoneinfo.ZoneInfo("UTC"), self.today)
+        expected = {"on_time": 1, "late": 1, "overdue": 1, "hit_rate": 0.333}
+        self.assertEqual(report["deadlines"], expected)
+        self.assertEqual({row["job_id"]: row for row in report["jobs"]}[self.job.id]["deadlines"], expected)
+
+    def test_completed_at_follows_status(self):
+        """✅ Moving a task to done stamps completed_at; moving it back clears it"""
+        self.task.status = "done"
+        self.task.save()
+        self.assertIsNotNone(Task.objects.get(pk=self.task.pk).completed_at)
+        self.task.status = "in-progress"
+        self.task.save(update_fields=["status"])
+        self.assertIsNone(Task.objects.get(pk=self.task.pk).completed_at)
+
+    def test_endpoint_cached_until_a_write(self):
+        """✅ The report is cached per user, window and timezone until their data changes"""
+        url = "/api/analytics/productivity/?days=30&tz=Europe/Berlin"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Analytics-Cache"], "miss")
+        self.assertEqual(response.data["timezone"], "Europe/Berlin")
+        self.assertEqual(len(response.data["heatmap"]), 7)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url)["X-Analytics-Cache"], "hit")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.session(self.task, timezone.now() - datetime.timedelta(hours=2), 45)
+        self.assertEqual(self.client.get(url)["X-Analytics-Cache"], "miss")
+
+    def test_rejects_bad_parameters(self):
+        """❌ Unknown timezone or non-numeric days"""
+        self.assertEqual(self.client.get("/api/analytics/productivity/?tz=Mars/Olympus").status_code, 400)
+        self.assertEqual(self.client.get("/api/analytics/productivity/?days=week").status_code, 400)
+
+
+class TestDailyDigests(APITestCase):
+    def setUp(self):
+        self.today = datetime.date(2025, 3, 10)
+        self.alice = User.objects.create_user(username="alice", email="alice@example.com", password="TestPass123!")
+        self.bob = User.objects.create_user(username="bob", email="bob@example.com", password="TestPass123!")
+        day = lambda n: self.today + datetime.timedelta(days=n)
+        job = Job.objects.create(user=self.alice, name="Engineer", company="Acme")
+        Task.objects.create(user=self.alice, job=job, title="Late", deadline=day(-3))
+        Task.objects.create(user=self.alice, title="Soon", deadline=day(2), status="in-progress")
+        Task.objects.create(user=self.alice, title="Finished", deadline=day(-1), status="done")
+        Task.objects.create(user=self.alice, title="Later", deadline=day(9))
+        Task.objects.create(user=self.alice, title="Someday")
+        Meeting.objects.create(user=self.alice, title="Interview", meeting_date=day(1), meeting_time=datetime.time(10))
+        Meeting.objects.create(user=self.alice, title="Standup", meeting_date=day(-6), meeting_time=datetime.time(9),
+                               recurrence_rule="FREQ=WEEKLY")
+        Task.objects.create(user=self.bob, title="Far", deadline=day(30))
+
+    def run_all(self, size=None):
+        return list(digests.run(self.today, size))
+
+    def test_digest_and_notification(self):
+        """✅ Overdue and due-soon open tasks and upcoming meetings, announced in the feed"""
+        self.assertEqual(self.run_all(size=1), [(1, 1), (2, 1)])
+        digest = Digest.objects.get(user=self.alice)
+        self.assertEqual(digest.date, self.today)
+        self.assertEqual((digest.overdue_tasks, digest.due_soon_tasks, digest.upcoming_meetings), (1, 1, 2))
+        self.assertEqual(digest.items["overdue"][0]["title"], "Late")
+        self.assertEqual(digest.items["overdue"][0]["job_name"], "Engineer")
+        self.assertEqual([m["title"] for m in digest.items["meetings"]], ["Standup", "Interview"])  # 09:00 and 10:00 tomorrow
+        notification = Notification.objects.get(user=self.alice)
+        self.assertEqual(notification.digest, digest)
+        self.assertEqual(notification.title, "1 overdue, 1 due soon, 2 meetings")
+        self.assertFalse(Digest.objects.filter(user=self.bob).exists())
+
+    def test_rerun_skips_written_digests(self):
+        """✅ Running twice for a day doesn't duplicate digests or notifications"""
+        self.run_all()
+        self.assertEqual(self.run_all(), [(2, 0)])
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_skips_inactive_users_and_deleted_jobs(self):
+        """✅ Deactivated accounts and soft-deleted jobs' tasks are left out"""
+        purge.soft_delete_job(Job.objects.get(user=self.alice))
+        User.objects.filter(pk=self.bob.pk).update(is_active=False)
+        Task.objects.create(user=self.bob, title="Late", deadline=self.today)
+        self.assertEqual(self.run_all(), [(1, 1)])
+        self.assertEqual(Digest.objects.get().overdue_tasks, 0)
+
+    def test_queries_per_chunk_do_not_grow(self):
+        """✅ A chunk costs the same queries however many users and tasks it holds"""
+        def queries():
+            Digest.objects.all().delete()
+            with CaptureQueriesContext(connection) as ctx:
+                self.run_all()
+            return len(ctx)
+
+        few = queries()
+        for i in range(20):
+            user = User.objects.create_user(username=f"user{i}", email=f"user{i}@example.com", password="x")
+            Task.objects.bulk_create([Task(user=user, title="t", deadline=self.today, position=f"a{n}") for n in range(5)])
+        self.assertEqual(queries(), few)
+        self.assertEqual(Digest.objects.count(), 21)
+
+    def test_notification_feed(self):
+        """✅ Unread filter, marking one read, and marking all read"""
+        self.run_all()
+        self.client.force_authenticate(self.alice)
+        response = self.client.get("/api/notifications/?unread=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["digest"]["overdue_tasks"], 1)
+        pk = response.data[0]["id"]
+
+        self.assertIsNotNone(self.client.patch(f"/api/notifications/{pk}/", {"read": True}, format="json").data["read_at"])
+        self.assertEqual(self.client.get("/api/notifications/?unread=1").data, [])
+        self.client.patch(f"/api/notifications/{pk}/", {"read": False}, format="json")
+        self.assertEqual(self.client.post("/api/notifications/read-all/").data, {"marked": 1})
+
+        self.client.force_authenticate(self.bob)
+        self.assertEqual(self.client.get(f"/api/notifications/{pk}/").status_code, 404)
+
+    def test_command(self):
+        """✅ send_digests for a given day"""
+        out = StringIO()
+        call_command("send_digests", "--date", self.today.isoformat(), stdout=out)
+        self.assertIn("Wrote 1 digests for 2 users", out.getvalue())
+
+
+class TestUpdatesRetention(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="inbox", email="inbox@example.com", password="TestPass123!")
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        Update.objects.bulk_create([
+            Update(user=self.user, title=f"Mail {i}", sender="hr@acme.com" if i % 2 else "news@example.com",
+                   received_at=now - datetime.timedelta(days=i * 10), type="meeting" if i % 3 == 0 else "email")
+            for i in range(12)
+        ])
+
+    def test_updates_are_cursor_paginated(self):
+        """✅ Pages walk newest to oldest without repeats"""
+        seen, url = [], "/api/updates/?page_size=5&fields=id,title"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [row["title"] for row in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(seen, [f"Mail {i}" for i in range(12)])
+        filtered = self.client.get("/api/updates/?type=meeting&q=acme")
+        self.assertEqual([row["title"] for row in filtered.data["results"]], ["Mail 3", "Mail 9"])
+
+    def test_retention_moves_old_updates_in_batches(self):
+        """✅ Old updates move to the archive batch by batch and stay searchable"""
+        old_ids = set(Update.objects.filter(title__in=[f"Mail {i}" for i in range(10, 12)] + ["Mail 9"])
+                      .values_list("id", flat=True))
+        progress = list(retention.archive_updates(days=85, batch_size=2))
+        self.assertEqual(progress, [2, 3])
+        self.assertEqual(Update.objects.count(), 9)
+        self.assertEqual(set(ArchivedUpdate.objects.values_list("id", flat=True)), old_ids)
+        self.assertEqual(list(retention.archive_updates(days=85)), [])  # nothing left to move
+
+        response = self.client.get("/api/updates/archive/?q=acme")
+        self.assertEqual([row["title"] for row in response.data["results"]], ["Mail 9", "Mail 11"])
+        self.assertEqual(len(self.client.get("/api/updates/").data["results"]), 9)
+
+        other = User.objects.create_user(username="other", email="other@example.com", password="TestPass123!")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get("/api/updates/archive/").data["results"], [])
+
+    def test_archive_command(self):
+        """✅ The retention command reports what it moved"""
+        out = StringIO()
+        call_command("archive_updates", "--days", "85", "--dry-run", stdout=out)
+        self.assertIn("3 updates", out.getvalue())
+        call_command("archive_updates", "--days", "85", stdout=out)
+        self.assertIn("Archived 3 updates", out.getvalue())
+        self.assertEqual(ArchivedUpdate.objects.count(), 3)
+
+
+class TestSoftDeletion(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="quitter", email="quitter@example.com", password="TestPass123!")
+        self.client.force_authenticate(self.user)
+        self.job = Job.objects.create(user=self.user, name="Old gig", company="Acme")
+        self.other_job = Job.objects.create(user=self.user, name="Current", company="Globex")
+        for job in (self.job, self.other_job):
+            for i in range(5):
+                task = Task.objects.create(user=self.user, job=job, title=f"{job.name} {i}")
+                WorkSession.objects.create(task=task, start_time=timezone.now(), duration=1000)
+            Meeting.objects.create(user=self.user, job=job, title=f"{job.name} sync",
+                                   meeting_date=timezone.now().date(), meeting_time=datetime.time(10))
+
+    def test_deleting_a_job_hides_it_at_once(self):
+        """✅ DELETE returns 202 and hides the job, its tasks and meetings before the purge"""
+        response = self.client.delete(f"/api/jobs/{self.job.id}/")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], "pending")
+        self.assertEqual(response.data["remaining"]["tasks"], 5)
+
+        self.assertEqual([j["id"] for j in self.client.get("/api/jobs/").data], [self.other_job.id])
+        self.assertEqual(len(self.client.get("/api/tasks/").data), 5)
+        self.assertEqual([m["title"] for m in self.client.get("/api/meetings/").data], ["Current sync"])
+        self.assertEqual(self.client.get(f"/api/jobs/{self.job.id}/").status_code, 404)
+        self.assertEqual(Task.objects.filter(job=self.job).count(), 5)  # not deleted yet
+
+    def test_purge_runs_in_batches_with_progress(self):
+        """✅ The purger removes dependent rows batch by batch and records progress"""
+        job_purge = Purge.objects.get(id=self.client.delete(f"/api/jobs/{self.job.id}/").data["id"])
+        purge.run(job_purge, size=2)
+
+        job_purge.refresh_from_db()
+        self.assertEqual(job_purge.status, "done")
+        self.assertEqual(job_purge.deleted, {"work_sessions": 5, "tasks": 5, "meetings": 1, "jobs": 1})
+        self.assertFalse(Job.objects.filter(id=self.job.id).exists())
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(WorkSession.objects.filter(task__user=self.user).count(), 5)
+
+        response = self.client.get(f"/api/purges/{job_purge.id}/")
+        self.assertEqual(response.data["status"], "done")
+        self.assertEqual(response.data["remaining"], {})
+
+    def test_account_deletion(self):
+        """✅ Deleting the account signs out at once; the purge removes every row"""
+        token = Token.objects.create(user=self.user)
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        response = self.client.delete("/api/profile/")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.client.get("/api/jobs/").status_code, 401)
+        self.client.credentials()
+        login = self.client.post("/api/login/", {"username": "quitter", "password": "TestPass123!"}, format="json")
+        self.assertEqual(login.status_code, 400)
+
+        out = StringIO()
+        call_command("purge_deleted", "--batch-size", "3", stdout=out)
+        self.assertIn("removed", out.getvalue())
+        self.assertFalse(User.objects.filter(username="quitter").exists())
+        self.assertFalse(Task.objects.exists())
+        account_purge = Purge.objects.get(id=response.data["id"])
+        self.assertEqual(account_purge.status, "done")
+        self.assertIsNone(account_purge.requested_by)
+        self.assertEqual(account_purge.deleted["tasks"], 10)
+
+    def test_other_users_cannot_see_purges(self):
+        """❌ Purge progress is private"""
+        purge_id = self.client.delete(f"/api/jobs/{self.job.id}/").data["id"]
+        other = User.objects.create_user(username="nosy2", email="nosy2@example.com", password="TestPass123!")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f"/api/purges/{purge_id}/").status_code, 404)
+        self.assertEqual(self.client.get("/api/purges/").data, [])
+
+
+class TestFractionalOrdering(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="sorter", email="sorter@example.com", password="TestPass123!")
+        self.client.force_authenticate(self.user)
+        self.cards = [Task.objects.create(user=self.user, title=f"Card {i}") for i in range(4)]
+
+    def titles(self, status="todo"):
+        return [t["title"] for t in self.client.get("/api/tasks/").data if t["status"] == status]
+
+    def test_keys_always_fit_between(self):
+        """✅ There is always a key between two neighbours, and respacing keeps the order short"""
+        keys = [ordering.key_between()]
+        for i in range(500):
+            index = (i * 7) % (len(keys) + 1)
+            before = keys[index - 1] if index else None
+            after = keys[index] if index < len(keys) else None
+            keys.insert(index, ordering.key_between(before, after))
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), len(keys))
+        spaced = ordering.spread(len(keys))
+        self.assertEqual(spaced, sorted(spaced))
+        self.assertLessEqual(max(map(len, spaced)), 2)
+        with self.assertRaises(ValueError):
+            ordering.key_between("b", "a")
+
+    def test_keys_stay_short_at_the_ends(self):
+        """✅ Adding to either end of a list grows keys slowly, and a list is respaced before they get too long"""
+        appended, prepended = [ordering.key_between()], [ordering.key_between()]
+        for _ in range(200):
+            appended.append(ordering.key_between(appended[-1]))
+            prepended.insert(0, ordering.key_between(None, prepended[0]))
+        for keys in (appended, prepended):
+            self.assertEqual(keys, sorted(set(keys)))
+            self.assertLessEqual(max(map(len, keys)), 4)
+
+        with self.settings(POSITION_REBALANCE_LENGTH=2):
+            for i in range(150):
+                Task.objects.create(user=self.user, title=f"Extra {i}")
+            self.client.post(f"/api/tasks/{self.cards[0].id}/move/", {}, format="json")
+        positions = list(Task.objects.filter(status="todo").order_by("position").values_list("position", flat=True))
+        self.assertLessEqual(max(map(len, positions)), 2)
+        self.assertEqual(self.titles()[-2:], ["Extra 149", "Card 0"])
+
+    def test_move_writes_one_row(self):
+        """✅ Moving a card between neighbours updates only that card"""
+        first, second, third, fourth = self.cards
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f"/api/tasks/{fourth.id}/move/", {"after": first.id}, format="json")
+        self.assertEqual(response.status_code, 200)
+        writes = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(self.titles(), ["Card 0", "Card 3", "Card 1", "Card 2"])
+
+        self.client.post(f"/api/tasks/{first.id}/move/", {"before": None, "after": None}, format="json")
+        self.assertEqual(self.titles(), ["Card 3", "Card 1", "Card 2", "Card 0"])
+
+    def test_move_to_another_column(self):
+        """✅ A card can change column and position in one call"""
+        Task.objects.create(user=self.user, title="Shipped", status="done")
+        response = self.client.post(
+            f"/api/tasks/{self.cards[1].id}/move/", {"status": "done", "before": Task.objects.get(title="Shipped").id},
+            format="json",
+        )
+        self.assertEqual(response.data["status"], "done")
+        self.assertEqual(self.titles("done"), ["Card 1", "Shipped"])
+        bad = self.client.post(f"/api/tasks/{self.cards[0].id}/move/", {"after": self.cards[2].id, "status": "done"},
+                               format="json")
+        self.assertEqual(bad.status_code, 400)  # card 2 isn't in the done column
+
+    def test_purged_jobs_cards_are_not_neighbours(self):
+        """❌ Cards of a deleted job (hidden while it's purged) can't be moved next to"""
+        job = Job.objects.create(user=self.user, name="Old", company="Gone", deleted_at=timezone.now())
+        hidden = Task.objects.create(user=self.user, job=job, title="Hidden")
+        response = self.client.post(f"/api/tasks/{self.cards[0].id}/move/", {"after": hidden.id}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_colliding_keys_are_respaced(self):
+        """✅ Duplicate keys from concurrent moves get respaced instead of failing"""
+        Task.objects.filter(id__in=[self.cards[0].id, self.cards[1].id]).update(position="V")
+        response = self.client.post(f"/api/tasks/{self.cards[3].id}/move/",
+                                    {"after": self.cards[0].id, "before": self.cards[1].id}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.titles(), ["Card 0", "Card 3", "Card 1", "Card 2"])
+
+    def test_rebalance_command_shortens_keys(self):
+        """✅ The rebalancer rewrites only lists with long keys"""
+        note = StickyNote.objects.create(user=self.user, content="first")
+        StickyNote.objects.create(user=self.user, content="second")
+        for _ in range(20):
+            self.client.post(f"/api/tasks/{self.cards[1].id}/move/", {"before": self.cards[2].id}, format="json")
+            self.client.post(f"/api/tasks/{self.cards[2].id}/move/", {"before": self.cards[1].id}, format="json")
+        self.assertGreater(max(len(t.position) for t in Task.objects.all()), 4)
+        order = self.titles()
+
+        out = StringIO()
+        call_command("rebalance_positions", "--length", "4", stdout=out)
+        self.assertIn("cards: rebalanced 1 lists", out.getvalue())
+        self.assertIn("notes: rebalanced 0 lists", out.getvalue())
+        self.assertEqual(self.titles(), order)
+        self.assertLessEqual(max(len(t.position) for t in Task.objects.all()), 1)
+        self.assertEqual(StickyNote.objects.get(id=note.id).position, "V")
+
+
+class TestStickyNoteEdits(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="writer", email="writer@example.com", password="TestPass123!")
+        self.client.force_authenticate(self.user)
+        self.note = StickyNote.objects.create(user=self.user, content="Call Acme about the offer")
+
+    def edit(self, revision, ops, note=None):
+        return self.client.post(f"/api/sticky-notes/{(note or self.note).pk}/edits/",
+                                {"revision": revision, "ops": ops}, format="json")
+
+    def test_applies_splices_against_revision(self):
+        """✅ Splices apply in order, bump the revision and write only content, revision and updated_at"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.edit(0, [[5, 4, "Initech"], [0, 4, "Email"]])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["revision"], response.data["length"]), (1, 29))
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.content, "Email Initech about the offer")
+        self.assertEqual(self.note.revision, 1)
+        [update] = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertNotIn('"color"', update)
+        self.assertNotIn('"position"', update)
+        self.assertEqual(self.edit(1, [[29, 0, "!"]]).data["revision"], 2)
+
+    def test_offsets_are_utf16_code_units(self):
+        """✅ An emoji counts as two, as in JavaScript strings"""
+        StickyNote.objects.filter(pk=self.note.pk).update(content="a\U0001F600b")
+        self.assertEqual(self.edit(0, [[3, 0, "X"]]).data["length"], 5)
+        self.assertEqual(StickyNote.objects.get(pk=self.note.pk).content, "a\U0001F600Xb")
+        self.assertEqual(self.edit(1, [[2, 1, ""]]).status_code, 400)  # half of the pair
+
+    def test_stale_revision_conflicts(self):
+        """❌ An edit against an old revision gets 409 with the current text; nothing is written"""
+        self.edit(0, [[0, 0, "Today: "]])
+        response = self.edit(0, [[0, 4, "Text"]])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["revision"], 1)
+        self.assertEqual(response.data["content"], "Today: Call Acme about the offer")
+        self.assertEqual(StickyNote.objects.get(pk=self.note.pk).revision, 1)
+
+    def test_full_update_moves_revision(self):
+        """✅ A whole-content PATCH bumps the revision; a colour change doesn't"""
+        self.client.patch(f"/api/sticky-notes/{self.note.pk}/", {"color": "#DBEAFE"}, format="json")
+        response = self.client.patch(f"/api/sticky-notes/{self.note.pk}/", {"content": "New"}, format="json")
+        self.assertEqual(response.data["revision"], 1)
+        self.assertEqual(self.edit(0, [[0, 0, "x"]]).status_code, 409)
+
+    def test_full_update_keeps_concurrent_edits(self):
+        """✅ A PATCH of a note loaded before a delta edit doesn't undo it or its revision"""
+        stale = StickyNote.objects.get(pk=self.note.pk)
+        self.edit(0, [[0, 0, "Today: "]])
+
+        serializer = StickyNoteSerializer(stale, data={"color": "#DBEAFE"}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+        self.note.refresh_from_db()
+        self.assertEqual((self.note.content, self.note.revision, self.note.color),
+                         ("Today: Call Acme about the offer", 1, "#DBEAFE"))
+
+        serializer = StickyNoteSerializer(stale, data={"content": "New"}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.save().revision, 2)
+        self.assertEqual(self.edit(1, [[0, 0, "x"]]).status_code, 409)
+
+    def test_noop_edit_keeps_revision(self):
+        """✅ Edits that change nothing write nothing"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.edit(0, [[0, 4, "Call"]])
+        self.assertEqual(response.data["revision"], 0)
+        self.assertFalse([q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")])
+
+    def test_rejects_bad_edits(self):
+        """❌ Malformed ops, splices past the end, missing revision, other users' notes"""
+        self.assertEqual(self.edit(0, [[0, 0]]).status_code, 400)
+        self.assertEqual(self.edit(0, [[-1, 0, "x"]]).status_code, 400)
+        self.assertEqual(self.edit(0, []).status_code, 400)
+        self.assertEqual(self.edit(0, [[20, 10, ""]]).status_code, 400)
+        self.assertEqual(self.edit("0", [[0, 0, "x"]]).status_code, 400)
+        other = User.objects.create_user(username="other", email="other@example.com", password="TestPass123!")
+        theirs = StickyNote.objects.create(user=other, content="private")
+        self.assertEqual(self.edit(0, [[0, 0, "x"]], note=theirs).status_code, 404)
+
+    def test_edit_refreshes_dashboard(self):
+        """✅ Delta saves bypass post_save but still invalidate the dashboard snapshot"""
+        before = dashboard.version(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.edit(0, [[0, 0, "x"]])
+        self.assertNotEqual(dashboard.version(self.user.id), before)
+
+
+class TestMeetingRecurrence(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="recurring", email="recurring@example.com", password="TestPass123!"
+        )
+        self.client.force_authenticate(self.user)
+        self.monday = datetime.date(2025, 1, 6)
+
+    def test_weekly_rule_with_exceptions(self):
+        """✅ BYDAY expands within the window and skips exception dates"""
+        days = recurrence.expand(
+            "FREQ=WEEKLY;BYDAY=MO,WE", self.monday,
+            self.monday, self.monday + datetime.timedelta(days=13),
+            frozenset({self.monday + datetime.timedelta(days=2)}),
+        )
+        self.assertEqual([d.day for d in days], [6, 13, 15])
+
+    def test_count_and_until_bound_the_series(self):
+        """✅ COUNT and UNTIL stop the series"""
+        far = self.monday + datetime.timedelta(days=365)
+        self.assertEqual(len(recurrence.expand("FREQ=DAILY;COUNT=3", self.monday, self.monday, far)), 3)
+        self.assertEqual(
+            recurrence.last_occurrence("FREQ=WEEKLY;UNTIL=20250120", self.monday), datetime.date(2025, 1, 20)
+        )
+
+    def test_skip_ahead_matches_full_expansion(self):
+        """✅ Jumping to a distant window gives the same dates as walking there"""
+        rule = "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,TH"
+        start = self.monday + datetime.timedelta(days=400)
+        end = start + datetime.timedelta(days=30)
+        full = [d for d in recurrence.expand(rule, self.monday, self.monday, end) if d >= start]
+        self.assertEqual(list(recurrence.expand(rule, self.monday, start, end)), full)
+
+    def test_invalid_rule_rejected(self):
+        """❌ Unknown frequencies are rejected by the API"""
+        response = self.client.post(reverse("meeting-list"), {
+            "title": "Standup", "meeting_date": "2025-01-06", "meeting_time": "09:30",
+            "recurrence_rule": "FREQ=HOURLY",
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cleared_rule_is_stored_blank(self):
+        """✅ A null or empty rule is stored as '' (the column is never NULL)"""
+        response = self.client.post(reverse("meeting-list"), {
+            "title": "Standup", "meeting_date": "2025-01-06", "meeting_time": "09:30",
+            "recurrence_rule": None,
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Meeting.objects.get(id=response.data["id"]).recurrence_rule, "")
+
+    def test_list_expands_occurrences_in_window(self):
+        """✅ One stored series lists as one entry per occurrence"""
+        Meeting.objects.create(
+            user=self.user, title="Standup", meeting_date=self.monday - datetime.timedelta(days=30),
+            meeting_time=datetime.time(9, 30), recurrence_rule="FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+            recurrence_exceptions=[(self.monday + datetime.timedelta(days=1)).isoformat()],
+        )
+        response = self.client.get(reverse("meeting-list"), {
+            "start": self.monday.isoformat(), "end": (self.monday + datetime.timedelta(days=6)).isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([m["meeting_date"] for m in response.data],
+                         ["2025-01-06", "2025-01-08", "2025-01-09", "2025-01-10"])
+        self.assertEqual(Meeting.objects.count(), 1)
+
+
+class TestSparseFieldsets(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="sparse", email="sparse@example.com", password="TestPass123!"
+        )
+        self.client.force_authenticate(self.user)
+        job = Job.objects.create(user=self.user, name="Engineer", company="Acme")
+        Task.objects.bulk_create([
+            Task(user=self.user, job=job, title=f"Task {i}", description="lorem ipsum " * 50) for i in range(40)
+        ])
+
+    def test_fields_narrow_output_and_columns(self):
+        """✅ ?fields= returns and loads only the requested columns"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/tasks/?fields=id,title,job_name")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data[0]), {"id", "title", "job_name"})
+        self.assertEqual(response.data[0]["job_name"], "Engineer")
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertNotIn("description", sql)
+        self.assertEqual(len(queries), 1)  # job joined, not fetched per task
+
+    def test_exclude_and_unknown_fields(self):
+        """✅ ?exclude= drops fields; ❌ unknown names are rejected"""
+        response = self.client.get("/api/tasks/?exclude=description,job_color")
+        self.assertNotIn("description", response.data[0])
+        self.assertIn("status", response.data[0])
+        self.assertEqual(self.client.get("/api/tasks/?fields=id,nope").status_code, 400)
+
+    def test_writes_ignore_sparse_fields(self):
+        """✅ Creating with ?fields= still returns the whole object"""
+        response = self.client.post("/api/tasks/?fields=id", {"title": "New"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("priority", response.data)
+
+    def test_recurring_meetings_with_sparse_fields(self):
+        """✅ Series still expand and sort when their dates aren't requested"""
+        today = timezone.now().date()
+        Meeting.objects.create(user=self.user, title="Standup", meeting_date=today,
+                               meeting_time=datetime.time(9), recurrence_rule="FREQ=DAILY;COUNT=3")
+        Meeting.objects.create(user=self.user, title="Review", meeting_date=today, meeting_time=datetime.time(8))
+        response = self.client.get("/api/meetings/?fields=title")
+        self.assertEqual([m["title"] for m in response.data], ["Review", "Standup", "Standup", "Standup"])
+        self.assertEqual(set(response.data[1]), {"title", "occurrence_of"})
+
+    def test_large_responses_are_compressed(self):
+        """✅ Big JSON is gzipped for clients that accept it, small JSON isn't"""
+        with self.settings(RESPONSE_COMPRESSION_MIN_BYTES=1024):
+            response = self.client.get("/api/tasks/", HTTP_ACCEPT_ENCODING="gzip")
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            self.assertIn("Accept-Encoding", response["Vary"])
+            self.assertEqual(len(json.loads(gzip.decompress(response.content))), 40)
+
+            self.assertFalse(self.client.get("/api/tasks/").has_header("Content-Encoding"))
+            Task.objects.exclude(pk=Task.objects.first().pk).delete()
+            self.assertFalse(
+                self.client.get("/api/tasks/?fields=id", HTTP_ACCEPT_ENCODING="gzip").has_header("Content-Encoding")
+            )
+
+    def test_compression_stays_async_under_asgi(self):
+        """✅ Wrapping a coroutine view keeps the middleware a coroutine, and it still compresses"""
+        async def view(request):
+            return HttpResponse(json.dumps([{"title": "Task"}] * 200), content_type="application/json")
+
+        compressing = middleware.CompressionMiddleware(view)
+        self.assertTrue(iscoroutinefunction(compressing))
+        response = async_to_sync(compressing)(AsyncRequestFactory().get("/api/tasks/", headers={"accept-encoding": "gzip"}))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 200)
+
+
+class TestCalendarFeed(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="calendar", email="calendar@example.com", password="TestPass123!"
+        )
+        self.client.force_authenticate(self.user)
+        Meeting.objects.create(
+            user=self.user, title="Weekly sync, team", meeting_date=datetime.date(2025, 1, 6),
+            meeting_time=datetime.time(10, 0), recurrence_rule="FREQ=WEEKLY",
+        )
+        Task.objects.create(user=self.user, title="Ship report", deadline=datetime.date(2025, 1, 8))
+        self.feed_url = self.client.post(reverse("calendar-token")).data["url"]
+        self.client.force_authenticate(None)
+
+    def get_feed(self, **headers):
+        return self.client.get(self.feed_url, **headers)
+
+    def test_feed_streams_meetings_and_deadlines(self):
+        """✅ Feed is a streamed calendar with meetings and task deadlines"""
+        response = self.get_feed()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        body = b"".join(response.streaming_content).decode()
+        self.assertTrue(body.startswith("BEGIN:VCALENDAR\r\n"))
+        self.assertIn("SUMMARY:Weekly sync\\, team\r\n", body)
+        self.assertIn("RRULE:FREQ=WEEKLY\r\n", body)
+        self.assertIn("DTSTART;VALUE=DATE:20250108\r\n", body)
+
+    def test_unchanged_feed_returns_304(self):
+        """✅ Polling with the ETag is a cheap 304 until something changes"""
+        etag = self.get_feed()["ETag"]
+        self.assertEqual(self.get_feed(HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Task.objects.filter(user=self.user).delete()
+        self.assertEqual(self.get_feed(HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_unknown_token_is_404(self):
+        """❌ Feeds need a valid token"""
+        response = self.client.get(reverse("calendar-feed", args=["nope"]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_long_lines_are_folded(self):
+        """✅ Content lines are folded at 75 octets"""
+        folded = ical.fold("DESCRIPTION:" + "é" * 80)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in folded.split("\r\n")))
+        self.assertEqual(folded.replace("\r\n ", ""), "DESCRIPTION:" + "é" * 80 + "\r\n")
+
+
+class TestDatasetExportImport(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="exporter", email="exporter@example.com", password="TestPass123!"
+        )
+        job = Job.objects.create(user=self.user, name="Dev", company="Acme")
+        task = Task.objects.create(user=self.user, job=job, title="Build", priority="high")
+        WorkSession.objects.create(task=task, start_time=timezone.now(), duration=1000)
+        Meeting.objects.create(
+            user=self.user, job=job, title="Standup", meeting_date=datetime.date(2025, 1, 6),
+            meeting_time=datetime.time(9, 0), recurrence_rule="FREQ=DAILY;COUNT=5",
+        )
+        StickyNote.objects.create(user=self.user, content="remember")
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        response = self.client.get(reverse("export-data"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b"".join(response.streaming_content)
+
+    def test_roundtrip_remaps_foreign_keys(self):
+        """✅ Importing an export recreates every row with remapped ids"""
+        dump = self.export()
+        other = User.objects.create_user(username="importer", email="importer@example.com", password="TestPass123!")
+        self.client.force_authenticate(other)
+
+        response = self.client.generic("POST", reverse("import-data"), dump, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"]["work_sessions"], 1)
+
+        task = Task.objects.get(user=other)
+        self.assertEqual(task.job.user, other)
+        self.assertEqual(task.work_sessions.count(), 1)
+        meeting = Meeting.objects.get(user=other)
+        self.assertEqual(meeting.job, task.job)
+        self.assertEqual(meeting.recurrence_end, datetime.date(2025, 1, 10))
+
+    def test_restore_into_same_account(self):
+        """✅ Re-importing an export into the account it came from skips mail that's already there"""
+        Update.objects.create(user=self.user, title="Offer", imap_uid=5, imap_uidvalidity=1)
+        Update.objects.create(user=self.user, title="Note to self")
+        dump = self.export(resource="updates")
+
+        response = self.client.generic("POST", reverse("import-data"), dump, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"]["updates"], 1)
+        self.assertEqual(Update.objects.filter(user=self.user, imap_uid=5).count(), 1)
+        self.assertEqual(Update.objects.filter(user=self.user, title="Note to self").count(), 2)
+
+    def test_deleted_jobs_are_not_exported(self):
+        """❌ A job awaiting purge and its rows stay out of the export, and imports never soft-delete"""
+        job = Job.objects.create(user=self.user, name="Old", company="Gone", deleted_at=timezone.now())
+        task = Task.objects.create(user=self.user, job=job, title="Hidden")
+        WorkSession.objects.create(task=task, start_time=timezone.now(), duration=60)
+        Meeting.objects.create(user=self.user, job=job, title="Hidden call",
+                               meeting_date=datetime.date(2025, 1, 7), meeting_time=datetime.time(10, 0))
+        dump = self.export().decode()
+        self.assertNotIn("Gone", dump)
+        self.assertNotIn("Hidden", dump)
+
+        lines = [
+            '{"resource": "jobs", "id": 1, "name": "Old", "company": "Gone", "deleted_at": "2025-01-01T00:00:00Z"}',
+        ]
+        response = self.client.generic("POST", reverse("import-data"), "\n".join(lines), content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(Job.objects.filter(user=self.user, company="Gone").latest("id").deleted_at)
+
+    def test_invalid_record_rolls_back(self):
+        """❌ A bad record rejects the whole import with its line number"""
+        lines = [
+            '{"resource": "jobs", "id": 1, "name": "Dev", "company": "Acme"}',
+            '{"resource": "tasks", "id": 1, "job_id": 1, "title": "x", "priority": "urgent"}',
+        ]
+        response = self.client.generic("POST", reverse("import-data"), "\n".join(lines), content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("line 2", response.data["detail"])
+        self.assertEqual(Job.objects.filter(user=self.user).count(), 1)
+
+    def test_csv_export_for_one_resource(self):
+        """✅ CSV export streams a header and one row per record"""
+        rows = self.export(output="csv", resource="tasks").decode().splitlines()
+        self.assertTrue(rows[0].startswith("id,job_id,title"))
+        self.assertEqual(len(rows), 2)
+
+
+class TestMailboxIngestion(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="ingester", email="ingester@example.com", password="TestPass123!"
+        )
+        company_resolver.cache.clear()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def write_mbox(self, subjects):
+        path = os.path.join(self.tmpdir, "archive.mbox")
+        box = mailbox.mbox(path)
+        for subject in subjects:
+            msg = EmailMessage()
+            msg["Subject"] = subject
+            msg["From"] = "Boss <boss@acme.com>"
+            msg["Date"] = "Mon, 06 Jan 2025 09:00:00 +0000"
+            msg.set_content("body")
+            box.add(msg)
+        box.flush()
+        box.close()
+        return path
+
+    def test_heuristic_classification(self):
+        """✅ Keyword fallback picks meeting/task/email"""
+        self.assertEqual(ingestion.heuristic_parse("Zoom call tomorrow", "a@b.com")["type"], "meeting")
+        self.assertEqual(ingestion.heuristic_parse("Action items", "a@b.com")["type"], "task")
+        self.assertEqual(ingestion.heuristic_parse("Project news", "a@b.com")["company_name"], "B")
+
+    def test_ingest_mbox_command(self):
+        """✅ Relevant messages become Updates, meetings become Meetings"""
+        path = self.write_mbox([
+            "Project meeting 01/10/2025 10:00 AM", "Lunch?", "Todo: review the proposal",
+        ])
+        out = StringIO()
+        call_command("ingest_mailbox", "ingester", path, "--no-llm", "--workers", "1", stdout=out)
+
+        self.assertEqual(Update.objects.filter(user=self.user).count(), 2)
+        meeting = Meeting.objects.get(user=self.user)
+        self.assertEqual(meeting.meeting_date, datetime.date(2025, 1, 10))
+        self.assertEqual(meeting.job.company, "Acme")
+        self.assertIn("Done: 2 updates, 1 meetings from 3 messages", out.getvalue())
+
+
+class TestAsyncIMAPIngestion(APITestCase):
+    def setUp(self):
+        company_resolver.cache.clear()
+        self.users = [
+            User.objects.create_user(
+                username=f"poller{i}", email=f"poller{i}@example.com", password="TestPass123!", app_password="password"
+            )
+            for i in range(4)
+        ]
+        self.server = FakeIMAPServer(latency=0.01).populate([u.email for u in self.users[:3]], 8).start()
+        self.addCleanup(self.server.stop)
+
+    def test_sequence_set(self):
+        """✅ Message numbers are sent as compact ranges"""
+        self.assertEqual(sequence_set([7, 1, 2, 3, 9, 10]), "1:3,7,9:10")
+
+    def test_polls_mailboxes_concurrently_within_host_limit(self):
+        """✅ Every mailbox is ingested; connections per host stay capped; bad logins are reported"""
+        out, err = StringIO(), StringIO()
+        call_command(
+            "ingest_imap", "--host", "127.0.0.1", "--port", str(self.server.port), "--no-ssl",
+            "--no-llm", "--per-host", "2", stdout=out, stderr=err,
+        )
+        self.assertIn("Done: 3/4 mailboxes, 24 messages", out.getvalue())
+        self.assertIn("poller3: authentication failed", err.getvalue())
+        self.assertLessEqual(self.server.max_active, 2)
+        for user in self.users[:3]:
+            self.assertEqual(Update.objects.filter(user=user).count(), 5)
+        self.assertFalse(Update.objects.filter(user=self.users[3]).exists())
+
+
+class TestBodySnippets(APITestCase):
+    def setUp(self):
+        company_resolver.cache.clear()
+        self.user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="TestPass123!", app_password="password"
+        )
+        self.server = FakeIMAPServer().populate([self.user.email], 9).start()
+        self.addCleanup(self.server.stop)
+        self.client.force_authenticate(user=self.user)
+
+    def test_bodystructure_picks_inline_text(self):
+        """✅ Plain text preferred, HTML next, attachments never"""
+        structure = mail_body.parse_sexp(
+            b'(("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "QUOTED-PRINTABLE" 141 2 NIL NIL NIL NIL)'
+            b'("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "BASE64" 900 12 NIL ("ATTACHMENT" ("FILENAME" "a.txt")) NIL NIL)'
+            b' "MIXED" ("BOUNDARY" "x") NIL NIL)'
+        )[0]
+        self.assertEqual(mail_body.choose_text_part(structure), ("1", "html", "quoted-printable", "utf-8"))
+        # Partial fetches can cut encodings mid-sequence
+        self.assertEqual(mail_body.decode_part(b"Caf=C3=A9 at 3pm=", "plain", "quoted-printable", "utf-8"), "Caf\u00e9 at 3pm")
+        self.assertEqual(mail_body.decode_part(b"<p>Hi&amp;bye</p><p>See y", "html", "7bit", "utf-8"), "Hi&bye\nSee y")
+
+    def test_snippets_classify_vague_subjects(self):
+        """✅ A meeting only the body talks about is still a meeting"""
+        parsed = ingestion.heuristic_parse("Quick question", "a@b.com", snippet="Can we do a Zoom call on Oct 21 at 3pm?")
+        self.assertEqual(parsed["type"], "meeting")
+
+    def test_ingestion_stores_snippets_without_attachments(self):
+        """✅ Snippets are saved; attachment bytes never cross the wire"""
+        out = StringIO()
+        call_command("ingest_imap", "--host", "127.0.0.1", "--port", str(self.server.port), "--no-ssl", "--no-llm", stdout=out)
+        updates = Update.objects.filter(user=self.user)
+        self.assertTrue(updates.exists())
+        self.assertTrue(all(u.snippet and u.imap_uid for u in updates))
+        self.assertTrue(any("Thanks" in u.snippet for u in updates))
+
+        mailbox_bytes = sum(len(raw) for raw in self.server.mailboxes[self.user.email])
+        self.assertLess(self.server.bytes_sent, mailbox_bytes / 20)
+
+    def test_full_body_is_fetched_once(self):
+        """✅ The full body endpoint caches what it fetched"""
+        call_command("ingest_imap", "--host", "127.0.0.1", "--port", str(self.server.port), "--no-ssl", "--no-llm", stdout=StringIO())
+        update = Update.objects.filter(user=self.user).first()
+        with self.settings(IMAP_HOST="127.0.0.1", IMAP_PORT=self.server.port, IMAP_SSL=False):
+            first = self.client.get(f"/api/updates/{update.id}/body/")
+            second = self.client.get(f"/api/updates/{update.id}/body/")
+        self.assertEqual(first.status_code, 200)
+        self.assertFalse(first.data["cached"])
+        self.assertTrue(second.data["cached"])
+        self.assertEqual(first.data["body"], second.data["body"])
+        self.assertTrue(first.data["body"].startswith(update.snippet[:20]))
+
+    def test_full_body_requires_mailbox_reference(self):
+        """❌ Updates without a UID (or of other users) have no body"""
+        update = Update.objects.create(user=self.user, title="Manual", type="email")
+        self.assertEqual(self.client.get(f"/api/updates/{update.id}/body/").status_code, 404)
+        other = User.objects.create_user(username="nosy", email="nosy@example.com", password="TestPass123!")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(f"/api/updates/{update.id}/body/").status_code, 404)
+
+
+class TestThrottling(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="clicker", email="clicker@example.com", password="TestPass123!", app_password="secret"
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_token_bucket_bursts_then_refills(self):
+        """✅ A full bucket allows a burst, then one request per refill"""
+        with self.settings(THROTTLE_BUCKETS={"test": {"capacity": 2, "per_minute": 60}}):
+            self.assertEqual(throttling.take("test", 1, now=100.0), 0)
+            self.assertEqual(throttling.take("test", 1, now=100.0), 0)
+            self.assertAlmostEqual(throttling.take("test", 1, now=100.0), 1.0)
+            self.assertEqual(throttling.take("test", 2, now=100.0), 0)  # buckets are per user
+            self.assertEqual(throttling.take("test", 1, now=101.0), 0)
+
+    def test_throttled_requests_get_retry_after(self):
+        """❌ Emptying the ingestion bucket answers 429 with Retry-After"""
+        with self.settings(THROTTLE_BUCKETS={"ingestion": {"capacity": 1, "per_minute": 2}}), \
+                mock.patch("api.views._fetch_today_emails", return_value=([], 200)):
+            self.assertEqual(self.client.post("/api/emails/fetch-today/").status_code, 200)
+            response = self.client.post("/api/emails/fetch-today/")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+
+    def test_single_flight_coalesces_concurrent_runs(self):
+        """✅ Concurrent callers share one run's result"""
+        runs, results = [], []
+        release = threading.Event()
+
+        def work():
+            runs.append(1)
+            release.wait(2)
+            return {"run": len(runs)}
+
+        threads = [
+            threading.Thread(target=lambda: results.append(throttling.single_flight("k", work, poll=0.01)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(results, [{"run": 1}] * 5)
+
+    def test_overrunning_flight_keeps_the_next_runs_lock(self):
+        """✅ A run that outlasted its lock doesn't release the lock a later run took"""
+        def work():
+            # Our lock expired and another run took it
+            cache.set("singleflight:k", "other@0", 60)
+            return "done"
+
+        self.assertEqual(throttling.single_flight("k", work), "done")
+        self.assertEqual(cache.get("singleflight:k"), "other@0")
+        self.assertEqual(async_to_sync(throttling.asingle_flight)("k2", sync_to_async(work)), "done")
+        self.assertEqual(cache.get("singleflight:k"), "other@0")
+        self.assertIsNone(cache.get("singleflight:k2"))
+
+    def test_busy_ingestion_answers_429(self):
+        """❌ A click that outwaits the running fetch is told when to retry"""
+        cache.set(f"singleflight:fetch-today:{self.user.pk}", f"other@{time.time():.3f}", 60)
+        with self.settings(INGESTION_COALESCE_WAIT_SECONDS=0.2, INGESTION_LOCK_SECONDS=60):
+            response = self.client.post("/api/emails/fetch-today/")
+        self.assertEqual(response.status_code, 429)
+        self.assertLessEqual(int(response["Retry-After"]), 60)
+
+
+class TestAsyncViews(APITestCase):
+    def setUp(self):
+        cache.clear()
+        company_resolver.cache.clear()
+        self.user = User.objects.create_user(
+            username="awaiter", email="awaiter@example.com", password="TestPass123!", app_password="password"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.imap = FakeIMAPServer(latency=0.01).populate([self.user.email], 8).start()
+        self.addCleanup(self.imap.stop)
+        self.gemini = FakeGeminiServer(delay=0.1).start()
+        self.addCleanup(self.gemini.stop)
+        self.factory = AsyncRequestFactory()
+
+    def call(self, view, method, path, token=True):
+        headers = {"authorization": f"Token {self.token.key}"} if token else {}
+        response = async_to_sync(view)(getattr(self.factory, method)(path, headers=headers))
+        return response.status_code, json.loads(response.content)
+
+    def test_fetch_today_classifies_concurrently(self):
+        """✅ The async fetch saves and returns today's updates, with LLM calls in parallel"""
+        client = llm.LLMClient(llm.gemini_rest_backend(self.gemini.base_url, "test-key"), max_concurrency=4)
+        with self.settings(IMAP_HOST="127.0.0.1", IMAP_PORT=self.imap.port, IMAP_SSL=False), \
+                mock.patch.object(llm, "_client", client):
+            code, data = self.call(async_views.fetch_today_emails, "post", "/api/emails/fetch-today/")
+        self.assertEqual(code, 200)
+        self.assertEqual(len(data), 5)
+        self.assertEqual(sorted(u["id"] for u in data), sorted(Update.objects.filter(user=self.user).values_list("id", flat=True)))
+        self.assertEqual(set(data[0]), set(UpdateSerializer(Update.objects.first()).data))
+        self.assertEqual(self.gemini.requests, 5)
+        self.assertGreater(self.gemini.max_in_flight, 1)
+        run = IngestionRun.objects.get(user=self.user)
+        self.assertEqual((run.source, run.status, run.messages, run.updates, run.llm_calls),
+                         ("fetch_today_async", "ok", 8, 5, 5))
+        self.assertEqual([s["stage"] for s in run.spans][:5], ["load_classifier", "connect", "login", "select", "search"])
+
+    def test_fetch_today_reports_bad_login(self):
+        """❌ Wrong app password answers 400 like the sync view"""
+        self.user.app_password = "wrong"
+        self.user.save()
+        with self.settings(IMAP_HOST="127.0.0.1", IMAP_PORT=self.imap.port, IMAP_SSL=False):
+            code, data = self.call(async_views.fetch_today_emails, "post", "/api/emails/fetch-today/")
+        self.assertEqual((code, data), (400, {"detail": "IMAP login failed."}))
+
+    def test_requires_authentication(self):
+        """❌ No token, no data"""
+        code, _ = self.call(async_views.dashboard_view, "get", "/api/dashboard/", token=False)
+        self.assertEqual(code, 401)
+
+    def test_dashboard_matches_sync_view(self):
+        """✅ Both flavours of the dashboard answer the same JSON"""
+        Task.objects.create(user=self.user, title="Ship", deadline=datetime.date(2025, 3, 10))
+        Meeting.objects.create(user=self.user, title="Sync", meeting_date=datetime.date(2025, 3, 11),
+                               meeting_time=datetime.time(9))
+        self.client.force_authenticate(self.user)
+        expected = json.loads(self.client.get("/api/dashboard/?date=2025-03-10").content)
+        cache.clear()
+        code, data = self.call(async_views.dashboard_view, "get", "/api/dashboard/?date=2025-03-10")
+        self.assertEqual(code, 200)
+        self.assertEqual(data, expected)
+
+
+class TestIngestionTracing(APITestCase):
+    def setUp(self):
+        cache.clear()
+        company_resolver.cache.clear()
+        self.user = User.objects.create_user(
+            username="tracer", email="tracer@example.com", password="TestPass123!", app_password="password"
+        )
+        self.client.force_authenticate(self.user)
+        self.imap = FakeIMAPServer().populate([self.user.email], 8).start()
+        self.addCleanup(self.imap.stop)
+        self.gemini = FakeGeminiServer().start()
+        self.addCleanup(self.gemini.stop)
+        client = llm.LLMClient(llm.gemini_rest_backend(self.gemini.base_url, "test-key"))
+        patcher = mock.patch.object(llm, "_client", client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fetch(self):
+        with self.settings(IMAP_HOST="127.0.0.1", IMAP_PORT=self.imap.port, IMAP_SSL=False):
+            return self.client.post("/api/emails/fetch-today/")
+
+    def test_run_records_stages_and_counters(self):
+        """✅ A fetch is saved with per-stage timings, message counts, LLM calls and cache hits"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.fetch().status_code, 200)
+        run = IngestionRun.objects.get()
+        self.assertEqual((run.source, run.status, run.messages, run.updates, run.llm_calls, run.errors),
+                         ("fetch_today", "ok", 8, 5, 5, 0))
+        spans = {span["stage"]: span for span in run.spans}
+        self.assertEqual(list(spans)[:4], ["connect", "login", "select", "search"])
+        self.assertEqual(spans["fetch_headers"]["calls"], 8)
+        self.assertEqual(spans["classify"]["llm_calls"], 5)
+
+        # Sender mappings are cached by now; mail saved by the first fetch isn't saved again
+        self.imap.deliver(self.user.email, 4)
+        self.fetch()
+        run = IngestionRun.objects.latest("id")
+        self.assertGreater(run.cache_hits, 0)
+        self.assertEqual((run.messages, Update.objects.filter(user=self.user).count()), (12, 5 + run.updates))
+
+        # Outside a run, tracing does nothing
+        with tracing.span("classify") as span:
+            tracing.count("llm_calls")
+        self.assertIsNone(span)
+
+    def test_failed_login_is_recorded(self):
+        """❌ A failed run keeps the stage and the error that broke it"""
+        self.user.app_password = "wrong"
+        self.user.save()
+        self.assertEqual(self.fetch().status_code, 400)
+        run = IngestionRun.objects.get()
+        self.assertEqual((run.status, run.errors), ("failed", 1))
+        self.assertIn("error", run.spans[-1])
+        self.assertEqual(run.spans[-1]["stage"], "login")
+        self.assertTrue(run.error)
+
+    def test_runs_endpoint(self):
+        """✅ Users list and filter their own runs; ❌ others' are hidden"""
+        now = timezone.now()
+        fast = IngestionRun.objects.create(user=self.user, source="fetch_today", status="ok", started_at=now, duration_ms=300)
+        slow = IngestionRun.objects.create(user=self.user, source="fetch_today", status="failed", started_at=now,
+                                           duration_ms=9000, spans=[{"stage": "login", "ms": 8900.0, "calls": 1}])
+        other = User.objects.create_user(username="peer", email="peer@example.com", password="TestPass123!")
+        theirs = IngestionRun.objects.create(user=other, source="fetch_today", status="ok", started_at=now, duration_ms=1)
+
+        ids = [run["id"] for run in self.client.get("/api/ingestion/runs/").data["results"]]
+        self.assertEqual(ids, [slow.id, fast.id])
+        self.assertEqual([run["id"] for run in self.client.get("/api/ingestion/runs/?min_ms=5000").data["results"]],
+                         [slow.id])
+        self.assertEqual([run["id"] for run in self.client.get("/api/ingestion/runs/?status=ok").data["results"]],
+                         [fast.id])
+        page = self.client.get("/api/ingestion/runs/?page_size=1").data
+        self.assertEqual([run["id"] for run in page["results"]], [slow.id])
+        self.assertEqual([run["id"] for run in self.client.get(page["next"]).data["results"]], [fast.id])
+        self.assertEqual(self.client.get(f"/api/ingestion/runs/{slow.id}/").data["spans"][0]["stage"], "login")
+        self.assertEqual(self.client.get(f"/api/ingestion/runs/{theirs.id}/").status_code, 404)
+        self.assertEqual(self.client.get("/api/ingestion/runs/?min_ms=soon").status_code, 400)
+
+    def test_failed_save_keeps_the_pipeline_error(self):
+        """❌ If the run can't be saved, the pipeline's own exception still reaches the caller"""
+        async def traced():
+            async with tracing.arun(self.user, "fetch_today"):
+                raise ValueError("mailbox gone")
+
+        with mock.patch.object(tracing.Tracer, "save", side_effect=DatabaseError("locked")), \
+                mock.patch("builtins.print") as printed:
+            with self.assertRaisesMessage(ValueError, "mailbox gone"):
+                with tracing.run(self.user, "fetch_today"):
+                    raise ValueError("mailbox gone")
+            with self.assertRaisesMessage(ValueError, "mailbox gone"):
+                async_to_sync(traced)()
+        self.assertEqual(printed.call_count, 2)
+        self.assertIn("locked", printed.call_args[0][0])
+
+    def test_only_recent_runs_are_kept(self):
+        """✅ Old runs beyond INGESTION_RUNS_PER_USER are dropped"""
+        with self.settings(INGESTION_RUNS_PER_USER=2, THROTTLE_BUCKETS={"ingestion": {"capacity": 10, "per_minute": 1}}):
+            for _ in range(3):
+                self.fetch()
+        self.assertEqual(IngestionRun.objects.filter(user=self.user).count(), 2)
+
+
+class TestMailboxPolling(APITestCase):
+    def setUp(self):
+        company_resolver.cache.clear()
+        self.users = [
+            User.objects.create_user(
+                username=f"daemon{i}", email=f"daemon{i}@example.com", password="TestPass123!", app_password="password"
+            )
+            for i in range(3)
+        ]
+        self.server = FakeIMAPServer().populate([u.email for u in self.users[:2]], 8).start()
+        self.addCleanup(self.server.stop)
+
+    def poll_once(self):
+        call_command(
+            "poll_mailboxes", "--once", "--stagger", "0", "--min-interval", "60", "--no-llm",
+            "--host", "127.0.0.1", "--port", str(self.server.port), "--no-ssl", stdout=StringIO(), stderr=StringIO(),
+        )
+
+    def test_interval_policy(self):
+        """✅ Activity resets the interval, quiet inboxes and failures back off"""
+        no_jitter = mock.Mock(uniform=lambda low, high: (low + high) / 2)
+        result = {"messages": 0, "error": None, "auth_failed": False}
+        interval = lambda previous, **changes: polling.next_interval(  # noqa: E731
+            previous, {**result, **changes}, 60, 1800, 21600, rng=no_jitter
+        )
+        self.assertEqual(interval(600, messages=3), 60)
+        self.assertEqual(interval(600), 900)
+        self.assertEqual(interval(1500), 1800)
+        self.assertEqual(interval(600, error="timeout"), 1200)
+        self.assertEqual(interval(60, error="auth", auth_failed=True), 240)
+        self.assertLess(polling.stagger_offset(self.users[0].id, 60), 60)
+
+    def test_incremental_polls(self):
+        """✅ Later polls only ingest new messages; auth failures back off"""
+        self.poll_once()
+        self.assertEqual(Update.objects.filter(user=self.users[0]).count(), 5)
+
+        self.server.deliver(self.users[0].email, 3)
+        self.poll_once()
+        state = MailboxPollState.objects.get(user=self.users[0])
+        self.assertEqual((state.polls, state.last_uid, state.consecutive_failures), (2, 11, 0))
+        self.assertEqual(Update.objects.filter(user=self.users[0]).count(), 7)
+        self.assertEqual(Update.objects.filter(user=self.users[1]).count(), 5)
+
+        failing = MailboxPollState.objects.get(user=self.users[2])
+        self.assertEqual(failing.consecutive_failures, 2)
+        self.assertIn("authentication failed", failing.last_error)
+        self.assertGreaterEqual(failing.interval_seconds, 60 * 16 * 0.9 * 0.9)
+
+    def test_refetched_messages_are_not_saved_twice(self):
+        """✅ Mail the poller already saved isn't saved again by a fetch that starts over (the fetch-today button)"""
+        self.poll_once()
+        MailboxPollState.objects.all().delete()
+        self.poll_once()
+        self.assertEqual(Update.objects.filter(user=self.users[0]).count(), 5)
+
+        item = Update.objects.filter(user=self.users[0]).values("imap_uid", "imap_uidvalidity").first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Update.objects.create(user=self.users[0], title="Copy", **item)
+
+    def test_unexpected_errors_stay_with_their_user(self):
+        """❌ A failure outside IMAP (here: saving) is reported for that user; the others still get results"""
+        save = ingestion.save_classified_batch
+
+        def failing_save(user, items):
+            if user == self.users[0]:
+                raise RuntimeError("database is locked")
+            return save(user, items)
+
+        with mock.patch("api.async_ingestion.save_classified_batch", side_effect=failing_save):
+            results = async_ingestion.run_ingestion(
+                self.users[:2], server=("127.0.0.1", self.server.port, False), use_llm=False
+            )
+        self.assertEqual([r["error"] for r in results], ["RuntimeError: database is locked", None])
+        self.assertEqual(results[1]["updates"], 5)
+        self.assertFalse(Update.objects.filter(user=self.users[0]).exists())
+
+    def test_polling_status_is_admin_only(self):
+        """❌ Regular users can't see other users' polling state"""
+        self.poll_once()
+        self.client.force_authenticate(user=self.users[0])
+        self.assertEqual(self.client.get("/api/ingestion/polling/").status_code, 403)
+        admin = User.objects.create_superuser(username="root", email="root@example.com", password="TestPass123!")
+        self.client.force_authenticate(user=admin)
+        rows = self.client.get("/api/ingestion/polling/").json()
+        self.assertEqual(sorted(r["user"] for r in rows), ["daemon0", "daemon1", "daemon2"])
+
+
+class TestSenderCompanyResolver(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="resolver", email="resolver@example.com", password="TestPass123!"
+        )
+        self.client.force_authenticate(user=self.user)
+        company_resolver.cache.clear()
+
+    def item(self, from_header, title="Project sync"):
+        return {
+            "subject": title, "from_header": from_header, "received_at": timezone.now(),
+            "parsed_data": {"detailed_task_title": title, "company_name": "Unknown", "type": "meeting", "deadline": None},
+            "meeting_date": datetime.date(2025, 3, 3), "meeting_time": datetime.time(10, 0),
+        }
+
+    def test_domain_parsing(self):
+        """✅ Display names, subdomains and multi-label suffixes"""
+        self.assertEqual(company_resolver.company_from_sender('"Doe, Jane" <jane@mail.google.com>'), "Google")
+        self.assertEqual(company_resolver.company_from_sender("bob@eng.acme-corp.co.uk"), "Acme Corp")
+        self.assertEqual(company_resolver.company_from_sender("friend@gmail.com"), "Unknown")
+        self.assertEqual(company_resolver.company_from_sender("no address here"), "Unknown")
+
+    def test_repeat_senders_cost_no_queries(self):
+        """✅ One Job per domain, cached after the first message"""
+        with self.captureOnCommitCallbacks(execute=True):
+            ingestion.save_classified(self.user, self.item("Ann <ann@acme.com>", "Kickoff"))
+        with self.assertNumQueries(0):
+            self.assertEqual(company_resolver.resolve_job(self.user, "bob@calendar.acme.com")[0], "Acme")
+        ingestion.save_classified(self.user, self.item("bob@acme.com", "Review"))
+
+        self.assertEqual(Job.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(set(Meeting.objects.values_list("job__company", flat=True)), {"Acme"})
+
+    def test_user_override(self):
+        """✅ Overriding a domain re-routes later meetings to the chosen Job"""
+        with self.captureOnCommitCallbacks(execute=True):
+            ingestion.save_classified(self.user, self.item("ann@acmecorp-mail.com", "Kickoff"))
+        client_job = Job.objects.create(user=self.user, name="Consulting", company="Acme Corp")
+
+        response = self.client.post("/api/sender-domains/", {"domain": "mail.acmecorp-mail.com", "job": client_job.id})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["domain"], "acmecorp-mail.com")
+        self.assertEqual(SenderDomain.objects.get(user=self.user).company, "Acme Corp")
+
+        upd, meeting = ingestion.save_classified(self.user, self.item("ann@acmecorp-mail.com", "Review"))
+        self.assertEqual(upd.company, "Acme Corp")
+        self.assertEqual(meeting.job_id, client_job.id)
+
+    def test_concurrently_created_mapping(self):
+        """✅ Losing the race to create a mapping keeps the batch's transaction usable"""
+        SenderDomain.objects.create(user=self.user, domain="acme.com", company="Acme")
+        real_filter = SenderDomain.objects.filter
+        calls = []
+
+        def filter(*args, **kwargs):
+            # The first lookup misses, as if another worker hadn't committed yet
+            calls.append(kwargs)
+            return SenderDomain.objects.none() if len(calls) == 1 else real_filter(*args, **kwargs)
+
+        with mock.patch.object(SenderDomain.objects, "filter", side_effect=filter):
+            updates, meetings = ingestion.save_classified_batch(self.user, [self.item("ann@acme.com", "Kickoff")])
+        self.assertEqual((len(updates), len(meetings)), (1, 1))
+        self.assertEqual(SenderDomain.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(Meeting.objects.get(user=self.user).job.company, "Acme")
+
+    def test_override_rejects_other_users_job(self):
+        """❌ Mappings can only point at the user's own jobs"""
+        other = User.objects.create_user(username="other", email="o@example.com", password="TestPass123!")
+        job = Job.objects.create(user=other, name="Theirs", company="X")
+        response = self.client.post("/api/sender-domains/", {"domain": "x.com", "job": job.id})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestMeetingDeduplication(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="dedup", email="dedup@example.com", password="TestPass123!"
+        )
+        company_resolver.cache.clear()
+
+    def item(self, title, from_header="Ann <ann@acme.com>", day=10):
+        return {
+            "subject": title, "from_header": from_header, "received_at": timezone.now(),
+            "parsed_data": {"detailed_task_title": title, "company_name": "Acme", "type": "meeting", "deadline": None},
+            "meeting_date": datetime.date(2025, 3, day), "meeting_time": datetime.time(10, 0),
+        }
+
+    def test_canonical_title(self):
+        """✅ Case, punctuation, word order and reply prefixes are ignored"""
+        self.assertEqual(
+            fingerprint.canonical_title("RE: Fwd: Project SYNC!!"), fingerprint.canonical_title("sync - project")
+        )
+        self.assertNotEqual(fingerprint.canonical_title("Q3 review"), fingerprint.canonical_title("Q4 review"))
+        # Numbers name different meetings; times and dates don't
+        self.assertNotEqual(fingerprint.canonical_title("Interview round 1"), fingerprint.canonical_title("Interview round 2"))
+        self.assertNotEqual(fingerprint.canonical_title("Sprint 12 review"), fingerprint.canonical_title("Sprint 13 review"))
+        self.assertEqual(fingerprint.canonical_title("Project sync Oct 21 at 10:00"), fingerprint.canonical_title("Project sync"))
+
+    def test_reworded_invites_in_one_run(self):
+        """✅ Reworded invites collapse into one meeting, checked with one lookup"""
+        items = [
+            self.item("Project sync"),
+            self.item("Re: project sync.", day=12),
+            self.item("FW: Project Sync", from_header="bob@mail.acme.com", day=13),
+            self.item("Budget review"),
+        ]
+        updates, meetings = ingestion.save_classified_batch(self.user, items)
+        self.assertEqual(len(updates), 4)
+        self.assertEqual(sorted(m.title for m in meetings), ["Budget review", "Project sync"])
+        self.assertEqual(Meeting.objects.get(title="Project sync").organizer_domain, "acme.com")
+
+        with self.assertNumQueries(2):  # fingerprints + recurring series
+            deduper = ingestion.MeetingDeduper(self.user, items)
+        self.assertTrue(all(deduper.is_duplicate(item) for item in items))
+
+    def test_manual_meetings_and_other_weeks(self):
+        """✅ Hand-entered meetings count; the same title a week or a month later does not"""
+        Meeting.objects.create(
+            user=self.user, title="Project Sync", meeting_date=datetime.date(2025, 3, 11), meeting_time=datetime.time(9, 0)
+        )
+        self.assertIsNone(ingestion.save_meeting(self.user, self.item("project sync")))
+        self.assertIsNotNone(ingestion.save_meeting(self.user, self.item("project sync", day=18)))
+        self.assertIsNotNone(ingestion.save_meeting(self.user, self.item("project sync", day=31)))
+
+    def test_racing_fetches_save_a_message_once(self):
+        """✅ A message saved by another fetch after the duplicate check is skipped, not a failed batch"""
+        first, second = self.item("Project sync"), self.item("Budget review")
+        first.update(imap_uid=7, imap_uidvalidity=1)
+        second.update(imap_uid=8, imap_uidvalidity=1)
+        ingestion.save_classified_batch(self.user, [first])
+
+        check = ingestion.unsaved_messages
+        calls = []
+
+        def late_check(user, items):
+            # The first check runs before the other fetch commits
+            calls.append(items)
+            return items if len(calls) == 1 else check(user, items)
+
+        with mock.patch.object(ingestion, "unsaved_messages", side_effect=late_check):
+            updates, _ = ingestion.save_classified_batch(self.user, [first, second])
+        self.assertEqual([u.imap_uid for u in updates], [8])
+        self.assertEqual(Update.objects.filter(user=self.user).count(), 2)
+
+    def test_numbered_meetings_stay_apart(self):
+        """❌ Successive rounds and sprints in the same week are different meetings"""
+        items = [self.item("Interview round 1"), self.item("Interview round 2", day=12),
+                 self.item("Sprint 12 planning"), self.item("Sprint 13 planning", day=11)]
+        _, meetings = ingestion.save_classified_batch(self.user, items)
+        self.assertEqual(len(meetings), 4)
+
+
+class TestLocalEmailClassifier(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="classifier", email="classifier@example.com", password="TestPass123!"
+        )
+
+    def make_message(self, subject, sender="Jira <jira@acme.com>"):
+        msg = EmailMessage()
+        msg["Subject"] = subject
+        msg["From"] = sender
+        return msg
+
+    def test_learns_from_update_labels(self):
+        """✅ Classifier catches up on the user's labelled Updates, from the raw subjects"""
+        for i in range(20):
+            Update.objects.create(user=self.user, title="Review the assigned ticket", subject=f"PROJ-{i} task assigned",
+                                  sender="jira@acme.com", type="task", classified_by="llm")
+            Update.objects.create(user=self.user, title="Attend the weekly sync", subject=f"Weekly sync #{i}",
+                                  sender="cal@acme.com", type="meeting", classified_by="llm")
+        # Its own guesses and the keyword rules' aren't labels
+        for source in ("local", "heuristic", ""):
+            Update.objects.create(user=self.user, title="x", subject="PROJ-1 task assigned", sender="jira@acme.com",
+                                  type="meeting", classified_by=source)
+        clf = classifier.load_for_user(self.user)
+        self.assertEqual(clf.trained, 40)
+        self.assertEqual(clf.predict("PROJ-99 task assigned", "jira@acme.com")[0], "task")
+
+        state = ClassifierState.objects.get(user=self.user)
+        self.assertEqual(state.trained_through, Update.objects.filter(classified_by="llm").latest("id").id)
+        # Nothing new to learn: state is reused as is
+        self.assertEqual(classifier.load_for_user(self.user).trained, 40)
+
+    def test_user_corrections_retrain(self):
+        """✅ Changing an Update's type replaces the label the classifier learned for it"""
+        self.client.force_authenticate(self.user)
+        update = Update.objects.create(user=self.user, title="Sync", subject="Quarterly planning",
+                                       sender="cal@acme.com", type="email", classified_by="llm")
+        self.assertEqual(classifier.load_for_user(self.user).doc_counts["email"], 1)
+
+        response = self.client.patch(f"/api/updates/{update.pk}/", {"type": "meeting", "classified_by": "llm"}, format="json")
+        self.assertEqual((response.status_code, response.data["classified_by"]), (200, "user"))
+        clf = classifier.load_for_user(self.user)
+        self.assertEqual((clf.doc_counts["email"], clf.doc_counts["meeting"]), (0, 1))
+        self.assertEqual(clf.predict("Quarterly planning", "cal@acme.com")[0], "meeting")
+
+    def test_ingested_updates_keep_subject_and_source(self):
+        """✅ Saved Updates record the raw subject and who classified them"""
+        item = ingestion.classify_message(self.make_message("Re: PROJ-7 task assigned to you"), use_llm=False)
+        update, _ = ingestion.save_classified(self.user, item)
+        self.assertEqual((update.subject, update.classified_by), ("Re: PROJ-7 task assigned to you", "heuristic"))
+
+    def test_confident_prediction_skips_llm(self):
+        """✅ The LLM is only asked when the local model is unsure"""
+        clf = classifier.NaiveBayesClassifier()
+        for i in range(30):
+            clf.learn(f"PROJ-{i} task assigned to you", "Jira <jira@acme.com>", "task")
+            clf.learn(f"Project newsletter {i}", "news@acme.com", "email")
+
+        with mock.patch.object(ingestion, "parse_email_with_gemini") as gemini:
+            item = ingestion.classify_message(self.make_message("PROJ-7 task assigned to you"), classifier=clf)
+            gemini.assert_not_called()
+        self.assertEqual(item["classified_by"], "local")
+        self.assertEqual(item["parsed_data"]["type"], "task")
+
+        untrained = classifier.NaiveBayesClassifier()
+        with mock.patch.object(ingestion, "parse_email_with_gemini", return_value=ingestion.heuristic_parse("x", "")) as gemini:
+            item = ingestion.classify_message(self.make_message("Project kickoff"), classifier=untrained)
+            gemini.assert_called_once()
+        self.assertEqual(item["classified_by"], "llm")
+
+
+class TestLLMClient(APITestCase):
+    def setUp(self):
+        self.server = FakeGeminiServer().start()
+        self.addCleanup(self.server.stop)
+
+    def make_client(self, **kwargs):
+        return llm.LLMClient(llm.gemini_rest_backend(self.server.base_url, "test-key"), **kwargs)
+
+    def test_call_returns_text(self):
+        """✅ Calls go through the fake server and are timed"""
+        client = self.make_client()
+        self.assertIn('"type": "meeting"', client.generate("hi"))
+        self.assertEqual(client.stats()["latency"]["count"], 1)
+
+    def test_deadline_is_enforced(self):
+        """✅ A slow API can't hold the caller past its deadline"""
+        self.server.delay = 1.0
+        client = self.make_client(timeout=0.1)
+        started = time.monotonic()
+        with self.assertRaises(llm.LLMUnavailable):
+            client.generate("hi")
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(client.stats()["calls"]["timeout"], 1)
+
+    def test_breaker_opens_and_recovers(self):
+        """✅ Consecutive failures open the breaker; a successful trial closes it"""
+        clock = [0.0]
+        breaker = llm.CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: clock[0])
+        client = self.make_client(breaker=breaker)
+        self.server.status = 500
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                client.generate("hi")
+        with self.assertRaises(llm.LLMUnavailable):
+            client.generate("hi")
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(client.stats()["breaker"]["state"], "open")
+
+        self.server.status = 200
+        clock[0] = 31
+        client.generate("hi")
+        self.assertEqual(client.stats()["breaker"]["state"], "closed")
+
+    def test_concurrency_is_capped(self):
+        """✅ No more than max_concurrency calls reach the API at once"""
+        self.server.delay = 0.2
+        client = self.make_client(max_concurrency=2, timeout=5)
+        threads = [threading.Thread(target=client.generate, args=("hi",)) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.server.requests, 6)
+        self.assertLessEqual(self.server.max_in_flight, 2)
+
+    def test_saturation_does_not_open_breaker(self):
+        """✅ Calls turned away for lack of a free slot are counted as rejected, not as API failures"""
+        client = self.make_client(max_concurrency=1, breaker=llm.CircuitBreaker(failure_threshold=1))
+        client.semaphore.acquire()
+        with self.assertRaises(llm.LLMUnavailable):
+            client.generate("hi", timeout=0.05)
+        client.semaphore.release()
+        self.assertEqual(client.stats()["calls"]["rejected"], 1)
+        self.assertEqual(client.stats()["breaker"], {"state": "closed", "consecutive_failures": 0})
+        self.assertIn('"type": "meeting"', client.generate("hi"))
+
+    def test_open_breaker_falls_back_to_heuristic(self):
+        """✅ Parsing still works while the breaker is open"""
+        client = self.make_client(breaker=llm.CircuitBreaker(failure_threshold=1))
+        client.breaker.record_failure()
+        with mock.patch.object(llm, "_client", client):
+            parsed = ingestion.parse_email_with_gemini("Zoom call on Friday", "a@acme.com")
+        self.assertEqual(parsed["type"], "meeting")
+        self.assertEqual(self.server.requests, 0)
+
+    def test_startup_does_not_import_sdk(self):
+        """✅ Loading settings, models and views leaves the Gemini SDK unimported"""
+        code = (
+            "import sys, django; django.setup(); import rolejuggler_backend.urls;"
+            "print(','.join(m for m in sys.modules if m.startswith('google.generativeai')))"
+        )
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "rolejuggler_backend.settings"}
+        result = subprocess.run([sys.executable, "-c", code], cwd=settings.BASE_DIR, env=env,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_sdk_is_configured_on_first_call(self):
+        """✅ The SDK backend imports and configures the SDK once, on its first call"""
+        genai = mock.MagicMock()
+        genai.GenerativeModel.return_value.generate_content.return_value.text = "ok"
+        with mock.patch.dict(sys.modules, {"google.generativeai": genai}):
+            backend = llm.gemini_sdk_backend("secret")
+            genai.configure.assert_not_called()
+            self.assertEqual(backend("hi", 1.0), "ok")
+            self.assertEqual(backend("hi", 1.0), "ok")
+        genai.configure.assert_called_once_with(api_key="secret")
+        genai.GenerativeModel.assert_called_once()
+
+
+class TestMeetingDateExtraction(APITestCase):
+    # Monday
+    anchor = datetime.datetime(2025, 10, 20, 9, 0, tzinfo=datetime.timezone.utc)
+
+    def extract(self, subject):
+        return ingestion.extract_meeting_datetime(subject, self.anchor)
+
+    def test_relative_dates_use_the_anchor(self):
+        """✅ Weekdays and relative words resolve against the Date header"""
+        self.assertEqual(self.extract("Weekly sync Tue 3pm"), (datetime.date(2025, 10, 21), datetime.time(15, 0)))
+        self.assertEqual(self.extract("Standup tomorrow at 10:30"), (datetime.date(2025, 10, 21), datetime.time(10, 30)))
+        self.assertEqual(self.extract("Sync next Monday"), (datetime.date(2025, 10, 27), None))
+        self.assertEqual(self.extract("Call in 2 weeks"), (datetime.date(2025, 11, 3), None))
+
+    def test_absolute_dates(self):
+        """✅ Numeric and month-name dates, with and without a year"""
+        self.assertEqual(self.extract("Meeting 10/25/2025 10:00 AM"), (datetime.date(2025, 10, 25), datetime.time(10, 0)))
+        self.assertEqual(self.extract("Kickoff 21st October 2025"), (datetime.date(2025, 10, 21), None))
+        # Without a year, dates long past roll over to next year
+        self.assertEqual(self.extract("Board meeting Jan 8"), (datetime.date(2026, 1, 8), None))
+
+    def test_timezones_convert_to_server_time(self):
+        """✅ Explicit zones are converted; plain times are kept as written"""
+        self.assertEqual(self.extract("Interview Oct 21 14:00 IST"), (datetime.date(2025, 10, 21), datetime.time(8, 30)))
+        self.assertEqual(self.extract("Call 2025-10-29 15:00 UTC+05:30"), (datetime.date(2025, 10, 29), datetime.time(9, 30)))
+
+    def test_time_ranges_are_not_offsets(self):
+        """✅ A range keeps its start time; "-3pm" is not a UTC offset"""
+        self.assertEqual(self.extract("Interview 2-3pm Thu"), (datetime.date(2025, 10, 23), datetime.time(14, 0)))
+        self.assertEqual(self.extract("Standup 9am-10am tomorrow"), (datetime.date(2025, 10, 21), datetime.time(9, 0)))
+        self.assertEqual(self.extract("Call 2pm-3pm Oct 21"), (datetime.date(2025, 10, 21), datetime.time(14, 0)))
+        self.assertEqual(self.extract("Panel 9am -10am Friday"), (datetime.date(2025, 10, 24), datetime.time(9, 0)))
+        # A bare offset after a time still converts
+        self.assertEqual(self.extract("Sync Oct 22 14:00 +0530"), (datetime.date(2025, 10, 22), datetime.time(8, 30)))
+
+    def test_no_false_positives(self):
+        """❌ Version numbers and plain words are not dates"""
+        self.assertEqual(self.extract("Release v2.10 update"), (None, None))
+        self.assertEqual(self.extract("Sat down with the project team"), (None, None))
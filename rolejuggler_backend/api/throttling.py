@@ -0,0 +1,177 @@
+"""
+Per-user limits for expensive endpoints, kept in the shared Django cache
+so every worker process sees the same state.
+
+Token buckets (settings.THROTTLE_BUCKETS) allow short bursts and then
+refill at a steady rate; an empty bucket answers 429 with Retry-After
+set to when the next token arrives. single_flight() coalesces concurrent
+identical work: the first caller runs it, callers arriving meanwhile wait
+for and share its result instead of starting their own run;
+asingle_flight() is the same for coroutines, waiting without a thread.
+"""
+import asyncio
+import contextlib
+import math
+import secrets
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+DEFAULT_BUCKETS = {
+    'ingestion': {'capacity': 3, 'per_minute': 1},
+    'mail_body': {'capacity': 20, 'per_minute': 10},
+    'backup': {'capacity': 2, 'per_minute': 0.2},
+}
+RESULT_TTL = 30  # seconds a finished single-flight result is kept for waiters
+
+
+def bucket(scope):
+    """(capacity, tokens per second) of the bucket for `scope`"""
+    config = {**DEFAULT_BUCKETS.get(scope, {}), **getattr(settings, 'THROTTLE_BUCKETS', {}).get(scope, {})}
+    return float(config['capacity']), config['per_minute'] / 60.0
+
+
+@contextlib.contextmanager
+def cache_lock(key, timeout=2.0):
+    """
+    Short mutual exclusion around a read-modify-write of `key`. cache.add
+    is atomic on every backend; the lock expires on its own if a holder dies.
+    """
+    lock = f"{key}:lock"
+    deadline = time.monotonic() + timeout
+    while not cache.add(lock, 1, timeout):
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(0.005)
+    try:
+        yield
+    finally:
+        cache.delete(lock)
+
+
+def take(scope, ident, now=None):
+    """Take a token from `ident`'s bucket; returns 0 if allowed, else seconds until one is available"""
+    capacity, rate = bucket(scope)
+    key = f"throttle:{scope}:{ident}"
+    now = time.time() if now is None else now
+    with cache_lock(key):
+        tokens, stamp = cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + max(0.0, now - stamp) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # Kept until the bucket would be full again; a missing key means full
+        ttl = (capacity - tokens) / rate if rate else None
+        cache.set(key, (tokens, now), None if ttl is None else int(ttl) + 1)
+    if allowed:
+        return 0.0
+    return (1 - tokens) / rate if rate else float('inf')
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Per-user, per-`scope` token bucket; anonymous requests are left to the permissions"""
+    scope = None
+
+    def allow_request(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return True
+        self.retry_after = take(self.scope, request.user.pk)
+        return not self.retry_after
+
+    def wait(self):
+        # A bucket that never refills has no meaningful Retry-After
+        return None if math.isinf(self.retry_after) else self.retry_after
+
+
+class IngestionThrottle(TokenBucketThrottle):
+    scope = 'ingestion'
+
+
+class MailBodyThrottle(TokenBucketThrottle):
+    scope = 'mail_body'
+
+
+class BackupThrottle(TokenBucketThrottle):
+    scope = 'backup'
+
+
+class Busy(Exception):
+    """Another run of the same work is in progress and didn't finish in time"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"already running, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def _busy(leader, lock_seconds):
+    started = float(leader.rsplit('@', 1)[1]) if leader else time.time()
+    return Busy(max(1.0, started + lock_seconds - time.time()))
+
+
+def _release(lock, run_id):
+    # Only our own lock: if this run outlasted lock_seconds, another run may hold it by now
+    if cache.get(lock) == run_id:
+        cache.delete(lock)
+
+
+async def _arelease(lock, run_id):
+    if await cache.aget(lock) == run_id:
+        await cache.adelete(lock)
+
+
+def single_flight(key, fn, lock_seconds=120.0, wait_seconds=60.0, poll=0.1):
+    """
+    Run fn() unless a run for `key` is already in flight, in which case
+    wait up to `wait_seconds` and return that run's result. `fn` must
+    return a picklable, non-None value. Raises Busy if the other run
+    outlasts the wait.
+    """
+    lock = f"singleflight:{key}"
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        run_id = f"{secrets.token_hex(8)}@{time.time():.3f}"
+        if cache.add(lock, run_id, int(lock_seconds)):
+            try:
+                result = fn()
+                cache.set(f"{lock}:{run_id}", result, RESULT_TTL)
+                return result
+            finally:
+                _release(lock, run_id)
+
+        leader = cache.get(lock)
+        while leader and cache.get(lock) == leader and time.monotonic() < deadline:
+            time.sleep(poll)
+        if leader:
+            result = cache.get(f"{lock}:{leader}")
+            if result is not None:
+                return result
+        # Otherwise the other run failed or its lock expired: try to run it ourselves
+        if time.monotonic() >= deadline:
+            raise _busy(leader, lock_seconds)
+
+
+async def asingle_flight(key, fn, lock_seconds=120.0, wait_seconds=60.0, poll=0.1):
+    """single_flight() for a coroutine function `fn`; shares locks and results with it"""
+    lock = f"singleflight:{key}"
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        run_id = f"{secrets.token_hex(8)}@{time.time():.3f}"
+        if await cache.aadd(lock, run_id, int(lock_seconds)):
+            try:
+                result = await fn()
+                await cache.aset(f"{lock}:{run_id}", result, RESULT_TTL)
+                return result
+            finally:
+                await _arelease(lock, run_id)
+
+        leader = await cache.aget(lock)
+        while leader and await cache.aget(lock) == leader and time.monotonic() < deadline:
+            await asyncio.sleep(poll)
+        if leader:
+            result = await cache.aget(f"{lock}:{leader}")
+            if result is not None:
+                return result
+        if time.monotonic() >= deadline:
+            raise _busy(leader, lock_seconds)
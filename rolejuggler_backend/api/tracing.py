@@ -0,0 +1,154 @@
+"""
+Per-stage timing of ingestion runs, persisted as IngestionRun rows.
+
+A run is opened around one "fetch today" (run() / arun()); pipeline code
+wraps each stage in span('login'), span('search'), ... and bumps counters
+with count('llm_calls'). Both are no-ops outside a run, so the shared
+pipeline (polling, imports) pays nothing. The current run lives in a
+context variable, which sync_to_async carries onto worker threads, so
+stages that run concurrently still land in the right run.
+
+Entering a stage again adds to it: a per-message loop produces one span
+per stage with its total time and number of calls, not one per message.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .models import IngestionRun
+
+# (tracer, current span or None) of the run in progress
+_current = contextvars.ContextVar('ingestion_run', default=(None, None))
+
+# Counters with their own IngestionRun columns; others are only kept on spans
+COLUMNS = ('llm_calls', 'cache_hits', 'errors')
+
+
+class Tracer:
+    def __init__(self, user, source):
+        self.user = user
+        self.source = source
+        self.started_at = timezone.now()
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.totals = {}
+        self.result = {'messages': 0, 'updates': 0, 'meetings': 0}
+        self.error = ''
+        self._lock = threading.Lock()
+
+    def _elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def count(self, span, name, n=1):
+        with self._lock:
+            self.totals[name] = self.totals.get(name, 0) + n
+            if span is not None:
+                span[name] = span.get(name, 0) + n
+
+    def fail(self, error):
+        """Mark the run failed with `error` (an exception or message); the first failure wins"""
+        if not self.error:
+            self.error = (f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error))[:255]
+
+    def save(self):
+        """Record the run, keeping only the newest INGESTION_RUNS_PER_USER of the user's runs"""
+        run = IngestionRun.objects.create(
+            user=self.user,
+            source=self.source,
+            status='failed' if self.error else 'ok',
+            started_at=self.started_at,
+            duration_ms=round(self._elapsed_ms()),
+            **self.result,
+            **{name: self.totals.get(name, 0) for name in COLUMNS},
+            error=self.error,
+            spans=sorted(self.spans.values(), key=lambda span: span['offset_ms']),
+        )
+        keep = getattr(settings, 'INGESTION_RUNS_PER_USER', 50)
+        old = IngestionRun.objects.filter(user=self.user).order_by('-started_at', '-id').values_list('id', flat=True)[keep:]
+        IngestionRun.objects.filter(id__in=list(old)).delete()
+        return run
+
+
+@contextlib.contextmanager
+def span(stage):
+    """Time `stage` of the current run; yields the span dict (None outside a run)"""
+    tracer, parent = _current.get()
+    if tracer is None:
+        yield None
+        return
+    with tracer._lock:
+        entry = tracer.spans.setdefault(stage, {'stage': stage, 'offset_ms': round(tracer._elapsed_ms(), 1),
+                                                 'ms': 0.0, 'calls': 0})
+        entry['calls'] += 1
+    token = _current.set((tracer, entry))
+    started = time.perf_counter()
+    try:
+        yield entry
+    except Exception as e:
+        tracer.count(entry, 'errors')
+        entry.setdefault('error', f"{type(e).__name__}: {e}"[:255])
+        raise
+    finally:
+        with tracer._lock:
+            entry['ms'] = round(entry['ms'] + (time.perf_counter() - started) * 1000, 1)
+        _current.reset(token)
+
+
+def count(name, n=1):
+    """Add `n` to counter `name` on the current run and stage"""
+    tracer, current = _current.get()
+    if tracer is not None:
+        tracer.count(current, name, n)
+
+
+def error(exc):
+    """Record an error that the pipeline handled (a message it skipped, say)"""
+    tracer, current = _current.get()
+    if tracer is not None:
+        tracer.count(current, 'errors')
+        if current is not None:
+            with tracer._lock:
+                current.setdefault('error', f"{type(exc).__name__}: {exc}"[:255])
+
+
+def _save(tracer):
+    """Save the run without letting a failure mask the pipeline's own outcome"""
+    try:
+        tracer.save()
+    except Exception as e:
+        print(f"Error saving ingestion run: {e}")
+
+
+@contextlib.contextmanager
+def run(user, source):
+    """Trace one ingestion run for `user`; the IngestionRun is saved on exit"""
+    tracer = Tracer(user, source)
+    token = _current.set((tracer, None))
+    try:
+        yield tracer
+    except Exception as e:
+        tracer.fail(e)
+        raise
+    finally:
+        _current.reset(token)
+        _save(tracer)
+
+
+@contextlib.asynccontextmanager
+async def arun(user, source):
+    """run() for coroutines"""
+    tracer = Tracer(user, source)
+    token = _current.set((tracer, None))
+    try:
+        yield tracer
+    except Exception as e:
+        tracer.fail(e)
+        raise
+    finally:
+        _current.reset(token)
+        await sync_to_async(_save)(tracer)
@@ -1,6 +1,11 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 from .views import ProfileView
+
+# Coroutine versions of the I/O-bound endpoints when running under ASGI
+io_views = async_views if getattr(settings, 'ASYNC_VIEWS', False) else views
+
 urlpatterns = [
     path('register/', views.register, name='register'),
     path('login/', views.login_view, name='login'),
@@ -9,13 +14,37 @@ urlpatterns = [
     path('jobs/<int:pk>/', views.JobDetailView.as_view(), name='job-detail'),
     path('tasks/', views.TaskListCreateView.as_view(), name='task-list'),
     path('tasks/<int:pk>/', views.TaskDetailView.as_view(), name='task-detail'),
+    path('tasks/<int:pk>/move/', views.task_move, name='task-move'),
     path('sticky-notes/', views.StickyNoteListCreateView.as_view(), name='sticky-note-list'),
     path('sticky-notes/<int:pk>/', views.StickyNoteDetailView.as_view(), name='sticky-note-detail'),
+    path('sticky-notes/<int:pk>/move/', views.sticky_note_move, name='sticky-note-move'),
+    path('sticky-notes/<int:pk>/edits/', views.sticky_note_edits, name='sticky-note-edits'),
     path("profile/", views.ProfileView.as_view(), name="profile"),
     
-    path("emails/fetch-today/", views.fetch_today_emails, name="fetch-today-emails"),
+    path("emails/fetch-today/", io_views.fetch_today_emails, name="fetch-today-emails"),
+    path("updates/", views.UpdateListView.as_view(), name="update-list"),
+    path("updates/archive/", views.ArchivedUpdateListView.as_view(), name="archived-update-list"),
+    path("updates/<int:pk>/", views.UpdateDetailView.as_view(), name="update-detail"),
+    path("updates/<int:pk>/body/", views.update_body, name="update-body"),
+    path("llm/status/", views.llm_status, name="llm-status"),
+    path("ingestion/polling/", views.polling_status, name="polling-status"),
+    path("ingestion/runs/", views.IngestionRunListView.as_view(), name="ingestion-run-list"),
+    path("ingestion/runs/<int:pk>/", views.IngestionRunDetailView.as_view(), name="ingestion-run-detail"),
+    path("notifications/", views.NotificationListView.as_view(), name="notification-list"),
+    path("notifications/read-all/", views.notifications_read_all, name="notification-read-all"),
+    path("notifications/<int:pk>/", views.NotificationDetailView.as_view(), name="notification-detail"),
     path('meetings/', views.MeetingListCreateView.as_view(), name='meeting-list'),
     path('meetings/<int:pk>/', views.MeetingDetailView.as_view(), name='meeting-detail'),
+    path('sender-domains/', views.SenderDomainListCreateView.as_view(), name='sender-domain-list'),
+    path('sender-domains/<int:pk>/', views.SenderDomainDetailView.as_view(), name='sender-domain-detail'),
+    path('dashboard/', io_views.dashboard_view, name='dashboard'),
+    path('planner/', views.plan_view, name='planner'),
+    path('analytics/productivity/', views.productivity_view, name='productivity'),
+    path('calendar/token/', views.calendar_token_view, name='calendar-token'),
+    path('calendar/<str:token>/feed.ics', views.calendar_feed, name='calendar-feed'),
+    path('purges/', views.PurgeListView.as_view(), name='purge-list'),
+    path('purges/<int:pk>/', views.PurgeDetailView.as_view(), name='purge-detail'),
+    path('export/', views.export_data, name='export-data'),
+    path('import/', views.import_data, name='import-data'),
     
-    # path('updates/', views.UpdateListView.as_view(), name='update-list'),
 ]
\ No newline at end of file
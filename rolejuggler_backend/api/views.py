@@ -1,10 +1,12 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import login
 from django.db import IntegrityError
 from .models import User, Job, Task, WorkSession, StickyNote,Meeting
+from .fieldsets import SparseFieldsViewMixin
+from . import purge
 from .serializers import (
     UserSerializer, RegisterSerializer, LoginSerializer, 
     JobSerializer, TaskSerializer, WorkSessionSerializer, StickyNoteSerializer
@@ -88,51 +90,56 @@ def logout_view(request):
     request.auth.delete()
     return Response(status=status.HTTP_200_OK)
 
-class JobListCreateView(generics.ListCreateAPIView):
+class JobListCreateView(SparseFieldsViewMixin, generics.ListCreateAPIView):
     serializer_class = JobSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Job.objects.filter(user=self.request.user)
+        return Job.objects.filter(user=self.request.user, deleted_at__isnull=True)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class JobDetailView(generics.RetrieveUpdateDestroyAPIView):
+class JobDetailView(SparseFieldsViewMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = JobSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Job.objects.filter(user=self.request.user)
+        return Job.objects.filter(user=self.request.user, deleted_at__isnull=True)
 
-class TaskListCreateView(generics.ListCreateAPIView):
+    def destroy(self, request, *args, **kwargs):
+        # Hidden now; its tasks, sessions and meetings are purged in the background
+        job_purge = purge.soft_delete_job(self.get_object())
+        return Response(PurgeSerializer(job_purge).data, status=status.HTTP_202_ACCEPTED)
+
+class TaskListCreateView(SparseFieldsViewMixin, generics.ListCreateAPIView):
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Task.objects.filter(user=self.request.user)
+        return Task.objects.filter(LIVE_JOB, user=self.request.user).order_by("position", "id")
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TaskDetailView(SparseFieldsViewMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Task.objects.filter(user=self.request.user)
+        return Task.objects.filter(LIVE_JOB, user=self.request.user)
 
-class StickyNoteListCreateView(generics.ListCreateAPIView):
+class StickyNoteListCreateView(SparseFieldsViewMixin, generics.ListCreateAPIView):
     serializer_class = StickyNoteSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return StickyNote.objects.filter(user=self.request.user)
+        return StickyNote.objects.filter(user=self.request.user).order_by("position", "id")
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class StickyNoteDetailView(generics.RetrieveUpdateDestroyAPIView):
+class StickyNoteDetailView(SparseFieldsViewMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = StickyNoteSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -145,164 +152,59 @@ class StickyNoteDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # views.py (append)import imaplibfrom rest_framework import generics, permissions, status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import login
 from django.db import IntegrityError
-from .models import User, Job, Task, WorkSession, StickyNote, Update, Meeting
+from .models import (
+    User, Job, Task, WorkSession, StickyNote, Update, Meeting, SenderDomain, MailboxPollState, UpdateBody,
+    ArchivedUpdate, Purge, IngestionRun, Notification
+)
 from .serializers import (
     UserSerializer, RegisterSerializer, LoginSerializer, 
     JobSerializer, TaskSerializer, WorkSessionSerializer, 
-    StickyNoteSerializer, UpdateSerializer, MeetingSerializer
+    StickyNoteSerializer, UpdateSerializer, MeetingSerializer, SenderDomainSerializer, ArchivedUpdateSerializer,
+    PurgeSerializer, IngestionRunSerializer, NotificationSerializer
 )
 import imaplib
 import email
-from email.header import decode_header
 import datetime
-import json
-import google.generativeai as genai
+import math
+import zoneinfo
+from django.conf import settings
 from django.utils import timezone
+from django.urls import reverse
 from django.db import transaction
+from django.db.models import F, Q, Count, Max
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_http_methods
+import hashlib
+import secrets
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
 import re
+from . import (
+    backup, classifier, company_resolver, dashboard, ical, llm, mail_body, note_edits, ordering, planner, recurrence,
+    retention, tracing,
+)
+from .classifier import load_for_user as load_email_classifier
+from .async_ingestion import imap_settings
+from .purge import LIVE_JOB
+from .throttling import BackupThrottle, Busy, IngestionThrottle, MailBodyThrottle, single_flight
+from .ingestion import (
+    extract_meeting_datetime, parse_email_with_gemini, classify_message, save_classified_batch,
+    decode_subject, is_relevant
+)
 
-# Configure Gemini API
-GEMINI_API_KEY = 
-genai.configure(api_key=GEMINI_API_KEY)
-
-def extract_meeting_datetime(subject):
-    """Extract meeting date and time from subject using regex"""
-    try:
-        # Common date patterns
-        date_patterns = [
-            r'(\d{1,2}/\d{1,2}/\d{4})',  # MM/DD/YYYY
-            r'(\d{1,2}-\d{1,2}-\d{4})',  # MM-DD-YYYY
-            r'(\d{1,2} \w+ \d{4})',      # DD Month YYYY
-        ]
-        
-        # Time patterns
-        time_patterns = [
-            r'(\d{1,2}:\d{2}\s*(?:AM|PM|am|pm))',
-            r'(\d{1,2}\s*(?:AM|PM|am|pm))',
-        ]
-        
-        meeting_date = None
-        meeting_time = None
-        
-        # Try to extract date
-        for pattern in date_patterns:
-            match = re.search(pattern, subject)
-            if match:
-                date_str = match.group(1)
-                try:
-                    # Try different date formats
-                    for fmt in ['%m/%d/%Y', '%m-%d-%Y', '%d %B %Y', '%d %b %Y']:
-                        try:
-                            meeting_date = datetime.datetime.strptime(date_str, fmt).date()
-                            break
-                        except ValueError:
-                            continue
-                except:
-                    pass
-        
-        # Try to extract time
-        for pattern in time_patterns:
-            match = re.search(pattern, subject)
-            if match:
-                time_str = match.group(1)
-                try:
-                    meeting_time = datetime.datetime.strptime(time_str.upper(), '%I:%M %p').time()
-                except ValueError:
-                    try:
-                        meeting_time = datetime.datetime.strptime(time_str.upper(), '%I %p').time()
-                    except ValueError:
-                        pass
-        
-        return meeting_date, meeting_time
-    except Exception as e:
-        print(f"Error extracting meeting datetime: {e}")
-        return None, None
-
-def parse_email_with_gemini(subject, from_header):
-    """Parse email content with Gemini API"""
-    try:
-        prompt = f"""
-        Based ONLY on the email subject and sender, extract this information as JSON:
-        - detailed_task_title: Create a meaningful title from the subject (max 8 words)
-        - company_name: Extract company name from sender email domain
-        - type: Classify as "email", "meeting", or "task" based on subject keywords
-        - deadline: For tasks, use 3 days from today. For meetings, try to extract date from subject.
-
-        Subject: {subject}
-        Sender: {from_header}
-
-        Return ONLY JSON with keys: detailed_task_title, company_name, type, deadline
-        """
-        
-        model = genai.GenerativeModel('models/gemini-2.0-flash-lite')
-        response = model.generate_content(prompt)
-        
-        response_text = response.text.strip()
-        if response_text.startswith('```json'):
-            response_text = response_text[7:]
-        if response_text.endswith('```'):
-            response_text = response_text[:-3]
-        
-        parsed_data = json.loads(response_text)
-        
-        # Validate and set defaults
-        if not parsed_data.get('detailed_task_title'):
-            parsed_data['detailed_task_title'] = subject[:255] if subject else "Untitled"
-        
-        if not parsed_data.get('company_name'):
-            if '@' in from_header:
-                domain = from_header.split('@')[1]
-                company = domain.split('.')[0].title()
-                parsed_data['company_name'] = company
-            else:
-                parsed_data['company_name'] = "Unknown"
-        
-        # Type validation
-        valid_types = ['email', 'meeting', 'task']
-        if parsed_data.get('type') not in valid_types:
-            lower_subj = subject.lower() if subject else ""
-            if any(word in lower_subj for word in ['meeting', 'call', 'zoom', 'schedule', 'calendar']):
-                parsed_data['type'] = 'meeting'
-            elif any(word in lower_subj for word in ['task', 'action', 'todo', 'follow up']):
-                parsed_data['type'] = 'task'
-            else:
-                parsed_data['type'] = 'email'
-        
-        # Deadline handling
-        if parsed_data['type'] == 'meeting':
-            # For meetings, try to extract date from subject
-            meeting_date, meeting_time = extract_meeting_datetime(subject)
-            if meeting_date:
-                # Set deadline to meeting date at 5 PM
-                parsed_data['deadline'] = timezone.make_aware(
-                    datetime.datetime.combine(meeting_date, meeting_time or datetime.time(17, 0))
-                )
-            else:
-                # Default to 3 days from now for meetings without clear date
-                parsed_data['deadline'] = timezone.now() + datetime.timedelta(days=3)
-        else:
-            # For tasks/emails, always 3 days from now
-            parsed_data['deadline'] = timezone.now() + datetime.timedelta(days=3)
-        
-        parsed_data['deadline'] = parsed_data['deadline'].replace(hour=17, minute=0, second=0, microsecond=0)
-        
-        return parsed_data
-        
-    except Exception as e:
-        print(f"Gemini parsing failed: {e}")
-        return {
-            'detailed_task_title': subject[:255] if subject else "Untitled",
-            'company_name': from_header.split('@')[1].split('.')[0].title() if '@' in from_header else "Unknown",
-            'type': 'email',
-            'deadline': timezone.now() + datetime.timedelta(days=3)
-        }
+def open_imap():
+    """Connection to the configured IMAP server (settings.IMAP_HOST)"""
+    host, port, use_ssl = imap_settings()
+    return imaplib.IMAP4_SSL(host, port) if use_ssl else imaplib.IMAP4(host, port)
 
 @api_view(["POST"])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([IngestionThrottle])
 def fetch_today_emails(request):
     user = request.user
     gmail_addr = getattr(user, "email", None)
@@ -311,174 +213,667 @@ def fetch_today_emails(request):
     if not gmail_addr or not gmail_app_pwd:
         return Response({"detail": "Gmail credentials not configured."}, status=status.HTTP_400_BAD_REQUEST)
 
+    # Clicks while a fetch is running share its result instead of starting another one
     try:
-        imap = imaplib.IMAP4_SSL("imap.gmail.com", 993)
-        imap.login(gmail_addr, gmail_app_pwd)
+        data, status_code = single_flight(
+            f"fetch-today:{user.pk}", lambda: _fetch_today_emails(user),
+            lock_seconds=getattr(settings, 'INGESTION_LOCK_SECONDS', 120.0),
+            wait_seconds=getattr(settings, 'INGESTION_COALESCE_WAIT_SECONDS', 60.0),
+        )
+    except Busy as e:
+        return Response(
+            {"detail": "Already fetching emails, try again later."},
+            status=status.HTTP_429_TOO_MANY_REQUESTS, headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    return Response(data, status=status_code)
+
+def _fetch_today_emails(user):
+    """(response data, status) of one "fetch today" run for `user`, traced as an IngestionRun"""
+    with tracing.run(user, 'fetch_today') as tracer:
+        data, status_code = _fetch_today_traced(user, tracer)
+        if status_code >= 400:
+            tracer.fail(data["detail"])
+        return data, status_code
+
+def _fetch_today_traced(user, tracer):
+    try:
+        with tracing.span("connect"):
+            imap = open_imap()
+        with tracing.span("login"):
+            imap.login(user.email, user.app_password)
     except Exception as e:
-        return Response({"detail": "IMAP login failed."}, status=status.HTTP_400_BAD_REQUEST)
-
+        tracer.fail(e)
+        return {"detail": "IMAP login failed."}, status.HTTP_400_BAD_REQUEST
     try:
-        imap.select("INBOX")
+        with tracing.span("select"):
+            imap.select("INBOX")
+        uidvalidity = imap.response("UIDVALIDITY")[1][0]
         today = datetime.date.today()
         date_str = today.strftime("%d-%b-%Y")
-        status_code, data = imap.search(None, '(SINCE "{}")'.format(date_str))
+        with tracing.span("search"):
+            status_code, data = imap.uid("SEARCH", None, '(SINCE "{}")'.format(date_str))
 
         update_results = []  # This will store Update objects
         meeting_results = []  # This will store Meeting objects (for internal use)
         
         if status_code != "OK":
             imap.logout()
-            return Response({"detail": "IMAP search failed."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return {"detail": "IMAP search failed."}, status.HTTP_500_INTERNAL_SERVER_ERROR
 
+        with tracing.span("load_classifier"):
+            classifier = load_email_classifier(user)
+        items = []
         mail_ids = data[0].split()
-        for mid in reversed(mail_ids):
-            status_code, msg_data = imap.fetch(mid, "(RFC822.HEADER)")
-            if status_code != "OK":
+        tracer.result["messages"] = len(mail_ids)
+        for uid in reversed(mail_ids):
+            with tracing.span("fetch_headers"):
+                status_code, msg_data = imap.uid("FETCH", uid, "(RFC822.HEADER)")
+            if status_code != "OK" or not msg_data or msg_data[0] is None:
                 continue
             
             raw_email = msg_data[0][1]
             msg = email.message_from_bytes(raw_email)
 
-            # Decode subject
-            subj, encoding = decode_header(msg.get("Subject") or "")[0]
-            if isinstance(subj, bytes):
-                subject = subj.decode(encoding or "utf-8", errors="ignore")
-            else:
-                subject = subj or ""
-
-            from_header = msg.get("From") or ""
-            date_header = msg.get("Date")
-            
-            # Parse date
-            try:
-                parsed_date = email.utils.parsedate_to_datetime(date_header) if date_header else timezone.now()
-                if parsed_date.tzinfo is None:
-                    parsed_date = timezone.make_aware(parsed_date)
-            except Exception:
-                parsed_date = timezone.now()
-
-            # Basic relevance check
-            lower_subj = subject.lower() if subject else ""
-            keywords = ["project", "meeting", "call", "proposal", "agenda", "update", "task", "action", "todo"]
-            relevant = any(k in lower_subj for k in keywords)
-            
-            if not relevant:
+            # Only relevant messages get the start of their text part fetched
+            snippet = ""
+            if is_relevant(decode_subject(msg)):
+                with tracing.span("fetch_bodies"):
+                    snippet = mail_body.fetch_text_imaplib(imap, int(uid), mail_body.snippet_bytes()) or ""
+                snippet = snippet[:mail_body.SNIPPET_CHARS]
+
+            # Relevance filter + classification (local model, Gemini when unsure)
+            with tracing.span("classify"):
+                item = classify_message(msg, classifier=classifier, snippet=snippet)
+            if item is None:
                 continue
 
-            # Parse with Gemini
-            parsed_data = parse_email_with_gemini(subject, from_header)
-
-            # Extract meeting date/time if it's a meeting
-            meeting_date = None
-            meeting_time = None
-            if parsed_data['type'] == 'meeting':
-                meeting_date, meeting_time = extract_meeting_datetime(subject)
-
-            with transaction.atomic():
-                # Create Update - THIS IS WHAT SHOULD BE RETURNED
-                upd = Update.objects.create(
-                    user=user,
-                    title=parsed_data['detailed_task_title'][:255],
-                    message=f"From: {from_header}",
-                    source="email",
-                    sender=from_header,
-                    received_at=parsed_date,
-                    type=parsed_data['type'],
-                    linked_task=False,
-                    deadline=parsed_data['deadline'],
-                    company=parsed_data['company_name'][:255],
-                    meeting_date=meeting_date,
-                    meeting_time=meeting_time
-                )
-                
-                # Add the update to results
-                update_results.append(upd)
-                
-                # If it's a meeting, also create a Meeting entry
-                if parsed_data['type'] == 'meeting':
-                    # Use extracted date/time or default values
-                    meeting_date_value = meeting_date or (timezone.now() + datetime.timedelta(days=1)).date()
-                    meeting_time_value = meeting_time or datetime.time(10, 0)  # Default 10 AM
-                    
-                    # Check if meeting already exists (same title and similar date - within 7 days)
-                    existing_meeting = Meeting.objects.filter(
-                        user=user,
-                        title=parsed_data['detailed_task_title'][:255],
-                        meeting_date__gte=meeting_date_value - datetime.timedelta(days=7),
-                        meeting_date__lte=meeting_date_value + datetime.timedelta(days=7)
-                    ).first()
-                    
-                    if not existing_meeting:
-                        # Find or create a job based on company
-                        job = None
-                        company_name = parsed_data['company_name']
-                        if company_name != "Unknown":
-                            job, created = Job.objects.get_or_create(
-                                user=user,
-                                company=company_name,
-                                defaults={
-                                    'name': f"{company_name} Work",
-                                    'color': '#3B82F6'
-                                }
-                            )
-                        
-                        meeting_obj = Meeting.objects.create(
-                            user=user,
-                            job=job,
-                            title=parsed_data['detailed_task_title'][:255],
-                            company=company_name,
-                            meeting_date=meeting_date_value,
-                            meeting_time=meeting_time_value,
-                            duration=60,  # Default 1 hour
-                            description=f"Automatically created from email: {subject}"
-                        )
-                        meeting_results.append(meeting_obj)
-
-        imap.logout()
+            item.update(imap_uid=int(uid), imap_uidvalidity=int(uidvalidity) if uidvalidity else None)
+            items.append(item)
+
+        with tracing.span("logout"):
+            imap.logout()
+        # Create Updates - THESE ARE WHAT SHOULD BE RETURNED. Meetings are
+        # deduplicated against existing ones in bulk for the whole run
+        if items:
+            with tracing.span("save"):
+                update_results, meeting_results = save_classified_batch(user, items)
+        tracer.result.update(updates=len(update_results), meetings=len(meeting_results))
         # Return Update objects, not Meeting objects
         serializer = UpdateSerializer(update_results, many=True)
-        print(serializer.data)
-        return Response(serializer.data)
+        return list(serializer.data), status.HTTP_200_OK
 
     except Exception as e:
+        tracer.fail(e)
         try:
             imap.logout()
         except:
             pass
         print(f"Error fetching emails: {e}")
-        return Response({"detail": "Error fetching emails."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return {"detail": "Error fetching emails."}, status.HTTP_500_INTERNAL_SERVER_ERROR
 # Meeting Views
 
-class MeetingListCreateView(generics.ListCreateAPIView):
+class MeetingListCreateView(SparseFieldsViewMixin, generics.ListCreateAPIView):
     serializer_class = MeetingSerializer
     permission_classes = [permissions.IsAuthenticated]
-    
+    # Read when expanding and sorting occurrences, whatever ?fields= asks for
+    required_fields = ('meeting_date', 'meeting_time', 'recurrence_rule', 'recurrence_exceptions')
+
+    # How far ahead recurring series are expanded when no ?end= is given
+    RECURRENCE_WINDOW_DAYS = 60
+    MAX_WINDOW_DAYS = 366
+
+    def get_window(self):
+        params = self.request.query_params
+        try:
+            start = datetime.date.fromisoformat(params["start"]) if params.get("start") else timezone.now().date()
+            end = datetime.date.fromisoformat(params["end"]) if params.get("end") else None
+        except ValueError:
+            raise ValidationError({"detail": "start and end must be YYYY-MM-DD dates."})
+        if end is not None:
+            end = min(end, start + datetime.timedelta(days=self.MAX_WINDOW_DAYS))
+        return start, end
+
     def get_queryset(self):
-        # Return ALL meetings from today onwards (not just today's)
-        today = timezone.now().date()
-        return Meeting.objects.filter(
-            user=self.request.user, 
-            meeting_date__gte=today
-        ).order_by('meeting_date', 'meeting_time')
+        # Return ALL meetings from today onwards (not just today's),
+        # plus recurring series that are still running in the window
+        start, end = self.get_window()
+        series_running = Q(recurrence_rule__gt="") & (Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=start))
+        queryset = Meeting.objects.filter(LIVE_JOB, user=self.request.user).filter(Q(meeting_date__gte=start) | series_running)
+        if end is not None:
+            queryset = queryset.filter(meeting_date__lte=end)
+        return queryset.order_by('meeting_date', 'meeting_time')
+
+    def list(self, request, *args, **kwargs):
+        start, end = self.get_window()
+        series_end = end or start + datetime.timedelta(days=self.RECURRENCE_WINDOW_DAYS)
+
+        meetings = list(self.filter_queryset(self.get_queryset()))
+        results = []
+        for meeting, data in zip(meetings, self.get_serializer(meetings, many=True).data):
+            if not meeting.recurrence_rule:
+                results.append((meeting.meeting_date, meeting.meeting_time, data))
+                continue
+            # Expand the series lazily, only for the requested window
+            for day in recurrence.occurrences(meeting, start, series_end):
+                occurrence = {**data, "occurrence_of": meeting.id}
+                if "meeting_date" in data:
+                    occurrence["meeting_date"] = day.isoformat()
+                results.append((day, meeting.meeting_time, occurrence))
+
+        results.sort(key=lambda item: item[:2])
+        return Response([data for _, _, data in results])
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class MeetingDetailView(generics.RetrieveUpdateDestroyAPIView):
+class MeetingDetailView(SparseFieldsViewMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = MeetingSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Meeting.objects.filter(user=self.request.user)
+        return Meeting.objects.filter(LIVE_JOB, user=self.request.user)
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def dashboard_view(request):
+    """Today's tasks, upcoming meetings, recent updates, notes and counts in one response"""
+    try:
+        # The client's local date; the server's may already be tomorrow or still yesterday
+        today = datetime.date.fromisoformat(request.query_params["date"]) if request.query_params.get("date") \
+            else timezone.now().date()
+    except ValueError:
+        return Response({"detail": "date must be YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+    data, cached = dashboard.snapshot(request.user, today)
+    return Response(data, headers={"X-Dashboard-Cache": "hit" if cached else "miss"})
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def plan_view(request):
+    """Auto-plan open tasks into the free time between meetings"""
+    try:
+        start_date = datetime.date.fromisoformat(request.query_params.get("start", ""))
+    except ValueError:
+        start_date = timezone.localdate()
+    try:
+        days = max(1, min(int(request.query_params.get("days", 7)), 31))
+    except ValueError:
+        return Response({"detail": "days must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+    user = request.user
+    task_fields = ("id", "title", "priority", "deadline", "total_time_spent")
+    tasks = Task.objects.filter(LIVE_JOB, user=user).exclude(status="done").values(*task_fields)
+    done_tasks = Task.objects.filter(LIVE_JOB, user=user, status="done").values("priority", "total_time_spent")
+    end_date = start_date + datetime.timedelta(days=days - 1)
+    running = Q(recurrence_rule__gt="") & (Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=start_date))
+    meeting_rows = Meeting.objects.filter(LIVE_JOB, user=user, meeting_date__lte=end_date).filter(
+        Q(meeting_date__gte=start_date) | running
+    ).values("meeting_date", "meeting_time", "duration", "recurrence_rule", "recurrence_exceptions")
+    meetings = [
+        {**row, "meeting_date": day}
+        for row in meeting_rows
+        for day in recurrence.occurrences(row, start_date, end_date)
+    ]
+
+    plan = planner.build_plan(
+        list(tasks), meetings, start_date, days,
+        history=planner.estimate_history(done_tasks), now=timezone.localtime(),
+    )
+    plan["start"] = start_date
+    plan["days"] = days
+    return Response(plan)
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def productivity_view(request):
+    """Focus heatmap, rolling focus per job, session lengths and deadline hit rates"""
+    # Imported here so NumPy isn't loaded at startup
+    from . import analytics
+    try:
+        days = max(1, min(int(request.query_params.get("days", 90)), analytics.max_days()))
+    except ValueError:
+        return Response({"detail": "days must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        # The client's timezone: hours of the day and deadlines are local
+        tz = zoneinfo.ZoneInfo(request.query_params.get("tz") or settings.TIME_ZONE)
+    except (ValueError, zoneinfo.ZoneInfoNotFoundError):
+        return Response({"detail": "tz must be an IANA timezone name."}, status=status.HTTP_400_BAD_REQUEST)
+    data, cached = analytics.snapshot(request.user, days, tz)
+    return Response(data, headers={"X-Analytics-Cache": "hit" if cached else "miss"})
+
+# Calendar feed
+
+@api_view(["POST", "DELETE"])
+@permission_classes([permissions.IsAuthenticated])
+def calendar_token_view(request):
+    """Rotate (POST) or revoke (DELETE) the user's calendar feed token"""
+    user = request.user
+    if request.method == "DELETE":
+        user.calendar_token = None
+        user.save(update_fields=["calendar_token"])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    user.calendar_token = secrets.token_urlsafe(32)
+    user.save(update_fields=["calendar_token"])
+    url = request.build_absolute_uri(reverse("calendar-feed", args=[user.calendar_token]))
+    return Response({"token": user.calendar_token, "url": url}, status=status.HTTP_201_CREATED)
+
+
+def _calendar_feed_state(request, token):
+    """Owner, querysets and change markers for a feed, computed once per request"""
+    if not hasattr(request, "_calendar_feed_state"):
+        state = None
+        user = User.objects.filter(calendar_token=token, is_active=True).only("id").first() if token else None
+        if user is not None:
+            meetings = Meeting.objects.filter(LIVE_JOB, user=user)
+            tasks = Task.objects.filter(LIVE_JOB, user=user, deadline__isnull=False).exclude(status="done")
+            meeting_stats = meetings.aggregate(count=Count("id"), latest=Max("updated_at"))
+            task_stats = tasks.aggregate(count=Count("id"), latest=Max("updated_at"))
+            latest = max(filter(None, [meeting_stats["latest"], task_stats["latest"]]), default=None)
+            fingerprint = f"{user.id}:{meeting_stats}:{task_stats}"
+            state = {
+                "meetings": meetings,
+                "tasks": tasks,
+                "last_modified": latest,
+                # Counts are part of the ETag so deletions change it too
+                "etag": hashlib.md5(fingerprint.encode()).hexdigest(),
+            }
+        request._calendar_feed_state = state
+    return request._calendar_feed_state
+
+
+def _calendar_feed_etag(request, token):
+    state = _calendar_feed_state(request, token)
+    return state and state["etag"]
+
+
+def _calendar_feed_last_modified(request, token):
+    state = _calendar_feed_state(request, token)
+    return state and state["last_modified"]
+
+
+@require_http_methods(["GET", "HEAD"])
+@condition(etag_func=_calendar_feed_etag, last_modified_func=_calendar_feed_last_modified)
+def calendar_feed(request, token):
+    """Token-authenticated .ics feed of meetings and open task deadlines"""
+    state = _calendar_feed_state(request, token)
+    if state is None:
+        raise Http404("Unknown calendar feed.")
+
+    meetings = state["meetings"].values(
+        "id", "title", "meeting_date", "meeting_time", "duration", "description",
+        "location", "recurrence_rule", "recurrence_exceptions", "updated_at",
+    ).order_by("id")
+    tasks = state["tasks"].values("id", "title", "deadline", "priority", "updated_at").order_by("id")
+
+    response = StreamingHttpResponse(
+        ical.calendar_stream(meetings, tasks, request.get_host().split(":")[0]),
+        content_type="text/calendar; charset=utf-8",
+    )
+    response["Content-Disposition"] = 'inline; filename="rolejuggler.ics"'
+    response["Cache-Control"] = "private, max-age=300"
+    return response
+
+# Dataset export / import
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+@throttle_classes([BackupThrottle])
+def export_data(request):
+    """Stream the user's whole dataset as NDJSON, or one resource as CSV"""
+    # Not "format": DRF reserves that for content negotiation
+    fmt = request.query_params.get("output", "ndjson")
+    resource = request.query_params.get("resource")
+    if resource and resource not in backup.RESOURCE_NAMES:
+        return Response({"detail": f"resource must be one of {', '.join(backup.RESOURCE_NAMES)}."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    if fmt == "csv":
+        if not resource:
+            return Response({"detail": "CSV export needs a resource."}, status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(backup.export_csv(request.user, resource), content_type="text/csv")
+        filename = f"rolejuggler-{resource}.csv"
+    elif fmt == "ndjson":
+        response = StreamingHttpResponse(
+            backup.export_ndjson(request.user, [resource] if resource else None),
+            content_type="application/x-ndjson",
+        )
+        filename = "rolejuggler-export.ndjson"
+    else:
+        return Response({"detail": "output must be ndjson or csv."}, status=status.HTTP_400_BAD_REQUEST)
+
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+@throttle_classes([BackupThrottle])
+def import_data(request):
+    """Import an NDJSON export (raw body or a multipart `file`) into the user's account"""
+    if request.content_type.startswith("multipart/"):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"detail": "No file uploaded."}, status=status.HTTP_400_BAD_REQUEST)
+        lines = upload
+    else:
+        # Read the raw body line by line instead of parsing it all up front
+        lines = request._request
+
+    try:
+        counts = backup.import_ndjson(request.user, lines)
+    except backup.DatasetImportError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"created": counts}, status=status.HTTP_201_CREATED)
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def llm_status(request):
+    """Circuit breaker state, call counters and latency histogram of the LLM client"""
+    return Response(llm.get_client().stats())
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def polling_status(request):
+    """Per-user background polling schedule and lag, laggiest first"""
+    states = MailboxPollState.objects.select_related("user").order_by(F("last_lag_ms").desc(nulls_last=True))
+    return Response([
+        {
+            "user": state.user.username,
+            "polls": state.polls,
+            "last_lag_ms": state.last_lag_ms,
+            "interval_seconds": round(state.interval_seconds, 1),
+            "consecutive_failures": state.consecutive_failures,
+            "last_error": state.last_error,
+            "last_polled_at": state.last_polled_at,
+            "next_poll_at": state.next_poll_at,
+        }
+        for state in states
+    ])
+
+def _move(request, item, scope, update_fields=()):
+    """Move `item` between the `after` and `before` ids in the request body (items of `scope`)"""
+    neighbours = {}
+    for name in ("after", "before"):
+        pk = request.data.get(name)
+        if pk is None:
+            neighbours[name] = None
+            continue
+        neighbours[name] = scope.exclude(pk=item.pk).filter(pk=pk).first()
+        if neighbours[name] is None:
+            return Response({name: "Not an item of this list."}, status=status.HTTP_400_BAD_REQUEST)
+    with transaction.atomic():
+        ordering.move(item, scope, neighbours["after"], neighbours["before"], update_fields)
+    return Response({"id": item.id, "position": item.position, **{f: getattr(item, f) for f in update_fields}})
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def task_move(request, pk):
+    """
+    Reorder a Kanban card: {"after": id, "before": id, "status": "done"}.
+    Only the moved card's row is written.
+    """
+    task = get_object_or_404(Task.objects.filter(LIVE_JOB), pk=pk, user=request.user)
+    update_fields = ()
+    new_status = request.data.get("status")
+    if new_status is not None and new_status != task.status:
+        if new_status not in dict(Task.STATUS_CHOICES):
+            return Response({"status": "Unknown status."}, status=status.HTTP_400_BAD_REQUEST)
+        task.status = new_status
+        update_fields = ("status", "updated_at")
+    scope = Task.objects.filter(LIVE_JOB, user=request.user, status=task.status)
+    return _move(request, task, scope, update_fields)
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def sticky_note_move(request, pk):
+    """Reorder a sticky note: {"after": id, "before": id}"""
+    note = get_object_or_404(StickyNote, pk=pk, user=request.user)
+    return _move(request, note, StickyNote.objects.filter(user=request.user))
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def sticky_note_edits(request, pk):
+    """
+    Apply text edits to a sticky note: {"revision": 3, "ops": [[start, delete, "insert"], ...]},
+    offsets in UTF-16 code units. 409 with the current revision and content if the note has
+    moved past `revision`; the client rebases and resends.
+    """
+    note = get_object_or_404(StickyNote.objects.only("id", "user_id"), pk=pk, user=request.user)
+    revision = request.data.get("revision")
+    if not isinstance(revision, int) or isinstance(revision, bool):
+        return Response({"revision": "Must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        revision, content, updated_at = note_edits.save(note, revision, note_edits.parse(request.data.get("ops")))
+    except note_edits.InvalidEdit as e:
+        return Response({"ops": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except note_edits.Conflict as e:
+        return Response(
+            {"detail": "The note changed since this revision.", "revision": e.revision, "content": e.content},
+            status=status.HTTP_409_CONFLICT,
+        )
+    # The length lets the client check its copy without the text coming back
+    return Response({"id": note.id, "revision": revision, "length": note_edits.utf16_length(content),
+                     "updated_at": updated_at})
+
+class UpdateCursorPagination(CursorPagination):
+    """Keyset pages over the (user, received_at) index; stable while new mail arrives"""
+    ordering = ("-received_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+class UpdateListView(SparseFieldsViewMixin, generics.ListAPIView):
+    """Recent updates, newest first; ?type=meeting and ?q=words filter"""
+    serializer_class = UpdateSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = UpdateCursorPagination
+    required_fields = ("received_at",)  # the page cursor
+
+    def get_queryset(self):
+        queryset = Update.objects.filter(user=self.request.user)
+        if self.request.query_params.get("type"):
+            queryset = queryset.filter(type=self.request.query_params["type"])
+        return retention.matching(queryset, self.request.query_params.get("q", ""))
+
+class UpdateDetailView(SparseFieldsViewMixin, generics.RetrieveUpdateAPIView):
+    """One update; changing its type is a correction the local classifier learns from"""
+    serializer_class = UpdateSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Update.objects.filter(user=self.request.user)
+
+    def perform_update(self, serializer):
+        old_type, old_classified_by = serializer.instance.type, serializer.instance.classified_by
+        if serializer.validated_data.get("type", old_type) == old_type:
+            serializer.save()
+            return
+        with transaction.atomic():
+            update = serializer.save(classified_by="user")
+            classifier.relabel(update, old_type, old_classified_by)
+
+class ArchivedUpdateListView(SparseFieldsViewMixin, generics.ListAPIView):
+    """Search updates moved out by the retention job: ?q=words&since=YYYY-MM-DD&until=YYYY-MM-DD"""
+    serializer_class = ArchivedUpdateSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = UpdateCursorPagination
+    required_fields = ("received_at",)  # the page cursor
+
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset = ArchivedUpdate.objects.filter(user=self.request.user)
+        try:
+            if params.get("since"):
+                queryset = queryset.filter(received_at__date__gte=datetime.date.fromisoformat(params["since"]))
+            if params.get("until"):
+                queryset = queryset.filter(received_at__date__lte=datetime.date.fromisoformat(params["until"]))
+        except ValueError:
+            raise ValidationError({"detail": "since and until must be YYYY-MM-DD dates."})
+        if params.get("type"):
+            queryset = queryset.filter(type=params["type"])
+        return retention.matching(queryset, params.get("q", ""))
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+@throttle_classes([MailBodyThrottle])
+def update_body(request, pk):
+    """Full text body of an email update, fetched from the mailbox once and then served from the database"""
+    update = get_object_or_404(Update, pk=pk, user=request.user)
+    cached = UpdateBody.objects.filter(update=update).values_list("text", flat=True).first()
+    if cached is not None:
+        return Response({"id": update.id, "body": cached, "cached": True})
+    if update.imap_uid is None:
+        return Response({"detail": "This update has no mailbox reference."}, status=status.HTTP_404_NOT_FOUND)
+
+    user = request.user
+    try:
+        imap = open_imap()
+        imap.login(user.email, user.app_password or "")
+    except Exception:
+        return Response({"detail": "IMAP login failed."}, status=status.HTTP_502_BAD_GATEWAY)
+    try:
+        imap.select("INBOX", readonly=True)
+        uidvalidity = imap.response("UIDVALIDITY")[1][0]
+        if update.imap_uidvalidity and uidvalidity and int(uidvalidity) != update.imap_uidvalidity:
+            text = None  # the mailbox was rebuilt; old UIDs mean nothing
+        else:
+            text = mail_body.fetch_text_imaplib(imap, update.imap_uid)
+    except Exception as e:
+        print(f"Error fetching email body: {e}")
+        return Response({"detail": "Error fetching the email body."}, status=status.HTTP_502_BAD_GATEWAY)
+    finally:
+        try:
+            imap.logout()
+        except Exception:
+            pass
+
+    if text is None:
+        return Response({"detail": "The message is no longer in the mailbox."}, status=status.HTTP_404_NOT_FOUND)
+    body, _ = UpdateBody.objects.get_or_create(update=update, defaults={"text": text})
+    return Response({"id": update.id, "body": body.text, "cached": False})
+
+class SenderDomainListCreateView(generics.ListCreateAPIView):
+    """Sender domain -> company/Job mappings; POSTing an existing domain overrides it"""
+    serializer_class = SenderDomainSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SenderDomain.objects.filter(user=self.request.user).select_related('job')
+
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        serializer.instance = SenderDomain.objects.filter(user=self.request.user, domain=data['domain']).first()
+        company = data.get('company') or (data['job'].company if data.get('job') else None)
+        serializer.save(
+            user=self.request.user,
+            is_override=True,
+            company=company or company_resolver.company_name(data['domain']),
+        )
+
+class SenderDomainDetailView(generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = SenderDomainSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SenderDomain.objects.filter(user=self.request.user)
+
+    def perform_update(self, serializer):
+        serializer.save(is_override=True)
 
 # Existing views remain the same...
-class ProfileView(generics.RetrieveUpdateAPIView):
+class ProfileView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         return self.request.user
 
+    def destroy(self, request, *args, **kwargs):
+        # Account deletion: signed out everywhere now, data purged in the background
+        account_purge = purge.soft_delete_user(request.user)
+        return Response(PurgeSerializer(account_purge).data, status=status.HTTP_202_ACCEPTED)
+
+class PurgeListView(generics.ListAPIView):
+    """Deletions requested by the user, newest first; staff see everyone's"""
+    serializer_class = PurgeSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = Purge.objects.order_by("-created_at")
+        return queryset if self.request.user.is_staff else queryset.filter(requested_by=self.request.user)
+
+class PurgeDetailView(generics.RetrieveAPIView):
+    serializer_class = PurgeSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = Purge.objects.all()
+        return queryset if self.request.user.is_staff else queryset.filter(requested_by=self.request.user)
+
+class IngestionRunCursorPagination(CursorPagination):
+    """Keyset pages, newest run first; staff listings span every user's runs"""
+    ordering = ("-started_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+class IngestionRunListView(generics.ListAPIView):
+    """
+    Recent "fetch today" runs with per-stage timings, newest first; staff
+    see everyone's. ?status=failed and ?min_ms=5000 narrow to the runs
+    worth a look.
+    """
+    serializer_class = IngestionRunSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = IngestionRunCursorPagination
+
+    def get_queryset(self):
+        queryset = IngestionRun.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user=self.request.user)
+        params = self.request.query_params
+        if params.get("status"):
+            queryset = queryset.filter(status=params["status"])
+        if params.get("min_ms"):
+            try:
+                queryset = queryset.filter(duration_ms__gte=int(params["min_ms"]))
+            except ValueError:
+                raise ValidationError({"detail": "min_ms must be an integer."})
+        return queryset
+
+class IngestionRunDetailView(generics.RetrieveAPIView):
+    serializer_class = IngestionRunSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = IngestionRun.objects.all()
+        return queryset if self.request.user.is_staff else queryset.filter(user=self.request.user)
+
+class NotificationListView(generics.ListAPIView):
+    """The user's notifications (daily digests, see api.digests), newest first; ?unread=1 for unread only"""
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(user=self.request.user).select_related("digest")
+        if self.request.query_params.get("unread") in ("1", "true"):
+            queryset = queryset.filter(read_at__isnull=True)
+        return queryset.order_by("-created_at", "-id")
+
+class NotificationDetailView(generics.RetrieveUpdateAPIView):
+    """PATCH {"read": true} to mark a notification read"""
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Notification.objects.filter(user=self.request.user).select_related("digest")
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def notifications_read_all(request):
+    marked = Notification.objects.filter(user=request.user, read_at__isnull=True).update(read_at=timezone.now())
+    return Response({"marked": marked})
+
 # @api_view(['POST'])
 # @permission_classes([permissions.AllowAny])
 # def register(request):
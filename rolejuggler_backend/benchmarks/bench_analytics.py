@@ -0,0 +1,156 @@
+"""
+Productivity analytics benchmark.
+
+Builds a throwaway test database holding `--sessions` work sessions over
+about three years for one user, spread across `--jobs` jobs, plus tasks
+with deadlines, then times each stage of api.analytics.build() and the
+whole report for a `--days` window. Unless --skip-baseline, also times
+the straightforward version (ORM instances, a Python loop per session)
+computing only the heatmap and daily per-job totals. Run from
+rolejuggler_backend/:
+    python -m benchmarks.bench_analytics [--sessions 1000000] [--days 730]
+"""
+import argparse
+import collections
+import datetime
+import os
+import resource
+import time
+import zoneinfo
+
+import django
+import numpy as np
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rolejuggler_backend.settings')
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from api import analytics  # noqa: E402
+from api.models import User, Job, Task, WorkSession  # noqa: E402
+
+TASKS_PER_JOB = 200
+SPAN_DAYS = 3 * 365
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def populate(user, sessions, jobs, today):
+    rng = np.random.default_rng(7)
+    job_rows = Job.objects.bulk_create([Job(user=user, name=f"Job {i}", company=f"Co {i}") for i in range(jobs)])
+    first = today - datetime.timedelta(days=SPAN_DAYS)
+    deadlines = rng.integers(0, SPAN_DAYS, jobs * TASKS_PER_JOB)
+    lateness = rng.integers(-3, 3, jobs * TASKS_PER_JOB)
+    tasks = []
+    for i in range(jobs * TASKS_PER_JOB):
+        deadline = first + datetime.timedelta(days=int(deadlines[i]))
+        done = i % 4 != 0
+        tasks.append(Task(
+            user=user, job=job_rows[i % jobs] if i % 10 else None, title=f"Task {i}", deadline=deadline,
+            status='done' if done else 'todo', position=f"a{i:07d}",
+            completed_at=datetime.datetime.combine(deadline + datetime.timedelta(days=int(lateness[i])),
+                                                   datetime.time(15), datetime.timezone.utc) if done else None,
+        ))
+    task_ids = [task.id for task in Task.objects.bulk_create(tasks, batch_size=5000)]
+
+    # Work hours-ish starts, lengths skewed towards short sessions
+    base = datetime.datetime.combine(first, datetime.time.min, datetime.timezone.utc).timestamp()
+    starts = base + rng.integers(0, SPAN_DAYS, sessions) * 86400 + rng.normal(13 * 3600, 3 * 3600, sessions)
+    minutes = np.clip(rng.gamma(2.0, 20.0, sessions), 1, 600)
+    owners = rng.integers(0, len(task_ids), sessions)
+    with transaction.atomic(), connection.cursor() as cursor:
+        table = WorkSession._meta.db_table
+        for offset in range(0, sessions, 50000):
+            rows = []
+            for start, length, owner in zip(starts[offset:offset + 50000], minutes[offset:offset + 50000],
+                                            owners[offset:offset + 50000]):
+                begin = datetime.datetime.fromtimestamp(float(start), datetime.timezone.utc)
+                end = begin + datetime.timedelta(minutes=float(length))
+                rows.append((task_ids[owner], begin.replace(tzinfo=None).isoformat(' '),
+                             end.replace(tzinfo=None).isoformat(' '), int(length * 60000), begin.isoformat(' ')))
+            cursor.executemany(
+                f"INSERT INTO {table} (task_id, start_time, end_time, duration, created_at) VALUES (%s, %s, %s, %s, %s)",
+                rows,
+            )
+
+
+def baseline(user, days, tz, today):
+    """Heatmap and daily per-job minutes the obvious way"""
+    since = datetime.datetime.combine(today - datetime.timedelta(days=days - 1), datetime.time.min, tz)
+    grid = [[0.0] * 24 for _ in range(7)]
+    daily = collections.defaultdict(float)
+    for session in WorkSession.objects.filter(task__user=user, duration__gt=0, start_time__gte=since).select_related('task'):
+        start = timezone.localtime(session.start_time, tz)
+        remaining = session.duration / 60000
+        daily[(session.task.job_id, start.date())] += remaining
+        while remaining > 0:
+            chunk = min(remaining, 60 - start.minute - start.second / 60)
+            grid[start.weekday()][start.hour] += chunk
+            remaining -= chunk
+            start = (start + datetime.timedelta(minutes=chunk)).replace(second=0, microsecond=0)
+    return grid, daily
+
+
+def timed(label, fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    print(f"  {label:24} {(time.perf_counter() - started) * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, default=1_000_000)
+    parser.add_argument('--jobs', type=int, default=8)
+    parser.add_argument('--days', type=int, default=730, help="Report window")
+    parser.add_argument('--tz', default='Europe/Berlin')
+    parser.add_argument('--skip-baseline', action='store_true')
+    args = parser.parse_args()
+    tz = zoneinfo.ZoneInfo(args.tz)
+    today = datetime.date.today()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = User.objects.create_user(username='bench-analytics', email='analytics@example.com', password='x')
+        started = time.perf_counter()
+        populate(user, args.sessions, args.jobs, today)
+        print(f"populated {args.sessions:,} sessions in {time.perf_counter() - started:.1f}s")
+
+        first_day = (today - analytics.EPOCH).days - args.days + 1
+        lead = max(analytics.ROLLING_WINDOWS) - 1
+        since = datetime.datetime.combine(today - datetime.timedelta(days=args.days + lead), datetime.time.min, tz)
+        print(f"stages ({args.days}-day window):")
+        start, minutes, job = timed('load sessions', analytics.load_sessions, user, since)
+        local = timed('local time', analytics.local_seconds, start, tz)
+        day = local // analytics.DAY
+        timed('rolling focus', analytics.rolling_focus, day, minutes, job, first_day, args.days)
+        in_window = day >= first_day
+        timed('heatmap', analytics.heatmap, local[in_window], minutes[in_window])
+        timed('session lengths', analytics.session_lengths, minutes[in_window], job[in_window])
+        timed('load tasks', analytics.load_tasks, user)
+        print(f"  ({len(start):,} sessions loaded)")
+
+        started = time.perf_counter()
+        report = analytics.build(user, args.days, tz, today)
+        vectorized = time.perf_counter() - started
+        print(f"analytics.build: {vectorized * 1000:.0f} ms, {report['session_lengths']['sessions']:,} sessions "
+              f"in window (peak rss {peak_rss_mb():.0f} MB)")
+
+        if not args.skip_baseline:
+            started = time.perf_counter()
+            grid, _ = baseline(user, args.days, tz, today)
+            elapsed = time.perf_counter() - started
+            drift = float(np.abs(np.array(grid) - np.array(report['heatmap'])).max())
+            print(f"baseline (ORM + Python loop, heatmap and daily totals only): {elapsed * 1000:.0f} ms, "
+                  f"{elapsed / vectorized:.0f}x slower (max heatmap difference {drift:.1f} min)")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
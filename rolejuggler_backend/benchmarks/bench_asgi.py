@@ -0,0 +1,179 @@
+"""
+Concurrent-request throughput of the I/O-bound endpoints, WSGI vs ASGI.
+
+Starts the fake IMAP and Gemini servers (with round-trip latency standing
+in for the real providers) and fires `--requests` concurrent "fetch today"
+calls, one per user, followed by as many dashboard reads, at the
+project's handlers in-process:
+  * wsgi: the DRF views on a pool of `--threads` threads, like a gthread worker
+  * asgi-sync: the same DRF views under Django's ASGI handler
+  * asgi-async: the coroutine views of api.async_views (ASYNC_VIEWS=1)
+and reports wall time, requests/s and latency percentiles.
+The throttle buckets and LLM concurrency cap are raised so they don't hide
+the difference. A file-backed throwaway database is used so WSGI threads
+can write concurrently. Run from rolejuggler_backend/:
+    python -m benchmarks.bench_asgi [--requests 32] [--threads 8] [--messages 8]
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib
+import io
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rolejuggler_backend.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.asgi import get_asgi_application  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.urls import clear_url_caches  # noqa: E402
+from rest_framework.authtoken.models import Token  # noqa: E402
+
+from api import company_resolver  # noqa: E402
+from api.fake_imap_server import FakeIMAPServer  # noqa: E402
+from api.fake_llm_server import FakeGeminiServer  # noqa: E402
+from api.models import User  # noqa: E402
+
+MODES = ('wsgi', 'asgi-sync', 'asgi-async')
+
+
+def use_async_views(enabled):
+    """Rebuild the URLconf with settings.ASYNC_VIEWS = `enabled`"""
+    import api.urls
+    import rolejuggler_backend.urls
+    settings.ASYNC_VIEWS = enabled
+    importlib.reload(api.urls)
+    importlib.reload(rolejuggler_backend.urls)
+    clear_url_caches()
+
+
+def run_wsgi(requests, threads):
+    application = get_wsgi_application()
+    factory = RequestFactory()
+
+    def one(request):
+        method, path, token = request
+        environ = getattr(factory, method)(path, HTTP_AUTHORIZATION=f"Token {token}").environ
+        statuses = []
+        started = time.perf_counter()
+        body = b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+        assert body is not None
+        return int(statuses[0].split()[0]), time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(one, requests))
+
+
+def run_asgi(requests):
+    application = get_asgi_application()
+
+    async def one(request):
+        method, path, token = request
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'scheme': 'http',
+            'method': method.upper(), 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+            'root_path': '', 'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+            'headers': [(b'host', b'testserver'), (b'authorization', f"Token {token}".encode())],
+        }
+        finished = asyncio.Event()
+        sent = []
+
+        async def receive():
+            if not sent:
+                sent.append(True)
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        status = []
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif not message.get('more_body'):
+                finished.set()
+
+        started = time.perf_counter()
+        await application(scope, receive, send)
+        return status[0], time.perf_counter() - started
+
+    async def all_requests():
+        return await asyncio.gather(*(one(request) for request in requests))
+
+    return asyncio.run(all_requests())
+
+
+def report(mode, endpoint, results, seconds):
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(1 for code, _ in results if code >= 300)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{mode:10} {endpoint:11} {len(results):4} requests in {seconds:6.2f}s  {len(results) / seconds:7.1f} req/s  "
+          f"p50 {statistics.median(latencies) * 1000:7.0f} ms  p95 {p95 * 1000:7.0f} ms  errors {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=32, help="Concurrent requests (and users) per endpoint")
+    parser.add_argument('--threads', type=int, default=8, help="WSGI worker threads")
+    parser.add_argument('--messages', type=int, default=8, help="Messages in each mailbox")
+    parser.add_argument('--imap-latency', type=float, default=0.02, help="Fake IMAP seconds per command")
+    parser.add_argument('--llm-delay', type=float, default=0.2, help="Fake Gemini seconds per call")
+    args = parser.parse_args()
+
+    imap = FakeIMAPServer(latency=args.imap_latency).start()
+    gemini = FakeGeminiServer(delay=args.llm_delay).start()
+    settings.IMAP_HOST, settings.IMAP_PORT, settings.IMAP_SSL = '127.0.0.1', imap.port, False
+    settings.GEMINI_API_BASE = gemini.base_url
+    settings.LLM_MAX_CONCURRENCY = 4 * args.requests
+    settings.THROTTLE_BUCKETS = {'ingestion': {'capacity': 1000, 'per_minute': 1000}}
+
+    workdir = tempfile.mkdtemp()
+    connection.settings_dict['TEST']['NAME'] = os.path.join(workdir, 'bench.sqlite3')
+    # Writers queue for the lock instead of failing with "database is locked"
+    connection.settings_dict['OPTIONS'].update(transaction_mode='IMMEDIATE', timeout=30)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        tokens = {}
+        for mode in MODES:
+            users = [
+                User.objects.create_user(username=f"{mode}-{i}", email=f"{mode}-{i}@example.com",
+                                         password='x', app_password='password')
+                for i in range(args.requests)
+            ]
+            imap.populate([user.email for user in users], args.messages)
+            tokens[mode] = [Token.objects.create(user=user).key for user in users]
+        connection.close()
+
+        for mode in MODES:
+            use_async_views(mode == 'asgi-async')
+            cache.clear()
+            company_resolver.cache.clear()
+            for endpoint, method, path in (('fetch-today', 'post', '/api/emails/fetch-today/'),
+                                           ('dashboard', 'get', '/api/dashboard/')):
+                requests = [(method, path, token) for token in tokens[mode]]
+                started = time.perf_counter()
+                # The views print what they fetched
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results = run_wsgi(requests, args.threads) if mode == 'wsgi' else run_asgi(requests)
+                report(mode, endpoint, results, time.perf_counter() - started)
+    finally:
+        imap.stop()
+        gemini.stop()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Dataset export/import benchmark.
+
+Builds a throwaway test database, fills it with `--rows` rows spread over
+the exported resources, then times a full NDJSON export and re-import and
+reports peak RSS. Run from rolejuggler_backend/:
+    python -m benchmarks.bench_backup [--rows 1000000]
+"""
+import argparse
+import datetime
+import os
+import resource
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rolejuggler_backend.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from api import backup  # noqa: E402
+from api.models import User, Job, Task, WorkSession, Meeting, StickyNote, Update  # noqa: E402
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def populate(user, rows):
+    """Roughly: 1% jobs/meetings/notes, 30% tasks, 40% sessions, rest updates"""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    jobs = Job.objects.bulk_create(
+        [Job(user=user, name=f"Job {i}", company=f"Co {i}") for i in range(max(1, rows // 100))]
+    )
+    n_tasks = rows * 30 // 100
+    for offset in range(0, n_tasks, 10000):
+        Task.objects.bulk_create([
+            Task(user=user, job=jobs[i % len(jobs)], title=f"Task {i}", description="x" * 40)
+            for i in range(offset, min(offset + 10000, n_tasks))
+        ])
+    task_ids = list(Task.objects.filter(user=user).values_list('id', flat=True))
+    n_sessions = rows * 40 // 100
+    for offset in range(0, n_sessions, 10000):
+        WorkSession.objects.bulk_create([
+            WorkSession(task_id=task_ids[i % len(task_ids)], start_time=now, duration=60000)
+            for i in range(offset, min(offset + 10000, n_sessions))
+        ])
+    Meeting.objects.bulk_create([
+        Meeting(user=user, job=jobs[i % len(jobs)], title=f"Meeting {i}",
+                meeting_date=now.date(), meeting_time=datetime.time(10, 0))
+        for i in range(rows // 100)
+    ])
+    StickyNote.objects.bulk_create([StickyNote(user=user, content=f"Note {i}") for i in range(rows // 100)])
+    n_updates = rows - Job.objects.count() - n_tasks - n_sessions - 2 * (rows // 100)
+    for offset in range(0, n_updates, 10000):
+        Update.objects.bulk_create([
+            Update(user=user, title=f"Update {i}", message="From: someone@example.com")
+            for i in range(offset, min(offset + 10000, n_updates))
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--path', default='/tmp/rolejuggler-export.ndjson')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        source = User.objects.create_user(username='bench-src', email='src@example.com', password='x')
+        target = User.objects.create_user(username='bench-dst', email='dst@example.com', password='x')
+
+        started = time.perf_counter()
+        populate(source, args.rows)
+        print(f"populated {args.rows} rows in {time.perf_counter() - started:.1f}s "
+              f"(rss {peak_rss_mb():.0f} MB)")
+
+        started = time.perf_counter()
+        size = 0
+        with open(args.path, 'w') as out:
+            for chunk in backup.export_ndjson(source):
+                size += len(chunk)
+                out.write(chunk)
+        elapsed = time.perf_counter() - started
+        print(f"export: {elapsed:.1f}s, {args.rows / elapsed:,.0f} rows/s, {size / 1e6:.0f} MB "
+              f"(peak rss {peak_rss_mb():.0f} MB)")
+
+        started = time.perf_counter()
+        with open(args.path) as lines:
+            counts = backup.import_ndjson(target, lines)
+        elapsed = time.perf_counter() - started
+        print(f"import: {elapsed:.1f}s, {sum(counts.values()) / elapsed:,.0f} rows/s "
+              f"(peak rss {peak_rss_mb():.0f} MB)")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        if os.path.exists(args.path):
+            os.remove(args.path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Local email classifier: accuracy and latency on the labeled fixture corpus.
+
+K-fold cross validation over benchmarks/fixtures/labeled_emails.csv,
+compared against the keyword heuristic. Folds are grouped by the first
+words of the subject so near-duplicate messages (same notification
+template) never sit on both sides of a split. Also reports how many messages
+would still be escalated to the LLM at the configured threshold. Run from
+rolejuggler_backend/:
+    python -m benchmarks.bench_classifier [--folds 5] [--threshold 0.9]
+"""
+import argparse
+import csv
+import os
+import random
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rolejuggler_backend.settings')
+django.setup()
+
+from api.classifier import TOKEN_RE, NaiveBayesClassifier, confidence_threshold  # noqa: E402
+from api.ingestion import keyword_type  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(__file__), 'fixtures', 'labeled_emails.csv')
+
+
+def group_key(subject):
+    return " ".join(TOKEN_RE.findall(subject.lower())[:2])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=confidence_threshold())
+    args = parser.parse_args()
+
+    with open(CORPUS, newline='') as f:
+        rows = [(r['subject'], r['sender'], r['type']) for r in csv.DictReader(f)]
+    groups = sorted({group_key(row[0]) for row in rows})
+    random.Random(0).shuffle(groups)
+    fold_of = {group: i % args.folds for i, group in enumerate(groups)}
+
+    correct = keyword_correct = confident = confident_correct = 0
+    predict_seconds = learn_seconds = 0.0
+    for fold in range(args.folds):
+        test = [row for row in rows if fold_of[group_key(row[0])] == fold]
+        train = [row for row in rows if fold_of[group_key(row[0])] != fold]
+
+        clf = NaiveBayesClassifier()
+        started = time.perf_counter()
+        for subject, sender, label in train:
+            clf.learn(subject, sender, label)
+        learn_seconds += time.perf_counter() - started
+
+        for subject, sender, label in test:
+            started = time.perf_counter()
+            predicted, confidence = clf.predict(subject, sender)
+            predict_seconds += time.perf_counter() - started
+            correct += predicted == label
+            keyword_correct += keyword_type(subject) == label
+            if confidence >= args.threshold:
+                confident += 1
+                confident_correct += predicted == label
+
+    n = len(rows)
+    print(f"corpus: {n} labeled messages, {args.folds}-fold")
+    print(f"local classifier accuracy: {correct / n:.1%} (keyword heuristic: {keyword_correct / n:.1%})")
+    print(f"threshold {args.threshold}: {confident / n:.1%} handled locally "
+          f"({confident_correct / max(confident, 1):.1%} accurate), {1 - confident / n:.1%} escalated to LLM")
+    print(f"latency: predict {predict_seconds / n * 1e6:.1f} us, "
+          f"learn {learn_seconds / (n * (args.folds - 1)) * 1e6:.1f} us per message")
+
+
+if __name__ == '__main__':
+    main()
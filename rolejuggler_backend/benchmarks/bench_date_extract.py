@@ -0,0 +1,102 @@
+"""
+Meeting date/time extraction: accuracy and throughput.
+
+Scores the tokenizer-based extractor against the old regex/strptime
+implementation on benchmarks/fixtures/meeting_dates.csv (subject, Date
+header anchor, expected date and time in the server timezone). Run from
+rolejuggler_backend/:
+    python -m benchmarks.bench_date_extract [--repeat 2000]
+"""
+import argparse
+import csv
+import datetime
+import os
+import re
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rolejuggler_backend.settings')
+django.setup()
+
+from api.ingestion import extract_meeting_datetime  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(__file__), 'fixtures', 'meeting_dates.csv')
+
+
+def legacy_extract(subject, anchor=None):
+    """The previous implementation: three date regexes x four strptime formats, two time regexes"""
+    date_patterns = [r'(\d{1,2}/\d{1,2}/\d{4})', r'(\d{1,2}-\d{1,2}-\d{4})', r'(\d{1,2} \w+ \d{4})']
+    time_patterns = [r'(\d{1,2}:\d{2}\s*(?:AM|PM|am|pm))', r'(\d{1,2}\s*(?:AM|PM|am|pm))']
+    meeting_date = meeting_time = None
+    for pattern in date_patterns:
+        match = re.search(pattern, subject)
+        if match:
+            for fmt in ['%m/%d/%Y', '%m-%d-%Y', '%d %B %Y', '%d %b %Y']:
+                try:
+                    meeting_date = datetime.datetime.strptime(match.group(1), fmt).date()
+                    break
+                except ValueError:
+                    continue
+    for pattern in time_patterns:
+        match = re.search(pattern, subject)
+        if match:
+            time_str = match.group(1).upper()
+            try:
+                meeting_time = datetime.datetime.strptime(time_str, '%I:%M %p').time()
+            except ValueError:
+                try:
+                    meeting_time = datetime.datetime.strptime(time_str, '%I %p').time()
+                except ValueError:
+                    pass
+    return meeting_date, meeting_time
+
+
+def load_corpus():
+    cases = []
+    with open(CORPUS, newline='') as f:
+        for row in csv.DictReader(f):
+            cases.append((
+                row['subject'],
+                datetime.date.fromisoformat(row['anchor']),
+                datetime.date.fromisoformat(row['date']) if row['date'] else None,
+                datetime.time.fromisoformat(row['time']) if row['time'] else None,
+            ))
+    return cases
+
+
+def score(extract, cases, verbose=False):
+    correct = 0
+    for subject, anchor, expected_date, expected_time in cases:
+        got = extract(subject, anchor)
+        if got == (expected_date, expected_time):
+            correct += 1
+        elif verbose:
+            print(f"  miss: {subject!r} -> {got}, expected {(expected_date, expected_time)}")
+    return correct / len(cases)
+
+
+def throughput(extract, cases, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for subject, anchor, _, _ in cases:
+            extract(subject, anchor)
+    return repeat * len(cases) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--verbose', action='store_true', help='List the cases each extractor gets wrong')
+    args = parser.parse_args()
+
+    cases = load_corpus()
+    print(f"corpus: {len(cases)} subjects")
+    for name, extract in (('legacy', legacy_extract), ('tokenizer', extract_meeting_datetime)):
+        accuracy = score(extract, cases, args.verbose)
+        rate = throughput(extract, cases, args.repeat)
+        print(f"{name:>10}: accuracy {accuracy:.1%}, {rate:,.0f} subjects/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Daily digest benchmark.
+
+Builds a throwaway test database with `--users` users, each with a few
+open tasks due around today and a couple of meetings, then runs
+api.digests for all of them after piling on more and more finished
+history per user (`--history`, done tasks with past deadlines). With the
+partial index on open tasks the time per user should stay flat as the
+history grows. Also prints the task query's plan. Run from
+rolejuggler_backend/:
+    python -m benchmarks.bench_digests [--users 2000] [--history 0 50 250]
+"""
+import argparse
+import datetime
+import os
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rolejuggler_backend.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+
+from api import digests  # noqa: E402
+from api.models import Digest, Meeting, Notification, Task, User  # noqa: E402
+
+
+def populate(users, today):
+    User.objects.bulk_create([
+        User(username=f"digest-{i}", email=f"digest-{i}@example.com", password='x') for i in range(users)
+    ], batch_size=2000)
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    tasks, meetings = [], []
+    for user_id in user_ids:
+        for offset in (-4, -1, 0, 1, 2, 10):
+            tasks.append(Task(user_id=user_id, title=f"Due {offset}", deadline=today + datetime.timedelta(days=offset),
+                              position=f"a{offset + 10}"))
+        meetings.append(Meeting(user_id=user_id, title="Interview", meeting_date=today + datetime.timedelta(days=1),
+                                meeting_time=datetime.time(10)))
+        meetings.append(Meeting(user_id=user_id, title="Standup", meeting_date=today - datetime.timedelta(days=30),
+                                meeting_time=datetime.time(9), recurrence_rule="FREQ=WEEKLY"))
+    Task.objects.bulk_create(tasks, batch_size=5000)
+    Meeting.objects.bulk_create(meetings, batch_size=5000)
+    return user_ids
+
+
+def add_history(user_ids, per_user, today):
+    """`per_user` more finished tasks per user, due over the past two years"""
+    batch = []
+    for user_id in user_ids:
+        for n in range(per_user):
+            deadline = today - datetime.timedelta(days=1 + n % 730)
+            batch.append(Task(user_id=user_id, title="Old", deadline=deadline, status='done', position=f"h{n}"))
+        if len(batch) >= 20000:
+            Task.objects.bulk_create(batch, batch_size=5000)
+            batch = []
+    Task.objects.bulk_create(batch, batch_size=5000)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--history', type=int, nargs='+', default=[0, 50, 250],
+                        help="Finished tasks per user, cumulative steps")
+    parser.add_argument('--chunk-size', type=int)
+    args = parser.parse_args()
+    today = datetime.date(2025, 3, 10)
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user_ids = populate(args.users, today)
+        horizon = today + datetime.timedelta(days=digests.due_soon_days())
+        sql, params = Task.objects.filter(user_id__in=user_ids[:3], deadline__lte=horizon).exclude(status='done') \
+            .values('id').query.sql_with_params()
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                print("task query plan:", "; ".join(row[-1] for row in cursor.fetchall()))
+
+        history = 0
+        for step in args.history:
+            add_history(user_ids, step - history, today)
+            history = step
+            Notification.objects.all().delete()
+            Digest.objects.all().delete()
+            if connection.vendor == 'sqlite':
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                for users, written in digests.run(today, args.chunk_size):
+                    pass
+            elapsed = time.perf_counter() - started
+            print(f"{Task.objects.count():>9,} tasks ({history:>4} done per user): {written:,} digests for "
+                  f"{users:,} users in {elapsed:.2f}s, {elapsed / users * 1000:.2f} ms/user, {len(queries)} queries")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
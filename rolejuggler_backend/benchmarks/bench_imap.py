@@ -0,0 +1,103 @@
+"""
+Multi-user IMAP ingestion throughput against the in-repo fake IMAP server.
+
+Starts api.fake_imap_server with N simulated mailboxes (and a per-command
+latency standing in for a real provider's round trip), then ingests them:
+  * sequential: one blocking imaplib session per user with a FETCH per
+    message, as the "fetch today" view does
+  * async: api.async_ingestion with the given concurrency/per-host limits
+Everything is saved to a throwaway test database. Run from rolejuggler_backend/:
+    python -m benchmarks.bench_imap [--users 300] [--messages 20] [--latency 0.01]
+"""
+import argparse
+import email
+import imaplib
+import os
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rolejuggler_backend.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from api import company_resolver  # noqa: E402
+from api.async_ingestion import run_ingestion  # noqa: E402
+from api.classifier import load_for_user as load_email_classifier  # noqa: E402
+from api.fake_imap_server import FakeIMAPServer  # noqa: E402
+from api.ingestion import classify_message, save_classified_batch  # noqa: E402
+from api.models import Meeting, Update, User  # noqa: E402
+
+
+def ingest_sequential(users, port):
+    for user in users:
+        imap = imaplib.IMAP4('127.0.0.1', port)
+        imap.login(user.email, user.app_password)
+        imap.select('INBOX')
+        _, data = imap.search(None, 'SINCE', '01-Jan-2000')
+        classifier = load_email_classifier(user)
+        items = []
+        for mid in reversed(data[0].split()):
+            _, msg_data = imap.fetch(mid, '(RFC822.HEADER)')
+            item = classify_message(email.message_from_bytes(msg_data[0][1]), use_llm=False, classifier=classifier)
+            if item is not None:
+                items.append(item)
+        imap.logout()
+        if items:
+            save_classified_batch(user, items)
+
+
+def reset():
+    Update.objects.all().delete()
+    Meeting.objects.all().delete()
+    company_resolver.cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--messages', type=int, default=20, help='Messages per mailbox')
+    parser.add_argument('--latency', type=float, default=0.01, help='Fake server delay per command (s)')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--per-host', type=int, nargs='+', default=[10, 50])
+    parser.add_argument('--skip-sequential', action='store_true')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        users = [
+            User(username=f'imap{i}', email=f'imap{i}@example.com', app_password='password')
+            for i in range(args.users)
+        ]
+        users = User.objects.bulk_create(users)
+        with FakeIMAPServer(latency=args.latency).populate([u.email for u in users], args.messages) as server:
+            total = args.users * args.messages
+            if not args.skip_sequential:
+                started = time.perf_counter()
+                ingest_sequential(users, server.port)
+                elapsed = time.perf_counter() - started
+                print(f"sequential imaplib: {elapsed:.2f}s, {args.users / elapsed:,.1f} mailboxes/s, "
+                      f"{total / elapsed:,.0f} msg/s, {Update.objects.count()} updates")
+
+            for per_host in args.per_host:
+                reset()
+                server.max_active = 0
+                started = time.perf_counter()
+                results = run_ingestion(
+                    users, server=('127.0.0.1', server.port, False), use_llm=False,
+                    concurrency=args.concurrency, per_host=per_host,
+                )
+                elapsed = time.perf_counter() - started
+                errors = sum(1 for r in results if r['error'])
+                print(f"async per_host={per_host}: {elapsed:.2f}s, {args.users / elapsed:,.1f} mailboxes/s, "
+                      f"{total / elapsed:,.0f} msg/s, {Update.objects.count()} updates, "
+                      f"peak connections {server.max_active}, {errors} errors")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Startup import-time benchmark.
+
+Runs Django setup plus the project's URLconf (which pulls in api.views and
+everything it imports) in fresh interpreters under `python -X importtime`,
+then reports the median total import time, the slowest modules by
+cumulative time and self time per top-level package. Exits non-zero if a
+module that should only load on first use (the Gemini SDK) shows up, or
+if the median total goes over `--budget-ms`, so it can gate CI.
+Run from rolejuggler_backend/:
+    python -m benchmarks.bench_importtime [--runs 5] [--top 15] [--budget-ms 1500]
+    python -m benchmarks.bench_importtime --with-sdk     # what eager SDK loading costs
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP = (
+    "import os, django;"
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rolejuggler_backend.settings');"
+    "django.setup();"
+    "import rolejuggler_backend.urls"
+)
+
+# Loaded lazily on first use; importing them at startup is a regression
+LAZY_MODULES = ('google.generativeai', 'google.genai', 'grpc')
+
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def sample(code):
+    """[(module, self_us, cumulative_us, depth)] for one fresh interpreter running `code`"""
+    env = {**os.environ, 'PYTHONWARNINGS': 'ignore'}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, help="Fail if the median total import time is above this")
+    parser.add_argument('--with-sdk', action='store_true', help="Also import google.generativeai, for comparison")
+    args = parser.parse_args()
+
+    code = STARTUP + (";import google.generativeai" if args.with_sdk else "")
+    runs = [sample(code) for _ in range(args.runs)]
+    # The first interpreter also pays for writing .pyc files
+    if len(runs) > 1:
+        runs = runs[1:]
+
+    totals = [sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000 for rows in runs]
+    rows = runs[totals.index(statistics.median_low(totals))]
+    total_ms = statistics.median(totals)
+    print(f"{len(rows)} modules, median total {total_ms:.0f} ms over {len(runs)} runs "
+          f"(min {min(totals):.0f}, max {max(totals):.0f})")
+
+    print(f"\nslowest {args.top} by cumulative time:")
+    for module, _, cumulative, depth in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {'  ' * depth}{module}")
+
+    per_package = defaultdict(int)
+    for module, self_us, _, _ in rows:
+        per_package[module.split('.')[0]] += self_us
+    print("\nself time by top-level package:")
+    for package, self_us in sorted(per_package.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    failed = False
+    loaded = sorted({module for module, *_ in rows if module.startswith(LAZY_MODULES)})
+    if loaded and not args.with_sdk:
+        print(f"\nFAIL: imported at startup but should load on first use: {', '.join(loaded[:10])}")
+        failed = True
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"\nFAIL: median total {total_ms:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Offline ingestion benchmark (no network).
+
+Generates a synthetic mbox, then runs `manage.py ingest_mailbox --no-llm`
+against a throwaway test database for each worker count. Run from
+rolejuggler_backend/:
+    python -m benchmarks.bench_ingest [--messages 20000] [--workers 1 2 4]
+"""
+import argparse
+import mailbox
+import os
+import random
+import tempfile
+import time
+from email.message import EmailMessage
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rolejuggler_backend.settings')
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from api.models import User, Update  # noqa: E402
+
+SUBJECTS = [
+    "Project update for {n}",
+    "Meeting on {d}/1{n}/2025 {h}:30 PM",
+    "Weekly sync call",
+    "Action required: todo #{n}",
+    "Lunch on friday?",
+    "Newsletter issue {n}",
+    "Proposal review agenda",
+]
+DOMAINS = ["acme.com", "mail.google.com", "example.co.uk", "startup.io"]
+
+
+def write_mbox(path, count, seed=7):
+    rng = random.Random(seed)
+    box = mailbox.mbox(path)
+    box.lock()
+    for n in range(count):
+        msg = EmailMessage()
+        msg["Subject"] = rng.choice(SUBJECTS).format(n=n % 10, d=rng.randint(1, 12), h=rng.randint(1, 11))
+        msg["From"] = f"Sender {n % 50} <sender{n % 50}@{rng.choice(DOMAINS)}>"
+        msg["Date"] = "Mon, 06 Jan 2025 09:00:00 +0000"
+        msg.set_content("Hello,\n\n" + "Lorem ipsum dolor sit amet. " * 20)
+        box.add(msg)
+    box.flush()
+    box.unlock()
+    box.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.mbox')
+        write_mbox(path, args.messages)
+        try:
+            user = User.objects.create_user(username='bench', email='bench@example.com', password='x')
+            for workers in args.workers:
+                Update.objects.filter(user=user).delete()
+                started = time.perf_counter()
+                call_command(
+                    'ingest_mailbox', 'bench', path, '--no-llm', '--workers', str(workers),
+                    '--progress-every', str(args.messages * 10), stdout=open(os.devnull, 'w'),
+                )
+                elapsed = time.perf_counter() - started
+                print(f"workers={workers}: {elapsed:.2f}s, {args.messages / elapsed:,.0f} msg/s, "
+                      f"{Update.objects.filter(user=user).count()} updates")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
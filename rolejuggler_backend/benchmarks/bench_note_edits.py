@@ -0,0 +1,136 @@
+"""
+Sticky-note autosave benchmark: whole-content PATCH vs delta edits.
+
+Replays one simulated typing session on a `--length` character note
+(`--keystrokes` edits at a cursor, mostly typing with some backspacing,
+one every `--typing-ms`) through the API in a throwaway test database,
+saving it three ways:
+  * patch: PATCH the whole content after every keystroke
+  * delta: POST one splice per keystroke to /edits/
+  * coalesced: POST one compacted splice every `--interval-ms`, as
+    src/services/noteAutosave.js does
+and reports requests, request and response bytes, UPDATE statements and
+the bytes of SQL they carried, and server time per save. Run from
+rolejuggler_backend/:
+    python -m benchmarks.bench_note_edits [--length 2000] [--keystrokes 300]
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rolejuggler_backend.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api.models import StickyNote, User  # noqa: E402
+
+WORDS = "follow up with the recruiter about next steps and send the signed offer letter".split()
+
+
+def session(length, keystrokes, seed=3):
+    """Note text after each keystroke of one editing session, starting from a `length` character note"""
+    rng = random.Random(seed)
+    text = " ".join(rng.choice(WORDS) for _ in range(length // 5))[:length]
+    cursor = rng.randrange(len(text))
+    states = [text]
+    for _ in range(keystrokes):
+        if rng.random() < 0.05:
+            cursor = rng.randrange(len(text))  # clicks somewhere else
+        if rng.random() < 0.15 and cursor:
+            text = text[:cursor - 1] + text[cursor:]
+            cursor -= 1
+        else:
+            text = text[:cursor] + rng.choice("etaoin shrdlu") + text[cursor:]
+            cursor += 1
+        states.append(text)
+    return states
+
+
+def splice(before, after):
+    """[start, delete, insert] turning `before` into `after` (same as diffSplice on the client)"""
+    start = 0
+    shortest = min(len(before), len(after))
+    while start < shortest and before[start] == after[start]:
+        start += 1
+    end = 0
+    while end < shortest - start and before[len(before) - 1 - end] == after[len(after) - 1 - end]:
+        end += 1
+    return [start, len(before) - end - start, after[start:len(after) - end]]
+
+
+def replay(client, note, saves, mode):
+    """Send `saves` (texts to save, in order); returns the totals"""
+    totals = {'requests': 0, 'request_bytes': 0, 'response_bytes': 0, 'updates': 0, 'update_bytes': 0, 'ms': 0.0}
+    saved, revision = saves[0], 0
+    for text in saves[1:]:
+        if text == saved:
+            continue
+        if mode == 'patch':
+            path, method, body = f"/api/sticky-notes/{note.pk}/", client.patch, {"content": text}
+        else:
+            path, method, body = f"/api/sticky-notes/{note.pk}/edits/", client.post, \
+                {"revision": revision, "ops": [splice(saved, text)]}
+        payload = json.dumps(body, separators=(',', ':'))
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = method(path, payload, content_type='application/json')
+            totals['ms'] += (time.perf_counter() - started) * 1000
+        assert response.status_code == 200, response.content
+        revision = response.data['revision']
+        saved = text
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        totals['requests'] += 1
+        totals['request_bytes'] += len(payload.encode())
+        totals['response_bytes'] += len(response.content)
+        totals['updates'] += len(updates)
+        totals['update_bytes'] += sum(len(sql.encode()) for sql in updates)
+    note.refresh_from_db()
+    assert note.content == saves[-1]
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--length', type=int, default=2000, help="Characters in the note before editing")
+    parser.add_argument('--keystrokes', type=int, default=300)
+    parser.add_argument('--typing-ms', type=int, default=150, help="Time between keystrokes")
+    parser.add_argument('--interval-ms', type=int, default=1500, help="Coalesced autosave interval")
+    args = parser.parse_args()
+
+    states = session(args.length, args.keystrokes)
+    every = max(1, args.interval_ms // args.typing_ms)
+    coalesced = states[::every] + ([states[-1]] if (len(states) - 1) % every else [])
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = User.objects.create_user(username='bench-notes', email='notes@example.com', password='x')
+        client = APIClient()
+        client.force_authenticate(user)
+        results = {}
+        for mode, saves in (('patch', states), ('delta', states), ('coalesced', coalesced)):
+            note = StickyNote.objects.create(user=user, content=states[0])
+            results[mode] = replay(client, note, saves, 'patch' if mode == 'patch' else 'delta')
+
+        print(f"{args.keystrokes} keystrokes on a {args.length}-character note, coalescing every {args.interval_ms} ms")
+        base = results['patch']
+        for mode, totals in results.items():
+            print(f"{mode:10} {totals['requests']:4} saves  request {totals['request_bytes'] / 1024:8.1f} KiB  "
+                  f"response {totals['response_bytes'] / 1024:7.1f} KiB  {totals['updates']:4} UPDATEs "
+                  f"{totals['update_bytes'] / 1024:8.1f} KiB SQL  {totals['ms'] / max(1, totals['requests']):5.2f} ms/save"
+                  + ("" if mode == 'patch' else
+                     f"  ({base['request_bytes'] / max(1, totals['request_bytes']):.0f}x less sent, "
+                     f"{base['update_bytes'] / max(1, totals['update_bytes']):.0f}x less written)"))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+List endpoint payload benchmark.
+
+Builds a throwaway test database with `--tasks` tasks and `--meetings`
+meetings (with realistic description lengths), then requests the list
+endpoints full and with the frontend's sparse fieldsets, uncompressed,
+gzip and brotli (if installed), reporting body size and median latency.
+Run from rolejuggler_backend/:
+    python -m benchmarks.bench_payloads [--tasks 2000] [--meetings 500]
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rolejuggler_backend.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api import middleware  # noqa: E402
+from api.models import User, Job, Task, Meeting  # noqa: E402
+
+WORDS = "please review the attached notes before we sync on the roadmap hiring budget and launch".split()
+
+ENDPOINTS = [
+    ('tasks', '/api/tasks/', 'id,title,status,priority,deadline,job_name,job_color'),
+    ('meetings', '/api/meetings/', 'id,title,company,meeting_date,meeting_time,duration'),
+]
+
+
+def text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def populate(user, n_tasks, n_meetings, seed=42):
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    jobs = Job.objects.bulk_create([Job(user=user, name=f"Job {i}", company=f"Co {i}") for i in range(5)])
+    Task.objects.bulk_create([
+        Task(user=user, job=jobs[i % len(jobs)], title=f"Task {i}", description=text(rng, rng.randint(20, 200)),
+             deadline=today + datetime.timedelta(days=rng.randint(0, 30)))
+        for i in range(n_tasks)
+    ])
+    Meeting.objects.bulk_create([
+        Meeting(user=user, job=jobs[i % len(jobs)], title=f"Meeting {i}", company=f"Co {i % 5}",
+                meeting_date=today + datetime.timedelta(days=rng.randint(0, 30)),
+                meeting_time=datetime.time(rng.randint(8, 17)), description=text(rng, rng.randint(50, 300)))
+        for i in range(n_meetings)
+    ])
+
+
+def measure(client, url, encoding, repeat):
+    headers = {'HTTP_ACCEPT_ENCODING': encoding} if encoding else {}
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url, **headers)
+        timings.append((time.perf_counter() - started) * 1000)
+    assert response.status_code == 200, response.status_code
+    return len(response.content), statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tasks', type=int, default=2000)
+    parser.add_argument('--meetings', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    encodings = [None, 'gzip'] + (['br'] if middleware.brotli is not None else [])
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = User.objects.create_user(username='bench', email='bench@example.com', password='x')
+        populate(user, args.tasks, args.meetings)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        for name, url, fields in ENDPOINTS:
+            baseline = None
+            for label, query in (('full', ''), ('sparse', f'?fields={fields}')):
+                for encoding in encodings:
+                    size, median = measure(client, url + query, encoding, args.repeat)
+                    baseline = baseline or size
+                    print(f"{name:9} {label:6} {encoding or 'identity':8} {size / 1024:9.1f} KB "
+                          f"({size / baseline:6.1%})  median {median:7.1f} ms")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Auto-planner benchmark.
+
+Run from rolejuggler_backend/:
+    python -m benchmarks.bench_planner [--tasks 1000] [--days 14]
+"""
+import argparse
+import datetime
+import random
+import time
+
+from api import planner
+
+
+def make_dataset(n_tasks, days, seed=42):
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    tasks = [
+        {
+            'id': i,
+            'title': f"Task {i}",
+            'priority': rng.choice(['low', 'medium', 'high']),
+            'deadline': today + datetime.timedelta(days=rng.randint(0, days * 2)) if rng.random() < 0.8 else None,
+            'total_time_spent': rng.randint(0, 3 * 60) * planner.MS_PER_MINUTE,
+        }
+        for i in range(n_tasks)
+    ]
+    meetings = [
+        {
+            'meeting_date': today + datetime.timedelta(days=rng.randint(0, days - 1)),
+            'meeting_time': datetime.time(rng.randint(9, 17), rng.choice([0, 30])),
+            'duration': rng.choice([30, 60]),
+        }
+        for _ in range(days * 4)
+    ]
+    return tasks, meetings, today
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tasks', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    tasks, meetings, today = make_dataset(args.tasks, args.days)
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        plan = planner.build_plan(tasks, meetings, today, args.days)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    print(f"tasks={args.tasks} days={args.days} blocks={len(plan['blocks'])} "
+          f"unscheduled={len(plan['unscheduled'])}")
+    print(f"median={timings[len(timings) // 2]:.2f}ms max={timings[-1]:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,18 @@ ASGI config for rolejuggler_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+To serve the API from an ASGI server with the async ingestion and dashboard
+views (api.async_views), from rolejuggler_backend/:
+
+    export ASYNC_VIEWS=1 REDIS_URL=redis://localhost:6379/0
+    gunicorn rolejuggler_backend.asgi:application -k uvicorn.workers.UvicornWorker -w 4
+
+(or ``uvicorn rolejuggler_backend.asgi:application --workers 4``). REDIS_URL
+gives the workers a shared cache for throttles, single-flight locks and
+dashboard snapshots. One worker per core is enough: requests waiting on
+IMAP or the LLM hold no thread. benchmarks/bench_asgi.py compares
+throughput with the WSGI path.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -116,6 +118,15 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Cache (throttle buckets, ingestion locks): Redis when configured, per-process memory otherwise
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
@@ -149,6 +160,82 @@ REST_FRAMEWORK = {
 # Custom user model
 AUTH_USER_MODEL = 'api.User'
 
+# Local email classifier: below this confidence the LLM is asked instead
+EMAIL_CLASSIFIER_CONFIDENCE = 0.9
+
+# Gemini / LLM client
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
+# Set to call the REST API directly, e.g. the local fake server (python -m api.fake_llm_server)
+GEMINI_API_BASE = os.environ.get('GEMINI_API_BASE') or None
+LLM_TIMEOUT_SECONDS = 10.0
+LLM_MAX_CONCURRENCY = 4
+LLM_BREAKER_FAILURES = 5  # consecutive failures before falling back to the heuristic
+LLM_BREAKER_RESET_SECONDS = 60.0
+
+# IMAP ingestion (python manage.py ingest_imap)
+IMAP_HOST = os.environ.get('IMAP_HOST', 'imap.gmail.com')
+IMAP_PORT = int(os.environ.get('IMAP_PORT', 993))
+IMAP_SSL = os.environ.get('IMAP_SSL', '1') != '0'
+IMAP_TIMEOUT_SECONDS = 30.0
+IMAP_MAX_CONCURRENT_USERS = 100
+IMAP_CONNECTIONS_PER_HOST = 10
+# Bytes of each relevant message's text part fetched for classification
+EMAIL_SNIPPET_BYTES = 2048
+
+# Background polling (python manage.py poll_mailboxes): per-user intervals adapt within these
+POLL_MIN_INTERVAL_SECONDS = 60.0
+POLL_MAX_INTERVAL_SECONDS = 1800.0
+POLL_MAX_AUTH_BACKOFF_SECONDS = 6 * 3600.0
+
+# Per-user token buckets for expensive endpoints (api.throttling): burst
+# capacity and tokens refilled per minute. Kept in the default cache, which
+# must be shared between workers (set REDIS_URL) for the limits to hold.
+THROTTLE_BUCKETS = {
+    'ingestion': {'capacity': 3, 'per_minute': 1},
+    'mail_body': {'capacity': 20, 'per_minute': 10},
+    'backup': {'capacity': 2, 'per_minute': 0.2},
+}
+# A "fetch today" run holds its lock at most this long; concurrent clicks wait this long for its result
+INGESTION_LOCK_SECONDS = 120.0
+INGESTION_COALESCE_WAIT_SECONDS = 60.0
+# "Fetch today" runs are traced stage by stage (api.tracing); only the newest are kept per user
+INGESTION_RUNS_PER_USER = 50
+
+# Updates older than this are moved to the archive table (python manage.py archive_updates)
+UPDATES_RETENTION_DAYS = 90
+UPDATES_ARCHIVE_BATCH_SIZE = 1000
+
+# Deleted jobs and accounts are purged this many rows per transaction (python manage.py purge_deleted)
+PURGE_BATCH_SIZE = 500
+
+# Daily digests (python manage.py send_digests): tasks due within this many days count as due soon;
+# users are processed this many per chunk, and each digest lists at most DIGEST_MAX_ITEMS per section
+DIGEST_DUE_SOON_DAYS = 2
+DIGEST_USER_CHUNK = 500
+DIGEST_MAX_ITEMS = 20
+
+# Kanban/sticky-note position keys longer than this are respaced (python manage.py rebalance_positions)
+POSITION_REBALANCE_LENGTH = 12
+
+# Dashboard snapshots are invalidated on writes; this only bounds how long an unused one lingers
+DASHBOARD_CACHE_SECONDS = 300
+
+# Productivity analytics (api.analytics) share the dashboard's invalidation; reports cover at most this many days
+ANALYTICS_CACHE_SECONDS = 3600
+ANALYTICS_MAX_DAYS = 730
+
+# ASGI deployment (see rolejuggler_backend/asgi.py): with ASYNC_VIEWS=1 the
+# I/O-bound endpoints (fetch today, dashboard) are served by the coroutine
+# views in api.async_views. Leave it off under WSGI, where every async view
+# would pay for its own event loop. Under ASGI keep CONN_MAX_AGE at 0 (the
+# default): ORM calls run on per-request threads, so persistent connections
+# would pile up instead of being reused.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '0') == '1'
+
+# Response compression (api.middleware): brotli if installed, else gzip
+RESPONSE_COMPRESSION_MIN_BYTES = 1024
+RESPONSE_BROTLI_QUALITY = 5
+
 # Database
 DATABASES = {
     'default': {
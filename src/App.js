@@ -211,6 +211,16 @@ const App = () => {
       throw error;
     }
   };
+
+  const handleStickyNoteEdits = async (noteId, revision, ops, content) => {
+    const response = await stickyNotesAPI.saveEdits(noteId, revision, ops);
+    setStickyNotes(prev =>
+      prev.map(note =>
+        note.id === noteId ? { ...note, content, revision: response.data.revision, updated_at: response.data.updated_at } : note
+      )
+    );
+    return response.data;
+  };
   // Analytics filter handler
   const handleAnalyticsJobChange = (jobId) => {
     setAnalyticsJobId(jobId ? parseInt(jobId) : null);
@@ -516,6 +526,7 @@ const handleStartTask = async (taskId) => {
     onStickyNoteAdd={handleAddStickyNote}
     onStickyNoteDelete={handleDeleteStickyNote}
     onStickyNoteEdit={handleEditStickyNote}
+    onStickyNoteEdits={handleStickyNoteEdits}
     onTaskControl={handleTaskControl}        // Add this
     onStartTask={handleStartTask}            // Add this
     onAnalyticsJobChange={handleAnalyticsJobChange}
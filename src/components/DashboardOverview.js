@@ -4,7 +4,7 @@ import { Calendar, CheckSquare, Bell } from 'lucide-react';
 import TaskAnalytics from './TaskAnalytics';
 import CurrentTaskTracker from './CurrentTaskTracker';
 import StickyNotes from './StickyNotes';
-import { emailsAPI, meetingsAPI } from '../services/api';
+import { dashboardAPI, emailsAPI } from '../services/api';
 
 const getPriorityTextColor = (priority) => {
   switch (priority) {
@@ -29,6 +29,7 @@ const DashboardOverview = ({
   onStickyNoteAdd,
   onStickyNoteDelete,
   onStickyNoteEdit,
+  onStickyNoteEdits,
   onTaskControl,
   onStartTask,
   onAnalyticsJobChange,
@@ -52,13 +53,18 @@ const DashboardOverview = ({
   // Filter today's tasks
   const todayTasks = tasks.filter(task => task.deadline === today);
 
-  // Fetch meetings and updates
-  const fetchMeetings = async () => {
+  // Upcoming meetings and recent updates come from one cached snapshot
+  const fetchDashboard = async () => {
     try {
-      const res = await meetingsAPI.getAll();
-      setAllMeetings(res.data || []);
+      const res = await dashboardAPI.get(today);
+      setAllMeetings(res.data.upcoming_meetings || []);
+      setUpdates(prev => {
+        const existingIds = new Set(prev.map(u => u.id));
+        const newOnes = (res.data.recent_updates || []).filter(u => !existingIds.has(u.id));
+        return [...prev, ...newOnes];
+      });
     } catch (error) {
-      console.error('Error fetching meetings:', error);
+      console.error('Error fetching dashboard:', error);
     }
   };
 
@@ -72,18 +78,18 @@ const DashboardOverview = ({
         return [...newOnes, ...prev];
       });
       // Refresh meetings after fetching emails (in case new meetings were added)
-      fetchMeetings();
+      fetchDashboard();
     } catch (error) {
       console.error('Error fetching email updates:', error);
     }
   };
 
   useEffect(() => {
-    fetchMeetings();
+    fetchDashboard();
     fetchEmailUpdates();
     
     const interval = setInterval(() => {
-      fetchMeetings();
+      fetchDashboard();
       fetchEmailUpdates();
     }, 5 * 60 * 1000);
     
@@ -314,6 +320,7 @@ const DashboardOverview = ({
         onAddNote={onStickyNoteAdd}
         onDeleteNote={onStickyNoteDelete}
         onEditNote={onStickyNoteEdit}
+        onSaveNoteEdits={onStickyNoteEdits}
       />
     </div>
     
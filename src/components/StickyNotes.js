@@ -1,8 +1,9 @@
 // components/StickyNotes.js - Notes Management Component
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { StickyNote, Plus, Trash2, Edit3, X } from 'lucide-react';
+import { createNoteAutosaver } from '../services/noteAutosave';
 
-const StickyNotes = ({ notes, onAddNote, onDeleteNote, onEditNote }) => {
+const StickyNotes = ({ notes, onAddNote, onDeleteNote, onEditNote, onSaveNoteEdits }) => {
   // State for add note modal
   const [showAddNote, setShowAddNote] = useState(false);
   const [newNoteContent, setNewNoteContent] = useState('');
@@ -11,6 +12,11 @@ const StickyNotes = ({ notes, onAddNote, onDeleteNote, onEditNote }) => {
   // State for editing notes
   const [editingNote, setEditingNote] = useState(null);
   const [editContent, setEditContent] = useState('');
+  // Delta autosave of the note being edited, and its text before editing (for Esc)
+  const autosaver = useRef(null);
+  const originalContent = useRef('');
+
+  useEffect(() => () => autosaver.current?.stop(), []);
 
   // Available colors for sticky notes
   const noteColors = [
@@ -40,11 +46,38 @@ const StickyNotes = ({ notes, onAddNote, onDeleteNote, onEditNote }) => {
   const startEditing = (note) => {
     setEditingNote(note.id);
     setEditContent(note.content);
+    originalContent.current = note.content;
+    if (onSaveNoteEdits) {
+      // Saves coalesced edits periodically while typing, as small deltas
+      autosaver.current = createNoteAutosaver({
+        revision: note.revision ?? 0,
+        content: note.content,
+        send: (revision, ops, content) => onSaveNoteEdits(note.id, revision, ops, content),
+        onRebase: setEditContent,
+      });
+    }
+  };
+
+  const handleEditChange = (value) => {
+    setEditContent(value);
+    autosaver.current?.update(value);
+  };
+
+  // Stop autosaving, saving `content` last
+  const finishAutosave = (content) => {
+    const saver = autosaver.current;
+    autosaver.current = null;
+    saver.update(content);
+    saver.flush()
+      .catch((error) => console.error('Error saving note:', error.response?.data))
+      .finally(() => saver.stop());
   };
 
   // Handle saving edited note
   const saveEdit = () => {
-    if (editContent.trim()) {
+    if (autosaver.current) {
+      finishAutosave(editContent.trim() || originalContent.current);
+    } else if (editContent.trim()) {
       onEditNote(editingNote, { content: editContent.trim() });
     }
     setEditingNote(null);
@@ -53,6 +86,8 @@ const StickyNotes = ({ notes, onAddNote, onDeleteNote, onEditNote }) => {
 
   // Handle canceling edit
   const cancelEdit = () => {
+    // Autosaved edits are rolled back to the text from before editing
+    if (autosaver.current) finishAutosave(originalContent.current);
     setEditingNote(null);
     setEditContent('');
   };
@@ -168,7 +203,7 @@ const StickyNotes = ({ notes, onAddNote, onDeleteNote, onEditNote }) => {
               <div>
                 <textarea
                   value={editContent}
-                  onChange={(e) => setEditContent(e.target.value)}
+                  onChange={(e) => handleEditChange(e.target.value)}
                   onKeyDown={handleEditKeyPress}
                   onBlur={saveEdit}
                   className="w-full bg-transparent resize-none border-none focus:outline-none text-sm p-0"
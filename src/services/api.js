@@ -46,11 +46,12 @@ export const authAPI = {
 export const profileAPI = {
   get: () => api.get('/profile/'),
   update: (profileData) => api.patch('/profile/', profileData),
+  delete: () => api.delete('/profile/'),  // 202: signed out now, data purged in the background
 };
 
 // Jobs API calls
 export const jobsAPI = {
-  getAll: () => api.get('/jobs/'),
+  getAll: (params) => api.get('/jobs/', { params }),
   getById: (id) => api.get(`/jobs/${id}/`),
   create: (jobData) => api.post('/jobs/', jobData),
   update: (id, jobData) => api.patch(`/jobs/${id}/`, jobData),
@@ -59,16 +60,18 @@ export const jobsAPI = {
 
 // Tasks API calls
 export const tasksAPI = {
-  getAll: () => api.get('/tasks/'),
+  getAll: (params) => api.get('/tasks/', { params }),  // e.g. { fields: 'id,title' }
   getById: (id) => api.get(`/tasks/${id}/`),
   create: (taskData) => api.post('/tasks/', taskData),
   update: (id, taskData) => api.patch(`/tasks/${id}/`, taskData),
   delete: (id) => api.delete(`/tasks/${id}/`),
+  // Between two neighbours (either may be null), optionally into another column
+  move: (id, { after = null, before = null, status } = {}) => api.post(`/tasks/${id}/move/`, { after, before, status }),
 };
 
 // Meetings API calls
 export const meetingsAPI = {
-  getAll: () => api.get('/meetings/'),
+  getAll: (params) => api.get('/meetings/', { params }),
   getById: (id) => api.get(`/meetings/${id}/`),
   create: (meetingData) => api.post('/meetings/', meetingData),
   update: (id, meetingData) => api.patch(`/meetings/${id}/`, meetingData),
@@ -77,16 +80,22 @@ export const meetingsAPI = {
 
 // Sticky Notes API calls
 export const stickyNotesAPI = {
-  getAll: () => api.get('/sticky-notes/'),
+  getAll: (params) => api.get('/sticky-notes/', { params }),
   getById: (id) => api.get(`/sticky-notes/${id}/`),
   create: (noteData) => api.post('/sticky-notes/', noteData),
   update: (id, noteData) => api.patch(`/sticky-notes/${id}/`, noteData),
   delete: (id) => api.delete(`/sticky-notes/${id}/`),
+  move: (id, { after = null, before = null } = {}) => api.post(`/sticky-notes/${id}/move/`, { after, before }),
+  // ops: [[start, deleteCount, insert], ...] against `revision`; 409 carries the current { revision, content }
+  saveEdits: (id, revision, ops) => api.post(`/sticky-notes/${id}/edits/`, { revision, ops }),
 };
 
 // Updates API calls
 export const updatesAPI = {
-  getAll: () => api.get('/updates/'),
+  getAll: (params) => api.get('/updates/', { params }),  // { cursor, page_size, type, q }; returns { next, previous, results }
+  searchArchive: (params) => api.get('/updates/archive/', { params }),  // { q, since, until, cursor }
+  update: (id, data) => api.patch(`/updates/${id}/`, data),  // a new type is a correction the classifier learns
+  getBody: (id) => api.get(`/updates/${id}/body/`),
 };
 
 // Email API calls
@@ -94,4 +103,64 @@ export const emailsAPI = {
   fetchToday: () => api.post('/emails/fetch-today/'),
 };
 
+// Planner API calls
+export const plannerAPI = {
+  getPlan: (params) => api.get('/planner/', { params }),
+};
+
+// Calendar feed API calls
+export const calendarAPI = {
+  rotateToken: () => api.post('/calendar/token/'),
+  revokeToken: () => api.delete('/calendar/token/'),
+};
+
+// Sender domain -> company/job mappings
+export const senderDomainsAPI = {
+  getAll: () => api.get('/sender-domains/'),
+  override: (data) => api.post('/sender-domains/', data),
+  update: (id, data) => api.patch(`/sender-domains/${id}/`, data),
+  delete: (id) => api.delete(`/sender-domains/${id}/`),
+};
+
+// Dataset export / import
+export const dataAPI = {
+  exportAll: () => api.get('/export/', { responseType: 'blob' }),
+  exportCsv: (resource) => api.get('/export/', { params: { output: 'csv', resource }, responseType: 'blob' }),
+  importAll: (file) => {
+    const form = new FormData();
+    form.append('file', file);
+    return api.post('/import/', form);
+  },
+};
+
+// Deletion progress (jobs and accounts are purged in the background)
+export const purgesAPI = {
+  getAll: () => api.get('/purges/'),
+  getById: (id) => api.get(`/purges/${id}/`),
+};
+
+export const ingestionRunsAPI = {
+  // params: { status: 'failed', min_ms: 5000, cursor, page_size }; returns { next, previous, results }
+  getAll: (params) => api.get('/ingestion/runs/', { params }),
+  getById: (id) => api.get(`/ingestion/runs/${id}/`),
+};
+
+// Notifications API calls (daily due-soon/overdue digests)
+export const notificationsAPI = {
+  getAll: (params) => api.get('/notifications/', { params }),  // params: { unread: 1 }
+  markRead: (id, read = true) => api.patch(`/notifications/${id}/`, { read }),
+  markAllRead: () => api.post('/notifications/read-all/'),
+};
+
+// Dashboard API calls
+export const dashboardAPI = {
+  get: (date) => api.get('/dashboard/', { params: { date } }),
+};
+
+// Productivity analytics API calls
+export const analyticsAPI = {
+  // params: { days: 90, tz: Intl.DateTimeFormat().resolvedOptions().timeZone }
+  getProductivity: (params) => api.get('/analytics/productivity/', { params }),
+};
+
 export default api;
\ No newline at end of file
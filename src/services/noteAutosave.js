@@ -0,0 +1,82 @@
+// services/noteAutosave.js - Delta autosave for sticky notes
+//
+// Keystrokes only update local text; every `interval` ms whatever changed since the last
+// saved revision is sent as one compact splice [start, deleteCount, insert] to
+// POST /sticky-notes/:id/edits/, one request at a time. If someone else saved in the
+// meantime the server answers 409 with its text, and our splice is rebased onto it.
+
+// The single splice turning `before` into `after` (common prefix and suffix kept), or null
+export const diffSplice = (before, after) => {
+  if (before === after) return null;
+  let start = 0;
+  const shortest = Math.min(before.length, after.length);
+  while (start < shortest && before[start] === after[start]) start++;
+  let end = 0;
+  while (end < shortest - start && before[before.length - 1 - end] === after[after.length - 1 - end]) end++;
+  return [start, before.length - end - start, after.slice(start, after.length - end)];
+};
+
+export const applySplice = (text, [start, deleteCount, insert]) =>
+  text.slice(0, start) + insert + text.slice(start + deleteCount);
+
+// Move `splice`, made against `base`, onto `theirs` (another edit of `base`)
+export const rebaseSplice = (splice, base, theirs) => {
+  const other = diffSplice(base, theirs);
+  if (!other) return splice;
+  const [start, deleteCount, insert] = splice;
+  const [otherStart, otherDelete, otherInsert] = other;
+  const shift = otherInsert.length - otherDelete;
+  if (otherStart + otherDelete <= start) return [start + shift, deleteCount, insert];
+  if (start + deleteCount <= otherStart) return splice;
+  // Overlapping edits: ours wins over the union of both ranges
+  const from = Math.min(start, otherStart);
+  const to = Math.max(start + deleteCount, otherStart + otherDelete);
+  const ours = applySplice(base, splice);
+  return [from, to + shift - from, ours.slice(from, to + insert.length - deleteCount)];
+};
+
+// send(revision, ops, content) resolves to the server's { revision } or rejects with the axios error
+export const createNoteAutosaver = ({ revision, content, send, onRebase, interval = 1500 }) => {
+  let saved = { revision, content };  // what the server has
+  let text = content;                 // what the user sees
+  let inFlight = null;
+
+  const save = async () => {
+    const splice = diffSplice(saved.content, text);
+    if (!splice) return saved;
+    const sending = text;
+    try {
+      const data = await send(saved.revision, [splice], sending);
+      saved = { revision: data.revision, content: sending };
+    } catch (error) {
+      if (error.response?.status !== 409) throw error;
+      const theirs = error.response.data;
+      // Rebase everything unsaved, including what was typed while the request was in flight
+      const mine = diffSplice(saved.content, text);
+      text = mine ? applySplice(theirs.content, rebaseSplice(mine, saved.content, theirs.content)) : theirs.content;
+      saved = { revision: theirs.revision, content: theirs.content };
+      if (onRebase) onRebase(text);
+      return save();
+    }
+    return saved;
+  };
+
+  const flush = () => {
+    if (!inFlight) inFlight = save().finally(() => { inFlight = null; });
+    return inFlight;
+  };
+
+  const timer = setInterval(() => {
+    if (text !== saved.content) flush().catch((error) => console.error('Error autosaving note:', error.response?.data));
+  }, interval);
+
+  return {
+    update: (next) => { text = next; },
+    // Waits for a save in progress, then saves whatever is still unsaved
+    flush: async () => {
+      if (inFlight) await inFlight.catch(() => {});
+      return flush();
+    },
+    stop: () => clearInterval(timer),
+  };
+};